@@ -14,6 +14,7 @@ const Recipe = () => {
   const [overall, setOverall] = useState([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
+  const [detailError, setDetailError] = useState("");
   const [title, setTitle] = useState("");
   const [infos, setInfos] = useState([]);
   const [activeState, setActiveState] = useState("ingredients");
@@ -27,6 +28,7 @@ const Recipe = () => {
     const fetchRecipe = async () => {
       setLoading(true);
       setError("");
+      setDetailError("");
       setSteps([]);
 
       try {
@@ -37,17 +39,27 @@ const Recipe = () => {
         }
 
         const data = await res.json();
-        const { image_url, steps, grid_info, infos, title } = data.data;
-        const { ingredients, overall } = data;
-        // data: { id: number, steps: string[] }
+        // data: { id, data, overall, ingredients, sections: { data, similar } }
+        // 상세 페이지가 시간 초과/실패하면 data 는 null → 비슷한 레시피만 보여줌
         console.log("data", data);
-        setTitle(title);
-        setInfos(infos);
-        setImageUrl(image_url || "");
-        setGridInfo(grid_info || []);
-        setSteps(steps || []);
-        setIngredients(ingredients);
-        setOverall(overall);
+        setIngredients(data.ingredients || []);
+        setOverall(data.overall || []);
+        if (data.data) {
+          const { image_url, steps, grid_info, infos, title } = data.data;
+          setTitle(title);
+          setInfos(infos || []);
+          setImageUrl(image_url || "");
+          setGridInfo(grid_info || {});
+          setSteps(steps || []);
+        } else {
+          const status = data.sections?.data?.status;
+          console.warn("recipe detail unavailable:", data.sections?.data);
+          setDetailError(
+            status === "timeout"
+              ? "레시피 상세 정보를 불러오는 데 시간이 너무 오래 걸렸습니다."
+              : "레시피 상세 정보를 불러오지 못했습니다."
+          );
+        }
       } catch (err) {
         console.error(err);
         setError("레시피 정보를 불러오지 못했습니다.");
@@ -109,7 +121,11 @@ const Recipe = () => {
         </div>
 
         <div>
-          {activeState === "ingredients" ? (
+          {detailError ? (
+            <p style={{ fontSize: "1.5rem", fontweight: "500" }}>
+              {detailError}
+            </p>
+          ) : activeState === "ingredients" ? (
             <div className={classes.ingredientsContainer}>
               <div
                 className={classes.ingredientsColumn}
@@ -1,18 +1,25 @@
 # rag_flask/app.py
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, jsonify, Response, g
 import numpy as np
 import pandas as pd
-from openai import OpenAI
+from openai_pool import get_pool
 from dotenv import load_dotenv
 import os
-import re
 import torch
-import requests
-from bs4 import BeautifulSoup
 import time
 import json
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
 from graph_similarity_v2 import RecipeGraphSimilarity
-from jiewan_model_v2 import graph_rag_search_with_scoring_explanation
+from jiewan_model_v2 import graph_rag_search_with_scoring_explanation, graph_rag_search_streaming, graph_rag_search_stages
+import crawl_branches
+import extractor_registry
+import metrics
+import search_fields
+import tracing
+from explanation_jobs import get_jobs, parse_wait, template_reason
+from recipe_detail_cache import get_detail_cache
+from bulk_crawl import get_store
 # from jiewan_model import graph_rag_search_with_scoring_explanation
 # from graph_server import graph_rag_search 
 
@@ -21,7 +28,7 @@ DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 
 # 환경변수(.env) 로드
 load_dotenv()
-client = OpenAI()  # OPENAI_API_KEY 자동 사용
+# OpenAI 호출은 openai_pool 공유 풀 사용 (OPENAI_API_KEY 자동 사용)
 
 app = Flask(__name__)
 
@@ -31,9 +38,65 @@ NEO4J_PASSWORD = "password"
 
 similarity_service = RecipeGraphSimilarity(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
 
+# 추출 모델은 백그라운드에서 로드 → 서버는 바로 뜨고 /health 응답 가능
+extractor_registry.warm_up(background=True)
+
+# 1이면 스트리밍 추출 + 하드 필터 사전 조회 경로 사용 (jiewan_model_v2.graph_rag_search_streaming)
+SEARCH_STREAMING = os.environ.get("SEARCH_STREAMING", "0") == "1"
+
+# 1이면 /jiewan-search-v2 결과 레시피 상세 페이지를 백그라운드에서 미리 크롤링 (클릭 시 캐시 hit)
+RECIPE_PREFETCH = os.environ.get("RECIPE_PREFETCH", "1") == "1"
+
+# /crawl-recipe 의 두 branch 용 (deadline 은 crawl_branches.CRAWL_*_DEADLINE_S)
+branch_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="crawl-branch")
+# 유사 레시피(Neo4j)는 따로 — 그래프가 느려져도 상세 페이지 branch 스레드를 잡아먹지 않도록
+similar_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="crawl-similar")
+
 def json_line(obj):
     return json.dumps(obj, ensure_ascii=False) + "\n"
 
+# /metrics: 단계별 지연 히스토그램 + 카운터 + 캐시 / 풀 / 스케줄러 stats (metrics.py)
+metrics.register_default_collectors()
+
+
+@app.before_request
+def _start_timer():
+    g.request_t0 = time.perf_counter()
+    # 요청마다 span 트리 (tracing.py) — SLOW_REQUEST_THRESHOLD_S 넘으면 body 와 함께 slow_requests.jsonl 로
+    rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    # tracing 이 꺼져 있으면 body 를 파싱하지 않고, Content-Length 가 없거나 크면 body 없이 남김
+    body = None
+    length = request.content_length
+    if (tracing.TRACING_ENABLED and request.method == "POST"
+            and length is not None and length <= tracing.TRACE_BODY_MAX_BYTES):
+        body = request.get_json(silent=True)
+    g.trace, g.trace_token = tracing.start_trace(
+        rule, method=request.method, path=request.full_path.rstrip("?"), body=body,
+    )
+
+
+@app.after_request
+def _record_request(response):
+    # endpoint 라벨은 url rule (/crawl-recipe/<int:recipe_id>) → recipe_id 별로 늘어나지 않음
+    # (스트리밍 응답은 generator 를 돌려준 시점까지)
+    rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    if rule != "/metrics" and "request_t0" in g:
+        metrics.observe("http_request_duration_seconds", time.perf_counter() - g.request_t0,
+                        endpoint=rule, method=request.method)
+        metrics.inc("http_requests_total", endpoint=rule, method=request.method, status=response.status_code)
+    if g.get("trace") is not None:
+        g.trace.root.attrs["status"] = response.status_code
+        response.headers["X-Trace-Id"] = g.trace.trace_id
+    return response
+
+
+@app.teardown_request
+def _end_trace(exc):
+    if g.get("trace") is not None:
+        tracing.end_trace(g.trace, g.trace_token, error=f"{type(exc).__name__}: {exc}" if exc else None)
+        g.trace = None
+
+
 # ===== 데이터 & 임베딩 로드 =====
 # 미리 만들어둔 임베딩
 embeddings = np.load("recipe_embeddings.npy").astype("float32")
@@ -51,10 +114,11 @@ EMBED_MODEL = "text-embedding-3-small"
 
 def embed_query(text: str, keywords: dict) -> np.ndarray:
     """OpenAI 임베딩으로 쿼리 벡터 생성"""
-    resp = client.embeddings.create(
-        model=EMBED_MODEL,
-        input=[text],
-    )
+    with metrics.stage("embed"):
+        resp = get_pool().embeddings_create(
+            model=EMBED_MODEL,
+            input=[text],
+        )
     v = np.array(resp.data[0].embedding, dtype="float32")
     v = v / np.linalg.norm(v)
     v_t = torch.from_numpy(v).to(DEVICE)  # (D,)
@@ -62,92 +126,45 @@ def embed_query(text: str, keywords: dict) -> np.ndarray:
 
 
 def get_recipe(id):
-    res = requests.get(f"https://www.10000recipe.com/recipe/{id}")
-    soup = BeautifulSoup(res.content, features="html.parser")
-    main_title = soup.select_one("div.view2_summary h3").text
-
-    infos = soup.select_one("div.view2_summary_info")
-    info1 = infos.select_one("span.view2_summary_info1")
-    info1 = info1.text if info1 else ""
-    info2 = infos.select_one("span.view2_summary_info2")
-    info2 = info2.text if info2 else ""
-    info3 = infos.select_one("span.view2_summary_info3")
-    info3 = info3.text if info3 else ""
-    infos = [info1,info2,info3]
-
-
-    # Fallback: desktop layout style that sometimes appears
-    image_url = ""
-    img_tag = soup.select_one("div.centeredcrop img")
-    if not img_tag:
-        img_tag = soup.select_one("div.view3_pic img")
-
-    if img_tag and img_tag.get("src"):
-        image_url = img_tag["src"].strip()
-
-    grid = soup.select_one("div.cont_ingre2")
-    result = {
-        "재료": [],
-        "조리도구": []
-    }
-
-    # 모든 big titles 찾기 (ex: 재료 / 조리도구)
-    big_sections = grid.select("div.best_tit")
-
-    for section in big_sections:
-        title = section.get_text(strip=True)
-
-        # 제목 다음에 오는 ready_ingre3 블록 찾기
-        next_div = section.find_next_sibling("div", class_="ready_ingre3")
-        if not next_div:
-            continue
-
-        # 재료 처리
-        if "재료" in title:
-            for li in next_div.select("li"):
-                # 재료명
-                name_tag = li.select_one("div.ingre_list_name a")
-                if not name_tag:
-                    continue
-                name = name_tag.get_text(strip=True)
-
-                # 용량
-                qty_tag = li.select_one("span.ingre_list_ea")
-                qty = qty_tag.get_text(strip=True) if qty_tag else ""
-
-                result["재료"].append((name, qty))
-
-        # 조리도구 처리
-        elif "조리도구" in title:
-            for li in next_div.select("li"):
-                name_tag = li.select_one("div.ingre_list_name")
-                if name_tag:
-                    tool_name = name_tag.get_text(strip=True)
-                    result["조리도구"].append(tool_name)
+    # 1) bulk_crawl 로 미리 받아둔 로컬 저장소 (RECIPE_STORE_DIR)
+    store = get_store()
+    if store is not None:
+        detail = store.get(id)
+        if detail is not None:
+            return detail
+    # 2) 없으면 크롤링 — 결과는 recipe_detail_cache (LRU + sqlite, TTL)
+    return get_detail_cache().get(id)
+
+
+def prefetch_details(recipes):
+    # get_recipe 와 같은 순서: bulk_crawl 저장소에 이미 있는 id 는 크롤링하지 않음 (asgi_app._prefetch 와 동일)
+    store = get_store()
+    get_detail_cache().prefetch(
+        r["recipe_id"] for r in recipes
+        if r.get("recipe_id") is not None and (store is None or r["recipe_id"] not in store)
+    )
 
 
+@app.route("/health", methods=["GET"])
+def health():
+    # 프로세스가 살아 있으면 바로 ok (모델 로드 여부와 무관)
+    return jsonify({"status": "ok"})
 
-    steps = []
-    for cont in soup.select("div.view_step_cont"):
-        step = {"text": "","tools": "", "img_url": ""}
-        body = cont.select_one("div.media-body")
-        if body:
-            main_text_node = body.find(string=True, recursive=False)
-            if main_text_node:
-                # steps.append(main_text_node.strip())
-                step["text"] = main_text_node.strip()
 
-                tools = body.select("p")
-                if tools:
-                    step["tools"] = tools[0].text.strip()
+@app.route("/ready", methods=["GET"])
+def ready():
+    # 추출 백엔드별 준비 상태 (active 백엔드가 준비돼야 200)
+    status = extractor_registry.readiness()
+    code = 200 if extractor_registry.is_ready() else 503
+    return jsonify(status), code
 
-        img = cont.find("div", id=re.compile(r"stepimg\d+")).select_one("img")
-        if img:
-            step["img_url"] = img["src"]
-        steps.append(step)
-        
 
-    return {"title": main_title,"infos":infos, "image_url": image_url, "steps": steps, "grid_info": result }
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    # Prometheus scrape 용 text format, ?format=json 이면 bucket 근사 p50/p95/p99 포함 JSON
+    if request.args.get("format") == "json":
+        return jsonify(metrics.snapshot())
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/search", methods=["POST"])
@@ -255,10 +272,19 @@ def graph_search_endpoint():
 
     if not query:
         return jsonify({"error": "query is required"}), 400
+    # 추천 이유: "none"(기존) / "template"(템플릿만) / "llm_async"(템플릿 먼저 + LLM 설명은 /explanations 로 조회)
+    # 응답 크기 / 설명 계산량: explain_level(none / summary / full) + fields (search_fields.py)
+    try:
+        explain = search_fields.parse_explain(data)
+        explain_level, fields = search_fields.parse_request(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    explain_fields = search_fields.explanation_fields(explain_level, fields, with_reason=explain != "none")
 
     try:
         start = time.time()
-        res = graph_rag_search_with_scoring_explanation(query,filterKeywords = filterKeywords, top_k=top_k)
+        search_fn = graph_rag_search_streaming if SEARCH_STREAMING else graph_rag_search_with_scoring_explanation
+        res = search_fn(query,filterKeywords = filterKeywords, top_k=top_k, explain_fields=explain_fields)
         end = time.time()
         print(f"⏱️ 작업 소요 시간: {end - start:.4f}초")
     except Exception as e:
@@ -267,36 +293,131 @@ def graph_search_endpoint():
 
     # Express 쪽에서 쓰기 편하도록 기존 /search와 비슷한 형태로 맞추기
     # res["recipes"] = [{recipe_id, title, name, views, time_min, difficulty, servings, score}, ...]
-    return jsonify({
+    body = {
         "results": res["recipes"],   # 메인 추천 리스트
         "keywords": res["keywords"], # 디버깅/로그용 (원하면 프론트에서 안 써도 됨)
-    })
+    }
+    if explain == "template":
+        for r in res["recipes"]:
+            r["template_reason"] = template_reason(r, res["keywords"])
+    elif explain == "llm_async" and res["recipes"]:
+        # 템플릿 이유는 submit 에서 바로 채워짐, LLM 설명은 백그라운드 생성
+        request_id = get_jobs().submit(query, res)
+        body["request_id"] = request_id
+        body["explanations_url"] = f"/explanations/{request_id}"
+    body["results"] = search_fields.project_recipes(res["recipes"], explain_level, fields)
+    if RECIPE_PREFETCH:
+        prefetch_details(res["recipes"])
+    return jsonify(body)
+
+
+@app.route("/jiewan-search-v2/stream", methods=["POST"])
+def graph_search_stream_endpoint():
+    """
+    /jiewan-search-v2 의 NDJSON 스트리밍 버전 — 단계가 끝날 때마다 한 줄씩
+      {"type": "keywords"}  추출 결과 (그래프 쿼리 전)
+      {"type": "results"}   선택까지 끝난 레시피 카드 (explain 이 none 이 아니면 template_reason 포함)
+      {"type": "explanation", "recipe_id": ...}  레시피별 LLM 설명
+          explain=cached: 설명 캐시에 있는 것만 (GPU 안 씀) / explain=llm: 없는 건 생성해서 끝나는 순서대로
+      {"type": "done"}
+    explain_level / fields 는 /jiewan-search-v2 와 같음 (results 줄의 레시피 카드에 적용).
+    실패하면 {"type": "error", "stage": ...} 한 줄 보내고 종료.
+    클라이언트가 연결을 끊으면 다음 write 에서 generator 가 닫히고 남은 설명 생성은 취소됨.
+    """
+    data = request.get_json() or {}
+    query = (data.get("query") or "").strip()
+    filterKeywords = (data.get("filterKeywords") or {})
+    top_k = int(data.get("top_k", 5))
+
+    if not query:
+        return jsonify({"error": "query is required"}), 400
+    try:
+        # "none" / "template" / "cached"(기본: 템플릿 + 캐시에 있는 LLM 설명만) / "llm"(없는 설명도 생성)
+        explain = search_fields.parse_explain(data, search_fields.STREAM_EXPLAIN_MODES, default="cached")
+        explain_level, fields = search_fields.parse_request(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    explain_fields = search_fields.explanation_fields(explain_level, fields, with_reason=explain != "none")
+
+    trace_name = request.url_rule.rule
+    trace_attrs = {"method": request.method, "path": request.full_path.rstrip("?"), "body": data}
+
+    def generate():
+        # 응답을 다 보낼 때까지가 한 trace (요청 trace 는 generator 를 돌려줄 때 끝남)
+        with tracing.trace(trace_name, **trace_attrs):
+            yield from _generate()
+
+    def _generate():
+        t0 = time.perf_counter()
+
+        def elapsed_ms():
+            return round((time.perf_counter() - t0) * 1000, 1)
+
+        stage = "keywords"
+        try:
+            res = None
+            for kind, value in graph_rag_search_stages(query, filterKeywords=filterKeywords, top_k=top_k,
+                                                       streaming=SEARCH_STREAMING, explain_fields=explain_fields):
+                if kind == "keywords":
+                    yield json_line({"type": "keywords", "keywords": value, "elapsed_ms": elapsed_ms()})
+                    stage = "results"
+                else:
+                    res = value
+
+            if explain in ("template", "cached", "llm"):
+                for r in res["recipes"]:
+                    r["template_reason"] = template_reason(r, res["keywords"])
+            line = {"type": "results", "keywords": res["keywords"],
+                    "results": search_fields.project_recipes(res["recipes"], explain_level, fields),
+                    "elapsed_ms": elapsed_ms()}
+            if res.get("no_result_message"):
+                line["no_result_message"] = res["no_result_message"]
+            yield json_line(line)
+            if RECIPE_PREFETCH:
+                prefetch_details(res["recipes"])
+
+            stage = "explanations"
+            if explain in ("cached", "llm") and res["recipes"]:
+                with closing(get_jobs().stream(query, res, generate=explain == "llm")) as explanations:
+                    for recipe_id, expl, error in explanations:
+                        line = {"type": "explanation", "recipe_id": recipe_id, "explanation": expl,
+                                "elapsed_ms": elapsed_ms()}
+                        if error:
+                            line["error"] = error
+                        yield json_line(line)
+        except Exception as e:
+            print(f"[ERROR] search stream failed at {stage}:", e)
+            yield json_line({"type": "error", "stage": stage, "error": "graph search failed", "detail": str(e)})
+            return
+        print(f"⏱️ 스트리밍 작업 소요 시간: {elapsed_ms() / 1000:.4f}초")
+        yield json_line({"type": "done", "elapsed_ms": elapsed_ms()})
+
+    return Response(generate(), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/explanations/<request_id>", methods=["GET"])
+@app.route("/explanations/<request_id>/<recipe_id>", methods=["GET"])
+def explanations_endpoint(request_id, recipe_id=None):
+    # ?wait=초 : LLM 설명이 끝날 때까지 최대 그만큼 대기 (long-poll, 최대 30초)
+    try:
+        wait_s = parse_wait(request.args.get("wait"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    job = get_jobs().get(request_id, recipe_id=recipe_id, wait_s=wait_s)
+    if job is None:
+        return jsonify({"error": "unknown or expired request_id"}), 404
+    return jsonify(job)
 
 @app.route("/crawl-recipe/<int:recipe_id>", methods=["GET"]) #아래 엔드포인트랑 합치기
 def crawl_recipe_endpoint(recipe_id):
-
-    top_n = 3
-    min_shared_ings = int(2)  # 기본값: 최소 2개 재료 공유
-    try:
-        start = time.time()
-        result = similarity_service.get_similar_recipes(
-            recipe_id=recipe_id,
-            top_n=top_n,
-            min_shared_ings=min_shared_ings,
-        )
-        end = time.time()
-        print(f"⏱️ similar-recipes 작업 소요 시간: {end - start:.4f}초")
-        data = get_recipe(recipe_id)
-        return jsonify({
-            "id": recipe_id,
-            "data": data,
-            "overall": result["overall"],         # 전체 그래프 기반 유사 레시피
-        "ingredients": result["ingredients"], # 재료 기반 유사 레시피
-        })
-    
-    except Exception as e:
-        print("[ERROR] get_recipe failed:", e)
-        return jsonify({"error": "crawl_failed", "detail": str(e)}), 500
+    # 상세 페이지(data) 와 유사 레시피(similar) 를 동시에, 각자 deadline 까지만 기다림 (crawl_branches.py)
+    body, status = crawl_branches.crawl_recipe(
+        recipe_id, get_recipe, similarity_service, branch_executor, similar_executor,
+        top_n=3,
+        min_shared_ings=2,  # 기본값: 최소 2개 재료 공유
+    )
+    return jsonify(body), status
 
 @app.route("/similar-recipes", methods=["POST"])
 def similar_recipes_endpoint():
@@ -328,4 +449,5 @@ def similar_recipes_endpoint():
 
 if __name__ == "__main__":
     # Node 서버랑 포트 안 겹치게 5001으로 예시
-    app.run(host="0.0.0.0", port=8001, debug=True)
\ No newline at end of file
+    # debug=True 는 reloader 로 프로세스를 두 번 띄움 (모델 / inference_worker 연결 중복) + 디버거 노출 → 쓰지 않음
+    app.run(host="0.0.0.0", port=8001)
\ No newline at end of file
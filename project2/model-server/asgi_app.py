@@ -0,0 +1,620 @@
+# asgi_app.py
+# app.py 와 같은 라우트 / 같은 JSON 을 내는 async(ASGI) 서버
+#
+#   uvicorn asgi_app:app --host 0.0.0.0 --port 8001 --timeout-graceful-shutdown 20
+#
+# - Neo4j: AsyncGraphDatabase (graph_similarity_v2.AsyncRecipeGraphSimilarity)
+# - 상세 페이지 크롤링: httpx.AsyncClient (keep-alive 풀 + timeout + 동시 요청 수 제한)
+# - OpenAI 임베딩: openai_pool.run_async (풀의 이벤트 루프에서 실행)
+# - 블로킹 / CPU 작업 (키워드 추출 + 그래프 검색, HTML 파싱, torch topk) 은 executor 에서
+#   (/jiewan-search-v2/stream 은 동기 단계 generator 를 한 단계씩 executor 에서 → NDJSON StreamingResponse)
+#   → 이벤트 루프는 느린 의존성을 기다리는 동안에도 다른 요청을 계속 받음
+# - /metrics: metrics.py (단계별 히스토그램 + 카운터 + stats), 요청별 지연은 _MetricsMiddleware
+# - tracing: 요청마다 span 트리 (_MetricsMiddleware 에서 시작, executor 작업은 run_blocking 이 context 를 넘김)
+#   → 느린 요청은 slow_requests.jsonl, 응답 헤더 X-Trace-Id
+# - 종료(SIGTERM): uvicorn 이 새 요청을 막고 진행 중 요청을 기다린 뒤 lifespan 종료
+#   → 백그라운드 작업(prefetch / stale 갱신) 정리, 드라이버 / http 클라이언트 / executor 닫기
+import asyncio
+import contextlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import anyio
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Match, Route
+
+import metrics
+import recipe_crawler
+import search_fields
+import tracing
+from recipe_crawler import RecipeNotFound
+from recipe_detail_cache import FRESH, NEGATIVE, STALE, get_detail_cache
+
+NEO4J_URI = "bolt://localhost:7687"
+NEO4J_USER = "neo4j"
+NEO4J_PASSWORD = "password"
+
+EMBED_MODEL = "text-embedding-3-small"
+
+# 블로킹 작업용 스레드 수 (모델 / 그래프 검색 / 파싱)
+ASGI_EXECUTOR_WORKERS = int(os.environ.get("ASGI_EXECUTOR_WORKERS", "8"))
+SHUTDOWN_TASK_TIMEOUT_S = float(os.environ.get("ASGI_SHUTDOWN_TASK_TIMEOUT_S", "10"))
+
+SEARCH_STREAMING = os.environ.get("SEARCH_STREAMING", "0") == "1"
+RECIPE_PREFETCH = os.environ.get("RECIPE_PREFETCH", "1") == "1"
+CRAWL_DETAIL_DEADLINE_S = float(os.environ.get("CRAWL_DETAIL_DEADLINE_S", "8"))
+CRAWL_SIMILAR_DEADLINE_S = float(os.environ.get("CRAWL_SIMILAR_DEADLINE_S", "3"))
+
+
+class _State:
+    """lifespan 에서 만들고 닫는 자원들"""
+
+    def __init__(self):
+        self.executor = None
+        self.http = None
+        self.http_slots = None
+        self.similarity = None
+        self.detail_cache = None
+        self.store = None
+        self.inflight_details = {}    # recipe_id → asyncio.Future (같은 id 크롤링 한 번만)
+        self.tasks = set()            # 백그라운드 작업 (종료 시 정리)
+        # /search
+        self.emb_norm_t = None
+        self.df = None
+        self.device = None
+
+    def spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def run_blocking(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # run_in_executor 는 contextvars 를 안 넘김 → 현재 span 아래에서 돌도록 wrap
+        return await loop.run_in_executor(self.executor, tracing.wrap(lambda: fn(*args, **kwargs)))
+
+
+_END = object()
+
+
+async def _iterate_blocking(state: _State, gen):
+    """
+    동기 generator 를 executor 에서 한 단계씩 (next 마다 run_blocking).
+    끝나거나 취소 / aclose 되면 gen.close() — 진행 중인 단계가 있으면 그 단계가 끝난 뒤에 (같은 lock).
+    close 는 기다리지 않고 executor 에 넘김 → 취소된 task 의 finally 에서도 await 없이 정리됨
+    """
+    lock = threading.Lock()
+
+    def _step():
+        with lock:
+            return next(gen, _END)
+
+    def _close():
+        with lock:
+            gen.close()
+
+    try:
+        while True:
+            item = await state.run_blocking(_step)
+            if item is _END:
+                return
+            yield item
+    finally:
+        state.executor.submit(_close)
+
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """클라이언트가 끊겨 stream task 가 취소돼도 body generator 를 aclose (StreamingResponse 는 닫지 않음)"""
+
+    async def stream_response(self, send):
+        try:
+            await super().stream_response(send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+
+class _MetricsMiddleware:
+    """
+    app.py 의 before/after/teardown_request 와 같은 역할:
+    http_request_duration_seconds / http_requests_total + 요청 trace (body 포함) + X-Trace-Id 헤더
+    """
+
+    def __init__(self, app, routes):
+        self.app = app
+        self.routes = routes
+
+    def _rule(self, scope):
+        for route in self.routes:
+            if route.matches(scope)[0] == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        status = {"code": 500}
+        rule = self._rule(scope)
+        query = scope.get("query_string", b"").decode("latin-1")
+        trace, token = tracing.start_trace(rule, method=scope["method"],
+                                           path=scope["path"] + (f"?{query}" if query else ""))
+        chunks, size = [], [0]
+
+        async def _receive():
+            message = await receive()
+            if trace is not None and message["type"] == "http.request" and size[0] <= tracing.TRACE_BODY_MAX_BYTES:
+                body = message.get("body", b"")
+                size[0] += len(body)
+                chunks.append(body)
+            return message
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if trace is not None:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-trace-id", trace.trace_id.encode())]
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, _receive, _send)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if trace is not None:
+                body = None
+                if scope["method"] == "POST" and chunks and size[0] <= tracing.TRACE_BODY_MAX_BYTES:
+                    try:
+                        body = json.loads(b"".join(chunks))
+                    except ValueError:
+                        pass
+                tracing.end_trace(trace, token, error=error, status=status["code"], body=body)
+            if rule != "/metrics":
+                metrics.observe("http_request_duration_seconds", time.perf_counter() - t0,
+                                endpoint=rule, method=scope["method"])
+                metrics.inc("http_requests_total", endpoint=rule, method=scope["method"], status=status["code"])
+
+
+def _load_search_index(state: _State):
+    # app.py 와 같은 파일 (없으면 /search 만 503)
+    import numpy as np
+    import pandas as pd
+    import torch
+
+    state.device = "cuda" if torch.cuda.is_available() else "cpu"
+    embeddings = np.load("recipe_embeddings.npy").astype("float32")
+    emb_norm = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    state.emb_norm_t = torch.from_numpy(emb_norm).to(state.device)
+    state.df = pd.read_csv("dataset_preprocessed.csv")
+
+
+def create_app(similarity=None, search_fn=None, detail_cache=None, store=None, use_store: bool = True,
+               load_search_index: bool = True, warm_up: bool = True) -> Starlette:
+    """
+    similarity : async get_similar_recipes(recipe_id, top_n, min_shared_ings) 를 가진 객체
+                 (None 이면 AsyncRecipeGraphSimilarity — Neo4j 연결)
+    search_fn  : 동기 graph_rag_search(query, filterKeywords=, top_k=, explain_fields=) (None 이면 jiewan_model_v2)
+    detail_cache / store : 상세 페이지 캐시 / bulk_crawl 저장소 (None 이면 기본값)
+    (부하 테스트에서는 stub 을 넣어서 외부 의존성 없이 띄움)
+    """
+    state = _State()
+
+    # ---------- lifespan ----------
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        state.executor = ThreadPoolExecutor(max_workers=ASGI_EXECUTOR_WORKERS, thread_name_prefix="asgi-blocking")
+        state.http_slots = asyncio.Semaphore(recipe_crawler.RECIPE_HTTP_MAX_CONCURRENCY)
+        state.http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=recipe_crawler.RECIPE_HTTP_MAX_CONCURRENCY,
+                max_keepalive_connections=recipe_crawler.RECIPE_HTTP_MAX_CONCURRENCY,
+            ),
+            timeout=httpx.Timeout(recipe_crawler.RECIPE_HTTP_READ_TIMEOUT_S,
+                                  connect=recipe_crawler.RECIPE_HTTP_CONNECT_TIMEOUT_S),
+            headers={"User-Agent": "Mozilla/5.0 (recipe-recommender)"},
+        )
+        if similarity is None:
+            from graph_similarity_v2 import AsyncRecipeGraphSimilarity
+            state.similarity = AsyncRecipeGraphSimilarity(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+        else:
+            state.similarity = similarity
+        state.detail_cache = detail_cache or get_detail_cache()
+        metrics.register_default_collectors()
+        metrics.register_collector("recipe_detail_cache", state.detail_cache.stats)
+        if store is not None:
+            state.store = store
+        elif use_store:
+            from bulk_crawl import get_store
+            state.store = get_store()
+        if load_search_index:
+            try:
+                await state.run_blocking(_load_search_index, state)
+            except Exception as e:
+                print("[WARN] search index not loaded, /search disabled:", e)
+        if warm_up:
+            import extractor_registry
+            extractor_registry.warm_up(background=True)
+
+        yield
+
+        # 진행 중 요청은 uvicorn 이 이미 기다려 줌 → 남은 백그라운드 작업만 정리
+        if state.tasks:
+            _done, pending = await asyncio.wait(set(state.tasks), timeout=SHUTDOWN_TASK_TIMEOUT_S)
+            for t in pending:
+                t.cancel()
+        await state.http.aclose()
+        if similarity is None:
+            await state.similarity.close()
+        state.executor.shutdown(wait=True, cancel_futures=True)
+
+    # ---------- 상세 페이지 ----------
+    async def _fetch_detail(key: str):
+        try:
+            with metrics.stage("crawl"):
+                async with state.http_slots:
+                    res = await state.http.get(recipe_crawler.recipe_url(key))
+                if res.status_code == 404:
+                    raise RecipeNotFound(f"recipe {key} not found")
+                res.raise_for_status()
+                value = await state.run_blocking(recipe_crawler.parse_recipe, res.content)
+        except RecipeNotFound:
+            await state.run_blocking(state.detail_cache.put, key, None)
+            raise
+        await state.run_blocking(state.detail_cache.put, key, value)
+        return value
+
+    def _start_detail_fetch(key: str):
+        fut = state.inflight_details.get(key)
+        if fut is None:
+            fut = state.spawn(_fetch_detail(key))
+            state.inflight_details[key] = fut
+            fut.add_done_callback(lambda _f, k=key: state.inflight_details.pop(k, None))
+        return fut
+
+    async def get_recipe(recipe_id):
+        # app.get_recipe 와 같은 순서: bulk_crawl 저장소 → 캐시 → 크롤링
+        if state.store is not None:
+            detail = await state.run_blocking(state.store.get, recipe_id)
+            if detail is not None:
+                return detail
+        key = str(recipe_id)
+        cached_state, value = await state.run_blocking(state.detail_cache.lookup, key)
+        if cached_state == FRESH:
+            return value
+        if cached_state == NEGATIVE:
+            raise RecipeNotFound(f"recipe {key} not found (cached)")
+        if cached_state == STALE:
+            _start_detail_fetch(key)
+            return value
+        try:
+            # shield: 요청이 취소돼도(deadline 등) 크롤링은 끝까지 해서 캐시에 저장
+            return await asyncio.shield(_start_detail_fetch(key))
+        except RecipeNotFound:
+            raise
+        except Exception:
+            if value is not None:    # 만료된 캐시라도 있으면
+                return value
+            raise
+
+    async def _prefetch(recipe_ids):
+        for rid in recipe_ids:
+            key = str(rid)
+            if state.store is not None and key in state.store:
+                continue
+            cached_state, _ = await state.run_blocking(state.detail_cache.lookup, key)
+            if cached_state in (FRESH, NEGATIVE):
+                continue
+            _start_detail_fetch(key)
+
+    # ---------- routes ----------
+    async def health(request: Request):
+        return JSONResponse({"status": "ok"})
+
+    async def ready(request: Request):
+        import extractor_registry
+        status = extractor_registry.readiness()
+        return JSONResponse(status, status_code=200 if extractor_registry.is_ready() else 503)
+
+    async def search(request: Request):
+        data = await _json_body(request)
+        query = (data.get("query") or "").strip()
+        top_k = int(data.get("top_k", 5))
+        if not query:
+            return JSONResponse({"error": "query is required"}, status_code=400)
+        if state.emb_norm_t is None:
+            return JSONResponse({"error": "search index not loaded"}, status_code=503)
+
+        from openai_pool import get_pool
+        with metrics.stage("embed"):
+            resp = await get_pool().embeddings_create_async(model=EMBED_MODEL, input=[query])
+        results = await state.run_blocking(_rank, resp.data[0].embedding, top_k)
+        return JSONResponse({"results": results})
+
+    def _rank(embedding, top_k):
+        # app.search 와 같은 코사인 topk + 메타데이터 (CPU/GPU → executor)
+        import numpy as np
+        import torch
+
+        v = np.array(embedding, dtype="float32")
+        v = v / np.linalg.norm(v)
+        q = torch.from_numpy(v).to(state.device)
+        sims_t = state.emb_norm_t @ q
+        k = min(top_k, sims_t.shape[0])
+        scores_t, idxs_t = torch.topk(sims_t, k)
+        idxs = idxs_t.cpu().numpy()
+        scores = scores_t.cpu().numpy().tolist()
+
+        results = []
+        for idx, score in zip(idxs, scores):
+            row = state.df.iloc[idx]
+            results.append({
+                "index": int(idx),
+                "score": float(score),
+                "name": row.get("요리명", ""),
+                "types": row.get("요리종류별명", []),
+                "intro": row.get("요리소개_cleaned", ""),
+                "servings": row.get("요리인분명", ""),
+                "difficulty": row.get("요리난이도명", ""),
+                "time": row.get("요리시간명", ""),
+                "ingredients": row.get("재료", []),
+            })
+        return results
+
+    async def graph_search(request: Request):
+        data = await _json_body(request)
+        query = (data.get("query") or "").strip()
+        filterKeywords = (data.get("filterKeywords") or {})
+        top_k = int(data.get("top_k", 5))
+        if not query:
+            return JSONResponse({"error": "query is required"}, status_code=400)
+        try:
+            explain = search_fields.parse_explain(data)
+            explain_level, fields = search_fields.parse_request(data)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        explain_fields = search_fields.explanation_fields(explain_level, fields, with_reason=explain != "none")
+
+        fn = search_fn
+        if fn is None:
+            from jiewan_model_v2 import graph_rag_search_streaming, graph_rag_search_with_scoring_explanation
+            fn = graph_rag_search_streaming if SEARCH_STREAMING else graph_rag_search_with_scoring_explanation
+        try:
+            start = time.time()
+            # 키워드 추출(모델) + 그래프 검색 + 점수 계산은 동기 코드 → executor
+            res = await state.run_blocking(fn, query, filterKeywords=filterKeywords, top_k=top_k,
+                                           explain_fields=explain_fields)
+            print(f"⏱️ 작업 소요 시간: {time.time() - start:.4f}초")
+        except Exception as e:
+            print("[ERROR] graph_rag_search failed:", e)
+            return JSONResponse({"error": "graph search failed", "detail": str(e)}, status_code=500)
+
+        body = {
+            "results": res["recipes"],
+            "keywords": res["keywords"],
+        }
+        if explain == "template":
+            from explanation_jobs import template_reason
+            for r in res["recipes"]:
+                r["template_reason"] = template_reason(r, res["keywords"])
+        elif explain == "llm_async" and res["recipes"]:
+            from explanation_jobs import get_jobs
+            request_id = get_jobs().submit(query, res)
+            body["request_id"] = request_id
+            body["explanations_url"] = f"/explanations/{request_id}"
+        body["results"] = search_fields.project_recipes(res["recipes"], explain_level, fields)
+        if RECIPE_PREFETCH:
+            state.spawn(_prefetch([r["recipe_id"] for r in res["recipes"] if r.get("recipe_id") is not None]))
+        return JSONResponse(body)
+
+    async def graph_search_stream(request: Request):
+        """app.graph_search_stream_endpoint 와 같은 NDJSON 줄 (keywords → results → explanation... → done)"""
+        data = await _json_body(request)
+        query = (data.get("query") or "").strip()
+        filterKeywords = (data.get("filterKeywords") or {})
+        top_k = int(data.get("top_k", 5))
+        if not query:
+            return JSONResponse({"error": "query is required"}, status_code=400)
+        try:
+            explain = search_fields.parse_explain(data, search_fields.STREAM_EXPLAIN_MODES, default="cached")
+            explain_level, fields = search_fields.parse_request(data)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        explain_fields = search_fields.explanation_fields(explain_level, fields, with_reason=explain != "none")
+
+        def _stages():
+            if search_fn is None:
+                from jiewan_model_v2 import graph_rag_search_stages
+                yield from graph_rag_search_stages(query, filterKeywords=filterKeywords, top_k=top_k,
+                                                   streaming=SEARCH_STREAMING, explain_fields=explain_fields)
+                return
+            res = search_fn(query, filterKeywords=filterKeywords, top_k=top_k, explain_fields=explain_fields)
+            yield "keywords", res["keywords"]
+            yield "result", res
+
+        def _line(obj):
+            return json.dumps(obj, ensure_ascii=False) + "\n"
+
+        async def _generate():
+            # 동기 단계(추출 / 그래프 검색 / 설명 생성)는 _iterate_blocking 으로 executor 에서,
+            # 연결이 끊기면 generator 가 닫히면서 남은 설명 생성은 cancel (ExplanationJobs.stream)
+            t0 = time.perf_counter()
+
+            def elapsed_ms():
+                return round((time.perf_counter() - t0) * 1000, 1)
+
+            stage = "keywords"
+            try:
+                res = None
+                async with contextlib.aclosing(_iterate_blocking(state, _stages())) as stages:
+                    async for kind, value in stages:
+                        if kind == "keywords":
+                            yield _line({"type": "keywords", "keywords": value, "elapsed_ms": elapsed_ms()})
+                            stage = "results"
+                        else:
+                            res = value
+
+                if explain in ("template", "cached", "llm"):
+                    from explanation_jobs import template_reason
+                    for r in res["recipes"]:
+                        r["template_reason"] = template_reason(r, res["keywords"])
+                line = {"type": "results", "keywords": res["keywords"],
+                        "results": search_fields.project_recipes(res["recipes"], explain_level, fields),
+                        "elapsed_ms": elapsed_ms()}
+                if res.get("no_result_message"):
+                    line["no_result_message"] = res["no_result_message"]
+                yield _line(line)
+                if RECIPE_PREFETCH:
+                    state.spawn(_prefetch([r["recipe_id"] for r in res["recipes"]
+                                           if r.get("recipe_id") is not None]))
+
+                stage = "explanations"
+                if explain in ("cached", "llm") and res["recipes"]:
+                    from explanation_jobs import get_jobs
+                    explanations = get_jobs().stream(query, res, generate=explain == "llm")
+                    async with contextlib.aclosing(_iterate_blocking(state, explanations)) as it:
+                        async for recipe_id, expl, error in it:
+                            line = {"type": "explanation", "recipe_id": recipe_id, "explanation": expl,
+                                    "elapsed_ms": elapsed_ms()}
+                            if error:
+                                line["error"] = error
+                            yield _line(line)
+            except Exception as e:
+                print(f"[ERROR] search stream failed at {stage}:", e)
+                yield _line({"type": "error", "stage": stage, "error": "graph search failed", "detail": str(e)})
+                return
+            yield _line({"type": "done", "elapsed_ms": elapsed_ms()})
+
+        return _ClosingStreamingResponse(_generate(), media_type="application/x-ndjson",
+                                         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    async def metrics_endpoint(request: Request):
+        # collector 중 inference_worker stats 는 IPC 왕복 → executor
+        if request.query_params.get("format") == "json":
+            return JSONResponse(await state.run_blocking(metrics.snapshot))
+        return PlainTextResponse(await state.run_blocking(metrics.render),
+                                 media_type="text/plain; version=0.0.4")
+
+    async def explanations(request: Request):
+        from explanation_jobs import get_jobs, parse_wait
+        request_id = request.path_params["request_id"]
+        recipe_id = request.path_params.get("recipe_id")
+        try:
+            wait_s = parse_wait(request.query_params.get("wait"))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        job = await state.run_blocking(get_jobs().get, request_id, recipe_id=recipe_id, wait_s=wait_s)
+        if job is None:
+            return JSONResponse({"error": "unknown or expired request_id"}, status_code=404)
+        return JSONResponse(job)
+
+    async def _branch(coro, timeout_s):
+        t0 = time.perf_counter()
+
+        def _section(status, **extra):
+            return {"status": status, "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1), **extra}
+
+        try:
+            value = await asyncio.wait_for(coro, timeout=max(0.0, timeout_s))
+            return value, _section("ok")
+        except asyncio.TimeoutError:
+            return None, _section("timeout")
+        except RecipeNotFound as e:
+            return None, _section("not_found", error=str(e))
+        except Exception as e:
+            return None, _section("error", error=f"{type(e).__name__}: {e}")
+
+    async def crawl_recipe(request: Request):
+        recipe_id = int(request.path_params["recipe_id"])
+        top_n = 3
+        min_shared_ings = 2
+        start = time.perf_counter()
+        (data, data_section), (result, similar_section) = await asyncio.gather(
+            _branch(get_recipe(recipe_id), CRAWL_DETAIL_DEADLINE_S),
+            _branch(state.similarity.get_similar_recipes(
+                recipe_id=recipe_id, top_n=top_n, min_shared_ings=min_shared_ings,
+                timeout_s=CRAWL_SIMILAR_DEADLINE_S,      # wait_for 취소와 별개로 DB 쪽 쿼리도 끝냄
+            ), CRAWL_SIMILAR_DEADLINE_S),
+        )
+        result = result or {"overall": [], "ingredients": []}
+        total_ms = (time.perf_counter() - start) * 1000
+
+        body = {
+            "id": recipe_id,
+            "data": data,
+            "overall": result["overall"],
+            "ingredients": result["ingredients"],
+            "sections": {"data": data_section, "similar": similar_section},
+            "meta": {"total_ms": round(total_ms, 1)},
+        }
+        if data_section["status"] == "not_found":
+            body["error"] = "recipe_not_found"
+            return JSONResponse(body, status_code=404)
+        if data_section["status"] != "ok" and similar_section["status"] != "ok":
+            print("[ERROR] crawl-recipe failed:", data_section, similar_section)
+            body["error"] = "crawl_failed"
+            return JSONResponse(body, status_code=500)
+        return JSONResponse(body)
+
+    async def similar_recipes(request: Request):
+        data = await _json_body(request)
+        recipe_id = data.get("recipe_id")
+        try:
+            start = time.time()
+            result = await state.similarity.get_similar_recipes(
+                recipe_id=recipe_id, top_n=3, min_shared_ings=2,
+            )
+            print(f"⏱️ similar-recipes 작업 소요 시간: {time.time() - start:.4f}초")
+        except Exception as e:
+            print("[ERROR] similar_recipes failed:", e)
+            return JSONResponse({"error": "similar_recipes failed", "detail": str(e)}, status_code=500)
+        return JSONResponse({
+            "recipe_id": recipe_id,
+            "overall": result["overall"],
+            "ingredients": result["ingredients"],
+        })
+
+    routes = [
+        Route("/health", health, methods=["GET"]),
+        Route("/ready", ready, methods=["GET"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+        Route("/search", search, methods=["POST"]),
+        Route("/jiewan-search-v2", graph_search, methods=["POST"]),
+        Route("/jiewan-search-v2/stream", graph_search_stream, methods=["POST"]),
+        Route("/explanations/{request_id}", explanations, methods=["GET"]),
+        Route("/explanations/{request_id}/{recipe_id}", explanations, methods=["GET"]),
+        Route("/crawl-recipe/{recipe_id:int}", crawl_recipe, methods=["GET"]),
+        Route("/similar-recipes", similar_recipes, methods=["POST"]),
+    ]
+    app = Starlette(routes=routes, lifespan=lifespan,
+                    middleware=[Middleware(_MetricsMiddleware, routes=routes)])
+    app.state.resources = state
+    return app
+
+
+async def _json_body(request: Request) -> dict:
+    # Flask 의 request.get_json() or {} 처럼 잘못된 body 는 빈 dict
+    try:
+        return (await request.json()) or {}
+    except Exception:
+        return {}
+
+
+# uvicorn asgi_app:app
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8001, timeout_graceful_shutdown=20)
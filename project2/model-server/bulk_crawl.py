@@ -0,0 +1,255 @@
+# bulk_crawl.py
+# 데이터셋의 모든 레시피 상세 페이지를 미리 크롤링해서 로컬 저장소(recipe_store/)에 저장
+#
+#   python bulk_crawl.py --csv dataset_preprocessed.csv --store recipe_store --concurrency 4 --delay 0.5
+#   (중간에 끊겨도 같은 명령으로 다시 실행하면 이어서 진행)
+#
+# 저장소 구조
+# - details.bin : 레시피마다 zlib 압축 JSON 레코드 하나씩 이어 붙임 (append-only)
+# - index.tsv   : recipe_id \t offset \t length \t status(ok / not_found) \t crawled_at
+#                 레코드를 쓴 뒤에 한 줄 추가 → 이 파일이 곧 checkpoint (있는 id 는 다시 안 받음)
+# - failed.tsv  : 재시도까지 실패한 id (다음 실행 때 다시 시도)
+#
+# 크롤링
+# - 동시 요청 concurrency 개, 요청 시작 간격은 전체 합쳐서 delay_s / concurrency 이상 (politeness)
+# - 실패한 id 는 재시도 큐로 → 라운드마다 backoff 후 max_retries 번까지
+# - 404 / 삭제된 레시피는 not_found 로 기록 (/crawl-recipe 에서 바로 404)
+import argparse
+import json
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from recipe_crawler import RecipeNotFound, fetch_recipe_html, parse_recipe
+
+RECIPE_STORE_DIR = os.environ.get("RECIPE_STORE_DIR", "recipe_store")
+
+OK = "ok"
+NOT_FOUND = "not_found"
+
+
+class RecipeStore:
+    """details.bin + index.tsv. 쓰기는 한 스레드(bulk_crawl 메인)에서만, 읽기는 여러 스레드 가능"""
+
+    def __init__(self, path: str = RECIPE_STORE_DIR, writable: bool = False):
+        self.path = path
+        self.writable = writable
+        self.data_path = os.path.join(path, "details.bin")
+        self.index_path = os.path.join(path, "index.tsv")
+        self.failed_path = os.path.join(path, "failed.tsv")
+
+        if writable:
+            os.makedirs(path, exist_ok=True)
+            self._data_w = open(self.data_path, "ab")
+            self._index_w = open(self.index_path, "a", encoding="utf-8")
+        self._data_r = open(self.data_path, "rb") if os.path.exists(self.data_path) else None
+
+        self._index = {}          # recipe_id → (offset, length, status)
+        self._index_pos = 0       # index.tsv 에서 어디까지 읽었는지 (크롤링 중에도 새 줄만 이어 읽기)
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_pos)
+            while True:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break           # 쓰는 중인 마지막 줄은 다음에
+                self._index_pos = f.tell()
+                parts = line.decode("utf-8").rstrip("\n").split("\t")
+                if len(parts) < 4:
+                    continue
+                rid, offset, length, status = parts[:4]
+                self._index[rid] = (int(offset), int(length), status)
+
+    def refresh(self):
+        """다른 프로세스(bulk_crawl)가 추가한 index 줄 반영"""
+        with self._lock:
+            self._load_index()
+            if self._data_r is None and os.path.exists(self.data_path):
+                self._data_r = open(self.data_path, "rb")
+
+    def __contains__(self, recipe_id) -> bool:
+        return str(recipe_id) in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def ids(self):
+        return list(self._index)
+
+    def get(self, recipe_id):
+        """저장된 상세 dict, 저장소에 없으면 None, not_found 로 기록된 id 면 RecipeNotFound"""
+        key = str(recipe_id)
+        entry = self._index.get(key)
+        if entry is None:
+            self.refresh()
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+        offset, length, status = entry
+        if status == NOT_FOUND:
+            raise RecipeNotFound(f"recipe {key} not found (store)")
+        raw = os.pread(self._data_r.fileno(), length, offset)
+        return json.loads(zlib.decompress(raw).decode("utf-8"))
+
+    # ---------- 쓰기 ----------
+    def _append_index(self, key, offset, length, status):
+        self._index_w.write(f"{key}\t{offset}\t{length}\t{status}\t{time.time():.0f}\n")
+        self._index_w.flush()
+        self._index[key] = (offset, length, status)
+
+    def put(self, recipe_id, detail: dict):
+        raw = zlib.compress(json.dumps(detail, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        offset = self._data_w.seek(0, os.SEEK_END)
+        self._data_w.write(raw)
+        self._data_w.flush()
+        if self._data_r is None:
+            self._data_r = open(self.data_path, "rb")
+        self._append_index(str(recipe_id), offset, len(raw), OK)
+
+    def put_not_found(self, recipe_id):
+        self._append_index(str(recipe_id), 0, 0, NOT_FOUND)
+
+    def write_failed(self, failed: dict):
+        """failed: recipe_id → 마지막 에러 메시지 (덮어씀)"""
+        with open(self.failed_path, "w", encoding="utf-8") as f:
+            for rid, err in failed.items():
+                f.write(f"{rid}\t{err}\n")
+
+    def close(self):
+        for name in ("_data_w", "_index_w", "_data_r"):
+            fh = getattr(self, name, None)
+            if fh is not None:
+                fh.close()
+                setattr(self, name, None)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """RECIPE_STORE_DIR 이 있으면 읽기 전용 RecipeStore, 없으면 None"""
+    global _store
+    with _store_lock:
+        if _store is None and os.path.exists(os.path.join(RECIPE_STORE_DIR, "index.tsv")):
+            _store = RecipeStore(RECIPE_STORE_DIR)
+    return _store
+
+
+# =========================================================
+# 크롤링
+# =========================================================
+
+class _Politeness:
+    """요청 시작 시각 사이 간격을 min_interval_s 이상으로 (모든 워커 합쳐서)"""
+
+    def __init__(self, min_interval_s: float):
+        self.min_interval_s = min_interval_s
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.min_interval_s
+        if start > now:
+            time.sleep(start - now)
+
+
+def load_recipe_ids(csv_path: str, column: str = "레시피일련번호"):
+    import pandas as pd
+
+    df = pd.read_csv(csv_path, usecols=[column])
+    return [str(int(x)) for x in df[column].dropna().drop_duplicates()]
+
+
+def bulk_crawl(recipe_ids, store: RecipeStore, concurrency: int = 4, delay_s: float = 0.5,
+               max_retries: int = 3, retry_backoff_s: float = 5.0, base_url: str = None,
+               log_every: int = 100) -> dict:
+    """
+    store 에 없는 recipe_ids 를 크롤링해서 저장. 리턴: 통계 dict
+    (파싱/저장은 메인 스레드에서 → store 쓰기는 한 스레드)
+    """
+    recipe_ids = [str(r) for r in recipe_ids]
+    todo = [r for r in recipe_ids if r not in store]
+    stats = {"total": len(recipe_ids), "skipped": len(recipe_ids) - len(todo),
+             "ok": 0, "not_found": 0, "failed": 0, "retries": 0}
+    gate = _Politeness(delay_s / max(1, concurrency))
+    attempts = {}
+    failed = {}
+    t0 = time.perf_counter()
+
+    def _fetch(rid):
+        gate.wait()
+        return fetch_recipe_html(rid, base_url)
+
+    round_no = 0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bulk-crawl") as pool:
+        while todo:
+            if round_no > 0:
+                time.sleep(retry_backoff_s * (2 ** (round_no - 1)))
+            retry = []
+            futures = {pool.submit(_fetch, rid): rid for rid in todo}
+            for fut in as_completed(futures):
+                rid = futures[fut]
+                try:
+                    store.put(rid, parse_recipe(fut.result()))
+                    stats["ok"] += 1
+                    failed.pop(rid, None)
+                except RecipeNotFound:
+                    store.put_not_found(rid)
+                    stats["not_found"] += 1
+                    failed.pop(rid, None)
+                except Exception as e:
+                    attempts[rid] = attempts.get(rid, 0) + 1
+                    failed[rid] = f"{type(e).__name__}: {e}"
+                    if attempts[rid] <= max_retries:
+                        retry.append(rid)
+
+                done = stats["ok"] + stats["not_found"]
+                if log_every and done and done % log_every == 0:
+                    rate = done / (time.perf_counter() - t0)
+                    print(f"[bulk_crawl] {done}/{len(recipe_ids) - stats['skipped']} ({rate:.1f}/s)")
+            stats["retries"] += len(retry)
+            todo = retry
+            round_no += 1
+
+    stats["failed"] = len(failed)
+    store.write_failed(failed)
+    stats["elapsed_s"] = time.perf_counter() - t0
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="crawl all recipe detail pages into a local store")
+    ap.add_argument("--csv", default="dataset_preprocessed.csv")
+    ap.add_argument("--store", default=RECIPE_STORE_DIR)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--delay", type=float, default=0.5, help="워커당 요청 간격(초)")
+    ap.add_argument("--max-retries", type=int, default=3)
+    ap.add_argument("--base-url", default=None, help="기본값 RECIPE_BASE_URL (로컬 fixture 서버 등)")
+    ap.add_argument("--limit", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    ids = load_recipe_ids(args.csv)
+    if args.limit:
+        ids = ids[:args.limit]
+    store = RecipeStore(args.store, writable=True)
+    try:
+        stats = bulk_crawl(ids, store, concurrency=args.concurrency, delay_s=args.delay,
+                           max_retries=args.max_retries, base_url=args.base_url)
+    finally:
+        store.close()
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
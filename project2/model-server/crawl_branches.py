@@ -0,0 +1,97 @@
+# crawl_branches.py
+# /crawl-recipe 의 branch 처리 (app.py 의 Flask 엔드포인트 / load_test 의 Flask baseline 공용)
+#
+# - 상세 페이지(data) 와 유사 레시피(similar) 를 각자 executor 에서 동시에, 각자 deadline 까지만 기다림
+#   → 한쪽이 늦거나 실패해도 나머지는 응답 (sections 에 섹션별 상태 / 소요 시간)
+# - 상세 branch 는 crawl_deadline 안에서 → 크롤러가 deadline 을 직접 지킴 (fut.cancel() 은 실행 중 작업을 못 멈춤)
+# - 유사 branch 는 timeout_s 를 넘겨서 Neo4j transaction 도 deadline 에 끝나게
+# - asgi_app 은 같은 응답 형태를 asyncio 로 따로 구현 (_branch)
+import os
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import tracing
+from recipe_crawler import RecipeNotFound, crawl_deadline
+
+# /crawl-recipe 섹션별 deadline (초) — 넘으면 그 섹션만 timeout 으로 응답
+CRAWL_DETAIL_DEADLINE_S = float(os.environ.get("CRAWL_DETAIL_DEADLINE_S", "8"))
+CRAWL_SIMILAR_DEADLINE_S = float(os.environ.get("CRAWL_SIMILAR_DEADLINE_S", "3"))
+
+
+def _timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    value = fn(*args, **kwargs)
+    return value, (time.perf_counter() - t0) * 1000
+
+
+def _timed_with_deadline(deadline, fn, *args, **kwargs):
+    # 이미 돌고 있는 branch 는 fut.cancel() 로 멈추지 않음 → 크롤러가 deadline 을 직접 지키도록
+    with crawl_deadline(deadline):
+        return _timed(fn, *args, **kwargs)
+
+
+def _branch_result(fut, start, deadline):
+    """
+    (value, section) — section = {"status": ok/timeout/not_found/error, "elapsed_ms", "error"}
+    elapsed_ms 는 모든 상태에서 요청 시작(start) → 결과(또는 포기)까지
+    """
+    def _section(status, **extra):
+        return {"status": status, "elapsed_ms": round((time.perf_counter() - start) * 1000, 1), **extra}
+
+    try:
+        value, _ = fut.result(timeout=max(0.0, deadline - time.perf_counter()))
+        return value, _section("ok")
+    except FutureTimeout:      # 기다리다 넘김 + 크롤러의 CrawlDeadlineExceeded (TimeoutError)
+        fut.cancel()           # 아직 시작 안 한 branch 만 취소됨
+        return None, _section("timeout")
+    except RecipeNotFound as e:
+        return None, _section("not_found", error=str(e))
+    except Exception as e:
+        return None, _section("error", error=f"{type(e).__name__}: {e}")
+
+
+def crawl_recipe(recipe_id, get_recipe, similarity, branch_executor, similar_executor,
+                 detail_deadline_s: float = None, similar_deadline_s: float = None,
+                 top_n: int = 3, min_shared_ings: int = 2):
+    """
+    리턴: (body, status_code)
+    get_recipe(recipe_id) → 상세 dict (RecipeNotFound 이면 404)
+    similarity.get_similar_recipes(recipe_id=, top_n=, min_shared_ings=, timeout_s=)
+    similar_executor 는 branch_executor 와 따로 — 그래프가 느려져도 상세 branch 스레드를 잡아먹지 않도록
+    """
+    detail_deadline_s = CRAWL_DETAIL_DEADLINE_S if detail_deadline_s is None else detail_deadline_s
+    similar_deadline_s = CRAWL_SIMILAR_DEADLINE_S if similar_deadline_s is None else similar_deadline_s
+    start = time.perf_counter()
+    # tracing.wrap: 두 branch 의 span 도 이 요청 trace 아래로
+    detail_fut = branch_executor.submit(tracing.wrap(_timed_with_deadline), start + detail_deadline_s,
+                                        get_recipe, recipe_id)
+    # timeout_s: fut.cancel() 로는 이미 돌고 있는 쿼리를 못 멈춤 → Neo4j 가 transaction 을 끝내도록
+    similar_fut = similar_executor.submit(
+        tracing.wrap(_timed), similarity.get_similar_recipes,
+        recipe_id=recipe_id, top_n=top_n, min_shared_ings=min_shared_ings,
+        timeout_s=similar_deadline_s,
+    )
+
+    data, data_section = _branch_result(detail_fut, start, start + detail_deadline_s)
+    result, similar_section = _branch_result(similar_fut, start, start + similar_deadline_s)
+    result = result or {"overall": [], "ingredients": []}
+    total_ms = (time.perf_counter() - start) * 1000
+    print(f"⏱️ crawl-recipe 작업 소요 시간: {total_ms / 1000:.4f}초 "
+          f"(data={data_section['status']}, similar={similar_section['status']})")
+
+    body = {
+        "id": recipe_id,
+        "data": data,
+        "overall": result["overall"],         # 전체 그래프 기반 유사 레시피
+        "ingredients": result["ingredients"], # 재료 기반 유사 레시피
+        "sections": {"data": data_section, "similar": similar_section},
+        "meta": {"total_ms": round(total_ms, 1)},
+    }
+    if data_section["status"] == "not_found":
+        body["error"] = "recipe_not_found"
+        return body, 404
+    if data_section["status"] != "ok" and similar_section["status"] != "ok":
+        print("[ERROR] crawl-recipe failed:", data_section, similar_section)
+        body["error"] = "crawl_failed"
+        return body, 500
+    return body, 200
@@ -0,0 +1,457 @@
+# distilled_extractor.py
+# LLM 추출 결과(keyword_extract_log.csv, extraction_logs/ 등)로 학습하는 CPU 용 소형 키워드 추출기
+#
+# - 재료: 글자 단위 BIO 태깅 (MUST / OPT / EXC 극성 포함) — averaged perceptron
+# - 태그 필드(dish_type, method, situation, health/weather/menu_style ...),
+#   spiciness, dietary_constraints: 글자 n-gram 해시 특성 + one-vs-rest 로지스틱 회귀 (numpy)
+# - 시간 / 인분: lexicon_extractor 의 규칙 재사용
+# - extract_keywords(user_prompt) 시그니처 그대로 → extractor_registry 의 "distilled" 백엔드
+import json
+import os
+import pickle
+import sys
+import time
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from extraction_log import read_log_rows
+from extractor_schema import LIST_FIELDS, DIET_FIELDS, _postprocess_text_to_json, row_to_result
+from lexicon_extractor import (
+    NEGATION_CUES, OPTIONAL_CUES, extract_numeric_constraints, compare_results,
+)
+
+DISTILLED_MODEL_PATH = os.environ.get("DISTILLED_MODEL_PATH", "distilled_extractor.pkl")
+
+# 분류기로 예측하는 리스트 필드 (재료 3종은 태거가 담당)
+CLASSIFIER_FIELDS = [
+    "dish_type", "method", "situation", "difficulty",
+    "health_tags", "weather_tags", "menu_style", "extra_keywords",
+    "positive_tags", "negative_tags",
+]
+SPICINESS_LEVELS = ["none", "low", "medium", "high"]
+
+ING_FIELDS = {"MUST": "must_ingredients", "OPT": "optional_ingredients", "EXC": "exclude_ingredients"}
+TAGS = ["O", "B-MUST", "I-MUST", "B-OPT", "I-OPT", "B-EXC", "I-EXC"]
+
+
+# =========================================================
+# 0. 학습 데이터
+# =========================================================
+
+def load_training_rows(paths):
+    """
+    LLM 로그 → [(prompt, 결과 dict), ...]
+    - .csv : park_extractor_model.save_result_to_csv 형식 (result_to_row)
+    - .jsonl / .parquet / 디렉터리 : extraction_log.BufferedLogWriter 출력
+    """
+    rows = []
+    for row in read_log_rows(paths):
+        prompt = (row.get("user_prompt") or "").strip()
+        if prompt:
+            rows.append((prompt, row_to_result(row)))
+    return rows
+
+
+def weak_bio_tags(prompt: str, result: dict):
+    """재료 문자열을 프롬프트에서 찾아 글자 단위 BIO 라벨을 만든다 (못 찾은 재료는 무시)"""
+    tags = ["O"] * len(prompt)
+    for pol, field in (("EXC", "exclude_ingredients"), ("MUST", "must_ingredients"),
+                       ("OPT", "optional_ingredients")):
+        for ing in result.get(field, []):
+            ing = str(ing).strip()
+            if not ing:
+                continue
+            start = prompt.find(ing)
+            while start != -1:
+                end = start + len(ing)
+                if all(t == "O" for t in tags[start:end]):
+                    tags[start] = "B-" + pol
+                    for j in range(start + 1, end):
+                        tags[j] = "I-" + pol
+                start = prompt.find(ing, end)
+    return tags
+
+
+# =========================================================
+# 1. 재료 태거 (averaged perceptron, greedy left-to-right)
+# =========================================================
+
+def _cue_flags(text: str):
+    """각 글자 위치에서 "현재 어절 뒤" 에 부정/옵션 표현이 오는지"""
+    n = len(text)
+    neg, opt = [False] * n, [False] * n
+    i = 0
+    while i < n:
+        j = text.find(" ", i)
+        j = n if j == -1 else j
+        after = text[j:j + 10].replace(" ", "")
+        word = text[i:j]
+        is_neg = any(c.replace(" ", "") in word + after[:6] for c in NEGATION_CUES)
+        is_opt = any(c in word + after[:6] for c in OPTIONAL_CUES)
+        for k in range(i, j):
+            neg[k], opt[k] = is_neg, is_opt
+        i = j + 1
+    return neg, opt
+
+
+class PerceptronTagger:
+    def __init__(self):
+        self.weights = {}          # feature → {tag: weight}
+        self._totals = defaultdict(float)
+        self._tstamps = defaultdict(int)
+        self._i = 0
+
+    @staticmethod
+    def _features(text, i, prev_tag, neg, opt):
+        c = text[i]
+        p1 = text[i - 1] if i > 0 else "<s>"
+        p2 = text[i - 2] if i > 1 else "<s>"
+        n1 = text[i + 1] if i + 1 < len(text) else "</s>"
+        n2 = text[i + 2] if i + 2 < len(text) else "</s>"
+        return [
+            "bias",
+            "c=" + c,
+            "p1=" + p1,
+            "n1=" + n1,
+            "p1c=" + p1 + c,
+            "cn1=" + c + n1,
+            "p2p1c=" + p2 + p1 + c,
+            "cn1n2=" + c + n1 + n2,
+            "prev=" + prev_tag,
+            "prev_c=" + prev_tag + "|" + c,
+            "neg=" + str(neg[i]),
+            "opt=" + str(opt[i]),
+            "neg_c=" + str(neg[i]) + c,
+        ]
+
+    def _score(self, feats):
+        scores = defaultdict(float)
+        for f in feats:
+            w = self.weights.get(f)
+            if not w:
+                continue
+            for tag, v in w.items():
+                scores[tag] += v
+        return max(TAGS, key=lambda t: (scores[t], t == "O"))
+
+    def _update(self, truth, guess, feats):
+        self._i += 1
+        if truth == guess:
+            return
+        for f in feats:
+            w = self.weights.setdefault(f, {})
+            for tag, delta in ((truth, 1.0), (guess, -1.0)):
+                key = (f, tag)
+                self._totals[key] += (self._i - self._tstamps[key]) * w.get(tag, 0.0)
+                self._tstamps[key] = self._i
+                w[tag] = w.get(tag, 0.0) + delta
+
+    def _average(self):
+        for f, w in self.weights.items():
+            for tag, v in list(w.items()):
+                key = (f, tag)
+                total = self._totals[key] + (self._i - self._tstamps[key]) * v
+                avg = round(total / max(self._i, 1), 4)
+                if avg:
+                    w[tag] = avg
+                else:
+                    del w[tag]
+        self._totals.clear()
+        self._tstamps.clear()
+
+    def train(self, examples, n_iter: int = 8, seed: int = 0):
+        """examples: [(text, tags), ...]"""
+        rng = np.random.default_rng(seed)
+        examples = list(examples)
+        for _ in range(n_iter):
+            for idx in rng.permutation(len(examples)):
+                text, tags = examples[idx]
+                neg, opt = _cue_flags(text)
+                prev = "<s>"
+                for i in range(len(text)):
+                    feats = self._features(text, i, prev, neg, opt)
+                    guess = self._score(feats)
+                    self._update(tags[i], guess, feats)
+                    prev = guess
+        self._average()
+        return self
+
+    def tag(self, text: str):
+        neg, opt = _cue_flags(text)
+        prev, out = "<s>", []
+        for i in range(len(text)):
+            prev = self._score(self._features(text, i, prev, neg, opt))
+            out.append(prev)
+        return out
+
+
+def spans_from_tags(text: str, tags):
+    """BIO 태그 → {"MUST": [...], "OPT": [...], "EXC": [...]}"""
+    spans = {"MUST": [], "OPT": [], "EXC": []}
+    cur_pol, cur_start = None, None
+
+    def _close(end):
+        if cur_pol is not None:
+            s = text[cur_start:end].strip()
+            if s and s not in spans[cur_pol]:
+                spans[cur_pol].append(s)
+
+    for i, t in enumerate(tags + ["O"]):
+        if t.startswith("B-") or t == "O" or (t.startswith("I-") and t[2:] != cur_pol):
+            _close(i)
+            cur_pol, cur_start = (t[2:], i) if t != "O" else (None, None)
+    return spans
+
+
+# =========================================================
+# 2. 다중 라벨 분류기 (해시 n-gram + one-vs-rest 로지스틱 회귀)
+# =========================================================
+
+def _ngram_indices(text: str, dim: int):
+    t = text.replace(" ", "").lower()
+    feats = set()
+    for n in (1, 2, 3):
+        for i in range(len(t) - n + 1):
+            feats.add(zlib.crc32(f"{n}:{t[i:i + n]}".encode("utf-8")) % dim)
+    return np.fromiter(feats, dtype=np.int64) if feats else np.zeros(0, dtype=np.int64)
+
+
+def labels_from_result(result: dict):
+    labels = []
+    for field in CLASSIFIER_FIELDS:
+        for v in result.get(field, []):
+            labels.append(f"{field}={v}")
+    if result.get("spiciness") in SPICINESS_LEVELS:
+        labels.append(f"spiciness={result['spiciness']}")
+    for k, v in (result.get("dietary_constraints") or {}).items():
+        if v:
+            labels.append(f"diet={k}")
+    return labels
+
+
+class MultiLabelClassifier:
+    """
+    가중치는 학습 데이터에 실제로 나온 해시 특성만 행으로 가짐 (vocab: 해시 → 행)
+    → 메모리 = 등장 특성 수 × 라벨 수 (dim × 라벨 수 dense 행렬을 만들지 않음).
+    학습에 없던 특성은 가중치가 0 이므로 추론에서 무시해도 결과가 같음.
+    """
+
+    def __init__(self, dim: int = 1 << 18):
+        self.dim = dim
+        self.labels = []
+        self.vocab = {}
+        self.W = None
+        self.b = None
+
+    def _rows(self, text: str, grow: bool = False):
+        rows = []
+        for h in _ngram_indices(text, self.dim).tolist():
+            r = self.vocab.get(h)
+            if r is None and grow:
+                r = self.vocab[h] = len(self.vocab)
+            if r is not None:
+                rows.append(r)
+        return np.asarray(rows, dtype=np.int64)
+
+    def train(self, texts, label_lists, min_count: int = 3, epochs: int = 10,
+              lr: float = 0.5, l2: float = 1e-6, seed: int = 0):
+        counts = defaultdict(int)
+        for ls in label_lists:
+            for l in set(ls):
+                counts[l] += 1
+        self.labels = sorted(l for l, c in counts.items() if c >= min_count)
+        index = {l: i for i, l in enumerate(self.labels)}
+        L = len(self.labels)
+        self.vocab = {}
+        X = [self._rows(t, grow=True) for t in texts] if L else []
+        self.W = np.zeros((len(self.vocab), L), dtype=np.float32)
+        self.b = np.zeros(L, dtype=np.float32)
+        if L == 0:
+            return self
+
+        Y = np.zeros((len(texts), L), dtype=np.float32)
+        for r, ls in enumerate(label_lists):
+            for l in ls:
+                if l in index:
+                    Y[r, index[l]] = 1.0
+
+        rng = np.random.default_rng(seed)
+        for ep in range(epochs):
+            step = lr / (1.0 + ep)
+            for r in rng.permutation(len(X)):
+                idx = X[r]
+                z = self.W[idx].sum(axis=0) + self.b
+                p = 1.0 / (1.0 + np.exp(-z))
+                g = p - Y[r]
+                self.W[idx] -= step * (g + l2 * self.W[idx])
+                self.b -= step * g
+        return self
+
+    def predict_proba(self, text: str) -> dict:
+        if not self.labels:
+            return {}
+        idx = self._rows(text)
+        z = self.W[idx].sum(axis=0) + self.b
+        p = 1.0 / (1.0 + np.exp(-z))
+        return dict(zip(self.labels, p.tolist()))
+
+
+def _prompt_hash(prompt: str) -> int:
+    return zlib.crc32(prompt.strip().encode("utf-8"))
+
+
+def split_rows(rows, test_frac: float = 0.1, seed: int = 0):
+    """학습 / 평가(held-out) 분할 (seed 고정 → 같은 입력이면 같은 분할)"""
+    order = np.random.default_rng(seed).permutation(len(rows))
+    n_test = max(1, int(len(rows) * test_frac)) if len(rows) > 1 else 0
+    test = [rows[i] for i in order[:n_test]]
+    train = [rows[i] for i in order[n_test:]]
+    return train, test
+
+
+# =========================================================
+# 3. 학습 / 저장 / 추론
+# =========================================================
+
+class DistilledExtractor:
+    def __init__(self, tagger=None, classifier=None, threshold: float = 0.5, trained_prompts=None):
+        self.tagger = tagger or PerceptronTagger()
+        self.classifier = classifier or MultiLabelClassifier()
+        self.threshold = threshold
+        # 학습에 쓴 프롬프트 해시 (평가 때 학습 데이터를 빼기 위해)
+        self.trained_prompts = set(trained_prompts or ())
+
+    @classmethod
+    def train(cls, rows, n_iter: int = 8, epochs: int = 10, min_count: int = 3):
+        """rows: [(prompt, LLM 결과 dict), ...]"""
+        tagger = PerceptronTagger().train(
+            [(p, weak_bio_tags(p, r)) for p, r in rows], n_iter=n_iter
+        )
+        clf = MultiLabelClassifier().train(
+            [p for p, _ in rows], [labels_from_result(r) for _, r in rows],
+            min_count=min_count, epochs=epochs,
+        )
+        return cls(tagger, clf, trained_prompts={_prompt_hash(p) for p, _ in rows})
+
+    def held_out(self, rows):
+        """학습에 쓰지 않은 행만 (같은 로그로 평가해도 학습 데이터 점수가 섞이지 않음)"""
+        return [(p, r) for p, r in rows if _prompt_hash(p) not in self.trained_prompts]
+
+    def save(self, path: str = DISTILLED_MODEL_PATH):
+        with open(path, "wb") as f:
+            pickle.dump({
+                "tagger_weights": self.tagger.weights,
+                "dim": self.classifier.dim,
+                "labels": self.classifier.labels,
+                "vocab": self.classifier.vocab,
+                "W": self.classifier.W,
+                "b": self.classifier.b,
+                "threshold": self.threshold,
+                "trained_prompts": sorted(self.trained_prompts),
+            }, f)
+
+    @classmethod
+    def load(cls, path: str = DISTILLED_MODEL_PATH):
+        with open(path, "rb") as f:
+            d = pickle.load(f)
+        tagger = PerceptronTagger()
+        tagger.weights = d["tagger_weights"]
+        clf = MultiLabelClassifier(dim=d["dim"])
+        clf.labels, clf.W, clf.b = d["labels"], d["W"], d["b"]
+        clf.vocab = d.get("vocab")
+        if clf.vocab is None:
+            # 예전 형식 (dim × 라벨 dense) → 0 이 아닌 행만 남김
+            rows = np.flatnonzero(np.any(clf.W != 0, axis=1))
+            clf.vocab = {int(h): i for i, h in enumerate(rows)}
+            clf.W = clf.W[rows]
+        return cls(tagger, clf, threshold=d.get("threshold", 0.5),
+                   trained_prompts=d.get("trained_prompts"))
+
+    def extract_keywords(self, user_prompt: str) -> dict:
+        raw = {k: [] for k in LIST_FIELDS}
+
+        # 1) 재료 span + 극성
+        spans = spans_from_tags(user_prompt, self.tagger.tag(user_prompt))
+        for pol, field in ING_FIELDS.items():
+            raw[field] = spans[pol]
+
+        # 2) 태그 / 매운맛 / 식단
+        probs = self.classifier.predict_proba(user_prompt)
+        spicy_best, spicy_p = None, self.threshold
+        diet = {k: False for k in DIET_FIELDS}
+        for label, p in probs.items():
+            field, _, value = label.partition("=")
+            if field == "spiciness":
+                if p >= spicy_p:
+                    spicy_best, spicy_p = value, p
+            elif p < self.threshold:
+                continue
+            elif field == "diet":
+                diet[value] = True
+            else:
+                raw[field].append(value)
+        raw["spiciness"] = spicy_best
+        raw["dietary_constraints"] = diet
+
+        # 3) 시간 / 인분 (규칙)
+        raw["max_cook_time_min"], raw["servings"], _ = extract_numeric_constraints(user_prompt)
+        raw["free_text"] = user_prompt
+
+        return _postprocess_text_to_json(json.dumps(raw, ensure_ascii=False), fallback_prompt=user_prompt)
+
+
+_default = None
+
+
+def load_default_model():
+    """registry warm-up 용: DISTILLED_MODEL_PATH 에서 한 번만 로드"""
+    global _default
+    if _default is None:
+        _default = DistilledExtractor.load(DISTILLED_MODEL_PATH)
+    return _default
+
+
+def extract_keywords(user_prompt: str) -> dict:
+    """new_extractor_model.extract_keywords 와 같은 시그니처"""
+    return load_default_model().extract_keywords(user_prompt)
+
+
+# =========================================================
+# 4. 벤치마크: LLM 결과와의 일치도 / 요청당 CPU 지연
+# =========================================================
+
+def benchmark(model: DistilledExtractor, rows) -> dict:
+    sums, lat = defaultdict(float), []
+    for prompt, gold in rows:
+        t0 = time.process_time()
+        pred = model.extract_keywords(prompt)
+        lat.append(time.process_time() - t0)
+        for k, v in compare_results(pred, gold).items():
+            sums[k] += v
+    n = max(len(rows), 1)
+    lat_sorted = sorted(lat) or [0.0]
+    return {
+        "n": len(rows),
+        "agreement": {k: v / n for k, v in sums.items()},
+        "cpu_avg_ms": 1000 * sum(lat) / n,
+        "cpu_p95_ms": 1000 * lat_sorted[min(len(lat_sorted) - 1, int(0.95 * len(lat_sorted)))],
+    }
+
+
+if __name__ == "__main__":
+    # 학습:  python distilled_extractor.py train keyword_extract_log.csv [more.csv ...]
+    # 평가:  python distilled_extractor.py eval keyword_extract_log.csv   (학습에 쓴 프롬프트는 제외하고 평가)
+    cmd, paths = sys.argv[1], sys.argv[2:]
+    data = load_training_rows(paths)
+    if cmd == "train":
+        train, test = split_rows(data)
+        m = DistilledExtractor.train(train)
+        m.save(DISTILLED_MODEL_PATH)
+        print(f"saved → {DISTILLED_MODEL_PATH} (train={len(train)}, held-out={len(test)})")
+    else:
+        m = DistilledExtractor.load(DISTILLED_MODEL_PATH)
+        test = m.held_out(data)
+        print(f"held-out={len(test)} (학습에 쓴 {len(data) - len(test)}개 제외)")
+    print(json.dumps(benchmark(m, test), ensure_ascii=False, indent=2))
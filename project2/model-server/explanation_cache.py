@@ -0,0 +1,249 @@
+# explanation_cache.py
+# generate_explanation_for_recipe 결과 캐시
+#
+# - key = sha256( recipe_id + 점수 구성 + 매칭 키워드/태그 + 프롬프트 버전 ) (정렬된 JSON 으로 정규화)
+#   → 같은 레시피가 같은 태그로 다시 매칭되면 LLM 호출 없이 재사용
+# - 1단계: 메모리 LRU / 2단계: sqlite 파일 (프로세스 재시작 후에도 유지)
+# - precompute(): 조회수 상위 N개 레시피 × 로그에서 자주 나온 키워드 조합을 미리 생성
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from extraction_log import read_log_rows
+from extractor_schema import _split_joined
+
+EXPLANATION_CACHE_PATH = os.environ.get("EXPLANATION_CACHE_PATH", "explanation_cache.sqlite")
+
+# 설명 프롬프트 버전 (캐시 key 에 포함). explanation_model 의 프롬프트 / payload 형식을 바꾸면 올릴 것
+# (모델을 import 하지 않는 웹 프로세스(remote 백엔드)도 같은 key 를 쓰도록 여기에 둠)
+EXPLANATION_PROMPT_VERSION = "v1"
+
+SCORE_FIELDS = [
+    "score", "score_must_ing", "score_opt_ing", "score_dish_type", "score_method",
+    "score_situation", "score_health", "score_weather", "score_menu_style", "score_extra",
+]
+
+# 로그에서 키워드 조합을 만들 때 쓰는 필드
+COMBO_FIELDS = [
+    "dish_type", "method", "situation",
+    "must_ingredients", "optional_ingredients", "exclude_ingredients",
+    "health_tags", "weather_tags", "menu_style", "extra_keywords", "difficulty",
+]
+
+
+def _canonical(obj):
+    """dict 키 정렬 + 리스트(문자열)는 정렬/중복 제거 → 순서만 다른 입력은 같은 key"""
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in sorted(obj.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(obj, (list, tuple, set)):
+        items = [_canonical(v) for v in obj]
+        if all(isinstance(v, str) for v in items):
+            return sorted(set(items))
+        return items
+    return obj
+
+
+def explanation_key(recipe_info: dict, prompt_version: str) -> str:
+    """레시피 / 점수 구성 / 매칭 키워드 / 프롬프트 버전으로 만든 캐시 key"""
+    sig = {
+        "recipe_id": recipe_info.get("recipe_id"),
+        "scores": {k: recipe_info.get(k) for k in SCORE_FIELDS},
+        "matched_keywords": recipe_info.get("matched_keywords_flat", []),
+        "matched_tag_dict": recipe_info.get("matched_tag_dict", {}),
+        "prompt_version": prompt_version,
+    }
+    raw = json.dumps(_canonical(sig), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ExplanationCache:
+    """메모리 LRU + sqlite 2단계 캐시 (스레드 안전)"""
+
+    def __init__(self, path: str = EXPLANATION_CACHE_PATH, max_items: int = 2048):
+        self.path = path
+        self.max_items = max_items
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "puts": 0}
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS explanations ("
+                " key TEXT PRIMARY KEY, recipe_id TEXT, value TEXT, created_at REAL)"
+            )
+            self._db.commit()
+
+    def _remember(self, key, value):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return self._lru[key]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM explanations WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self._stats["disk_hits"] += 1
+                    return value
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, value: dict, recipe_id=None):
+        with self._lock:
+            self._remember(key, value)
+            self._stats["puts"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO explanations (key, recipe_id, value, created_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, None if recipe_id is None else str(recipe_id),
+                     json.dumps(value, ensure_ascii=False), time.time()),
+                )
+                self._db.commit()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._lru:
+                return True
+            if self._db is None:
+                return False
+            return self._db.execute(
+                "SELECT 1 FROM explanations WHERE key = ?", (key,)
+            ).fetchone() is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["memory_items"] = len(self._lru)
+            if self._db is not None:
+                s["disk_items"] = self._db.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+        lookups = s["memory_hits"] + s["disk_hits"] + s["misses"]
+        s["hit_rate"] = ((s["memory_hits"] + s["disk_hits"]) / lookups) if lookups else None
+        return s
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ExplanationCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExplanationCache()
+    return _cache
+
+
+# =========================================================
+# 캐시를 거치는 설명 생성
+# =========================================================
+
+def explain_with_cache(user_prompt: str, global_keywords: dict, recipe_infos: list,
+                       generate_batch_fn, prompt_version: str, cache: ExplanationCache = None) -> list:
+    """
+    recipe_infos 각각의 설명을 캐시에서 찾고, 없는 것만 generate_batch_fn 으로 한 번에 생성.
+    generate_batch_fn(user_prompt, global_keywords, recipe_infos) -> [설명 dict, ...]
+    """
+    cache = cache or get_cache()
+    keys = [explanation_key(r, prompt_version) for r in recipe_infos]
+    out = [cache.get(k) for k in keys]
+
+    miss_idx = [i for i, v in enumerate(out) if v is None]
+    if miss_idx:
+        generated = generate_batch_fn(user_prompt, global_keywords, [recipe_infos[i] for i in miss_idx])
+        for i, expl in zip(miss_idx, generated):
+            out[i] = expl
+            # 파싱 실패로 비어 있는 설명은 저장하지 않음
+            if expl.get("short_reason"):
+                cache.put(keys[i], expl, recipe_id=recipe_infos[i].get("recipe_id"))
+    return out
+
+
+# =========================================================
+# 미리 생성 (조회수 상위 레시피 × 자주 나온 키워드 조합)
+# =========================================================
+
+def _combo_values(row, field):
+    """csv(" | " join) / jsonl(리스트) / parquet 어느 쪽이든 정렬된 값 tuple"""
+    return tuple(sorted({str(v).strip() for v in _split_joined(row.get(field)) if str(v).strip()}))
+
+
+def frequent_keyword_combos(log_paths, n: int = 20):
+    """
+    추출 로그(파일/디렉터리, extraction_log.read_log_rows)에서 자주 나온 키워드 조합 상위 n개 → [(kw dict, count), ...]
+    (kw dict 는 리스트 필드만 채운 extract_keywords 형태)
+    """
+    counts = Counter()
+    for row in read_log_rows(log_paths):
+        combo = tuple((f, _combo_values(row, f)) for f in COMBO_FIELDS)
+        if any(vals for _, vals in combo):
+            counts[combo] += 1
+
+    out = []
+    for combo, cnt in counts.most_common(n):
+        kw = {f: list(vals) for f, vals in combo}
+        out.append((kw, cnt))
+    return out
+
+
+def top_viewed_recipe_ids(driver, n: int = 100):
+    """조회수 상위 n개 recipe_id"""
+    query = """
+    MATCH (r:RecipeV2)
+    RETURN r.recipe_id AS recipe_id
+    ORDER BY r.views DESC
+    LIMIT $n
+    """
+    with driver.session() as session:
+        return [rec["recipe_id"] for rec in session.run(query, n=n)]
+
+
+def precompute(combos, search_fn, top_recipe_ids, generate_batch_fn, prompt_version: str,
+               cache: ExplanationCache = None) -> dict:
+    """
+    combos: frequent_keyword_combos 결과
+    search_fn(kw) -> graph_rag_search_with_scoring_explanation 형태의 결과 (keywords, recipes)
+    top_recipe_ids 에 속하는 레시피만 설명을 미리 생성해서 캐시에 저장.
+    """
+    cache = cache or get_cache()
+    top = {str(rid) for rid in top_recipe_ids}
+    generated = skipped = 0
+    t0 = time.perf_counter()
+
+    for kw, _cnt in combos:
+        res = search_fn(kw)
+        targets = [r for r in res.get("recipes", []) if str(r.get("recipe_id")) in top]
+        todo = [r for r in targets if explanation_key(r, prompt_version) not in cache]
+        skipped += len(targets) - len(todo)
+        if not todo:
+            continue
+        user_prompt = kw.get("free_text") or " ".join(
+            v for f in COMBO_FIELDS for v in kw.get(f, [])
+        )
+        explain_with_cache(user_prompt, res.get("keywords", kw), todo,
+                           generate_batch_fn, prompt_version, cache=cache)
+        generated += len(todo)
+
+    return {"combos": len(combos), "generated": generated, "already_cached": skipped,
+            "elapsed_s": time.perf_counter() - t0}
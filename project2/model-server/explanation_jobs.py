@@ -0,0 +1,347 @@
+# explanation_jobs.py
+# 템플릿 설명을 먼저 주고, LLM 설명은 백그라운드에서 생성해서 나중에 조회
+#
+# - template_reason(): matched_tag_dict / 시간 / 난이도로 바로 만드는 한 줄 추천 이유 (GPU 없음)
+# - ExplanationJobs.submit(): 검색 결과를 큐에 넣고 request_id 리턴
+#   → 워커 스레드가 explain_with_cache + generate_explanations_batch 로 LLM 설명 생성
+# - get(request_id, recipe_id=None, wait_s=0): /explanations/<request_id> 에서 조회 (wait_s 만큼 long-poll)
+# - stream(): 캐시에 있는 설명은 바로, 나머지는 생성해서 끝나는 대로 yield (NDJSON 스트리밍 응답용, 닫으면 남은 생성 취소)
+#   · 스케줄러 / inference_worker 경로: 레시피별 Future (스케줄러가 다시 배치로 묶음)
+#   · 로컬 모델 직접 호출 경로: 캐시 miss 전체를 한 번의 배치 generate 로, 워커 job 과 같은 lock 으로 직렬화
+# - 끝난 job 은 ttl_s 가 지나면 정리
+import functools
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import metrics
+from explanation_cache import EXPLANATION_PROMPT_VERSION, explain_with_cache, explanation_key, get_cache
+
+# /explanations ?wait= long-poll 최대 대기 (초)
+MAX_WAIT_S = 30.0
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+# matched_tag_dict 필드 → 설명에 쓸 한국어 이름 (앞에 있을수록 먼저 언급)
+_FIELD_LABELS = [
+    ("situation", "상황"),
+    ("health_tags", "건강"),
+    ("weather_tags", "날씨"),
+    ("dish_type", "요리 종류"),
+    ("method", "조리법"),
+    ("menu_style", "스타일"),
+    ("extra_keywords", "키워드"),
+]
+
+
+def template_reason(recipe_info: dict, keywords: dict = None, max_terms: int = 3) -> str:
+    """
+    LLM 없이 매칭 정보만으로 만드는 짧은 추천 이유.
+    예) "'계란', '혼밥' 조건과 잘 맞고 15분 안에 만들 수 있는 초급 레시피예요."
+    """
+    keywords = keywords or {}
+    tag_dict = recipe_info.get("matched_tag_dict") or {}
+
+    terms = []
+    for ing in keywords.get("must_ingredients") or []:
+        terms.append(ing)
+    for field, _label in _FIELD_LABELS:
+        for kw in (tag_dict.get(field) or {}):
+            terms.append(kw)
+    if not terms:
+        terms = list(recipe_info.get("matched_keywords_flat") or [])
+
+    seen, uniq = set(), []
+    for t in terms:
+        if t and t not in seen:
+            seen.add(t)
+            uniq.append(t)
+    uniq = uniq[:max_terms]
+
+    desc = []
+    time_min = recipe_info.get("time_min")
+    if time_min:
+        desc.append(f"{time_min}분 안에 만들 수 있는")
+    difficulty = recipe_info.get("difficulty")
+    if difficulty:
+        desc.append(f"{difficulty} 난이도")
+    desc = " ".join(desc)
+
+    terms_str = ", ".join(f"'{t}'" for t in uniq)
+    name = recipe_info.get("name") or recipe_info.get("title") or "요리"
+    if uniq and desc:
+        return f"{terms_str} 조건과 잘 맞고 {desc} 레시피예요."
+    if uniq:
+        return f"{terms_str} 조건과 잘 맞는 {name} 레시피예요."
+    if desc:
+        return f"{desc} {name} 레시피예요."
+    return f"요청하신 내용과 가장 가까운 {name} 레시피예요."
+
+
+def parse_wait(value) -> float:
+    """/explanations 의 ?wait= → 0 ~ MAX_WAIT_S 초. 숫자가 아니면 ValueError (400 응답)"""
+    if value is None or value == "":
+        return 0.0
+    try:
+        wait_s = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("wait must be a number of seconds") from None
+    if wait_s != wait_s or wait_s < 0:      # NaN / 음수
+        raise ValueError("wait must be a non-negative number of seconds")
+    return min(wait_s, MAX_WAIT_S)
+
+
+class ExplanationJobs:
+    def __init__(self, generate_batch_fn=None, prompt_version: str = None,
+                 max_queue: int = 256, ttl_s: float = 600.0):
+        self._generate_batch_fn = generate_batch_fn
+        self._submit_fn = None      # (user_prompt, kw, recipe_infos) → Future([설명]) — cancel 가능한 경로
+        self._prompt_version = prompt_version
+        self._stream_executor = None
+        # 로컬 모델 직접 호출 경로의 generate 직렬화 (워커 job 과 stream 이 공유 모델에서 겹치지 않도록)
+        self._generate_lock = threading.Lock()
+        self._resolve_lock = threading.Lock()
+        self.ttl_s = ttl_s
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = {}            # request_id → job dict
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._worker = None
+        self._stats = {"submitted": 0, "rejected": 0, "done": 0, "failed": 0,
+                       "streamed": 0, "stream_cancelled": 0}
+
+    # ---------- lifecycle ----------
+    def start(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="explanation-jobs", daemon=True)
+                self._worker.start()
+        return self
+
+    def _resolve_generator(self):
+        # 워커 job / stream 요청 스레드가 동시에 처음 부를 수 있음 → 한 번만 결정
+        with self._resolve_lock:
+            if self._generate_batch_fn is None or self._prompt_version is None:
+                self._generate_batch_fn, self._submit_fn = self._pick_generator()
+                self._prompt_version = self._prompt_version or EXPLANATION_PROMPT_VERSION
+            return self._generate_batch_fn, self._prompt_version
+
+    def _pick_generator(self):
+        if self._generate_batch_fn is not None:
+            return self._generate_batch_fn, self._submit_fn
+        import extractor_registry
+        if extractor_registry.ACTIVE_BACKEND == "remote":
+            # 모델은 inference_worker 프로세스에 있음 → 설명도 IPC 로 (웹 프로세스에서 모델 import/로드 안 함)
+            import inference_worker
+            return inference_worker.generate_explanations_batch, inference_worker.submit_explanations
+        # explanation_model 은 new_extractor_model(torch / transformers) 을 import 하므로 처음 쓸 때 import
+        import new_extractor_model
+        if new_extractor_model.USE_SCHEDULER:
+            # 추출 요청이 우선, 설명은 낮은 우선순위로 (과부하 시 Overloaded → job failed)
+            scheduler = new_extractor_model.get_scheduler()
+            return scheduler.generate_explanations, scheduler.submit_explanations
+        import explanation_model
+        return explanation_model.generate_explanations_batch, None
+
+    # ---------- 요청 경로 ----------
+    def submit(self, user_prompt: str, search_result: dict, request_id: str = None) -> str:
+        """
+        각 레시피에 template_reason 을 바로 채우고 LLM 설명 job 을 큐에 넣는다.
+        큐가 가득 차면 job 은 failed("queue full") 로 남고 템플릿 설명만 제공.
+        """
+        self.start()
+        request_id = request_id or uuid.uuid4().hex
+        kw = search_result.get("keywords", {})
+        recipes = search_result.get("recipes", [])
+
+        for r in recipes:
+            r["template_reason"] = template_reason(r, kw)
+
+        job = {
+            "request_id": request_id,
+            "status": PENDING,
+            "created_at": time.time(),
+            "finished_at": None,
+            "error": None,
+            "explanations": {str(r.get("recipe_id")): None for r in recipes},
+        }
+        with self._lock:
+            self._gc_locked()
+            self._jobs[request_id] = job
+        try:
+            self._queue.put_nowait((request_id, user_prompt, kw, [dict(r) for r in recipes]))
+            self._count("submitted")
+        except queue.Full:
+            self._finish(request_id, error="queue full")
+            self._count("rejected")
+        return request_id
+
+    def get(self, request_id: str, recipe_id=None, wait_s: float = 0.0):
+        """job 상태 조회. wait_s > 0 이면 끝날 때까지 최대 wait_s 초 대기. 없으면 None"""
+        deadline = time.monotonic() + max(0.0, wait_s)
+        with self._cond:
+            while True:
+                job = self._jobs.get(request_id)
+                if job is None:
+                    return None
+                remaining = deadline - time.monotonic()
+                if job["status"] != PENDING or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            out = {k: v for k, v in job.items() if k != "explanations"}
+            if recipe_id is None:
+                out["explanations"] = dict(job["explanations"])
+            else:
+                out["recipe_id"] = str(recipe_id)
+                out["explanation"] = job["explanations"].get(str(recipe_id))
+            return out
+
+    def stream(self, user_prompt: str, search_result: dict, generate: bool = True):
+        """
+        레시피별 LLM 설명을 끝나는 대로 (recipe_id, 설명 dict | None, error | None) 로 yield.
+        캐시에 있는 건 바로, 나머지는 generate=True 일 때만 생성 요청 (False 면 캐시 hit 만, GPU 안 씀).
+        generator 를 닫으면(클라이언트 연결 끊김) 아직 끝나지 않은 생성은 cancel
+        """
+        if generate:
+            generate_fn, version = self._resolve_generator()
+        else:
+            # 캐시 조회만 → 모델 / IPC 경로를 고르지 않음 (로컬 모델 import 안 함)
+            generate_fn, version = None, self._prompt_version or EXPLANATION_PROMPT_VERSION
+        cache = get_cache()
+        kw = search_result.get("keywords", {})
+        t0 = time.perf_counter()
+
+        hits, misses = [], []
+        for r in search_result.get("recipes", []):
+            rid = str(r.get("recipe_id"))
+            key = explanation_key(r, version)
+            expl = cache.get(key)
+            if expl is not None:
+                hits.append((rid, expl, None))
+            elif generate:
+                misses.append((rid, key, r))
+
+        pending = {}        # Future → [(rid, key, recipe_id), ...] (결과 리스트와 같은 순서)
+        try:
+            for group in self._miss_groups(misses):
+                try:
+                    fut = self._submit_group(generate_fn, user_prompt, kw, [dict(r) for _, _, r in group])
+                except Exception as e:      # 스케줄러 Overloaded 등
+                    hits.extend((rid, None, f"{type(e).__name__}: {e}") for rid, _, _ in group)
+                    continue
+                pending[fut] = [(rid, key, r.get("recipe_id")) for rid, key, r in group]
+
+            for item in hits:
+                yield item
+            for fut in as_completed(list(pending)):
+                group = pending.pop(fut)
+                # 요청 시작 → 이 설명(들)이 나올 때까지
+                metrics.observe_stage("explain", time.perf_counter() - t0, mode="stream")
+                try:
+                    expls = fut.result()
+                except Exception as e:
+                    metrics.inc("stage_errors_total", stage="explain", error=type(e).__name__, mode="stream")
+                    for rid, _, _ in group:
+                        yield rid, None, f"{type(e).__name__}: {e}"
+                    continue
+                for (rid, key, recipe_id), expl in zip(group, expls):
+                    # 파싱 실패로 비어 있는 설명은 저장하지 않음 (explain_with_cache 와 같은 기준)
+                    if expl.get("short_reason"):
+                        cache.put(key, expl, recipe_id=recipe_id)
+                    self._count("streamed")
+                    yield rid, expl, None
+        finally:
+            cancelled = sum(1 for fut in pending if fut.cancel())
+            if cancelled:
+                with self._lock:
+                    self._stats["stream_cancelled"] += cancelled
+
+    def _miss_groups(self, misses):
+        """스케줄러 / IPC 경로는 레시피별 요청 (끝나는 대로 흘려보냄), 로컬 모델 경로는 한 번의 배치"""
+        if not misses:
+            return []
+        if self._submit_fn is not None:
+            return [[m] for m in misses]
+        return [misses]
+
+    def _submit_group(self, generate_fn, user_prompt, kw, recipe_infos):
+        if self._submit_fn is not None:
+            return self._submit_fn(user_prompt, kw, recipe_infos)
+        with self._lock:
+            if self._stream_executor is None:
+                # 한 스레드 + _generate_lock → 로컬 모델에서 generate 가 동시에 돌지 않음
+                self._stream_executor = ThreadPoolExecutor(max_workers=1,
+                                                           thread_name_prefix="explanation-stream")
+        return self._stream_executor.submit(self._generate_serialized, generate_fn, user_prompt, kw,
+                                            recipe_infos)
+
+    def _generate_serialized(self, generate_fn, user_prompt, kw, recipe_infos):
+        with self._generate_lock:
+            return generate_fn(user_prompt, kw, recipe_infos)
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["jobs"] = len(self._jobs)
+        s["queued"] = self._queue.qsize()
+        return s
+
+    # ---------- worker ----------
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _finish(self, request_id, explanations=None, error=None):
+        with self._cond:
+            job = self._jobs.get(request_id)
+            if job is None:
+                return
+            if explanations:
+                job["explanations"].update(explanations)
+            job["status"] = FAILED if error else DONE
+            job["error"] = error
+            job["finished_at"] = time.time()
+            self._stats["failed" if error else "done"] += 1
+            self._cond.notify_all()
+
+    def _gc_locked(self):
+        now = time.time()
+        expired = [rid for rid, j in self._jobs.items()
+                   if j["finished_at"] is not None and now - j["finished_at"] > self.ttl_s]
+        for rid in expired:
+            del self._jobs[rid]
+
+    def _run(self):
+        while True:
+            request_id, user_prompt, kw, recipes = self._queue.get()
+            try:
+                generate_fn, version = self._resolve_generator()
+                if self._submit_fn is None:
+                    generate_fn = functools.partial(self._generate_serialized, generate_fn)
+                with metrics.stage("explain", mode="batch"):
+                    expls = explain_with_cache(user_prompt, kw, recipes, generate_fn, version,
+                                               cache=get_cache())
+                self._finish(request_id, {
+                    str(r.get("recipe_id")): e for r, e in zip(recipes, expls)
+                })
+            except Exception as e:
+                print("[ERROR] explanation job failed:", e)
+                self._finish(request_id, error=f"{type(e).__name__}: {e}")
+
+
+_jobs = None
+_jobs_lock = threading.Lock()
+
+
+def get_jobs() -> ExplanationJobs:
+    global _jobs
+    with _jobs_lock:
+        if _jobs is None:
+            _jobs = ExplanationJobs().start()
+    return _jobs
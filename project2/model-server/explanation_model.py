@@ -2,8 +2,11 @@
 import json
 import torch
 
-# new_extractor_model.py 안에서 이미 로드해둔 tokenizer / model 재사용
-from new_extractor_model import tokenizer, model
+# new_extractor_model 의 tokenizer / model 재사용 (import 시점이 아니라 첫 생성 시 load_model())
+from new_extractor_model import load_model
+from explanation_cache import EXPLANATION_PROMPT_VERSION, explain_with_cache, get_cache
+
+# EXPLANATION_SYSTEM_PROMPT / payload 형식을 바꾸면 explanation_cache.EXPLANATION_PROMPT_VERSION 을 올릴 것
 
 EXPLANATION_SYSTEM_PROMPT = """
 당신은 한국어 레시피 추천 시스템의 '추천 이유 설명기'입니다.
@@ -49,26 +52,9 @@ def _strip_code_fence(output_text: str) -> str:
     return text
 
 
-def generate_explanation_for_recipe(
-    user_prompt: str,
-    global_keywords: dict,
-    recipe_info: dict,
-) -> dict:
-    """
-    한 개 레시피에 대해 LLM 기반 설명 JSON 생성.
-
-    Parameters
-    ----------
-    user_prompt : str
-        원본 사용자 입력 문장.
-    global_keywords : dict
-        extract_keywords → build_cypher_from_keywords_relaxed 이후의 kw 딕셔너리
-        (res["keywords"] 그대로 넣으면 됨).
-    recipe_info : dict
-        graph_rag_search_with_scoring_explanation에서 반환된 각 레시피 dict
-        (matched_keywords_flat / matched_tag_dict를 포함하고 있다고 가정).
-    """
-    payload = {
+def _build_payload(user_prompt: str, global_keywords: dict, recipe_info: dict) -> dict:
+    """설명 모델에 넘길 입력 JSON (레시피 메타데이터 + 점수 구성 + 매칭 키워드)"""
+    return {
         "user_prompt": user_prompt,
         "keywords": global_keywords,
         "recipe": {
@@ -96,31 +82,22 @@ def generate_explanation_for_recipe(
         },
     }
 
+
+def _build_chat_text(tokenizer, payload: dict) -> str:
     messages = [
         {"role": "system", "content": EXPLANATION_SYSTEM_PROMPT},
         {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
     ]
-
-    text = tokenizer.apply_chat_template(
+    return tokenizer.apply_chat_template(
         messages,
         tokenize=False,
         add_generation_prompt=True,
     )
-    inputs = tokenizer(text, return_tensors="pt").to(model.device)
 
-    with torch.no_grad():
-        output_ids = model.generate(
-            **inputs,
-            max_new_tokens=256,
-            do_sample=False,
-            temperature=0.0,
-            pad_token_id=tokenizer.eos_token_id,
-            eos_token_id=tokenizer.eos_token_id,
-        )
 
-    gen_ids = output_ids[0][inputs["input_ids"].shape[-1]:]
-    output_text = tokenizer.decode(gen_ids, skip_special_tokens=True).strip()
-    output_text = _strip_code_fence(output_text)
+def _parse_explanation(output_text: str, recipe_info: dict) -> dict:
+    """생성 텍스트 → {"short_reason", "matched_keywords"} (파싱 실패 / 필드 누락 보정)"""
+    output_text = _strip_code_fence(output_text.strip())
 
     try:
         data = json.loads(output_text)
@@ -130,6 +107,8 @@ def generate_explanation_for_recipe(
             "short_reason": output_text,
             "matched_keywords": recipe_info.get("matched_keywords_flat", []),
         }
+    if not isinstance(data, dict):
+        data = {}
 
     # 필드 누락 보정
     if "short_reason" not in data or not isinstance(data["short_reason"], str):
@@ -140,7 +119,103 @@ def generate_explanation_for_recipe(
     return data
 
 
-def add_llm_explanations(user_prompt: str, search_result: dict) -> dict:
+def generate_explanation_for_recipe(
+    user_prompt: str,
+    global_keywords: dict,
+    recipe_info: dict,
+) -> dict:
+    """
+    한 개 레시피에 대해 LLM 기반 설명 JSON 생성.
+
+    Parameters
+    ----------
+    user_prompt : str
+        원본 사용자 입력 문장.
+    global_keywords : dict
+        extract_keywords → build_cypher_from_keywords_relaxed 이후의 kw 딕셔너리
+        (res["keywords"] 그대로 넣으면 됨).
+    recipe_info : dict
+        graph_rag_search_with_scoring_explanation에서 반환된 각 레시피 dict
+        (matched_keywords_flat / matched_tag_dict를 포함하고 있다고 가정).
+    """
+    tokenizer, model = load_model()
+    payload = _build_payload(user_prompt, global_keywords, recipe_info)
+    text = _build_chat_text(tokenizer, payload)
+    inputs = tokenizer(text, return_tensors="pt").to(model.device)
+
+    with torch.no_grad():
+        output_ids = model.generate(
+            **inputs,
+            max_new_tokens=256,
+            do_sample=False,
+            temperature=0.0,
+            pad_token_id=tokenizer.eos_token_id,
+            eos_token_id=tokenizer.eos_token_id,
+        )
+
+    gen_ids = output_ids[0][inputs["input_ids"].shape[-1]:]
+    output_text = tokenizer.decode(gen_ids, skip_special_tokens=True)
+    return _parse_explanation(output_text, recipe_info)
+
+
+def generate_explanations_for_items(items, max_new_tokens: int = 256) -> list:
+    """
+    [(user_prompt, global_keywords, recipe_info), ...] 를 한 번의 model.generate 로 처리.
+    서로 다른 검색 요청의 레시피를 섞어서 묶을 수 있음 (inference_scheduler 에서 사용).
+    - payload 를 모두 만든 뒤 left-padding 으로 묶음 → 모든 행의 프롬프트 길이가 같아서
+      같은 위치에서 생성 부분을 잘라낼 수 있음
+    - 각 출력은 _parse_explanation 으로 동일하게 보정
+    """
+    if not items:
+        return []
+
+    tokenizer, model = load_model()
+    texts = [
+        _build_chat_text(tokenizer, _build_payload(user_prompt, global_keywords, r))
+        for (user_prompt, global_keywords, r) in items
+    ]
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    inputs = tokenizer(
+        texts,
+        return_tensors="pt",
+        padding=True,
+        padding_side="left",
+    ).to(model.device)
+
+    with torch.no_grad():
+        output_ids = model.generate(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            do_sample=False,
+            temperature=0.0,
+            pad_token_id=tokenizer.pad_token_id,
+            eos_token_id=tokenizer.eos_token_id,
+        )
+
+    gen_ids = output_ids[:, inputs["input_ids"].shape[-1]:]
+    outputs = tokenizer.batch_decode(gen_ids, skip_special_tokens=True)
+    return [_parse_explanation(out, r) for out, (_, _, r) in zip(outputs, items)]
+
+
+def generate_explanations_batch(
+    user_prompt: str,
+    global_keywords: dict,
+    recipe_infos: list,
+    max_new_tokens: int = 256,
+) -> list:
+    """
+    여러 레시피의 설명을 한 번의 model.generate 로 생성 (generate_explanation_for_recipe 의 배치 버전).
+    """
+    return generate_explanations_for_items(
+        [(user_prompt, global_keywords, r) for r in recipe_infos],
+        max_new_tokens=max_new_tokens,
+    )
+
+
+def add_llm_explanations(user_prompt: str, search_result: dict, batched: bool = True,
+                         use_cache: bool = False) -> dict:
     """
     기존 graph_rag_search_with_scoring_explanation 결과(search_result)에
     LLM 기반 설명(JSON)을 추가해서 되돌려준다.
@@ -155,6 +230,11 @@ def add_llm_explanations(user_prompt: str, search_result: dict) -> dict:
           "keywords": kw,
           "recipes": [ r_info1, r_info2, ... ]
         }
+    batched : bool
+        True 면 모든 레시피를 한 번의 generate 로 처리 (generate_explanations_batch),
+        False 면 레시피마다 generate_explanation_for_recipe 를 순차 호출.
+    use_cache : bool
+        True 면 explanation_cache 에서 먼저 찾고, 없는 레시피만 생성 후 저장.
 
     Returns
     -------
@@ -164,8 +244,40 @@ def add_llm_explanations(user_prompt: str, search_result: dict) -> dict:
     kw = search_result.get("keywords", {})
     recipes = search_result.get("recipes", [])
 
-    for r in recipes:
-        expl = generate_explanation_for_recipe(user_prompt, kw, r)
+    if batched:
+        generate_fn = generate_explanations_batch
+    else:
+        def generate_fn(prompt, keywords, infos):
+            return [generate_explanation_for_recipe(prompt, keywords, r) for r in infos]
+
+    if use_cache:
+        expls = explain_with_cache(user_prompt, kw, recipes, generate_fn,
+                                   EXPLANATION_PROMPT_VERSION, cache=get_cache())
+    else:
+        expls = generate_fn(user_prompt, kw, recipes)
+
+    for r, expl in zip(recipes, expls):
         r["llm_explanation"] = expl  # short_reason, matched_keywords
 
     return search_result
+
+
+def benchmark_explanations(user_prompt: str, search_result: dict) -> dict:
+    """같은 검색 결과에 대해 순차 / 배치 설명 생성 시간 비교"""
+    import copy
+    import time
+
+    t0 = time.perf_counter()
+    add_llm_explanations(user_prompt, copy.deepcopy(search_result), batched=False)
+    sequential_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    add_llm_explanations(user_prompt, copy.deepcopy(search_result), batched=True)
+    batched_s = time.perf_counter() - t0
+
+    return {
+        "n_recipes": len(search_result.get("recipes", [])),
+        "sequential_s": sequential_s,
+        "batched_s": batched_s,
+        "speedup": (sequential_s / batched_s) if batched_s else None,
+    }
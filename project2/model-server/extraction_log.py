@@ -0,0 +1,305 @@
+# extraction_log.py
+# 키워드 추출 결과 로그 (요청 경로에서 파일 I/O 제거)
+#
+# - 요청 스레드: log() 가 메모리 큐에 put_nowait 만 함 → 큐가 가득 차면 버리고 dropped 카운트
+# - 백그라운드 스레드: batch_size 개 또는 flush_interval_s 마다 모아서 한 번에 쓰기
+# - 파일은 크기 / 시간 기준으로 회전: extraction_logs/extractions-YYYYmmdd-HHMMSS-0001.jsonl
+#   (parquet 은 footer 를 닫을 때 쓰므로 쓰는 중에는 *.parquet.part → 회전/close 때 *.parquet 으로 rename
+#    → read_log_rows(디렉터리) 는 다 쓴 파일만 읽음)
+# - 포맷: jsonl (기본) / csv (park_extractor_model 의 " | " join 형식) / parquet (pyarrow 필요)
+# - 스키마는 LOG_FIELDS 로 고정 → distilled_extractor 학습 / 캐시 warm-up 에서 바로 읽음
+import csv
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+from extractor_schema import LIST_FIELDS, DIET_FIELDS
+
+LOG_ENABLED = os.environ.get("EXTRACTION_LOG", "0") == "1"
+LOG_DIR = os.environ.get("EXTRACTION_LOG_DIR", "extraction_logs")
+LOG_FORMAT = os.environ.get("EXTRACTION_LOG_FORMAT", "jsonl")
+
+LOG_FIELDS = (
+    ["ts", "backend", "latency_ms", "user_prompt"]
+    + LIST_FIELDS
+    + ["spiciness"]
+    + DIET_FIELDS
+    + ["servings_min", "servings_max", "max_cook_time_min", "free_text"]
+)
+
+FORMATS = ("jsonl", "csv", "parquet")
+
+# 아직 쓰는 중인 parquet 파일 (footer 없음 → 읽을 수 없음)
+PARTIAL_SUFFIX = ".part"
+
+
+def log_row(user_prompt: str, result: dict, backend: str = None, latency_ms: float = None,
+            ts: float = None) -> dict:
+    """extract_keywords 결과 → LOG_FIELDS 순서의 flat dict (리스트 필드는 리스트 그대로)"""
+    dc = result.get("dietary_constraints") or {}
+    serv = result.get("servings") or {}
+    row = {
+        "ts": ts if ts is not None else time.time(),
+        "backend": backend,
+        "latency_ms": latency_ms,
+        "user_prompt": user_prompt,
+    }
+    for k in LIST_FIELDS:
+        row[k] = [str(v) for v in (result.get(k) or [])]
+    row["spiciness"] = result.get("spiciness")
+    for k in DIET_FIELDS:
+        row[k] = bool(dc.get(k, False))
+    row["servings_min"] = serv.get("min")
+    row["servings_max"] = serv.get("max")
+    row["max_cook_time_min"] = result.get("max_cook_time_min")
+    row["free_text"] = result.get("free_text") or ""
+    return row
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    types = {"ts": pa.float64(), "backend": pa.string(), "latency_ms": pa.float64(),
+             "user_prompt": pa.string(), "spiciness": pa.string(), "free_text": pa.string(),
+             "servings_min": pa.int64(), "servings_max": pa.int64(), "max_cook_time_min": pa.int64()}
+    types.update({k: pa.list_(pa.string()) for k in LIST_FIELDS})
+    types.update({k: pa.bool_() for k in DIET_FIELDS})
+    return pa.schema([(k, types[k]) for k in LOG_FIELDS])
+
+
+class BufferedLogWriter:
+    def __init__(
+        self,
+        log_dir: str = LOG_DIR,
+        fmt: str = LOG_FORMAT,
+        max_queue: int = 10000,
+        batch_size: int = 256,
+        flush_interval_s: float = 1.0,
+        rotate_bytes: int = 64 * 1024 * 1024,
+        rotate_interval_s: float = 3600.0,
+        prefix: str = "extractions",
+    ):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown log format: {fmt} (available: {FORMATS})")
+        if fmt == "parquet":
+            import pyarrow  # noqa: F401  (없으면 여기서 ImportError)
+
+        self.log_dir = log_dir
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.rotate_bytes = rotate_bytes
+        self.rotate_interval_s = rotate_interval_s
+        self.prefix = prefix
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+        # 현재 파일
+        self._path = None
+        self._file = None
+        self._pq_writer = None
+        self._opened_at = 0.0
+        self._seq = 0
+
+        self._stats = {"logged": 0, "written": 0, "dropped": 0, "flushes": 0,
+                       "files": 0, "write_errors": 0}
+        self._stats_lock = threading.Lock()
+
+    # ---------- lifecycle ----------
+    def start(self):
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                os.makedirs(self.log_dir, exist_ok=True)
+                self._stop.clear()
+                self._worker = threading.Thread(target=self._run, name="extraction-log", daemon=True)
+                self._worker.start()
+        return self
+
+    def close(self, timeout: float = 5.0):
+        """남은 큐를 모두 쓰고 파일 닫기"""
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
+        self._close_file()
+
+    # ---------- 요청 경로 ----------
+    def log(self, user_prompt: str, result: dict, backend: str = None, latency_ms: float = None) -> bool:
+        """절대 블로킹하지 않음. 큐가 가득 차면 False (버림)"""
+        self.start()
+        try:
+            self._queue.put_nowait(log_row(user_prompt, result, backend, latency_ms))
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("logged")
+        return True
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            s = dict(self._stats)
+        return {**s, "queued": self._queue.qsize(), "current_file": self._path}
+
+    # ---------- worker ----------
+    def _drain(self):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval_s))
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + self.flush_interval_s
+        while len(batch) < self.batch_size:
+            remaining = 0 if self._stop.is_set() else deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._drain()
+            if batch:
+                try:
+                    self._write(batch)
+                    self._count("written", len(batch))
+                    self._count("flushes")
+                except Exception as e:
+                    self._count("write_errors")
+                    print("[WARN] extraction log write failed:", e)
+            elif self._stop.is_set():
+                break
+
+    # ---------- 파일 ----------
+    def _new_path(self) -> str:
+        self._seq += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(self.log_dir, f"{self.prefix}-{stamp}-{self._seq:04d}.{self.fmt}")
+
+    def _close_file(self):
+        if self._pq_writer is not None:
+            self._pq_writer.close()
+            self._pq_writer = None
+            os.replace(self._path, self._path[:-len(PARTIAL_SUFFIX)])
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._path = None       # 다음 write 는 새 파일로
+
+    def _should_rotate(self) -> bool:
+        if self._path is None:
+            return True
+        if time.time() - self._opened_at >= self.rotate_interval_s:
+            return True
+        try:
+            return os.path.getsize(self._path) >= self.rotate_bytes
+        except OSError:
+            return True
+
+    def _open_new(self):
+        self._close_file()
+        self._path = self._new_path()
+        self._opened_at = time.time()
+        self._count("files")
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+            self._path += PARTIAL_SUFFIX
+            self._pq_writer = pq.ParquetWriter(self._path, _parquet_schema())
+        else:
+            self._file = open(self._path, "a", newline="", encoding="utf-8")
+            if self.fmt == "csv":
+                csv.DictWriter(self._file, fieldnames=LOG_FIELDS).writeheader()
+
+    def _write(self, batch):
+        if self._should_rotate():
+            self._open_new()
+
+        if self.fmt == "jsonl":
+            self._file.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch))
+            self._file.flush()
+        elif self.fmt == "csv":
+            writer = csv.DictWriter(self._file, fieldnames=LOG_FIELDS)
+            for r in batch:
+                writer.writerow({k: (" | ".join(v) if isinstance(v, list) else v) for k, v in r.items()})
+            self._file.flush()
+        else:
+            import pyarrow as pa
+            table = pa.Table.from_pylist(batch, schema=_parquet_schema())
+            self._pq_writer.write_table(table)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> BufferedLogWriter:
+    """프로세스 공용 writer (EXTRACTION_LOG_DIR / EXTRACTION_LOG_FORMAT)"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BufferedLogWriter().start()
+    return _writer
+
+
+# =========================================================
+# 읽기 (학습 / warm-up 용)
+# =========================================================
+
+def _expand_paths(paths):
+    if isinstance(paths, str):
+        paths = [paths]
+    out = []
+    for p in paths:
+        if os.path.isdir(p):
+            for ext in FORMATS:
+                out.extend(sorted(glob.glob(os.path.join(p, f"*.{ext}"))))
+        else:
+            out.extend(sorted(glob.glob(p)) or [p])
+    return [p for p in out if not p.endswith(PARTIAL_SUFFIX)]
+
+
+def read_log_rows(paths):
+    """
+    로그 파일/디렉터리(jsonl / csv / parquet) → row dict 들을 순서대로 yield
+    (디렉터리에서는 쓰는 중인 *.parquet.part 를 건너뜀 — glob 이 *.parquet 만 잡음)
+    """
+    for path in _expand_paths(paths):
+        if path.endswith(".jsonl"):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue   # 쓰는 도중 잘린 마지막 줄 등
+        elif path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            yield from pq.read_table(path).to_pylist()
+        else:
+            with open(path, encoding="utf-8") as f:
+                yield from csv.DictReader(f)
+
+
+def top_prompts(paths, n: int = 100):
+    """자주 들어온 프롬프트 상위 n개 [(prompt, count), ...] — 캐시 warm-up 용"""
+    counts = Counter()
+    for row in read_log_rows(paths):
+        p = (row.get("user_prompt") or "").strip()
+        if p:
+            counts[p] += 1
+    return counts.most_common(n)
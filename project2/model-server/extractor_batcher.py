@@ -0,0 +1,319 @@
+# extractor_batcher.py
+# 동시 요청을 모아서 한 번의 model.generate 로 처리하는 배치 스케줄러
+#
+# - 요청 스레드는 submit() 으로 프롬프트만 넣고 Future 를 기다림
+# - 워커 스레드가 max_wait_ms 동안(또는 max_batch_size 가 찰 때까지) 프롬프트를 모아
+#   left-padding → batched generate → 요청별로 잘라서 _postprocess_text_to_json
+import os
+import sys
+import time
+import threading
+import queue
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import torch
+
+from extractor_schema import SYSTEM_PROMPT, _postprocess_text_to_json
+from json_decoding import build_json_generation_kwargs
+
+
+# =========================================================
+# 0. 배치 generate 헬퍼
+# =========================================================
+
+def build_chat_text(tokenizer, user_prompt: str, system_prompt: str = SYSTEM_PROMPT) -> str:
+    """extract_keywords 와 동일한 chat_template 문자열 생성"""
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+    return tokenizer.apply_chat_template(
+        messages,
+        tokenize=False,
+        add_generation_prompt=True,
+    )
+
+
+def generate_batch(tokenizer, model, texts, max_new_tokens: int = 256,
+                   json_stop: bool = False, constrained: bool = False, **generate_kwargs):
+    """
+    여러 chat 텍스트를 left-padding 해서 한 번에 generate 하고,
+    각 요청의 생성 부분만 디코딩한 문자열 리스트를 돌려준다.
+    (left-padding 이므로 모든 행의 프롬프트 길이가 동일 → 같은 위치에서 자르면 됨)
+    json_stop / constrained 는 json_decoding.build_json_generation_kwargs 참고 (행별로 종료).
+    """
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    inputs = tokenizer(
+        list(texts),
+        return_tensors="pt",
+        padding=True,
+        padding_side="left",
+    ).to(model.device)
+    prompt_len = inputs["input_ids"].shape[-1]
+    generate_kwargs.update(
+        build_json_generation_kwargs(tokenizer, prompt_len, json_stop, constrained)
+    )
+
+    with torch.no_grad():
+        output_ids = model.generate(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            do_sample=False,         # deterministic하게
+            pad_token_id=tokenizer.pad_token_id,
+            eos_token_id=tokenizer.eos_token_id,
+            **generate_kwargs,
+        )
+
+    gen_ids = output_ids[:, prompt_len:]
+    return tokenizer.batch_decode(gen_ids, skip_special_tokens=True)
+
+
+def _percentile(values, q: float):
+    if not values:
+        return None
+    s = sorted(values)
+    idx = min(len(s) - 1, max(0, int(round(q / 100.0 * (len(s) - 1)))))
+    return s[idx]
+
+
+# =========================================================
+# 1. 배치 스케줄러
+# =========================================================
+
+class BatchingExtractor:
+    """
+    extract_keywords 앞단의 동적 배치 스케줄러.
+
+    Parameters
+    ----------
+    tokenizer, model :
+        new_extractor_model 의 Qwen 또는 테스트용 소형 CPU 모델.
+    max_batch_size : int
+        한 번의 generate 에 묶을 최대 요청 수.
+    max_wait_ms : float
+        첫 요청이 들어온 뒤 다른 요청을 기다리는 최대 시간(ms).
+    max_new_tokens : int
+        generate 의 max_new_tokens (기존 extract_keywords 와 동일하게 256).
+    json_stop, constrained : bool
+        JSON-aware 조기 종료 / 스키마 제약 디코딩 (json_decoding.py).
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        model,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        max_new_tokens: int = 256,
+        json_stop: bool = False,
+        constrained: bool = False,
+        latency_window: int = 1000,
+    ):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_new_tokens = max_new_tokens
+        self.json_stop = json_stop
+        self.constrained = constrained
+
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._worker = None
+        self._lock = threading.Lock()
+
+        # 통계
+        self._latencies = deque(maxlen=latency_window)
+        self._n_batches = 0
+        self._n_requests = 0
+
+    # ---------- lifecycle ----------
+    def start(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stop.clear()
+                self._worker = threading.Thread(
+                    target=self._run, name="extractor-batcher", daemon=True
+                )
+                self._worker.start()
+        return self
+
+    def close(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
+        # 아직 큐에 남은 요청은 실패로 끝냄 (기다리는 스레드가 영원히 멈추지 않도록)
+        while True:
+            try:
+                _, fut, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if fut.set_running_or_notify_cancel():
+                fut.set_exception(RuntimeError("extractor batcher closed"))
+
+    # ---------- public API ----------
+    def submit(self, user_prompt: str) -> Future:
+        self.start()
+        fut = Future()
+        self._queue.put((user_prompt, fut, time.perf_counter()))
+        return fut
+
+    def extract_keywords(self, user_prompt: str, timeout: float = None) -> dict:
+        """new_extractor_model.extract_keywords 와 같은 시그니처/리턴"""
+        return self.submit(user_prompt).result(timeout=timeout)
+
+    def stats(self) -> dict:
+        lat = list(self._latencies)
+        return {
+            "requests": self._n_requests,
+            "batches": self._n_batches,
+            "avg_batch_size": (self._n_requests / self._n_batches) if self._n_batches else 0.0,
+            "p50_latency_s": _percentile(lat, 50),
+            "p95_latency_s": _percentile(lat, 95),
+        }
+
+    # ---------- worker ----------
+    def _collect_batch(self):
+        """첫 요청을 블로킹으로 받고, max_wait_ms 동안 추가 요청을 모은다."""
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            # 이미 취소된 요청은 제외
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            prompts = [p for (p, _, _) in batch]
+            try:
+                texts = [build_chat_text(self.tokenizer, p) for p in prompts]
+                outputs = generate_batch(
+                    self.tokenizer, self.model, texts,
+                    max_new_tokens=self.max_new_tokens,
+                    json_stop=self.json_stop,
+                    constrained=self.constrained,
+                )
+            except Exception as e:
+                print("[ERROR] batched generate failed:", e, file=sys.stderr)
+                for (_, fut, _) in batch:
+                    fut.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            self._n_batches += 1
+            for i, (prompt, fut, t0) in enumerate(batch):
+                self._n_requests += 1
+                self._latencies.append(now - t0)
+                if i >= len(outputs):
+                    fut.set_exception(RuntimeError(f"batched generate returned {len(outputs)} outputs "
+                                                   f"for {len(batch)} prompts"))
+                    continue
+                # 후처리 실패는 그 요청만 실패 (워커 스레드가 죽으면 이후 요청이 전부 멈춤)
+                try:
+                    fut.set_result(_postprocess_text_to_json(outputs[i], fallback_prompt=prompt))
+                except Exception as e:
+                    print("[ERROR] extraction postprocess failed:", e, file=sys.stderr)
+                    fut.set_exception(e)
+
+
+# =========================================================
+# 2. 벤치마크 (소형 CPU 모델로 처리량 / p95 측정)
+# =========================================================
+
+def benchmark(tokenizer, model, prompts, concurrency: int = 8,
+              max_batch_size: int = 8, max_wait_ms: float = 5.0,
+              max_new_tokens: int = 32) -> dict:
+    """
+    같은 프롬프트 집합을
+      1) 요청마다 단건 generate (기존 방식, 모델 앞에서 직렬화)
+      2) BatchingExtractor
+    로 concurrency 개 스레드에서 동시에 호출하여 처리량과 p95 지연을 비교.
+    """
+    # 1) 단건 방식: 동시에 들어와도 모델 호출은 한 번에 하나
+    gen_lock = threading.Lock()
+
+    def single(p):
+        t0 = time.perf_counter()
+        with gen_lock:
+            out = generate_batch(tokenizer, model, [build_chat_text(tokenizer, p)],
+                                 max_new_tokens=max_new_tokens)[0]
+        _postprocess_text_to_json(out, fallback_prompt=p)
+        return time.perf_counter() - t0
+
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        seq_lat = list(ex.map(single, prompts))
+    seq_total = time.perf_counter() - t_start
+
+    # 2) 배치 방식
+    batcher = BatchingExtractor(
+        tokenizer, model,
+        max_batch_size=max_batch_size,
+        max_wait_ms=max_wait_ms,
+        max_new_tokens=max_new_tokens,
+    ).start()
+
+    def batched(p):
+        t0 = time.perf_counter()
+        batcher.extract_keywords(p)
+        return time.perf_counter() - t0
+
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        bat_lat = list(ex.map(batched, prompts))
+    bat_total = time.perf_counter() - t_start
+    batcher.close()
+
+    return {
+        "sequential": {
+            "throughput_rps": len(prompts) / seq_total,
+            "p95_latency_s": _percentile(seq_lat, 95),
+        },
+        "batched": {
+            "throughput_rps": len(prompts) / bat_total,
+            "p95_latency_s": _percentile(bat_lat, 95),
+            **batcher.stats(),
+        },
+    }
+
+
+if __name__ == "__main__":
+    # 예) BENCH_MODEL=Qwen/Qwen2.5-0.5B-Instruct python extractor_batcher.py
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    bench_model = os.environ.get("BENCH_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
+    tok = AutoTokenizer.from_pretrained(bench_model)
+    mdl = AutoModelForCausalLM.from_pretrained(bench_model, torch_dtype=torch.float32)
+    mdl.eval()
+
+    sample_prompts = [
+        "계란 들어간 30분 이내 요리",
+        "비 오는 날 얼큰한 국물 요리 추천해줘",
+        "돼지고기 빼고 혼밥용 덮밥",
+        "다이어트 중인데 고단백 샐러드 먹고 싶어",
+    ] * 4
+
+    res = benchmark(tok, mdl, sample_prompts, concurrency=8)
+    print(res)
@@ -0,0 +1,204 @@
+# extractor_registry.py
+# 키워드 추출 백엔드 레지스트리
+#
+# - 백엔드는 설정(EXTRACTOR_BACKEND)으로 선택: local_hf / openai / lexicon / distilled / remote / stub
+#   (remote: inference_worker 프로세스에 IPC 로 요청 → 웹 프로세스는 모델을 로드하지 않음)
+#   (예전처럼 import 줄을 주석 처리해서 바꾸지 않아도 됨)
+# - 모듈 import / 모델 로드는 첫 사용 시점 또는 warm_up() 백그라운드 스레드에서
+# - readiness() 로 백엔드별 상태(not_loaded / loading / ready / failed) 확인
+# - EXTRACTION_LOG=1 이면 결과를 extraction_log 버퍼에 남김 (distilled 학습 / warm-up 용)
+import importlib
+import os
+import threading
+import time
+
+import extraction_log
+import tracing
+from extractor_schema import _postprocess_text_to_json
+
+# 실제 요청에 사용할 백엔드
+ACTIVE_BACKEND = os.environ.get("EXTRACTOR_BACKEND", "local_hf")
+
+# 서버 시작 시 미리 로드할 백엔드 (콤마 구분, 비우면 ACTIVE_BACKEND 만)
+WARMUP_BACKENDS = [
+    b.strip() for b in os.environ.get("EXTRACTOR_WARMUP", "").split(",") if b.strip()
+] or [ACTIVE_BACKEND]
+
+# lexicon 백엔드가 confidence 낮을 때 넘길 LLM 백엔드
+LEXICON_LLM_BACKEND = os.environ.get("LEXICON_LLM_BACKEND", "local_hf")
+
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ExtractorBackend:
+    """
+    module_name 을 처음 쓸 때 import 하고, warmup_fn(있으면)을 호출해 준비시킨다.
+    extract_fn 은 (backend, user_prompt) → dict.
+    """
+
+    def __init__(self, name, module_name=None, warmup_fn=None, extract_fn=None):
+        self.name = name
+        self.module_name = module_name
+        self.warmup_fn = warmup_fn
+        self.extract_fn = extract_fn or (lambda backend, p: backend.module.extract_keywords(p))
+
+        self.module = None
+        self.state = NOT_LOADED
+        self.error = None
+        self.load_time_s = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """import + warm-up (여러 스레드에서 불러도 한 번만 실행)"""
+        with self._lock:
+            if self.state == READY:
+                return self
+            self.state = LOADING
+            self.error = None
+            t0 = time.perf_counter()
+            try:
+                if self.module_name:
+                    self.module = importlib.import_module(self.module_name)
+                    if self.warmup_fn:
+                        getattr(self.module, self.warmup_fn)()
+            except Exception as e:
+                self.state = FAILED
+                self.error = f"{type(e).__name__}: {e}"
+                print(f"[ERROR] extractor backend '{self.name}' load failed:", e)
+                raise
+            self.load_time_s = time.perf_counter() - t0
+            self.state = READY
+            print(f"⏱️ extractor backend '{self.name}' 준비 완료: {self.load_time_s:.2f}초")
+        return self
+
+    def extract_keywords(self, user_prompt: str) -> dict:
+        if self.state != READY:
+            self.load()
+        return self.extract_fn(self, user_prompt)
+
+    def stream_keywords(self, user_prompt: str):
+        """
+        ("field", key, value) ... ("done", None, result) 이벤트 스트림.
+        모듈에 stream_extract_keywords 가 없으면 전체 추출 후 필드를 한꺼번에 내보냄.
+        """
+        if self.state != READY:
+            self.load()
+        stream_fn = getattr(self.module, "stream_extract_keywords", None) if self.module else None
+        if stream_fn is not None:
+            yield from stream_fn(user_prompt)
+            return
+        result = self.extract_fn(self, user_prompt)
+        for key, value in result.items():
+            yield ("field", key, value)
+        yield ("done", None, result)
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "error": self.error,
+            "load_time_s": self.load_time_s,
+        }
+
+
+def _stub_extract(backend, user_prompt):
+    # 모델 없이 빈 스키마만 채워서 리턴 (개발/테스트용)
+    return _postprocess_text_to_json("", fallback_prompt=user_prompt)
+
+
+def _lexicon_extract(backend, user_prompt):
+    llm = get_backend(LEXICON_LLM_BACKEND)
+    return backend.module.extract_keywords(user_prompt, llm_extract=llm.extract_keywords)
+
+
+_BACKENDS = {
+    "local_hf": ExtractorBackend("local_hf", "new_extractor_model", warmup_fn="warm_up"),
+    "openai": ExtractorBackend("openai", "park_extractor_model"),
+    "lexicon": ExtractorBackend("lexicon", "lexicon_extractor", warmup_fn="get_lexicon",
+                                extract_fn=_lexicon_extract),
+    "distilled": ExtractorBackend("distilled", "distilled_extractor", warmup_fn="load_default_model"),
+    "remote": ExtractorBackend("remote", "inference_worker", warmup_fn="connect_default"),
+    "stub": ExtractorBackend("stub", extract_fn=_stub_extract),
+}
+
+
+def register_backend(backend: ExtractorBackend):
+    """추가 백엔드 등록"""
+    _BACKENDS[backend.name] = backend
+    return backend
+
+
+def get_backend(name: str = None) -> ExtractorBackend:
+    name = name or ACTIVE_BACKEND
+    if name not in _BACKENDS:
+        raise ValueError(f"unknown extractor backend: {name} (available: {sorted(_BACKENDS)})")
+    return _BACKENDS[name]
+
+
+def _log_extraction(backend, user_prompt, result, t0):
+    if extraction_log.LOG_ENABLED:
+        extraction_log.get_writer().log(
+            user_prompt, result, backend=backend.name,
+            latency_ms=(time.perf_counter() - t0) * 1000.0,
+        )
+
+
+def extract_keywords(user_prompt: str) -> dict:
+    """기존 extract_keywords 와 같은 시그니처 — 설정된 백엔드로 위임"""
+    backend = get_backend()
+    tracing.annotate(backend=backend.name)
+    t0 = time.perf_counter()
+    result = backend.extract_keywords(user_prompt)
+    _log_extraction(backend, user_prompt, result, t0)
+    return result
+
+
+def stream_extract_keywords(user_prompt: str):
+    """
+    설정된 백엔드의 필드 단위 스트림 (ExtractorBackend.stream_keywords 참고).
+    "done" 결과는 extract_keywords 와 똑같이 extraction_log 에 남김 (스트림이 중간에 끊기면 안 남김)
+    """
+    backend = get_backend()
+    tracing.annotate(backend=backend.name)
+    t0 = time.perf_counter()
+    for event in backend.stream_keywords(user_prompt):
+        if event[0] == "done":
+            _log_extraction(backend, user_prompt, event[2], t0)
+        yield event
+
+
+def warm_up(names=None, background: bool = True):
+    """
+    백엔드 미리 로드. background=True 면 데몬 스레드에서 로드하고 바로 리턴
+    → 서버는 health 엔드포인트를 즉시 서비스할 수 있음.
+    """
+    names = names or WARMUP_BACKENDS
+
+    def _run():
+        for n in names:
+            try:
+                get_backend(n).load()
+            except Exception:
+                # 실패 상태/에러는 readiness() 에 남아 있음
+                pass
+
+    if not background:
+        _run()
+        return None
+    t = threading.Thread(target=_run, name="extractor-warmup", daemon=True)
+    t.start()
+    return t
+
+
+def readiness() -> dict:
+    """백엔드별 준비 상태"""
+    return {
+        "active": ACTIVE_BACKEND,
+        "backends": {name: b.status() for name, b in _BACKENDS.items()},
+    }
+
+
+def is_ready(name: str = None) -> bool:
+    return get_backend(name).state == READY
@@ -0,0 +1,418 @@
+# extractor_schema.py
+# new_extractor_model.py 에서 분리: SYSTEM_PROMPT + 후처리 헬퍼
+# (모델을 로드하지 않고도 import 가능 → 배치 스케줄러/백엔드들이 공유)
+import json
+
+
+# =========================================================
+# 1. SYSTEM PROMPT (확장된 JSON 스키마)
+# =========================================================
+
+SYSTEM_PROMPT = """
+당신은 한국어 레시피 추천 시스템의 핵심 구성요소인
+"요리 의도·조건 추출기(Keyword & Constraint Extractor)" 입니다.
+
+당신의 임무는:
+사용자의 자연어 요리 요청에서 **모든 의미 있는 요소를 빠짐없이 구조화된 JSON으로 추출하는 것**입니다.
+
+출력 규칙은 반드시 다음을 따라야 합니다:
+
+────────────────────────────────────────
+📌 **① 출력 형식**
+
+오직 아래 JSON 스키마 형태의 JSON만 출력하십시오.
+문장 설명, 해설, 추가 문구는 절대 출력하지 마십시오.
+무조건 답변은 한국어로 하십시오.
+
+모든 필드는 반드시 존재해야 합니다.
+값이 비었으면 **빈 배열 또는 null** 로 채우십시오.
+
+JSON 스키마:
+
+{
+  "dish_type": [],                    // 요리 형태/종류
+  "method": [],                       // 조리 방식
+  "situation": [],                    // 먹는 상황/맥락
+  "must_ingredients": [],             // 반드시 포함되어야 하는 재료
+  "optional_ingredients": [],         // 들어가면 좋지만 필수는 아닌 재료
+  "exclude_ingredients": [],          // 절대 들어가면 안 되는 재료
+  "spiciness": "none" | "low" | "medium" | "high" | null,
+
+  "dietary_constraints": {
+    "vegetarian": bool,
+    "vegan": bool,
+    "no_beef": bool,
+    "no_pork": bool,
+    "no_chicken": bool,
+    "no_seafood": bool
+  },
+
+  "servings": {
+    "min": int or null,
+    "max": int or null
+  },
+
+  "max_cook_time_min": int or null,
+  "difficulty": [],
+
+  "health_tags": [],                  // 건강, 목적, 영양 관련
+  "weather_tags": [],                 // 날씨/계절
+  "menu_style": [],                   // 국가/분류/스타일
+  "extra_keywords": [],               // 위 어디에도 속하지 않는 의미 있는 단어
+
+  "positive_tags": [],                // 사용자가 원함/좋아함
+  "negative_tags": [],                // 사용자가 싫어함/피하고 싶음
+
+  "free_text": string                 // 전체 요청의 자연어 요약
+}
+
+────────────────────────────────────────
+📌 **② 각 필드의 세부 지침 (매우 중요)**
+
+1) dish_type (요리 종류)
+- "찌개", "국", "볶음", "튀김", "조림", "덮밥", "비빔밥", "면 요리" 등
+- 가능하면 구체적 표현으로 추출
+
+2) method (조리 방식)
+- "끓이기", "볶기", "찜", "무침", "튀기기", "굽기" 등
+
+3) situation (먹는 상황)
+- "야식", "혼밥", "술안주", "손님 초대", "간단하게", "도시락", "캠핑" 등
+- 문맥에서 숨겨진 상황도 추론하여 포함 가능
+
+4) must_ingredients 규칙(아주 중요):
+
+  사용자가 특정 재료를 언급하며 “~ 요리 추천해줘”, “~ 넣어 먹고 싶다”, 
+  “~로 만들고 싶다”, “~ 요리가 땡긴다”, “~ 요리 먹고 싶어” 라고 말한 경우
+  → 해당 재료는 MUST INGREDIENT로 간주한다.
+
+  예:
+  - “돼지고기 요리 추천해줘” → must_ingredients: ["돼지고기"]
+  - “김치랑 버섯이랑 같이 먹고 싶다” → must_ingredients: ["김치","버섯"]
+  - “닭고기로 뭘 만들까?” → must_ingredients: ["닭고기"]
+
+5) optional_ingredients
+- “있으면 좋고”, “가능하면”, “추가로” 표현된 재료
+
+6) exclude_ingredients
+- “싫어”, “알레르기”, “못먹어”, “빼고”, “제외해줘” 등
+
+7) spiciness
+- "안 매운", "매콤하게", "얼큰하게" 등 해석하여 4단계로 정규화:
+  - none, low, medium, high
+
+8) dietary_constraints
+- "채식주의자" → vegetarian=true + no_beef/no_pork/no_chicken/no_seafood=true, 어떠한 형태의 고기요리나 생선요리도 포함되면 안돼
+- "비건" → vegan=true + 위 조건 모두 true
+- “고기 안 먹어” → no_beef/no_pork/no_chicken 모두 true
+- 특정 육류만 싫어하면 해당 항목만 true
+
+9) servings
+- "1인분", "혼자 먹을 거야" → min=1, max=1
+- "4명", "가족" → 추론 가능하면 넣고, 불확실하면 null
+
+10) max_cook_time_min
+- "10분 안에", "빨리", "간단히" → 명확히 숫자가 있을 때만 기입
+- 숫자가 없으면 null
+
+11) difficulty
+- "간단한", "쉽게", "어려운 요리" 등 난이도 표현 그대로 단어로 넣기
+
+12) health_tags
+- "다이어트", "고단백", "저염식", "저칼로리", "영양식" 등
+
+13) weather_tags
+- "추운 날", "더운 날", "비오는 날", "겨울", "여름" 등
+
+14) menu_style
+- "한식", "중식", "양식", "분식", "디저트", "안주", "브런치", "한 그릇" 등
+
+15) extra_keywords
+- 위 항목들 어디에도 속하지 않지만 의미 있는 단어
+  예: "백종원 레시피", "에어프라이어", "명절", "칼칼한", "간편식"
+
+16) positive_tags
+- “좋아해”, “먹고 싶어”, “원해”, “ craving ” 등 감정/선호 기반
+
+17) negative_tags
+- “싫어”, “별로”, “꺼려져”, "먹기 싫어"
+
+18) free_text
+- 전체 사용자 요청을 자연스럽고 간결하게 요약한 1~2문장
+- 단순 요약이 아니라, 다음 내용을 반드시 포함해야 함:
+  1) 사용자가 어떤 상황에서 어떤 종류의 음식을 원하고 있는지
+  2) 재료/식단 제한/취향 조건이 서로 모순되거나 비현실적인지 여부
+  3) 모순·위험·비현실적인 조건이 있다면,
+     "요청을 그대로 만족시키기 어렵다"는 점과
+     어떤 방향(예: 비건 유지, 알레르기 회피 등)을 우선해야 하는지 제안
+
+────────────────────────────────────────
+📌 **③ 절대적으로 지켜야 할 3가지**
+
+1. 출력은 반드시 **JSON 단독**이어야 함 (앞뒤 추가 텍스트 금지)  
+2. JSON 스키마의 **모든 필드**를 반드시 출력  
+3. 빈 값도 반드시 포함 (절대 필드 누락 금지)
+
+────────────────────────────────────────
+
+지금부터 사용자 입력이 들어오면
+위 스키마에 맞춰 **정확하고 완전한 JSON**만 출력하십시오.
+"""
+
+
+
+# =========================================================
+# 2. Post-process helpers
+# =========================================================
+
+def _ensure_list(x):
+    if x is None:
+        return []
+    if isinstance(x, str):
+        if not x.strip():
+            return []
+        return [x]
+    return list(x)
+
+def _unique_preserve_order(lst):
+    seen = set()
+    out = []
+    for x in lst:
+        if x not in seen:
+            seen.add(x)
+            out.append(x)
+    return out
+
+def _dedup_by_norm_space_lower(tags):
+    """
+    ['추운 날', '추운날'] 같이 공백/대소문자만 다른 중복을 하나로 정리.
+    """
+    norm_seen = set()
+    out = []
+    for t in _ensure_list(tags):
+        norm = str(t).replace(" ", "").lower()
+        if norm in norm_seen:
+            continue
+        norm_seen.add(norm)
+        out.append(t)
+    return out
+
+
+def _parse_first_json_object(text: str) -> dict:
+    """문자열/escape 를 고려해 첫 번째 최상위 {...} 를 찾아 파싱 (실패 시 {})"""
+    start = text.find("{")
+    if start == -1:
+        return {}
+    depth, in_str, esc = 0, False, False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_str:
+            if esc:
+                esc = False
+            elif c == "\\":
+                esc = True
+            elif c == '"':
+                in_str = False
+        elif c == '"':
+            in_str = True
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                try:
+                    return json.loads(text[start:i + 1])
+                except json.JSONDecodeError:
+                    return {}
+    return {}
+
+
+def _postprocess_text_to_json(output_text: str, fallback_prompt: str) -> dict:
+    """
+    - LLM이 출력한 JSON 텍스트를 파싱
+    - 누락/타입 이상 필드 보정
+    - positive_tags → health_tags / extra_keywords 확장
+    - weather_tags는 LLM 출력만 사용하되, 표기 중복만 정리
+    """
+    output_text = output_text.strip()
+
+    # ```json ... ``` 형태 제거
+    if output_text.startswith("```"):
+        output_text = output_text.strip("`").strip()
+        if output_text.startswith("json"):
+            output_text = output_text[4:].strip()
+
+    try:
+        data = json.loads(output_text)
+    except json.JSONDecodeError:
+        # 앞뒤에 설명/펜스가 붙은 경우: 첫 번째 최상위 {...} 만 잘라서 재시도
+        data = _parse_first_json_object(output_text)
+
+    # 1) 기본 골격 (확장된 스키마 기준)
+    base = {
+        "dish_type": [],
+        "method": [],
+        "situation": [],
+        "must_ingredients": [],
+        "optional_ingredients": [],
+        "exclude_ingredients": [],
+        "spiciness": None,
+        "dietary_constraints": {
+            "vegetarian": False,
+            "vegan": False,
+            "no_beef": False,
+            "no_pork": False,
+            "no_chicken": False,
+            "no_seafood": False,
+        },
+        "servings": {"min": None, "max": None},
+        "max_cook_time_min": None,
+        "difficulty": [],
+
+        "health_tags": [],
+        "weather_tags": [],
+        "menu_style": [],
+        "extra_keywords": [],
+
+        "positive_tags": [],
+        "negative_tags": [],
+        "free_text": fallback_prompt,
+    }
+
+    if not isinstance(data, dict):
+        data = {}
+
+    merged = base.copy()
+    merged.update({k: v for k, v in data.items() if v is not None})
+
+    # 리스트 필드 정규화
+    list_fields = [
+        "dish_type", "method", "situation",
+        "must_ingredients", "optional_ingredients", "exclude_ingredients",
+        "difficulty",
+        "health_tags", "weather_tags", "menu_style", "extra_keywords",
+        "positive_tags", "negative_tags",
+    ]
+    for k in list_fields:
+        merged[k] = _ensure_list(merged.get(k))
+
+    # dietary_constraints 보정
+    dc = merged.get("dietary_constraints") or {}
+    merged["dietary_constraints"] = {
+        "vegetarian": bool(dc.get("vegetarian", False)),
+        "vegan": bool(dc.get("vegan", False)),
+        "no_beef": bool(dc.get("no_beef", False)),
+        "no_pork": bool(dc.get("no_pork", False)),
+        "no_chicken": bool(dc.get("no_chicken", False)),
+        "no_seafood": bool(dc.get("no_seafood", False)),
+    }
+
+    # servings 보정
+    serv = merged.get("servings") or {}
+    merged["servings"] = {
+        "min": serv.get("min"),
+        "max": serv.get("max"),
+    }
+
+    # spiciness 정규화
+    valid_sp = {"none", "low", "medium", "high", None}
+    sp = merged.get("spiciness")
+    if isinstance(sp, str):
+        sp = sp.lower().strip()
+        if sp not in valid_sp:
+            sp = None
+    elif sp not in valid_sp:
+        sp = None
+    merged["spiciness"] = sp
+
+    # free_text 보정
+    if not isinstance(merged.get("free_text"), str) or not merged["free_text"].strip():
+        merged["free_text"] = fallback_prompt
+
+    # positive_tags → health_tags / extra_keywords 확장
+    pos = merged.get("positive_tags", [])
+    merged["health_tags"] = _unique_preserve_order(merged["health_tags"] + pos)
+    merged["extra_keywords"] = _unique_preserve_order(merged["extra_keywords"] + pos)
+
+    # weather_tags는 LLM 출력만 신뢰, 대신 공백/대소문자 기준 중복 제거
+    merged["weather_tags"] = _dedup_by_norm_space_lower(merged["weather_tags"])
+
+    return merged
+
+
+# =========================================================
+# 3. 난이도 표현 → 그래프 난이도 (jiewan_model_v2.normalize_difficulty 등)
+# =========================================================
+
+DIFFICULTY_MAP = {
+    "쉬운": ["아무나", "초급"],
+    "간단": ["아무나", "초급"],
+    "쉽": ["아무나", "초급"],
+    "초보": ["아무나", "초급"],
+    "입문": ["아무나", "초급"],
+    "초급": ["초급"],
+    "중급": ["중급"],
+    "고급": ["고급"],
+    "어려운": ["고급", "중급"],
+    "힘든": ["고급", "중급"],
+}
+
+
+# =========================================================
+# 4. 로그 row(flat dict) → extract_keywords 결과 dict
+#    (park_extractor_model.result_to_row 의 역변환)
+# =========================================================
+
+LIST_FIELDS = [
+    "dish_type", "method", "situation",
+    "must_ingredients", "optional_ingredients", "exclude_ingredients",
+    "difficulty",
+    "health_tags", "weather_tags", "menu_style", "extra_keywords",
+    "positive_tags", "negative_tags",
+]
+
+DIET_FIELDS = ["vegetarian", "vegan", "no_beef", "no_pork", "no_chicken", "no_seafood"]
+
+
+def _split_joined(x):
+    if isinstance(x, list):
+        return x
+    if x is None or (isinstance(x, float) and x != x):   # None / NaN
+        return []
+    s = str(x).strip()
+    if not s:
+        return []
+    return [v.strip() for v in s.split(" | ") if v.strip()]
+
+
+def _to_bool(x) -> bool:
+    if isinstance(x, bool):
+        return x
+    return str(x).strip().lower() in ("true", "1", "yes")
+
+
+def _to_int_or_none(x):
+    if x is None or x == "":
+        return None
+    try:
+        f = float(x)
+    except (TypeError, ValueError):
+        return None
+    if f != f:   # NaN
+        return None
+    return int(f)
+
+
+def row_to_result(row: dict) -> dict:
+    """keyword_extract_log.csv 한 줄을 extract_keywords 스키마 dict 로 복원"""
+    result = {k: _split_joined(row.get(k)) for k in LIST_FIELDS}
+    sp = row.get("spiciness")
+    result["spiciness"] = sp if isinstance(sp, str) and sp.strip() else None
+    result["dietary_constraints"] = {k: _to_bool(row.get(k, False)) for k in DIET_FIELDS}
+    result["servings"] = {
+        "min": _to_int_or_none(row.get("servings_min")),
+        "max": _to_int_or_none(row.get("servings_max")),
+    }
+    result["max_cook_time_min"] = _to_int_or_none(row.get("max_cook_time_min"))
+    result["free_text"] = row.get("free_text") or row.get("user_prompt", "")
+    return result
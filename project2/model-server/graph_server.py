@@ -6,6 +6,8 @@ from neo4j import GraphDatabase
 from extractor_model_old import extract_keywords  # 기존 키워드 추출 모델
 import time
 
+import metrics
+
 URI = "bolt://localhost:7687"
 USER = "neo4j"
 PASSWORD = "password"
@@ -176,6 +178,12 @@ def graph_rag_search(user_prompt: str,keywords:dict, top_k: int = 5) -> Dict[str
     t6 = time.time()
     selected = candidates[:top_k]
 
+    metrics.observe_stage("extract", t1 - t0)
+    metrics.observe_stage("build_query", t3 - t2)
+    metrics.observe_stage("neo4j", t4 - t3, query="candidates")
+    metrics.observe_stage("select", t6 - t4)
+    metrics.inc("search_results_total", len(selected))
+
     print(f"⏱️ 키워드 추출 소요 시간 : {t1 - t0:.4f}초")
     print(f"⏱️ 이전 키워드 반영     : {t2 - t1:.4f}초")
     print(f"⏱️ DB검색 쿼리 생성    : {t3 - t2:.4f}초")
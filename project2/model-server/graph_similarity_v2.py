@@ -1,7 +1,11 @@
 # graph_similarity.py
 from typing import List, Dict, Any
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase, GraphDatabase, unit_of_work
 import math
+import time
+
+import metrics
+import tracing
 
 # ================================
 # 1. 유사도 & 다양성 헬퍼 함수
@@ -71,7 +75,101 @@ def diversify_by_set_field(
 
 
 # ================================
-# 2. 메인 클래스
+# 2. Cypher (동기 / async 클래스 공용)
+# ================================
+
+# 전체 그래프 기준 – 관계 타입별 가중치 (재료 제외) + exclude_ids 필터
+OVERALL_SIMILAR_CYPHER = """
+MATCH (base:RecipeV2 {recipe_id: $recipe_id})
+
+// base와 연결된 모든 태그 노드 (재료 제외)
+MATCH (base)-[:IN_CATEGORY_V2
+              |COOKED_BY_V2
+              |FOR_SITUATION_V2
+              |HAS_HEALTH_TAG
+              |HAS_WEATHER_TAG
+              |HAS_MENU_STYLE
+              |HAS_EXTRA_KEYWORD]->(t)
+
+// 같은 태그 t에 연결된 other 레시피
+MATCH (other:RecipeV2)-[r2:IN_CATEGORY_V2
+                        |COOKED_BY_V2
+                        |FOR_SITUATION_V2
+                        |HAS_HEALTH_TAG
+                        |HAS_WEATHER_TAG
+                        |HAS_MENU_STYLE
+                        |HAS_EXTRA_KEYWORD]->(t)
+WHERE other <> base
+  AND NOT other.recipe_id IN $exclude_ids   // 재료 기반으로 뽑힌 것들 제외
+
+WITH other, t, type(r2) AS rel_type
+
+// 관계 타입별 가중치 합산
+WITH other,
+     collect(DISTINCT t.name) AS shared_tags,
+     sum(
+       CASE rel_type
+         WHEN "FOR_SITUATION_V2"  THEN 4
+         WHEN "HAS_HEALTH_TAG"    THEN 5
+         WHEN "IN_CATEGORY_V2"    THEN 2
+         WHEN "HAS_WEATHER_TAG"   THEN 2
+         WHEN "HAS_MENU_STYLE"    THEN 2
+         WHEN "HAS_EXTRA_KEYWORD" THEN 3
+         ELSE 1
+       END
+     ) AS similarity_score
+
+RETURN
+    other.recipe_id AS recipe_id,
+    other.title     AS title,
+    other.name      AS name,
+    other.image_url AS image_url,
+    similarity_score AS score,
+    shared_tags
+ORDER BY score DESC, other.views DESC, title ASC
+LIMIT $candidate_n;
+"""
+
+# 재료만 기준 – 공유 재료 수 기반 + 최소 재료 공유 필터
+INGREDIENT_SIMILAR_CYPHER = """
+MATCH (base:RecipeV2 {recipe_id: $recipe_id})
+MATCH (base)-[:HAS_INGREDIENT_V2]->(ing:IngredientV2)
+
+MATCH (other:RecipeV2)-[:HAS_INGREDIENT_V2]->(ing)
+WHERE other <> base
+
+WITH other,
+     collect(DISTINCT ing.name) AS shared_ingredients,
+     count(DISTINCT ing)        AS shared_ing_count
+
+// 재료 공유 개수 필터
+WHERE shared_ing_count >= $min_shared_ings
+
+RETURN
+    other.recipe_id       AS recipe_id,
+    other.title           AS title,
+    other.name            AS name,
+    other.image_url       AS image_url,
+    shared_ing_count      AS score,
+    shared_ingredients
+ORDER BY score DESC, other.views DESC, title ASC
+LIMIT $candidate_n;
+"""
+
+
+def _with_tx_timeout(fn, deadline):
+    """
+    execute_read 용 transaction 함수에 Neo4j 서버측 timeout 을 붙임 (deadline 까지 남은 시간).
+    호출 쪽이 기다리기를 포기해도 쿼리는 DB 가 끝내므로 스레드 / 세션이 계속 잡혀 있지 않음.
+    공유 staticmethod 에 속성을 달지 않도록 호출마다 감싼 함수를 만든다.
+    """
+    if deadline is None:
+        return fn
+    return unit_of_work(timeout=max(0.001, deadline - time.monotonic()))(lambda tx, *a, **kw: fn(tx, *a, **kw))
+
+
+# ================================
+# 3. 메인 클래스
 # ================================
 class RecipeGraphSimilarity:
     def __init__(self, uri, user, password):
@@ -88,8 +186,10 @@ class RecipeGraphSimilarity:
         lambda_ing: float = 0.7,
         lambda_overall: float = 0.7,
         candidate_factor: int = 5,
+        timeout_s: float = None,
     ):
         """
+        - timeout_s: 두 쿼리를 합친 Neo4j transaction timeout (None 이면 서버 기본값)
         - 재료 기준: 상위 candidate_n개를 Neo4j에서 가져온 뒤,
           MMR 기반으로 서로 다른 재료를 공유하도록 top_n개 선택
         - overall 기준: 재료로 이미 선택한 recipe_id는 제외하고
@@ -97,15 +197,19 @@ class RecipeGraphSimilarity:
           shared_tags 기준으로 다양성 있게 top_n개 선택
         """
         candidate_n = top_n * candidate_factor
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
 
-        with self.driver.session() as session:
+        with metrics.stage("similarity"), self.driver.session() as session:
             # 1) 재료 기반 후보 넉넉히 가져오기
-            ing_candidates = session.execute_read(
-                self._query_ingredient_similar,
-                recipe_id,
-                candidate_n,
-                min_shared_ings,
-            )
+            with tracing.span("neo4j", query="similar_ingredients",
+                              params={"recipe_id": recipe_id, "candidate_n": candidate_n,
+                                      "min_shared_ings": min_shared_ings}):
+                ing_candidates = session.execute_read(
+                    _with_tx_timeout(self._query_ingredient_similar, deadline),
+                    recipe_id,
+                    candidate_n,
+                    min_shared_ings,
+                )
 
             # 1-1) 재료 기반 diversified top_n
             ingredients = diversify_by_set_field(
@@ -119,12 +223,15 @@ class RecipeGraphSimilarity:
             exclude_ids = [row["recipe_id"] for row in ingredients]
 
             # 3) overall 후보 넉넉히 가져오기 (재료 기반 제외)
-            overall_candidates = session.execute_read(
-                self._query_overall_similar,
-                recipe_id,
-                candidate_n,
-                exclude_ids,
-            )
+            with tracing.span("neo4j", query="similar_overall",
+                              params={"recipe_id": recipe_id, "candidate_n": candidate_n,
+                                      "exclude_ids": exclude_ids}):
+                overall_candidates = session.execute_read(
+                    _with_tx_timeout(self._query_overall_similar, deadline),
+                    recipe_id,
+                    candidate_n,
+                    exclude_ids,
+                )
 
             # 3-1) overall에서도 shared_tags 기준 diversified top_n
             overall = diversify_by_set_field(
@@ -145,56 +252,7 @@ class RecipeGraphSimilarity:
     # ==========================================================
     @staticmethod
     def _query_overall_similar(tx, recipe_id, candidate_n, exclude_ids):
-        cypher = """
-        MATCH (base:RecipeV2 {recipe_id: $recipe_id})
-
-        // base와 연결된 모든 태그 노드 (재료 제외)
-        MATCH (base)-[:IN_CATEGORY_V2
-                      |COOKED_BY_V2
-                      |FOR_SITUATION_V2
-                      |HAS_HEALTH_TAG
-                      |HAS_WEATHER_TAG
-                      |HAS_MENU_STYLE
-                      |HAS_EXTRA_KEYWORD]->(t)
-
-        // 같은 태그 t에 연결된 other 레시피
-        MATCH (other:RecipeV2)-[r2:IN_CATEGORY_V2
-                                |COOKED_BY_V2
-                                |FOR_SITUATION_V2
-                                |HAS_HEALTH_TAG
-                                |HAS_WEATHER_TAG
-                                |HAS_MENU_STYLE
-                                |HAS_EXTRA_KEYWORD]->(t)
-        WHERE other <> base
-          AND NOT other.recipe_id IN $exclude_ids   // 재료 기반으로 뽑힌 것들 제외
-
-        WITH other, t, type(r2) AS rel_type
-
-        // 관계 타입별 가중치 합산
-        WITH other,
-             collect(DISTINCT t.name) AS shared_tags,
-             sum(
-               CASE rel_type
-                 WHEN "FOR_SITUATION_V2"  THEN 4
-                 WHEN "HAS_HEALTH_TAG"    THEN 5
-                 WHEN "IN_CATEGORY_V2"    THEN 2
-                 WHEN "HAS_WEATHER_TAG"   THEN 2
-                 WHEN "HAS_MENU_STYLE"    THEN 2
-                 WHEN "HAS_EXTRA_KEYWORD" THEN 3
-                 ELSE 1
-               END
-             ) AS similarity_score
-
-        RETURN
-            other.recipe_id AS recipe_id,
-            other.title     AS title,
-            other.name      AS name,
-            other.image_url AS image_url,
-            similarity_score AS score,
-            shared_tags
-        ORDER BY score DESC, other.views DESC, title ASC
-        LIMIT $candidate_n;
-        """
+        cypher = OVERALL_SIMILAR_CYPHER
 
         result = tx.run(
             cypher,
@@ -210,30 +268,7 @@ class RecipeGraphSimilarity:
     # ==========================================================
     @staticmethod
     def _query_ingredient_similar(tx, recipe_id, candidate_n, min_shared_ings):
-        cypher = """
-        MATCH (base:RecipeV2 {recipe_id: $recipe_id})
-        MATCH (base)-[:HAS_INGREDIENT_V2]->(ing:IngredientV2)
-
-        MATCH (other:RecipeV2)-[:HAS_INGREDIENT_V2]->(ing)
-        WHERE other <> base
-
-        WITH other,
-             collect(DISTINCT ing.name) AS shared_ingredients,
-             count(DISTINCT ing)        AS shared_ing_count
-
-        // 재료 공유 개수 필터
-        WHERE shared_ing_count >= $min_shared_ings
-
-        RETURN
-            other.recipe_id       AS recipe_id,
-            other.title           AS title,
-            other.name            AS name,
-            other.image_url       AS image_url,
-            shared_ing_count      AS score,
-            shared_ingredients
-        ORDER BY score DESC, other.views DESC, title ASC
-        LIMIT $candidate_n;
-        """
+        cypher = INGREDIENT_SIMILAR_CYPHER
 
         result = tx.run(
             cypher,
@@ -241,4 +276,65 @@ class RecipeGraphSimilarity:
             candidate_n=candidate_n,
             min_shared_ings=min_shared_ings,
         )
-        return [dict(record) for record in result]
\ No newline at end of file
+        return [dict(record) for record in result]
+
+
+# ================================
+# 4. async 버전 (asgi_app 용)
+# ================================
+class AsyncRecipeGraphSimilarity:
+    """RecipeGraphSimilarity 와 같은 쿼리 / 결과, neo4j async 드라이버 사용"""
+
+    def __init__(self, uri, user, password):
+        self.driver = AsyncGraphDatabase.driver(uri, auth=(user, password))
+
+    async def close(self):
+        await self.driver.close()
+
+    async def get_similar_recipes(
+        self,
+        recipe_id: int,
+        top_n: int = 3,
+        min_shared_ings: int = 2,
+        lambda_ing: float = 0.7,
+        lambda_overall: float = 0.7,
+        candidate_factor: int = 5,
+        timeout_s: float = None,
+    ):
+        candidate_n = top_n * candidate_factor
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+
+        with metrics.stage("similarity"):
+            async with self.driver.session() as session:
+                params = {"recipe_id": recipe_id, "candidate_n": candidate_n, "min_shared_ings": min_shared_ings}
+                with tracing.span("neo4j", query="similar_ingredients", params=params):
+                    ing_candidates = await session.execute_read(
+                        _with_tx_timeout(self._query, deadline), INGREDIENT_SIMILAR_CYPHER, **params)
+                ingredients = diversify_by_set_field(
+                    candidates=ing_candidates,
+                    field="shared_ingredients",
+                    top_n=top_n,
+                    lambda_rel=lambda_ing,
+                )
+
+                exclude_ids = [row["recipe_id"] for row in ingredients]
+                params = {"recipe_id": recipe_id, "candidate_n": candidate_n, "exclude_ids": exclude_ids}
+                with tracing.span("neo4j", query="similar_overall", params=params):
+                    overall_candidates = await session.execute_read(
+                        _with_tx_timeout(self._query, deadline), OVERALL_SIMILAR_CYPHER, **params)
+                overall = diversify_by_set_field(
+                    candidates=overall_candidates,
+                    field="shared_tags",
+                    top_n=top_n,
+                    lambda_rel=lambda_overall,
+                )
+
+        return {
+            "overall": overall,
+            "ingredients": ingredients,
+        }
+
+    @staticmethod
+    async def _query(tx, cypher, **params):
+        result = await tx.run(cypher, **params)
+        return [dict(record) async for record in result]
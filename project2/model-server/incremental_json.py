@@ -0,0 +1,92 @@
+# incremental_json.py
+# 생성 중인 추출 JSON 을 토큰 단위로 받아서, 최상위 필드 값이 완성되는 즉시 이벤트로 내보냄
+#
+#   parser = IncrementalJsonParser()
+#   for chunk in streamer:
+#       for key, value in parser.feed(chunk):
+#           ...   # ("must_ingredients", ["계란"]) 처럼 완성된 필드
+#
+# - 첫 "{" 이전의 텍스트(```json 펜스 등)는 무시
+# - 문자열 / escape 를 고려해서 depth 1 의 "key": value 경계를 찾음
+# - 값은 다음 "," 또는 객체를 닫는 "}" 를 만나면 json.loads 로 파싱 (실패하면 건너뜀)
+import json
+
+
+class IncrementalJsonParser:
+    def __init__(self):
+        self.buf = []
+        self.depth = 0
+        self.in_str = False
+        self.esc = False
+        self.started = False
+        self.done = False
+
+        self.fields = {}          # 지금까지 완성된 필드
+        self._str_start = None    # depth 1 문자열 시작 위치 (key 후보)
+        self._key = None
+        self._value_start = None
+
+    def _emit(self, end: int):
+        """buf[_value_start:end] 를 현재 key 의 값으로 파싱"""
+        key, start = self._key, self._value_start
+        self._key, self._value_start = None, None
+        if key is None or start is None:
+            return None
+        raw = "".join(self.buf[start:end]).strip()
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        self.fields[key] = value
+        return key, value
+
+    def feed(self, text: str):
+        """텍스트 조각을 먹이고, 이번에 완성된 (key, value) 리스트를 리턴"""
+        events = []
+        for c in text:
+            if self.done:
+                break
+            if not self.started:
+                if c == "{":
+                    self.started = True
+                    self.depth = 1
+                continue
+
+            i = len(self.buf)
+            self.buf.append(c)
+
+            if self.in_str:
+                if self.esc:
+                    self.esc = False
+                elif c == "\\":
+                    self.esc = True
+                elif c == '"':
+                    self.in_str = False
+                    if self.depth == 1 and self._value_start is None and self._str_start is not None:
+                        self._key = "".join(self.buf[self._str_start + 1:i])
+                    self._str_start = None
+                continue
+
+            if c == '"':
+                self.in_str = True
+                if self.depth == 1 and self._value_start is None:
+                    self._str_start = i
+            elif c in "{[":
+                self.depth += 1
+            elif c in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    ev = self._emit(i)
+                    if ev:
+                        events.append(ev)
+                    self.done = True
+            elif c == ":" and self.depth == 1 and self._key is not None and self._value_start is None:
+                self._value_start = i + 1
+            elif c == "," and self.depth == 1:
+                ev = self._emit(i)
+                if ev:
+                    events.append(ev)
+        return events
+
+    def has_fields(self, names) -> bool:
+        return all(n in self.fields for n in names)
@@ -0,0 +1,259 @@
+# inference_scheduler.py
+# 하나의 모델(GPU)을 키워드 추출 / 추천 설명 생성이 같이 쓰도록 조율하는 우선순위 스케줄러
+#
+# - 모델 호출은 워커 스레드 하나에서만 → 동시에 model.generate 가 겹치지 않음
+# - 클래스별 큐: extraction(높음, 검색 응답 critical path) > explanation(낮음)
+#   · 워커는 매 배치마다 extraction 큐부터 확인, 비어 있을 때만 explanation 처리
+#   · 같은 클래스의 요청은 max_batch_items 까지 묶어서 한 번에 generate
+# - explanation 은 load shedding: 큐가 max_depth 를 넘으면 submit 즉시 Overloaded,
+#   max_wait_s 이상 기다린 요청은 처리하지 않고 Overloaded 로 종료
+# - stats(): 클래스별 큐 깊이 / 대기 시간 p50·p95 / 처리 시간 / shed 수
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+EXTRACTION = "extraction"
+EXPLANATION = "explanation"
+
+
+class Overloaded(Exception):
+    """낮은 우선순위 요청을 받을 여유가 없음 (load shedding)"""
+
+
+def _percentile(values, q: float):
+    if not values:
+        return None
+    s = sorted(values)
+    idx = min(len(s) - 1, max(0, int(round(q / 100.0 * (len(s) - 1)))))
+    return s[idx]
+
+
+class _Request:
+    __slots__ = ("items", "future", "enqueued_at")
+
+    def __init__(self, items):
+        self.items = items
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class _ClassQueue:
+    def __init__(self, name, priority, handler, max_batch_items, max_depth=None,
+                 max_wait_s=None, latency_window=1000):
+        self.name = name
+        self.priority = priority           # 작을수록 먼저
+        self.handler = handler             # items → results (같은 길이)
+        self.max_batch_items = max_batch_items
+        self.max_depth = max_depth         # None 이면 무제한 (shedding 없음)
+        self.max_wait_s = max_wait_s
+
+        self.queue = deque()
+        self.depth_items = 0
+        self.waits = deque(maxlen=latency_window)
+        self.service = deque(maxlen=latency_window)
+        self.counts = {"submitted": 0, "completed": 0, "failed": 0, "shed": 0,
+                       "batches": 0, "max_depth_seen": 0}
+
+    def stats(self) -> dict:
+        waits, service = list(self.waits), list(self.service)
+        return {
+            **self.counts,
+            "depth_requests": len(self.queue),
+            "depth_items": self.depth_items,
+            "p50_wait_s": _percentile(waits, 50),
+            "p95_wait_s": _percentile(waits, 95),
+            "p50_service_s": _percentile(service, 50),
+            "p95_service_s": _percentile(service, 95),
+        }
+
+
+def _default_extraction_handler(json_stop=False, constrained=False, max_new_tokens=256):
+    def handler(prompts):
+        from extractor_batcher import build_chat_text, generate_batch
+        from extractor_schema import _postprocess_text_to_json
+        from new_extractor_model import load_model
+
+        tokenizer, model = load_model()
+        texts = [build_chat_text(tokenizer, p) for p in prompts]
+        outputs = generate_batch(tokenizer, model, texts, max_new_tokens=max_new_tokens,
+                                 json_stop=json_stop, constrained=constrained)
+        return [_postprocess_text_to_json(o, fallback_prompt=p) for o, p in zip(outputs, prompts)]
+    return handler
+
+
+def _default_explanation_handler(items):
+    from explanation_model import generate_explanations_for_items
+    return generate_explanations_for_items(items)
+
+
+class InferenceScheduler:
+    """
+    Parameters
+    ----------
+    extraction_handler, explanation_handler :
+        items 리스트 → 결과 리스트. 기본값은 new_extractor_model / explanation_model 의 배치 generate.
+    extraction_batch, explanation_batch : int
+        한 번의 generate 에 묶을 최대 item 수.
+    explanation_max_depth : int
+        explanation 큐에 쌓일 수 있는 최대 item 수 (넘으면 Overloaded).
+    explanation_max_wait_s : float
+        이 시간 이상 기다린 explanation 요청은 버림.
+    """
+
+    def __init__(
+        self,
+        extraction_handler=None,
+        explanation_handler=None,
+        extraction_batch: int = 8,
+        explanation_batch: int = 8,
+        explanation_max_depth: int = 64,
+        explanation_max_wait_s: float = 30.0,
+        json_stop: bool = False,
+        constrained: bool = False,
+    ):
+        self._classes = {
+            EXTRACTION: _ClassQueue(
+                EXTRACTION, 0,
+                extraction_handler or _default_extraction_handler(json_stop, constrained),
+                max_batch_items=extraction_batch,
+            ),
+            EXPLANATION: _ClassQueue(
+                EXPLANATION, 1,
+                explanation_handler or _default_explanation_handler,
+                max_batch_items=explanation_batch,
+                max_depth=explanation_max_depth,
+                max_wait_s=explanation_max_wait_s,
+            ),
+        }
+        self._order = sorted(self._classes.values(), key=lambda c: c.priority)
+        self._cond = threading.Condition()
+        self._stop = False
+        self._worker = None
+
+    # ---------- lifecycle ----------
+    def start(self):
+        with self._cond:
+            if self._worker is None or not self._worker.is_alive():
+                self._stop = False
+                self._worker = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+                self._worker.start()
+        return self
+
+    def close(self, timeout: float = 5.0):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
+
+    # ---------- public API ----------
+    def submit(self, cls: str, items) -> Future:
+        """items 를 한 요청으로 큐에 넣음. 결과는 Future(list). shedding 시 Overloaded"""
+        self.start()
+        q = self._classes[cls]
+        items = list(items)
+        req = _Request(items)
+        with self._cond:
+            if q.max_depth is not None and q.depth_items + len(items) > q.max_depth:
+                q.counts["shed"] += 1
+                raise Overloaded(f"{cls} queue full ({q.depth_items} items)")
+            q.queue.append(req)
+            q.depth_items += len(items)
+            q.counts["submitted"] += 1
+            q.counts["max_depth_seen"] = max(q.counts["max_depth_seen"], q.depth_items)
+            self._cond.notify()
+        return req.future
+
+    def extract_keywords(self, user_prompt: str, timeout: float = None) -> dict:
+        """new_extractor_model.extract_keywords 와 같은 리턴"""
+        return self.submit(EXTRACTION, [user_prompt]).result(timeout=timeout)[0]
+
+    def generate_explanations(self, user_prompt: str, global_keywords: dict, recipe_infos,
+                              timeout: float = None) -> list:
+        """explanation_model.generate_explanations_batch 와 같은 시그니처/리턴"""
+        items = [(user_prompt, global_keywords, r) for r in recipe_infos]
+        if not items:
+            return []
+        return self.submit(EXPLANATION, items).result(timeout=timeout)
+
+    def submit_explanations(self, user_prompt: str, global_keywords: dict, recipe_infos) -> Future:
+        """generate_explanations 의 Future 버전 (배치에 들어가기 전에 cancel 하면 생성 안 함)"""
+        return self.submit(EXPLANATION, [(user_prompt, global_keywords, r) for r in recipe_infos])
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {name: q.stats() for name, q in self._classes.items()}
+
+    # ---------- worker ----------
+    def _take_batch(self):
+        """우선순위 높은 클래스부터, 오래 기다린 explanation 은 버리면서 배치 구성 (lock 보유 상태)"""
+        now = time.perf_counter()
+        for q in self._order:
+            batch, n_items = [], 0
+            while q.queue:
+                req = q.queue[0]
+                if q.max_wait_s is not None and now - req.enqueued_at > q.max_wait_s:
+                    q.queue.popleft()
+                    q.depth_items -= len(req.items)
+                    # 이미 취소된 요청(스트림 연결 끊김 등)은 그냥 버림 (취소된 Future 에 set_exception 하면 InvalidStateError)
+                    if req.future.set_running_or_notify_cancel():
+                        q.counts["shed"] += 1
+                        req.future.set_exception(Overloaded(f"{q.name} waited too long"))
+                    continue
+                if batch and n_items + len(req.items) > q.max_batch_items:
+                    break
+                q.queue.popleft()
+                q.depth_items -= len(req.items)
+                if not req.future.set_running_or_notify_cancel():
+                    continue
+                q.waits.append(now - req.enqueued_at)
+                batch.append(req)
+                n_items += len(req.items)
+            if batch:
+                return q, batch
+        return None, None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stop and not any(q.queue for q in self._order):
+                    self._cond.wait()
+                if self._stop:
+                    return
+                q, batch = self._take_batch()
+            if not batch:
+                continue
+
+            items = [it for req in batch for it in req.items]
+            t0 = time.perf_counter()
+            try:
+                results = q.handler(items)
+            except Exception as e:
+                with self._cond:
+                    q.counts["failed"] += len(batch)
+                for req in batch:
+                    req.future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - t0
+
+            # handler 가 item 수보다 적게 돌려주면 결과가 모자란 요청은 실패 처리 (Future 가 영원히 안 끝나지 않도록)
+            results = list(results)
+            short = RuntimeError(f"{q.name} handler returned {len(results)} results for {len(items)} items")
+            done, failed, pos = [], [], 0
+            for req in batch:
+                n = len(req.items)
+                chunk = results[pos:pos + n]
+                pos += n
+                (done if len(chunk) == n else failed).append((req, chunk))
+
+            with self._cond:
+                q.counts["batches"] += 1
+                q.counts["completed"] += len(done)
+                q.counts["failed"] += len(failed)
+                q.service.append(elapsed)
+
+            for req, chunk in done:
+                req.future.set_result(chunk)
+            for req, _ in failed:
+                req.future.set_exception(short)
@@ -0,0 +1,343 @@
+# inference_worker.py
+# 모델을 별도 프로세스에 올리고, 웹 프로세스는 Unix socket(IPC)으로 요청만 보냄
+#
+#   # 모델 프로세스 (GPU 하나에 하나씩 띄워도 됨: --socket 을 다르게)
+#   python inference_worker.py --socket /tmp/recipe-inference-0.sock
+#
+#   # 웹 프로세스 (Flask 워커 여러 개여도 모델은 로드하지 않음)
+#   EXTRACTOR_BACKEND=remote INFERENCE_SOCKETS=/tmp/recipe-inference-0.sock python app.py
+#
+# - 워커 프로세스 안에서는 InferenceScheduler 가 모델을 전담 (추출 우선, 설명은 배치 + shedding)
+# - 메시지: {"id", "op": extract|explain|cancel|ping|stats, "args", "deadline"} → {"id", "ok", "result"|"error"}
+# - 클라이언트: 요청별 timeout, timeout 나면 cancel 전송 (아직 큐에 있으면 워커에서 취소)
+# - 여러 워커 주소를 주면 in-flight 요청이 가장 적은 워커로 보냄
+import argparse
+import itertools
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing.connection import Client, Listener
+
+INFERENCE_SOCKETS = [
+    s.strip() for s in os.environ.get("INFERENCE_SOCKETS", "/tmp/recipe-inference.sock").split(",")
+    if s.strip()
+]
+INFERENCE_AUTHKEY = os.environ.get("INFERENCE_AUTHKEY", "recipe-inference").encode("utf-8")
+INFERENCE_TIMEOUT_S = float(os.environ.get("INFERENCE_TIMEOUT_S", "60"))
+
+
+class RemoteError(Exception):
+    """워커 쪽에서 난 예외 (타입 이름 + 메시지)"""
+
+
+# =========================================================
+# 1. 워커 (모델 프로세스)
+# =========================================================
+
+class InferenceWorkerServer:
+    def __init__(self, address: str, scheduler, authkey: bytes = INFERENCE_AUTHKEY):
+        self.address = address
+        self.scheduler = scheduler
+        self.authkey = authkey
+        self._listener = None
+        self._futures = {}            # (conn_id, req_id) → Future
+        self._lock = threading.Lock()
+        self._conn_ids = itertools.count()
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)   # 이전 실행에서 남은 socket 파일
+        self._listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        print(f"[inference-worker] listening on {self.address}")
+        try:
+            while True:
+                try:
+                    conn = self._listener.accept()
+                except Exception as e:
+                    # 잘못된 authkey 등은 해당 연결만 무시
+                    print("[WARN] accept failed:", e)
+                    continue
+                threading.Thread(target=self._handle_conn, args=(conn, next(self._conn_ids)),
+                                 name="inference-conn", daemon=True).start()
+        finally:
+            self._listener.close()
+
+    def _handle_conn(self, conn, conn_id):
+        send_lock = threading.Lock()
+
+        def reply(msg):
+            with send_lock:
+                try:
+                    conn.send(msg)
+                except (OSError, EOFError):
+                    pass
+
+        try:
+            while True:
+                try:
+                    msg = conn.recv()
+                except (EOFError, OSError):
+                    break
+                self._dispatch(msg, conn_id, reply)
+        finally:
+            # 연결이 끊기면 그 연결의 대기 중인 요청은 취소
+            with self._lock:
+                keys = [k for k in self._futures if k[0] == conn_id]
+                futs = [self._futures.pop(k) for k in keys]
+            for f in futs:
+                f.cancel()
+            conn.close()
+
+    def _dispatch(self, msg, conn_id, reply):
+        from inference_scheduler import EXTRACTION, EXPLANATION
+
+        req_id, op = msg.get("id"), msg.get("op")
+        args = msg.get("args") or {}
+
+        if op == "ping":
+            reply({"id": req_id, "ok": True, "result": "pong"})
+            return
+        if op == "stats":
+            reply({"id": req_id, "ok": True, "result": self.scheduler.stats()})
+            return
+        if op == "cancel":
+            with self._lock:
+                fut = self._futures.pop((conn_id, args.get("target")), None)
+            cancelled = fut.cancel() if fut is not None else False
+            reply({"id": req_id, "ok": True, "result": cancelled})
+            return
+
+        deadline = msg.get("deadline")
+        if deadline is not None and time.time() > deadline:
+            reply({"id": req_id, "ok": False, "error": "DeadlineExceeded: expired before scheduling"})
+            return
+
+        try:
+            if op == "extract":
+                fut = self.scheduler.submit(EXTRACTION, [args["user_prompt"]])
+            elif op == "explain":
+                items = [(args["user_prompt"], args["global_keywords"], r) for r in args["recipe_infos"]]
+                fut = self.scheduler.submit(EXPLANATION, items)
+            else:
+                reply({"id": req_id, "ok": False, "error": f"ValueError: unknown op {op}"})
+                return
+        except Exception as e:
+            reply({"id": req_id, "ok": False, "error": f"{type(e).__name__}: {e}"})
+            return
+
+        with self._lock:
+            self._futures[(conn_id, req_id)] = fut
+
+        def _done(f, req_id=req_id, op=op):
+            with self._lock:
+                self._futures.pop((conn_id, req_id), None)
+            if f.cancelled():
+                reply({"id": req_id, "ok": False, "error": "Cancelled: cancelled"})
+            elif f.exception() is not None:
+                e = f.exception()
+                reply({"id": req_id, "ok": False, "error": f"{type(e).__name__}: {e}"})
+            else:
+                res = f.result()
+                reply({"id": req_id, "ok": True, "result": res[0] if op == "extract" else res})
+
+        fut.add_done_callback(_done)
+
+
+# =========================================================
+# 2. 클라이언트 (웹 프로세스)
+# =========================================================
+
+class _Connection:
+    """워커 하나에 대한 연결 + 응답 수신 스레드"""
+
+    def __init__(self, address, authkey):
+        self.address = address
+        self.authkey = authkey
+        self._conn = None
+        self._send_lock = threading.Lock()
+        self._pending = {}       # req_id → Future
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    def _ensure(self):
+        if self._conn is None:
+            self._conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            threading.Thread(target=self._recv_loop, args=(self._conn,),
+                             name="inference-client", daemon=True).start()
+
+    def _recv_loop(self, conn):
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                fut = self._pending.pop(msg.get("id"), None)
+            if fut is None or fut.done():
+                continue
+            if msg.get("ok"):
+                fut.set_result(msg.get("result"))
+            else:
+                fut.set_exception(RemoteError(msg.get("error")))
+
+        # 연결 끊김: 대기 중인 요청 모두 실패 처리, 다음 요청 때 재연결
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._conn is conn:
+                self._conn = None
+        for fut in pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError(f"inference worker {self.address} disconnected"))
+
+    def send(self, op, args=None, deadline=None):
+        with self._send_lock:
+            self._ensure()
+            req_id = next(self._ids)
+            fut = Future()
+            with self._lock:
+                self._pending[req_id] = fut
+            try:
+                self._conn.send({"id": req_id, "op": op, "args": args or {}, "deadline": deadline})
+            except (OSError, EOFError, ValueError) as e:
+                with self._lock:
+                    self._pending.pop(req_id, None)
+                self._conn = None
+                raise ConnectionError(f"inference worker {self.address} unavailable: {e}") from e
+        return req_id, fut
+
+    def cancel(self, req_id):
+        with self._lock:
+            fut = self._pending.pop(req_id, None)
+        if fut is not None and not fut.done():
+            fut.cancel()
+        try:
+            self.send("cancel", {"target": req_id})
+        except ConnectionError:
+            pass
+
+
+class InferenceClient:
+    def __init__(self, addresses=None, authkey: bytes = INFERENCE_AUTHKEY,
+                 timeout_s: float = INFERENCE_TIMEOUT_S):
+        addresses = addresses or INFERENCE_SOCKETS
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        self.timeout_s = timeout_s
+        self._conns = [_Connection(a, authkey) for a in addresses]
+
+    def _pick(self):
+        return min(self._conns, key=lambda c: c.in_flight)
+
+    def call(self, op, args=None, timeout: float = None):
+        """요청 → 결과. timeout 이 지나면 워커에 cancel 을 보내고 TimeoutError"""
+        timeout = self.timeout_s if timeout is None else timeout
+        conn = self._pick()
+        req_id, fut = conn.send(op, args, deadline=time.time() + timeout)
+        try:
+            return fut.result(timeout=timeout)
+        except FutureTimeout:
+            conn.cancel(req_id)
+            raise TimeoutError(f"inference {op} timed out after {timeout}s")
+
+    # new_extractor_model / explanation_model 과 같은 시그니처
+    def extract_keywords(self, user_prompt: str, timeout: float = None) -> dict:
+        return self.call("extract", {"user_prompt": user_prompt}, timeout)
+
+    def generate_explanations(self, user_prompt: str, global_keywords: dict, recipe_infos,
+                              timeout: float = None) -> list:
+        return self.call("explain", {
+            "user_prompt": user_prompt,
+            "global_keywords": global_keywords,
+            "recipe_infos": list(recipe_infos),
+        }, timeout)
+
+    def submit(self, op, args=None, timeout: float = None) -> Future:
+        """call 의 Future 버전. Future 를 cancel 하면 워커에도 cancel 전송"""
+        timeout = self.timeout_s if timeout is None else timeout
+        conn = self._pick()
+        req_id, fut = conn.send(op, args, deadline=time.time() + timeout)
+        fut.add_done_callback(lambda f: f.cancelled() and conn.cancel(req_id))
+        return fut
+
+    def submit_explanations(self, user_prompt: str, global_keywords: dict, recipe_infos,
+                            timeout: float = None) -> Future:
+        return self.submit("explain", {
+            "user_prompt": user_prompt,
+            "global_keywords": global_keywords,
+            "recipe_infos": list(recipe_infos),
+        }, timeout)
+
+    def ping(self, timeout: float = 5.0) -> bool:
+        """모든 워커가 응답하면 True"""
+        for c in self._conns:
+            _, fut = c.send("ping")
+            fut.result(timeout=timeout)
+        return True
+
+    def stats(self, timeout: float = 5.0) -> dict:
+        out = {}
+        for c in self._conns:
+            _, fut = c.send("stats")
+            out[c.address] = fut.result(timeout=timeout)
+        return out
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> InferenceClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = InferenceClient()
+    return _client
+
+
+def connect_default():
+    """extractor_registry "remote" 백엔드 warm-up: 워커가 떠 있는지 확인"""
+    return get_client().ping()
+
+
+# extractor_registry / explanation_jobs 에서 모듈 함수로 바로 쓰는 진입점
+def extract_keywords(user_prompt: str) -> dict:
+    return get_client().extract_keywords(user_prompt)
+
+
+def generate_explanations_batch(user_prompt: str, global_keywords: dict, recipe_infos) -> list:
+    return get_client().generate_explanations(user_prompt, global_keywords, recipe_infos)
+
+
+def submit_explanations(user_prompt: str, global_keywords: dict, recipe_infos) -> Future:
+    return get_client().submit_explanations(user_prompt, global_keywords, recipe_infos)
+
+
+# =========================================================
+# 3. 실행
+# =========================================================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="recipe inference worker")
+    ap.add_argument("--socket", default=INFERENCE_SOCKETS[0])
+    args = ap.parse_args(argv)
+
+    import new_extractor_model
+    from inference_scheduler import InferenceScheduler
+
+    new_extractor_model.warm_up()
+    scheduler = InferenceScheduler(
+        extraction_batch=new_extractor_model.BATCH_MAX_SIZE,
+        json_stop=new_extractor_model.JSON_STOP,
+        constrained=new_extractor_model.CONSTRAINED,
+    ).start()
+    InferenceWorkerServer(args.socket, scheduler).serve_forever()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
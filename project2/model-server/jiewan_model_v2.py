@@ -1,11 +1,18 @@
+import contextlib
 import re
 import math
 import time
 import random
 import json
+from concurrent.futures import ThreadPoolExecutor
 from neo4j import GraphDatabase
-from new_extractor_model import extract_keywords
-# from park_extractor_model import extract_keywords
+# 추출 백엔드는 EXTRACTOR_BACKEND 설정으로 선택 (local_hf / openai / lexicon / distilled / stub)
+# → 모델은 첫 사용 또는 warm-up 시점에 로드됨
+from extractor_registry import extract_keywords, stream_extract_keywords
+import metrics
+import tracing
+from search_fields import DETAIL_FIELDS, EXPLANATION_FIELDS
+from extractor_schema import DIFFICULTY_MAP  # 난이도 표현 → 그래프 난이도 (lexicon_extractor 와 공유)
 
 # Neo4j 연결 (네 환경에 맞게 수정)
 URI = "bolt://localhost:7687"
@@ -65,18 +72,6 @@ def softmax(scores, temperature: float = 1.0):
         return [1.0 / len(scores)] * len(scores)
     return [e / Z for e in exps]
 
-DIFFICULTY_MAP = {
-    "쉬운": ["아무나", "초급"],
-    "간단": ["아무나", "초급"],
-    "쉽": ["아무나", "초급"],
-    "초보": ["아무나", "초급"],
-    "입문": ["아무나", "초급"],
-    "초급": ["초급"],
-    "중급": ["중급"],
-    "고급": ["고급"],
-    "어려운": ["고급", "중급"],
-    "힘든": ["고급", "중급"],
-}
 def normalize_difficulty(raw_kw):
     """
     LLM이 difficulty를 못 잡거나 '쉬운' 같은 단어를 잡았을 때
@@ -169,11 +164,13 @@ def get_all_user_keywords(kw: dict):
 
 
 #----
-def build_cypher_from_keywords_relaxed(kw: dict, filterKeywords: list = [], limit: int = 50):
+def build_cypher_from_keywords_relaxed(kw: dict, filterKeywords: list = [], limit: int = 50,
+                                      candidate_ids: list = None):
     """
     - difficulty, dietary constraints, servings 모두 반영
     - servings_min / servings_max property 사용 안 함 
     - servings 문자열에서 숫자 추출 후 필터/스코어링 적용
+    - candidate_ids 가 있으면 해당 레시피만 스코어링 (스트리밍 추출 중 미리 뽑아 둔 하드 필터 후보)
     """
 
     kw = dict(kw)
@@ -290,6 +287,7 @@ def build_cypher_from_keywords_relaxed(kw: dict, filterKeywords: list = [], limi
 
         "max_time": kw.get("max_cook_time_min", None),
         "limit_number": limit,
+        "candidate_ids": candidate_ids,
     }
 
     # -----------------------------
@@ -297,6 +295,7 @@ def build_cypher_from_keywords_relaxed(kw: dict, filterKeywords: list = [], limi
     # -----------------------------
     cypher = """
 MATCH (r:RecipeV2)
+WHERE $candidate_ids IS NULL OR r.recipe_id IN $candidate_ids
 OPTIONAL MATCH (r)-[:HAS_INGREDIENT_V2]->(ing:IngredientV2)
 OPTIONAL MATCH (r)-[:IN_CATEGORY_V2]->(cat:CategoryV2)
 OPTIONAL MATCH (r)-[:COOKED_BY_V2]->(meth:MethodV2)
@@ -447,6 +446,200 @@ def _build_match_dict(llm_list, graph_list):
     return result
 
 
+def _explain_matches(kw: dict, r_info: dict, detail):
+    """레시피 태그 상세(detail) ↔ 추출 키워드 매칭. 리턴: (matched_tag_dict, explanation_lines)"""
+    categoryList  = detail["categoryList"]   or []
+    methodList    = detail["methodList"]     or []
+    situationList = detail["situationList"]  or []
+    healthList    = detail["healthList"]     or []
+    weatherList   = detail["weatherList"]    or []
+    menuStyleList = detail["menuStyleList"]  or []
+    extraList     = detail["extraList"]      or []
+
+    expl_lines = []
+
+    # ❶ 매칭 정보 구조 저장용 dict
+    matched_tag_dict = {}
+
+    # --- 하드 필터 설명 ---
+    if kw.get("must_ingredients"):
+        expl_lines.append(
+            f"- 필수 재료(must_ingredients={kw['must_ingredients']}) 모두 포함 → 하드 필터 통과"
+        )
+    if kw.get("exclude_ingredients"):
+        expl_lines.append(
+            f"- 제외 재료(exclude_ingredients={kw['exclude_ingredients']})는 포함되지 않음 → 하드 필터 통과"
+        )
+    if kw.get("max_cook_time_min"):
+        max_t = kw["max_cook_time_min"]
+        cur_t = r_info["time_min"]
+        if cur_t is not None and cur_t <= max_t:
+            expl_lines.append(
+                f"- 최대 조리시간 {max_t}분 조건 만족 (현재 {cur_t}분)"
+            )
+        else:
+            expl_lines.append(
+                f"- 최대 조리시간 {max_t}분 조건 미충족일 수 있음 (time_min={cur_t})"
+            )
+
+    # --- LLM 키워드 기반 매칭 설명 + 매칭 구조 저장 ---
+
+    if kw.get("dish_type"):
+        match_dict = _build_match_dict(kw["dish_type"], categoryList)
+        matched_tag_dict["dish_type"] = match_dict
+        match_cnt = len(match_dict)
+        expl_lines.append(
+            f"- [dish_type(CategoryV2)] 점수 {r_info['score_dish_type']}점 (LLM 키워드 매칭 {match_cnt}개)"
+        )
+        expl_lines.append(f"   · LLM dish_type(CategoryV2) 키워드: {kw['dish_type']}")
+        expl_lines.append(f"   · LLM 키워드↔그래프 태그 매칭: {match_dict}")
+
+    if kw.get("method"):
+        match_dict = _build_match_dict(kw["method"], methodList)
+        matched_tag_dict["method"] = match_dict
+        match_cnt = len(match_dict)
+        expl_lines.append(
+            f"- [method(MethodV2)] 점수 {r_info['score_method']}점 (LLM 키워드 매칭 {match_cnt}개)"
+        )
+        expl_lines.append(f"   · LLM method(MethodV2) 키워드: {kw['method']}")
+        expl_lines.append(f"   · LLM 키워드↔그래프 태그 매칭: {match_dict}")
+
+    if kw.get("situation"):
+        match_dict = _build_match_dict(kw["situation"], situationList)
+        matched_tag_dict["situation"] = match_dict
+        match_cnt = len(match_dict)
+        expl_lines.append(
+            f"- [situation(SituationV2)] 점수 {r_info['score_situation']}점 (LLM 키워드 매칭 {match_cnt}개)"
+        )
+        expl_lines.append(f"   · LLM situation(SituationV2) 키워드: {kw['situation']}")
+        expl_lines.append(f"   · LLM 키워드↔그래프 태그 매칭: {match_dict}")
+
+    if kw.get("health_tags"):
+        match_dict = _build_match_dict(kw["health_tags"], healthList)
+        matched_tag_dict["health_tags"] = match_dict
+        match_cnt = len(match_dict)
+        expl_lines.append(
+            f"- [health_tags(HealthTag)] 점수 {r_info['score_health']}점 (LLM 키워드 매칭 {match_cnt}개)"
+        )
+        expl_lines.append(f"   · LLM health_tags(HealthTag) 키워드: {kw['health_tags']}")
+        expl_lines.append(f"   · LLM 키워드↔그래프 태그 매칭: {match_dict}")
+
+    if kw.get("weather_tags"):
+        match_dict = _build_match_dict(kw["weather_tags"], weatherList)
+        matched_tag_dict["weather_tags"] = match_dict
+        match_cnt = len(match_dict)
+        expl_lines.append(
+            f"- [weather_tags(WeatherTag)] 점수 {r_info['score_weather']}점 (LLM 키워드 매칭 {match_cnt}개)"
+        )
+        expl_lines.append(f"   · LLM weather_tags(WeatherTag) 키워드: {kw['weather_tags']}")
+        expl_lines.append(f"   · LLM 키워드↔그래프 태그 매칭: {match_dict}")
+
+    if kw.get("menu_style"):
+        match_dict = _build_match_dict(kw["menu_style"], menuStyleList)
+        matched_tag_dict["menu_style"] = match_dict
+        match_cnt = len(match_dict)
+        expl_lines.append(
+            f"- [menu_style(MenuStyle)] 점수 {r_info['score_menu_style']}점 (LLM 키워드 매칭 {match_cnt}개)"
+        )
+        expl_lines.append(f"   · LLM menu_style(MenuStyle) 키워드: {kw['menu_style']}")
+        expl_lines.append(f"   · LLM 키워드↔그래프 태그 매칭: {match_dict}")
+
+    if kw.get("extra_keywords"):
+        match_dict = _build_match_dict(kw["extra_keywords"], extraList)
+        matched_tag_dict["extra_keywords"] = match_dict
+        match_cnt = len(match_dict)
+        expl_lines.append(
+            f"- [extra_keywords(ExtraKeyword)] 점수 {r_info['score_extra']}점 (LLM 키워드 매칭 {match_cnt}개)"
+        )
+        expl_lines.append(f"   · LLM extra_keywords(ExtraKeyword) 키워드: {kw['extra_keywords']}")
+        expl_lines.append(f"   · LLM 키워드↔그래프 태그 매칭: {match_dict}")
+
+    if kw.get("difficulty"):
+        graph_diff = [r_info["difficulty"]] if r_info["difficulty"] else []
+        match_dict = _build_match_dict(kw["difficulty"], graph_diff)
+
+        matched_tag_dict["difficulty"] = match_dict
+        match_cnt = len(match_dict)
+
+        expl_lines.append(
+            f"- [difficulty] 점수 {r_info['score_difficulty']}점 "
+            f"(LLM 키워드 매칭 {match_cnt}개)"
+        )
+        expl_lines.append(f"   · 요청 난이도: {kw['difficulty']}")
+        expl_lines.append(f"   · 그래프 난이도: {graph_diff}")
+        expl_lines.append(f"   · 매칭 결과: {match_dict}")
+
+
+    # --- servings(인분수) ---
+    # 사용자 요구가 있을 때만 설명 출력
+    if kw.get("servings", {}).get("min") or kw.get("servings", {}).get("max"):
+
+        requested_min = kw["servings"].get("min")
+        requested_max = kw["servings"].get("max")
+
+        # 그래프에서 실제 인분수
+        graph_serv = r_info.get("servings")
+
+        # 매칭 정보 구조 저장
+        matched_tag_dict["servings"] = {
+            "requested_min": requested_min,
+            "requested_max": requested_max,
+            "graph_servings": graph_serv
+        }
+
+        expl_lines.append(
+            f"- [servings] 점수 {r_info['score_servings']}점"
+            f" (요청 인분수 min={requested_min}, max={requested_max} / 그래프 값={graph_serv})"
+        )
+
+        expl_lines.append(
+            f"   · 인분수 조건과의 거리 기반 점수: {r_info['score_servings']}"
+        )
+
+    return matched_tag_dict, expl_lines
+
+
+def _user_keywords_flat(kw: dict):
+    """사용자가 실제로 요청한 의미 있는 모든 키워드 (중복 제거 + 순서 유지)"""
+    user_keywords_all = (
+        kw.get("must_ingredients", [])
+        + kw.get("optional_ingredients", [])
+        + kw.get("dish_type", [])
+        + kw.get("method", [])
+        + kw.get("situation", [])
+        + kw.get("health_tags", [])
+        + kw.get("weather_tags", [])
+        + kw.get("menu_style", [])
+        + kw.get("extra_keywords", [])
+    )
+
+    seen_kw = set()
+    flat_unique = []
+    for k in user_keywords_all:
+        if k not in seen_kw:
+            seen_kw.add(k)
+            flat_unique.append(k)
+    return flat_unique
+
+
+def _summary_line(r_info: dict) -> str:
+    return (
+        f"총점 {r_info['score']}점 "
+        f"(must={r_info['score_must_ing']}, "
+        f"opt={r_info['score_opt_ing']}, "
+        f"dish={r_info['score_dish_type']}, "
+        f"method={r_info['score_method']}, "
+        f"situation={r_info['score_situation']}, "
+        f"health={r_info['score_health']}, "
+        f"weather={r_info['score_weather']}, "
+        f"style={r_info['score_menu_style']}, "
+        f"extra={r_info['score_extra']}, "
+        f"difficulty={r_info['score_difficulty']}, "
+        f"menu_name={r_info['score_menu_name']}, "
+        f"servings={r_info['score_servings']})"
+    )
+
+
 # def graph_rag_search_with_scoring_explanation(
 #     user_prompt: str,
 #     filterKeywords: dict ={},
@@ -470,18 +663,32 @@ def graph_rag_search_with_scoring_explanation(
     greedy_k: int = 3,          # 점수 그대로 뽑을 개수
     filterKeywords: dict ={},
     temperature: float = 1.5,   # softmax 온도 (크면 다양성↑)
+    raw_kw: dict = None,        # 이미 추출된 키워드 (스트리밍 경로)
+    candidate_ids: list = None, # 하드 필터 사전 후보 (스트리밍 경로)
+    explain_fields: set = None, # 계산할 설명 필드 (search_fields.explanation_fields, None 이면 전부)
 ):
+    if explain_fields is None:
+        explain_fields = set(EXPLANATION_FIELDS)
+
     print("\n" + "=" * 80)
     print("USER PROMPT:", user_prompt)
 
+    metrics.inc("search_requests_total")
+
     # 1) 키워드 추출
-    start = time.time()
-    raw_kw = extract_keywords(user_prompt)
-    end = time.time()
-    print(f"⏱️ 작업 소요 시간: {end - start:.4f}초")
+    if raw_kw is None:
+        start = time.time()
+        with metrics.stage("extract"):
+            raw_kw = extract_keywords(user_prompt)
+        end = time.time()
+        print(f"⏱️ 작업 소요 시간: {end - start:.4f}초")
+    tracing.annotate_trace(keywords=dict(raw_kw))     # slow 로그 replay --local 용 (정규화 전 추출 결과)
     raw_kw["difficulty"] = normalize_difficulty(raw_kw)
 
-    cypher, params, kw = build_cypher_from_keywords_relaxed(raw_kw, filterKeywords=filterKeywords, limit=50) 
+    with metrics.stage("build_query"):
+        cypher, params, kw = build_cypher_from_keywords_relaxed(
+            raw_kw, filterKeywords=filterKeywords, limit=50, candidate_ids=candidate_ids
+        )
 
     # 매칭된 키워드 모두 리스트 목록화
     matched_keywords_only = get_all_user_keywords(raw_kw)
@@ -494,12 +701,17 @@ def graph_rag_search_with_scoring_explanation(
     print("\nParams:", params)
 
     # 2) Neo4j에서 상위 50개 후보 가져오기
-    with driver.session() as session:
+    with metrics.stage("neo4j", query="candidates"), driver.session() as session:
+        tracing.annotate(cypher=cypher, params=params)
         result = session.run(cypher, **params)
         rows = list(result)
+        tracing.annotate(rows=len(rows))
+    t_select = time.perf_counter()
+    metrics.inc("search_candidates_total", len(rows))
 
     if not rows:
         print("\n⚠️ 조건에 맞는 레시피가 없습니다.")
+        metrics.inc("search_empty_total", reason="no_candidates")
         return {"keywords": kw, "recipes": []}
     
     
@@ -507,6 +719,7 @@ def graph_rag_search_with_scoring_explanation(
     all_zero = all((rec["score"] or 0) == 0 for rec in rows)
     if all_zero:
         print("\n⚠️ 점수 기반으로 추천할 만한 레시피가 없습니다. (모든 후보 score=0)")
+        metrics.inc("search_empty_total", reason="all_zero")
         return {
             "keywords": kw,
             "recipes": [],
@@ -638,6 +851,7 @@ def graph_rag_search_with_scoring_explanation(
             print(f"\n=== [3] Final {len(selected_rows)} results with scoring explanation (Top-{top_k}) ===\n")
 
 
+    metrics.observe_stage("select", time.perf_counter() - t_select)
     recipes = []
 
     # 레시피 태그 디테일 쿼리
@@ -660,7 +874,14 @@ def graph_rag_search_with_scoring_explanation(
       collect(DISTINCT cat.name) AS categoryList
     """
 
-    with driver.session() as session:
+    # 요청 키워드 목록은 레시피와 무관 → 한 번만
+    flat_unique = _user_keywords_flat(kw) if "matched_keywords_flat" in explain_fields else None
+    # 태그 매칭 / 설명 줄이 필요 없으면 레시피별 태그 상세 쿼리도 생략
+    need_detail = any(f in explain_fields for f in DETAIL_FIELDS)
+
+    # 레시피별 태그 상세 쿼리 + 설명 줄 (trace 에서 이 구간과 그 안의 neo4j detail 쿼리로 보임)
+    with tracing.span("explanation_lines", recipes=len(selected_rows), fields=sorted(explain_fields)), \
+            (driver.session() if need_detail else contextlib.nullcontext()) as session:
         for i, rec in enumerate(selected_rows, start=1):
             r_info = {
                 "recipe_id": rec["recipe_id"],
@@ -687,216 +908,223 @@ def graph_rag_search_with_scoring_explanation(
                 "image_url": rec["image_url"]     
             }
 
-
-            detail = session.run(recipe_detail_query, {"rid": rec["recipe_id"]}).single()
-
-            categoryList  = detail["categoryList"]   or []
-            methodList    = detail["methodList"]     or []
-            situationList = detail["situationList"]  or []
-            healthList    = detail["healthList"]     or []
-            weatherList   = detail["weatherList"]    or []
-            menuStyleList = detail["menuStyleList"]  or []
-            extraList     = detail["extraList"]      or []
-
-            expl_lines = []
-
-            # ❶ 매칭 정보 구조 저장용 dict
-            matched_tag_dict = {}
-
-            # --- 하드 필터 설명 ---
-            if kw.get("must_ingredients"):
-                expl_lines.append(
-                    f"- 필수 재료(must_ingredients={kw['must_ingredients']}) 모두 포함 → 하드 필터 통과"
-                )
-            if kw.get("exclude_ingredients"):
-                expl_lines.append(
-                    f"- 제외 재료(exclude_ingredients={kw['exclude_ingredients']})는 포함되지 않음 → 하드 필터 통과"
-                )
-            if kw.get("max_cook_time_min"):
-                max_t = kw["max_cook_time_min"]
-                cur_t = r_info["time_min"]
-                if cur_t is not None and cur_t <= max_t:
-                    expl_lines.append(
-                        f"- 최대 조리시간 {max_t}분 조건 만족 (현재 {cur_t}분)"
-                    )
-                else:
-                    expl_lines.append(
-                        f"- 최대 조리시간 {max_t}분 조건 미충족일 수 있음 (time_min={cur_t})"
-                    )
-
-            # --- LLM 키워드 기반 매칭 설명 + 매칭 구조 저장 ---
-
-            if kw.get("dish_type"):
-                match_dict = _build_match_dict(kw["dish_type"], categoryList)
-                matched_tag_dict["dish_type"] = match_dict
-                match_cnt = len(match_dict)
-                expl_lines.append(
-                    f"- [dish_type(CategoryV2)] 점수 {r_info['score_dish_type']}점 (LLM 키워드 매칭 {match_cnt}개)"
-                )
-                expl_lines.append(f"   · LLM dish_type(CategoryV2) 키워드: {kw['dish_type']}")
-                expl_lines.append(f"   · LLM 키워드↔그래프 태그 매칭: {match_dict}")
-
-            if kw.get("method"):
-                match_dict = _build_match_dict(kw["method"], methodList)
-                matched_tag_dict["method"] = match_dict
-                match_cnt = len(match_dict)
-                expl_lines.append(
-                    f"- [method(MethodV2)] 점수 {r_info['score_method']}점 (LLM 키워드 매칭 {match_cnt}개)"
-                )
-                expl_lines.append(f"   · LLM method(MethodV2) 키워드: {kw['method']}")
-                expl_lines.append(f"   · LLM 키워드↔그래프 태그 매칭: {match_dict}")
-
-            if kw.get("situation"):
-                match_dict = _build_match_dict(kw["situation"], situationList)
-                matched_tag_dict["situation"] = match_dict
-                match_cnt = len(match_dict)
-                expl_lines.append(
-                    f"- [situation(SituationV2)] 점수 {r_info['score_situation']}점 (LLM 키워드 매칭 {match_cnt}개)"
-                )
-                expl_lines.append(f"   · LLM situation(SituationV2) 키워드: {kw['situation']}")
-                expl_lines.append(f"   · LLM 키워드↔그래프 태그 매칭: {match_dict}")
-
-            if kw.get("health_tags"):
-                match_dict = _build_match_dict(kw["health_tags"], healthList)
-                matched_tag_dict["health_tags"] = match_dict
-                match_cnt = len(match_dict)
-                expl_lines.append(
-                    f"- [health_tags(HealthTag)] 점수 {r_info['score_health']}점 (LLM 키워드 매칭 {match_cnt}개)"
-                )
-                expl_lines.append(f"   · LLM health_tags(HealthTag) 키워드: {kw['health_tags']}")
-                expl_lines.append(f"   · LLM 키워드↔그래프 태그 매칭: {match_dict}")
-
-            if kw.get("weather_tags"):
-                match_dict = _build_match_dict(kw["weather_tags"], weatherList)
-                matched_tag_dict["weather_tags"] = match_dict
-                match_cnt = len(match_dict)
-                expl_lines.append(
-                    f"- [weather_tags(WeatherTag)] 점수 {r_info['score_weather']}점 (LLM 키워드 매칭 {match_cnt}개)"
-                )
-                expl_lines.append(f"   · LLM weather_tags(WeatherTag) 키워드: {kw['weather_tags']}")
-                expl_lines.append(f"   · LLM 키워드↔그래프 태그 매칭: {match_dict}")
-
-            if kw.get("menu_style"):
-                match_dict = _build_match_dict(kw["menu_style"], menuStyleList)
-                matched_tag_dict["menu_style"] = match_dict
-                match_cnt = len(match_dict)
-                expl_lines.append(
-                    f"- [menu_style(MenuStyle)] 점수 {r_info['score_menu_style']}점 (LLM 키워드 매칭 {match_cnt}개)"
-                )
-                expl_lines.append(f"   · LLM menu_style(MenuStyle) 키워드: {kw['menu_style']}")
-                expl_lines.append(f"   · LLM 키워드↔그래프 태그 매칭: {match_dict}")
-
-            if kw.get("extra_keywords"):
-                match_dict = _build_match_dict(kw["extra_keywords"], extraList)
-                matched_tag_dict["extra_keywords"] = match_dict
-                match_cnt = len(match_dict)
-                expl_lines.append(
-                    f"- [extra_keywords(ExtraKeyword)] 점수 {r_info['score_extra']}점 (LLM 키워드 매칭 {match_cnt}개)"
-                )
-                expl_lines.append(f"   · LLM extra_keywords(ExtraKeyword) 키워드: {kw['extra_keywords']}")
-                expl_lines.append(f"   · LLM 키워드↔그래프 태그 매칭: {match_dict}")
-
-            if kw.get("difficulty"):
-                graph_diff = [r_info["difficulty"]] if r_info["difficulty"] else []
-                match_dict = _build_match_dict(kw["difficulty"], graph_diff)
-
-                matched_tag_dict["difficulty"] = match_dict
-                match_cnt = len(match_dict)
-
-                expl_lines.append(
-                    f"- [difficulty] 점수 {r_info['score_difficulty']}점 "
-                    f"(LLM 키워드 매칭 {match_cnt}개)"
-                )
-                expl_lines.append(f"   · 요청 난이도: {kw['difficulty']}")
-                expl_lines.append(f"   · 그래프 난이도: {graph_diff}")
-                expl_lines.append(f"   · 매칭 결과: {match_dict}")
-
-
-            # --- servings(인분수) ---
-            # 사용자 요구가 있을 때만 설명 출력
-            if kw.get("servings", {}).get("min") or kw.get("servings", {}).get("max"):
-
-                requested_min = kw["servings"].get("min")
-                requested_max = kw["servings"].get("max")
-
-                # 그래프에서 실제 인분수
-                graph_serv = r_info.get("servings")
-
-                # 매칭 정보 구조 저장
-                matched_tag_dict["servings"] = {
-                    "requested_min": requested_min,
-                    "requested_max": requested_max,
-                    "graph_servings": graph_serv
-                }
-
-                expl_lines.append(
-                    f"- [servings] 점수 {r_info['score_servings']}점"
-                    f" (요청 인분수 min={requested_min}, max={requested_max} / 그래프 값={graph_serv})"
-                )
-
-                expl_lines.append(
-                    f"   · 인분수 조건과의 거리 기반 점수: {r_info['score_servings']}"
-                )
-
-            # === ❷ 사용자가 실제로 요청한 의미 있는 모든 키워드 모아두기 ===
-
-            user_keywords_all = (
-                kw.get("must_ingredients", [])
-                + kw.get("optional_ingredients", [])
-                + kw.get("dish_type", [])
-                + kw.get("method", [])
-                + kw.get("situation", [])
-                + kw.get("health_tags", [])
-                + kw.get("weather_tags", [])
-                + kw.get("menu_style", [])
-                + kw.get("extra_keywords", [])
-            )
-
-            # 중복 제거 + 순서 유지
-            seen_kw = set()
-            flat_unique = []
-            for k in user_keywords_all:
-                if k not in seen_kw:
-                    seen_kw.add(k)
-                    flat_unique.append(k)
-
-            # 결과 저장
-            r_info["matched_keywords_flat"] = flat_unique
-
-
-            summary_line = (
-                f"총점 {r_info['score']}점 "
-                f"(must={r_info['score_must_ing']}, "
-                f"opt={r_info['score_opt_ing']}, "
-                f"dish={r_info['score_dish_type']}, "
-                f"method={r_info['score_method']}, "
-                f"situation={r_info['score_situation']}, "
-                f"health={r_info['score_health']}, "
-                f"weather={r_info['score_weather']}, "
-                f"style={r_info['score_menu_style']}, "
-                f"extra={r_info['score_extra']}, "
-                f"difficulty={r_info['score_difficulty']}, "
-                f"menu_name={r_info['score_menu_name']}, "
-                f"servings={r_info['score_servings']})"
-            )
-
-
-
             print(f"[{i}] ({r_info['recipe_id']}) {r_info['title']}  | 이름: {r_info['name']}")
             print(f"     - 조리시간: {r_info['time_min']}분 | 난이도: {r_info['difficulty']} | 조회수: {r_info['views']}")
-            print("     -", summary_line)
-            for line in expl_lines:
-                print("        ", line)
 
-            # ❸ r_info에 매칭 정보 저장
-            r_info["summary"] = summary_line
-            r_info["explanation_lines"] = expl_lines
-            r_info["matched_tag_dict"] = matched_tag_dict
-            r_info["matched_keywords_flat"] = flat_unique
+            if need_detail:
+                with metrics.stage("neo4j", query="detail"):
+                    tracing.annotate(params={"rid": rec["recipe_id"]})
+                    detail = session.run(recipe_detail_query, {"rid": rec["recipe_id"]}).single()
+                matched_tag_dict, expl_lines = _explain_matches(kw, r_info, detail)
+
+            # ❸ r_info에 요청된 설명 필드만 저장
+            if "summary" in explain_fields:
+                r_info["summary"] = _summary_line(r_info)
+                print("     -", r_info["summary"])
+            if "explanation_lines" in explain_fields:
+                r_info["explanation_lines"] = expl_lines
+                for line in expl_lines:
+                    print("        ", line)
+            if "matched_tag_dict" in explain_fields:
+                r_info["matched_tag_dict"] = matched_tag_dict
+            if flat_unique is not None:
+                r_info["matched_keywords_flat"] = flat_unique
 
             recipes.append(r_info)
 
+    metrics.inc("search_results_total", len(recipes))
     return {
         "keywords": kw,
         "recipes": recipes,
     }
+
+
+# =========================================================
+# 스트리밍 추출 + 하드 필터 사전 후보 조회
+# =========================================================
+# 추출 JSON 에서 must / exclude / max_cook_time_min 은 앞쪽에 나오므로,
+# 이 필드들이 완성되면 나머지(soft) 필드를 생성하는 동안 하드 필터 후보를 미리 조회해 둔다.
+
+HARD_FILTER_FIELDS = ("must_ingredients", "exclude_ingredients", "max_cook_time_min")
+
+_prefilter_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefilter")
+
+PREFILTER_CYPHER = """
+MATCH (r:RecipeV2)
+WHERE $max_time IS NULL OR r.time_min <= $max_time
+OPTIONAL MATCH (r)-[:HAS_INGREDIENT_V2]->(ing:IngredientV2)
+WITH r, [x IN collect(DISTINCT ing.name) | replace(toLower(x)," ","")] AS ingList
+WHERE (
+    size($must_ings) = 0 OR
+    ALL(ing IN $must_ings WHERE ANY(mi IN ingList WHERE mi CONTAINS replace(toLower(ing)," ","")))
+)
+AND (
+    size($exclude_ings) = 0 OR
+    NONE(ex IN $exclude_ings WHERE ANY(mi IN ingList WHERE mi CONTAINS replace(toLower(ex)," ","")))
+)
+RETURN r.recipe_id AS recipe_id
+"""
+
+
+def _hard_filters(kw: dict):
+    """(must, exclude, max_time) — build_cypher_from_keywords_relaxed 와 같은 정규화"""
+    must = canonicalize_ingredient_list(ensure_list(kw.get("must_ingredients")))
+    exclude = canonicalize_ingredient_list(ensure_list(kw.get("exclude_ingredients")))
+    max_time = kw.get("max_cook_time_min")
+    try:
+        max_time = int(max_time) if max_time is not None else None
+    except (TypeError, ValueError):
+        max_time = None
+    return must, exclude, max_time
+
+
+def prefilter_candidate_ids(kw: dict):
+    """
+    하드 필터만 적용한 recipe_id 리스트.
+    하드 필터가 하나도 없으면 None (전체 대상 → 사전 조회 의미 없음)
+    """
+    must, exclude, max_time = _hard_filters(kw)
+    if not must and not exclude and max_time is None:
+        return None
+    with metrics.stage("neo4j", query="prefilter"), driver.session() as session:
+        tracing.annotate(params={"must_ings": must, "exclude_ings": exclude, "max_time": max_time})
+        rows = session.run(PREFILTER_CYPHER, must_ings=must, exclude_ings=exclude, max_time=max_time)
+        return [rec["recipe_id"] for rec in rows]
+
+
+def _extract_with_prefilter(user_prompt: str, t0: float, timings: dict):
+    """
+    스트리밍 추출 + 하드 필터 사전 조회. 리턴: (raw_kw, candidate_ids)
+    최종 하드 필터 값이 사전 조회 때와 다르면 candidate_ids=None (전체 쿼리)
+    """
+    partial = {}
+    prefilter_future = None
+    prefilter_key = None
+    raw_kw = None
+
+    with metrics.stage("extract", mode="streaming"):
+        for event, key, value in stream_extract_keywords(user_prompt):
+            if event == "field":
+                partial[key] = value
+                if prefilter_future is None and all(f in partial for f in HARD_FILTER_FIELDS):
+                    timings["hard_filters_ready_s"] = time.time() - t0
+                    prefilter_key = _hard_filters(partial)
+                    prefilter_future = _prefilter_executor.submit(prefilter_candidate_ids, dict(partial))
+            elif event == "done":
+                raw_kw = value
+        if raw_kw is None:
+            # "done" 없이 끝난 스트림 (백엔드가 필드만 보내고 끝남 등) → 사전 조회 버리고 전체 추출로
+            print("[WARN] keyword stream ended without a result, falling back to extract_keywords")
+            if prefilter_future is not None:
+                prefilter_future.cancel()
+                prefilter_future = None
+            raw_kw = extract_keywords(user_prompt)
+    timings["extract_s"] = time.time() - t0
+    tracing.annotate_trace(keywords=dict(raw_kw))
+
+    candidate_ids = None
+    if prefilter_future is not None:
+        try:
+            candidate_ids = prefilter_future.result()
+        except Exception as e:
+            print("[WARN] prefilter failed, fallback to full query:", e)
+        if _hard_filters(raw_kw) != prefilter_key:
+            candidate_ids = None
+    timings["prefilter_wait_s"] = time.time() - t0 - timings["extract_s"]
+    timings["candidates"] = None if candidate_ids is None else len(candidate_ids)
+    return raw_kw, candidate_ids
+
+
+def graph_rag_search_streaming(
+    user_prompt: str,
+    top_k: int = 5,
+    greedy_k: int = 3,
+    filterKeywords: dict = {},
+    temperature: float = 1.5,
+    explain_fields: set = None,
+):
+    """
+    graph_rag_search_with_scoring_explanation 의 스트리밍 버전.
+    - 추출 중 하드 필터 필드가 완성되면 후보 조회를 백그라운드로 시작
+    - 추출이 끝나면 후보만 대상으로 스코어링 쿼리 실행
+    - 최종 하드 필터 값이 사전 조회 때와 다르면 후보를 버리고 전체 쿼리로 진행
+    """
+    t0 = time.time()
+    timings = {}
+    raw_kw, candidate_ids = _extract_with_prefilter(user_prompt, t0, timings)
+
+    result = graph_rag_search_with_scoring_explanation(
+        user_prompt,
+        top_k=top_k,
+        greedy_k=greedy_k,
+        filterKeywords=filterKeywords,
+        temperature=temperature,
+        raw_kw=raw_kw,
+        candidate_ids=candidate_ids,
+        explain_fields=explain_fields,
+    )
+    timings["total_s"] = time.time() - t0
+    result["timings"] = timings
+    return result
+
+
+def graph_rag_search_stages(
+    user_prompt: str,
+    top_k: int = 5,
+    greedy_k: int = 3,
+    filterKeywords: dict = {},
+    temperature: float = 1.5,
+    streaming: bool = False,
+    explain_fields: set = None,
+):
+    """
+    단계별 결과 generator (NDJSON 스트리밍 응답용)
+    - ("keywords", raw_kw) : 추출이 끝나자마자 (그래프 쿼리 전)
+    - ("result", 검색 결과)  : 후보 조회 + 선택까지 끝난 뒤 (graph_rag_search_with_scoring_explanation 과 같은 dict)
+    streaming=True 면 graph_rag_search_streaming 처럼 추출 중 하드 필터 사전 조회
+    """
+    t0 = time.time()
+    timings = {}
+    if streaming:
+        raw_kw, candidate_ids = _extract_with_prefilter(user_prompt, t0, timings)
+    else:
+        with metrics.stage("extract"):
+            raw_kw, candidate_ids = extract_keywords(user_prompt), None
+        timings["extract_s"] = time.time() - t0
+        tracing.annotate_trace(keywords=dict(raw_kw))
+    yield "keywords", dict(raw_kw)
+
+    result = graph_rag_search_with_scoring_explanation(
+        user_prompt,
+        top_k=top_k,
+        greedy_k=greedy_k,
+        filterKeywords=filterKeywords,
+        temperature=temperature,
+        raw_kw=raw_kw,
+        candidate_ids=candidate_ids,
+        explain_fields=explain_fields,
+    )
+    timings["total_s"] = time.time() - t0
+    result["timings"] = timings
+    yield "result", result
+
+
+def benchmark_streaming(prompts, filterKeywords=None, repeat: int = 1) -> dict:
+    """순차(추출 → 쿼리) vs 스트리밍(추출 중 사전 조회) end-to-end 지연 비교"""
+    fk = filterKeywords or {"include": [], "exclude": []}
+    seq, stream = [], []
+    for _ in range(repeat):
+        for p in prompts:
+            t0 = time.time()
+            graph_rag_search_with_scoring_explanation(p, filterKeywords=json.loads(json.dumps(fk)))
+            seq.append(time.time() - t0)
+
+            t0 = time.time()
+            graph_rag_search_streaming(p, filterKeywords=json.loads(json.dumps(fk)))
+            stream.append(time.time() - t0)
+
+    def _summary(xs):
+        xs = sorted(xs)
+        return {"avg_s": sum(xs) / len(xs), "p95_s": xs[min(len(xs) - 1, int(0.95 * (len(xs) - 1) + 0.5))]}
+
+    return {"sequential": _summary(seq), "streaming": _summary(stream)}
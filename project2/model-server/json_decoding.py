@@ -0,0 +1,522 @@
+# json_decoding.py
+# 키워드 추출용 JSON-aware 디코딩
+#
+# 1) JsonObjectStoppingCriteria
+#    - 최상위 JSON 객체의 '}' 가 닫히는 순간 디코딩 종료 (256 토큰을 다 쓰지 않음)
+# 2) SchemaConstrainedLogitsProcessor (옵션)
+#    - 지금까지 생성된 텍스트 + 후보 토큰이 extractor 스키마의 "유효한 prefix" 인
+#      경우만 허용 → 코드 펜스(```), 설명 문장, 모르는 키, 타입이 틀린 값에 토큰을 쓰지 않음
+import time
+
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList, LogitsProcessor, LogitsProcessorList
+
+
+# =========================================================
+# 0. extractor 스키마 (SYSTEM_PROMPT 의 JSON 스키마와 동일)
+# =========================================================
+
+STR = "str"
+INT = "int"
+BOOL = "bool"
+NULL = "null"
+
+
+def _arr(item):
+    return ("arr", item)
+
+
+def _obj(fields: dict):
+    return ("obj", fields)
+
+
+def _enum(*values):
+    return ("enum", frozenset(values))
+
+
+def _union(*types):
+    return ("union", types)
+
+
+_STR_LIST = _arr(STR)
+
+EXTRACTOR_SCHEMA = _obj({
+    "dish_type": _STR_LIST,
+    "method": _STR_LIST,
+    "situation": _STR_LIST,
+    "must_ingredients": _STR_LIST,
+    "optional_ingredients": _STR_LIST,
+    "exclude_ingredients": _STR_LIST,
+    "spiciness": _union(_enum("none", "low", "medium", "high"), NULL),
+    "dietary_constraints": _obj({
+        "vegetarian": BOOL,
+        "vegan": BOOL,
+        "no_beef": BOOL,
+        "no_pork": BOOL,
+        "no_chicken": BOOL,
+        "no_seafood": BOOL,
+    }),
+    "servings": _obj({
+        "min": _union(INT, NULL),
+        "max": _union(INT, NULL),
+    }),
+    "max_cook_time_min": _union(INT, NULL),
+    "difficulty": _STR_LIST,
+    "health_tags": _STR_LIST,
+    "weather_tags": _STR_LIST,
+    "menu_style": _STR_LIST,
+    "extra_keywords": _STR_LIST,
+    "positive_tags": _STR_LIST,
+    "negative_tags": _STR_LIST,
+    "free_text": STR,
+})
+
+_WS = " \t\n\r"
+
+
+# =========================================================
+# 1. 최상위 객체 닫힘 감지 (문자열/escape 고려한 brace depth)
+# =========================================================
+
+class JsonDepthScanner:
+    """문자를 하나씩 받아서 최상위 {...} 가 닫혔는지 추적"""
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escape = False
+        self.closed = False
+
+    def feed(self, text: str) -> bool:
+        for c in text:
+            if self.closed:
+                break
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                continue
+            if not self.started:
+                # ```json 같은 앞부분은 무시하고 첫 '{' 부터 추적
+                if c == "{":
+                    self.started = True
+                    self.depth = 1
+                continue
+            if c == '"':
+                self.in_string = True
+            elif c in "{[":
+                self.depth += 1
+            elif c in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.closed = True
+        return self.closed
+
+
+# =========================================================
+# 2. 스키마 prefix 검증기 (문자 단위 pushdown 오토마타)
+# =========================================================
+
+class SchemaPrefixValidator:
+    """
+    feed(text) 가 True 를 리턴하는 동안은
+    "지금까지의 텍스트가 스키마를 만족하는 JSON 의 prefix" 임이 보장된다.
+    - 모든 필드를 강제하지는 않음 (누락 필드는 _postprocess_text_to_json 이 채움)
+    - 모르는 키 / 중복 키 / 타입이 다른 값 / 객체 밖 텍스트는 거부
+    """
+
+    def __init__(self, schema=EXTRACTOR_SCHEMA):
+        # frame 은 작은 dict, used 는 frozenset → clone 이 얕은 복사로 충분
+        self.stack = [{"kind": "top", "phase": "start", "schema": schema}]
+
+    @property
+    def done(self) -> bool:
+        return len(self.stack) == 1 and self.stack[0]["phase"] == "done"
+
+    def clone(self):
+        other = SchemaPrefixValidator.__new__(SchemaPrefixValidator)
+        other.stack = [dict(f) for f in self.stack]
+        return other
+
+    def feed(self, text: str) -> bool:
+        for c in text:
+            if not self._feed_char(c):
+                return False
+        return True
+
+    # ---------- 내부 ----------
+    def _complete_value(self):
+        parent = self.stack[-1]
+        kind = parent["kind"]
+        if kind == "obj":
+            parent["used"] = parent["used"] | {parent["cur_key"]}
+            parent["phase"] = "comma_or_end"
+        elif kind == "arr":
+            parent["phase"] = "comma_or_end"
+        elif kind == "top":
+            parent["phase"] = "done"
+
+    def _start_value(self, typ, c) -> bool:
+        if isinstance(typ, tuple):
+            tag = typ[0]
+            if tag == "union":
+                return any(self._start_value(t, c) for t in typ[1])
+            if tag == "enum":
+                if c == '"':
+                    self.stack.append({"kind": "str", "buf": "", "escape": False,
+                                       "role": "value", "allowed": typ[1]})
+                    return True
+                return False
+            if tag == "arr":
+                if c == "[":
+                    self.stack.append({"kind": "arr", "item": typ[1], "phase": "value_or_end"})
+                    return True
+                return False
+            if tag == "obj":
+                if c == "{":
+                    self.stack.append({"kind": "obj", "fields": typ[1], "used": frozenset(),
+                                       "phase": "key_or_end", "cur_key": None})
+                    return True
+                return False
+            return False
+
+        if typ == STR:
+            if c == '"':
+                self.stack.append({"kind": "str", "buf": "", "escape": False,
+                                   "role": "value", "allowed": None})
+                return True
+            return False
+        if typ == INT:
+            if c.isdigit() or c == "-":
+                self.stack.append({"kind": "num", "buf": c})
+                return True
+            return False
+        if typ == BOOL:
+            if c in "tf":
+                self.stack.append({"kind": "lit", "buf": c, "options": ("true", "false")})
+                return True
+            return False
+        if typ == NULL:
+            if c == "n":
+                self.stack.append({"kind": "lit", "buf": c, "options": ("null",)})
+                return True
+            return False
+        return False
+
+    def _feed_char(self, c) -> bool:
+        frame = self.stack[-1]
+        kind = frame["kind"]
+
+        if kind == "str":
+            if frame["escape"]:
+                frame["escape"] = False
+                frame["buf"] += c
+                return True
+            if c == "\\":
+                frame["escape"] = True
+                return True
+            allowed = frame["allowed"]
+            if c == '"':
+                if allowed is not None and frame["buf"] not in allowed:
+                    return False
+                self.stack.pop()
+                parent = self.stack[-1]
+                if frame["role"] == "key":
+                    parent["cur_key"] = frame["buf"]
+                    parent["phase"] = "colon"
+                else:
+                    self._complete_value()
+                return True
+            buf = frame["buf"] + c
+            if allowed is not None and not any(a.startswith(buf) for a in allowed):
+                return False
+            frame["buf"] = buf
+            return True
+
+        if kind == "lit":
+            buf = frame["buf"] + c
+            if not any(o.startswith(buf) for o in frame["options"]):
+                return False
+            frame["buf"] = buf
+            if buf in frame["options"]:
+                self.stack.pop()
+                self._complete_value()
+            return True
+
+        if kind == "num":
+            if c.isdigit():
+                frame["buf"] += c
+                return True
+            if frame["buf"] in ("", "-"):
+                return False
+            self.stack.pop()
+            self._complete_value()
+            # 숫자를 끝낸 문자(',', '}' 등)는 부모 frame 에서 다시 처리
+            return self._feed_char(c)
+
+        phase = frame["phase"]
+
+        if kind == "top":
+            if c in _WS:
+                return True
+            if phase == "start":
+                return self._start_value(frame["schema"], c)
+            return False  # 최상위 객체가 닫힌 뒤의 텍스트는 허용 안 함
+
+        if c in _WS:
+            return True
+
+        if kind == "obj":
+            if phase in ("key_or_end", "key"):
+                if c == '"':
+                    remaining = frozenset(frame["fields"]) - frame["used"]
+                    if not remaining:
+                        return False
+                    self.stack.append({"kind": "str", "buf": "", "escape": False,
+                                       "role": "key", "allowed": remaining})
+                    return True
+                if c == "}" and phase == "key_or_end":
+                    self.stack.pop()
+                    self._complete_value()
+                    return True
+                return False
+            if phase == "colon":
+                if c == ":":
+                    frame["phase"] = "value"
+                    return True
+                return False
+            if phase == "value":
+                return self._start_value(frame["fields"][frame["cur_key"]], c)
+            if phase == "comma_or_end":
+                if c == ",":
+                    frame["phase"] = "key"
+                    return True
+                if c == "}":
+                    self.stack.pop()
+                    self._complete_value()
+                    return True
+                return False
+            return False
+
+        if kind == "arr":
+            if phase == "value_or_end" and c == "]":
+                self.stack.pop()
+                self._complete_value()
+                return True
+            if phase in ("value_or_end", "value"):
+                frame["phase"] = "value"
+                return self._start_value(frame["item"], c)
+            if phase == "comma_or_end":
+                if c == ",":
+                    frame["phase"] = "value"
+                    return True
+                if c == "]":
+                    self.stack.pop()
+                    self._complete_value()
+                    return True
+                return False
+        return False
+
+
+# =========================================================
+# 3. HF generate 용 StoppingCriteria / LogitsProcessor
+# =========================================================
+
+class _TokenTextCache:
+    """token id → 디코딩 문자열 캐시 (토큰 단위 decode 는 자주 반복됨)"""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self._cache = {}
+
+    def __call__(self, tok_id: int) -> str:
+        text = self._cache.get(tok_id)
+        if text is None:
+            text = self.tokenizer.decode([tok_id], skip_special_tokens=True)
+            self._cache[tok_id] = text
+        return text
+
+
+class JsonObjectStoppingCriteria(StoppingCriteria):
+    """최상위 JSON 객체가 닫히면 (행별로) 생성 종료"""
+
+    def __init__(self, tokenizer, prompt_len: int):
+        self.prompt_len = prompt_len
+        self.token_text = _TokenTextCache(tokenizer)
+        self._scanners = None
+        self._seen = 0
+
+    def __call__(self, input_ids, scores, **kwargs):
+        batch = input_ids.shape[0]
+        if self._scanners is None:
+            self._scanners = [JsonDepthScanner() for _ in range(batch)]
+            self._seen = self.prompt_len
+
+        # 지난 호출 이후 새로 붙은 토큰만 스캐너에 넣는다
+        new_ids = input_ids[:, self._seen:].tolist()
+        self._seen = input_ids.shape[-1]
+        done = []
+        for row, ids in zip(self._scanners, new_ids):
+            for t in ids:
+                row.feed(self.token_text(t))
+            done.append(row.closed)
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+
+class SchemaConstrainedLogitsProcessor(LogitsProcessor):
+    """
+    점수가 높은 top_k 후보 토큰 중에서 스키마 prefix 를 유지하는 토큰만 남긴다.
+    - 전체 vocab 을 검사하지 않고 상위 후보만 검사 (greedy 디코딩 기준 충분)
+    - 상위 후보가 모두 무효이면 fallback_k 까지 넓혀서 검사
+    - 객체가 닫히면 eos 만 허용
+    - assisted/speculative 생성처럼 거부된 후보 위에서 호출될 수 있으므로
+      토큰별 검증기 상태를 기록해 두고, 시퀀스가 되감기면 일치하는 지점부터 다시 계산
+    """
+
+    def __init__(self, tokenizer, prompt_len: int, schema=EXTRACTOR_SCHEMA,
+                 top_k: int = 16, fallback_k: int = 256):
+        self.prompt_len = prompt_len
+        self.schema = schema
+        self.top_k = top_k
+        self.fallback_k = fallback_k
+        self.eos_token_id = tokenizer.eos_token_id
+        self.token_text = _TokenTextCache(tokenizer)
+        self._history = None   # 행별 [(token_id, 그 토큰까지 먹인 검증기), ...]
+
+    def _allowed(self, validator, cand_ids):
+        allowed = []
+        for t in cand_ids:
+            if t == self.eos_token_id:
+                continue
+            v = validator.clone()
+            if v.feed(self.token_text(t)):
+                allowed.append(t)
+        return allowed
+
+    def _validator_for(self, row: int, gen_ids):
+        hist = self._history[row]
+        n = 0
+        while n < len(hist) and n < len(gen_ids) and hist[n][0] == gen_ids[n]:
+            n += 1
+        del hist[n:]
+        v = hist[-1][1] if hist else SchemaPrefixValidator(self.schema)
+        for t in gen_ids[n:]:
+            v = v.clone()
+            if t != self.eos_token_id:
+                v.feed(self.token_text(t))
+            hist.append((t, v))
+        return v
+
+    def __call__(self, input_ids, scores):
+        batch = input_ids.shape[0]
+        if self._history is None:
+            self._history = [[] for _ in range(batch)]
+
+        gen_rows = input_ids[:, self.prompt_len:].tolist()
+
+        mask = torch.full_like(scores, float("-inf"))
+        for row, gen_ids in enumerate(gen_rows):
+            validator = self._validator_for(row, gen_ids)
+
+            if validator.done:
+                mask[row, self.eos_token_id] = 0.0
+                continue
+
+            k = min(self.top_k, scores.shape[-1])
+            cand = torch.topk(scores[row], k).indices.tolist()
+            allowed = self._allowed(validator, cand)
+            if not allowed and self.fallback_k > k:
+                cand = torch.topk(scores[row], min(self.fallback_k, scores.shape[-1])).indices.tolist()
+                allowed = self._allowed(validator, cand)
+            if not allowed:
+                # 어떤 후보도 스키마를 유지하지 못하면 제약 없이 진행 (후처리가 보정)
+                mask[row] = 0.0
+                continue
+            mask[row, allowed] = 0.0
+
+        return scores + mask
+
+
+def build_json_generation_kwargs(tokenizer, prompt_len: int,
+                                 json_stop: bool = False,
+                                 constrained: bool = False) -> dict:
+    """extract_keywords / generate_batch 에서 model.generate 에 넘길 추가 kwargs"""
+    kwargs = {}
+    if json_stop or constrained:
+        kwargs["stopping_criteria"] = StoppingCriteriaList(
+            [JsonObjectStoppingCriteria(tokenizer, prompt_len)]
+        )
+    if constrained:
+        kwargs["logits_processor"] = LogitsProcessorList(
+            [SchemaConstrainedLogitsProcessor(tokenizer, prompt_len)]
+        )
+    return kwargs
+
+
+# =========================================================
+# 4. 벤치마크: 요청당 생성 토큰 수 / 지연 (before / after)
+# =========================================================
+
+BENCHMARK_PROMPTS = [
+    "계란 들어간 30분 이내 요리",
+    "비 오는 날 얼큰한 국물 요리 추천해줘",
+    "돼지고기 빼고 혼밥용 덮밥",
+    "다이어트 중인데 고단백 샐러드 먹고 싶어",
+    "캠핑 가서 먹을 간단한 술안주",
+    "아이랑 같이 먹을 안 매운 반찬 4인분",
+]
+
+
+def benchmark_modes(tokenizer, model, prompts=BENCHMARK_PROMPTS, max_new_tokens: int = 256) -> dict:
+    """
+    baseline / json_stop / constrained 세 모드로 같은 프롬프트를 돌려
+    요청당 평균 생성 토큰 수와 평균 지연을 비교.
+    """
+    from extractor_batcher import build_chat_text
+
+    modes = {
+        "baseline": {},
+        "json_stop": {"json_stop": True},
+        "constrained": {"constrained": True},
+    }
+    report = {}
+    for name, opts in modes.items():
+        n_tokens, elapsed = [], []
+        for p in prompts:
+            inputs = tokenizer(build_chat_text(tokenizer, p), return_tensors="pt").to(model.device)
+            prompt_len = inputs["input_ids"].shape[-1]
+            t0 = time.perf_counter()
+            with torch.no_grad():
+                out = model.generate(
+                    **inputs,
+                    max_new_tokens=max_new_tokens,
+                    do_sample=False,
+                    pad_token_id=tokenizer.eos_token_id,
+                    eos_token_id=tokenizer.eos_token_id,
+                    **build_json_generation_kwargs(tokenizer, prompt_len, **opts),
+                )
+            elapsed.append(time.perf_counter() - t0)
+            n_tokens.append(int(out.shape[-1] - prompt_len))
+        report[name] = {
+            "avg_new_tokens": sum(n_tokens) / len(n_tokens),
+            "avg_latency_s": sum(elapsed) / len(elapsed),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    # 예) BENCH_MODEL=Qwen/Qwen2.5-0.5B-Instruct python json_decoding.py
+    import os
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    bench_model = os.environ.get("BENCH_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
+    tok = AutoTokenizer.from_pretrained(bench_model)
+    mdl = AutoModelForCausalLM.from_pretrained(bench_model, torch_dtype=torch.float32)
+    mdl.eval()
+    for mode, r in benchmark_modes(tok, mdl).items():
+        print(f"{mode:12s} tokens/req={r['avg_new_tokens']:.1f}  "
+              f"latency={r['avg_latency_s']:.3f}s")
@@ -0,0 +1,460 @@
+# lexicon_extractor.py
+# LLM 없이 사전 매칭 + 정규식으로 키워드를 뽑는 fast-path 추출기
+#
+# - 그래프에 이미 있는 재료/카테고리/조리방식/상황/건강·날씨·메뉴스타일 태그와
+#   DIFFICULTY_MAP 을 사전(lexicon)으로 사용
+# - 시간("30분 이내"), 인분("2인분", "혼밥"), 부정("빼고", "싫어") 은 규칙으로 처리
+# - 결과는 new_extractor_model.extract_keywords 와 같은 스키마 + confidence
+# - confidence 가 낮을 때만 LLM 을 호출 (extract_keywords)
+import csv
+import json
+import os
+import re
+import time
+
+from extractor_schema import DIFFICULTY_MAP, LIST_FIELDS, _postprocess_text_to_json, row_to_result
+
+URI = "bolt://localhost:7687"
+USER = "neo4j"
+PASSWORD = "password"
+
+LEXICON_PATH = os.environ.get("LEXICON_PATH", "lexicon.json")
+
+# 이 값 이상이면 LLM 없이 fast-path 결과를 그대로 사용
+CONFIDENCE_THRESHOLD = float(os.environ.get("LEXICON_CONFIDENCE_THRESHOLD", "0.8"))
+
+# 스키마 필드 → 그래프 노드 라벨
+FIELD_LABELS = {
+    "ingredients": "IngredientV2",
+    "dish_type": "CategoryV2",
+    "method": "MethodV2",
+    "situation": "SituationV2",
+    "health_tags": "HealthTag",
+    "weather_tags": "WeatherTag",
+    "menu_style": "MenuStyle",
+    "extra_keywords": "ExtraKeyword",
+}
+
+
+# =========================================================
+# 0. 사전(lexicon) 로드
+# =========================================================
+
+def load_lexicon_from_graph(driver=None) -> dict:
+    """Neo4j 에서 필드별 태그 이름 전체를 읽어온다."""
+    close = False
+    if driver is None:
+        from neo4j import GraphDatabase
+        driver = GraphDatabase.driver(URI, auth=(USER, PASSWORD))
+        close = True
+
+    lexicon = {}
+    try:
+        with driver.session() as session:
+            for field, label in FIELD_LABELS.items():
+                rows = session.run(f"MATCH (n:{label}) RETURN DISTINCT n.name AS name")
+                lexicon[field] = sorted({r["name"] for r in rows if r["name"]})
+    finally:
+        if close:
+            driver.close()
+    return lexicon
+
+
+def save_lexicon(lexicon: dict, path: str = LEXICON_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(lexicon, f, ensure_ascii=False, indent=2)
+
+
+_lexicon = None
+_matcher = None
+
+
+def get_lexicon(path: str = LEXICON_PATH) -> dict:
+    """lexicon.json 이 있으면 파일에서, 없으면 그래프에서 읽고 파일로 저장"""
+    global _lexicon
+    if _lexicon is None:
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as f:
+                _lexicon = json.load(f)
+        else:
+            _lexicon = load_lexicon_from_graph()
+            save_lexicon(_lexicon, path)
+    return _lexicon
+
+
+# =========================================================
+# 1. 규칙 (부정 / 옵션 / 시간 / 인분 / 매운맛 / 식단)
+# =========================================================
+
+# 재료/태그 바로 뒤에 붙으면 "제외" 로 해석
+NEGATION_CUES = [
+    "빼고", "빼줘", "빼서", "빼면", "제외", "없이", "없는", "말고", "싫어", "싫은", "싫고",
+    "못먹", "못 먹", "알레르기", "알러지", "안들어간", "안 들어간", "넣지", "별로",
+]
+# 재료 바로 뒤에 붙으면 "있으면 좋은 재료" 로 해석
+OPTIONAL_CUES = ["있으면", "가능하면", "추가로", "곁들", "정도는"]
+
+# 매칭 뒤 몇 글자 안에서 cue 를 찾을지
+CUE_WINDOW = 8
+
+# 의미는 없지만 흔히 나오는 표현 (confidence 계산 시 "설명된" 것으로 침)
+FILLER_WORDS = [
+    "요리", "음식", "메뉴", "레시피", "추천", "해줘", "해 줘", "알려줘", "주세요", "줘",
+    "먹고", "싶어", "싶다", "싶은", "먹을", "만들", "뭐", "좀", "거", "것", "할", "수", "있는",
+    "들어간", "넣은", "이내", "안에", "이하", "이랑", "랑", "하고", "와", "과", "를", "을",
+    "로", "으로", "의", "에", "한", "하는", "용", "만", "땡긴다", "땡겨", "먹기", "간단히",
+]
+
+KOREAN_NUMS = {"한": 1, "두": 2, "세": 3, "네": 4, "다섯": 5, "여섯": 6}
+
+# 시간 표현만: "1시간 30분", "1.5시간", "30분" ("2인분" / "3분의1" 같은 수량은 제외)
+_RE_DURATION = re.compile(
+    r"(?<![\d.])(?:(\d+(?:\.\d+)?)\s*시간(?:\s*반)?(?:\s*(\d+)\s*분(?!의))?|(\d+)\s*분(?!의))"
+)
+_RE_SERVINGS = re.compile(r"(\d+)\s*(?:인분|인|명|사람)")
+_RE_SERVINGS_KR = re.compile(r"(한|두|세|네|다섯|여섯)\s*(?:명|사람|식구)")
+_RE_SOLO = re.compile(r"혼자|혼밥|1인|자취")
+
+SPICINESS_RULES = [
+    ("none", ["안 매운", "안매운", "맵지 않", "안 맵", "안맵", "순한"]),
+    ("high", ["아주 매운", "엄청 매운", "완전 매운", "핵매운", "불닭", "화끈"]),
+    ("low", ["살짝 매", "약간 매", "매콤"]),
+    ("medium", ["매운", "얼큰", "칼칼", "맵게"]),
+]
+
+# (공백 제거한 프롬프트에 대한 정규식, 켜질 dietary_constraints 키)
+DIET_RULES = [
+    (re.compile(r"비건"), ["vegan", "vegetarian", "no_beef", "no_pork", "no_chicken", "no_seafood"]),
+    (re.compile(r"채식|베지테리언"), ["vegetarian", "no_beef", "no_pork", "no_chicken", "no_seafood"]),
+    # 단독 "고기" 만 — "돼지고기 빼고" 같은 특정 육류는 제외 재료 → EXCLUDE_DIET 에서 처리,
+    # "물고기" / "불고기" 는 육류 전체 제외가 아님 (공백 제거 후라 앞 글자들을 각각 확인)
+    (re.compile(r"(?<!물)(?<!불)(?<!돼지)(?<!닭)(?<!소)(?<!오리)(?<!양)고기(안|없이|빼고|말고|싫)"),
+     ["no_beef", "no_pork", "no_chicken"]),
+]
+
+# 제외 재료 → dietary_constraints
+EXCLUDE_DIET = {
+    "소고기": "no_beef",
+    "돼지고기": "no_pork",
+    "닭고기": "no_chicken",
+    "해산물": "no_seafood",
+    "생선": "no_seafood",
+}
+
+
+def _norm(s: str) -> str:
+    return str(s).replace(" ", "").lower()
+
+
+class _Matcher:
+    """
+    공백 제거한 프롬프트에서 사전 단어를 찾는다.
+    - 긴 단어 우선 + 겹치지 않게 선택 ("돼지고기" 가 있으면 "고기" 는 버림)
+    - 1글자 단어는 오탐이 많아서 제외
+    """
+
+    def __init__(self, lexicon: dict):
+        self.terms = {}   # norm → [(field, 원래 이름), ...]
+        for field, names in lexicon.items():
+            for name in names:
+                n = _norm(name)
+                if len(n) < 2:
+                    continue
+                self.terms.setdefault(n, []).append((field, name))
+        # 길이별로 묶어 두고 긴 것부터 검사
+        self.lengths = sorted({len(t) for t in self.terms}, reverse=True)
+
+    def find(self, text_norm: str):
+        taken = [False] * len(text_norm)
+        hits = []
+        for L in self.lengths:
+            for i in range(0, len(text_norm) - L + 1):
+                if any(taken[i:i + L]):
+                    continue
+                sub = text_norm[i:i + L]
+                entries = self.terms.get(sub)
+                if not entries:
+                    continue
+                for j in range(i, i + L):
+                    taken[j] = True
+                hits.append((i, i + L, entries))
+        hits.sort(key=lambda h: h[0])
+        return hits
+
+
+def _get_matcher(lexicon=None):
+    global _matcher
+    if lexicon is not None:
+        return _Matcher(lexicon)
+    if _matcher is None:
+        _matcher = _Matcher(get_lexicon())
+    return _matcher
+
+
+def _cue_span(text_norm: str, end: int, cues):
+    """매칭 끝(end) 바로 뒤에 붙은 cue 의 (start, end). 없으면 None"""
+    # 조사 1~2글자("계란은 빼고")까지 허용
+    window = text_norm[end:end + CUE_WINDOW]
+    for c in cues:
+        c = _norm(c)
+        i = window.find(c, 0, len(c) + 2)
+        if i >= 0:
+            return end + i, end + i + len(c)
+    return None
+
+
+def _cue_after(text_norm: str, end: int, cues) -> bool:
+    return _cue_span(text_norm, end, cues) is not None
+
+
+def _mark(covered, start, end):
+    for j in range(max(0, start), min(len(covered), end)):
+        covered[j] = True
+
+
+def _mark_all(covered, text_norm, words):
+    for w in words:
+        w = _norm(w)
+        if not w:
+            continue
+        for m in re.finditer(re.escape(w), text_norm):
+            _mark(covered, m.start(), m.end())
+
+
+def extract_numeric_constraints(user_prompt: str):
+    """
+    시간 / 인분 규칙 (distilled_extractor 에서도 사용)
+    리턴: (max_cook_time_min, {"min", "max"}, 혼밥 여부)
+    """
+    max_time = None
+    durations = []
+    for m in _RE_DURATION.finditer(user_prompt):
+        hours, extra_min, minutes = m.group(1), m.group(2), m.group(3)
+        if hours is not None:
+            total = float(hours) * 60 + (30 if "반" in m.group(0) else 0) + int(extra_min or 0)
+            durations.append(int(total))
+        else:
+            durations.append(int(minutes))
+    if durations:
+        max_time = max(durations)
+
+    servings = {"min": None, "max": None}
+    solo = False
+    m = _RE_SERVINGS.search(user_prompt)
+    m_kr = _RE_SERVINGS_KR.search(user_prompt)
+    if m:
+        n = int(m.group(1))
+        servings = {"min": n, "max": n}
+    elif m_kr:
+        n = KOREAN_NUMS[m_kr.group(1)]
+        servings = {"min": n, "max": n}
+    elif _RE_SOLO.search(user_prompt):
+        servings = {"min": 1, "max": 1}
+        solo = True
+    return max_time, servings, solo
+
+
+# =========================================================
+# 2. fast-path 추출
+# =========================================================
+
+def extract_keywords_fast(user_prompt: str, lexicon: dict = None):
+    """
+    사전 매칭 + 규칙으로 키워드 추출.
+    리턴: (extract_keywords 와 같은 스키마 dict, confidence 0~1)
+    """
+    matcher = _get_matcher(lexicon)
+    text_norm = _norm(user_prompt)
+    covered = [False] * len(text_norm)
+
+    raw = {k: [] for k in LIST_FIELDS}
+    raw["dietary_constraints"] = {}
+    raw["servings"] = {"min": None, "max": None}
+    raw["max_cook_time_min"] = None
+    raw["spiciness"] = None
+    raw["free_text"] = user_prompt
+
+    # 1) 사전 매칭 (재료 / 태그)
+    for start, end, entries in matcher.find(text_norm):
+        _mark(covered, start, end)
+        # cue 는 매칭에 붙었을 때만 "설명된" 글자로 침 (아무것도 부정하지 않는 "싫어" 는 미설명)
+        negated = _cue_span(text_norm, end, NEGATION_CUES)
+        optional = None if negated else _cue_span(text_norm, end, OPTIONAL_CUES)
+        if negated or optional:
+            _mark(covered, *(negated or optional))
+        for field, name in entries:
+            if field == "ingredients":
+                if negated:
+                    raw["exclude_ingredients"].append(name)
+                elif optional:
+                    raw["optional_ingredients"].append(name)
+                else:
+                    raw["must_ingredients"].append(name)
+            elif negated:
+                raw["negative_tags"].append(name)
+            else:
+                raw[field].append(name)
+
+    # 2) 시간 / 3) 인분
+    raw["max_cook_time_min"], raw["servings"], solo = extract_numeric_constraints(user_prompt)
+    if solo:
+        raw["situation"].append("혼밥")
+
+    # 4) 매운맛: 규칙 순서상 처음으로 부정 안 된 표현의 레벨
+    #    ("매운거 싫어" 처럼 뒤에 부정 cue 가 붙은 표현만 있으면 none)
+    taken = [False] * len(text_norm)
+    negated_any = False
+    for level, cues in SPICINESS_RULES:
+        for c in sorted(cues, key=len, reverse=True):
+            for m in re.finditer(re.escape(_norm(c)), text_norm):
+                if any(taken[m.start():m.end()]):        # "안 매운" 안의 "매운" 은 한 번만
+                    continue
+                _mark(taken, m.start(), m.end())
+                _mark(covered, m.start(), m.end())
+                negated = _cue_span(text_norm, m.end(), NEGATION_CUES)
+                if negated:
+                    _mark(covered, *negated)
+                    negated_any = True
+                elif raw["spiciness"] is None:
+                    raw["spiciness"] = level
+    if raw["spiciness"] is None and negated_any:
+        raw["spiciness"] = "none"
+
+    # 5) 식단 제약
+    diet = {}
+    for rx, keys in DIET_RULES:
+        for mm in rx.finditer(text_norm):
+            for k in keys:
+                diet[k] = True
+            _mark(covered, mm.start(), mm.end())
+    for ing in raw["exclude_ingredients"]:
+        key = EXCLUDE_DIET.get(_norm(ing))
+        if key:
+            diet[key] = True
+    raw["dietary_constraints"] = diet
+
+    # 6) 난이도 (LLM 과 같이 표현 그대로 넣고, 그래프 매핑은 normalize_difficulty 가 담당)
+    for key in DIFFICULTY_MAP:
+        if key in text_norm:
+            raw["difficulty"].append(key)
+            _mark_all(covered, text_norm, [key])
+
+    # 7) confidence: 프롬프트 글자 중 사전/규칙/불용어로 "설명된" 비율
+    _mark_all(covered, text_norm, FILLER_WORDS)
+    for rx in (_RE_DURATION, _RE_SERVINGS, _RE_SERVINGS_KR, _RE_SOLO):
+        for mm in rx.finditer(text_norm):
+            _mark(covered, mm.start(), mm.end())
+
+    n_hits = sum(len(raw[k]) for k in LIST_FIELDS) + (raw["max_cook_time_min"] is not None)
+    if not text_norm or n_hits == 0:
+        confidence = 0.0
+    else:
+        confidence = sum(covered) / len(covered)
+        # 길고 복잡한 문장은 규칙으로 다 못 잡을 가능성이 큼
+        if len(text_norm) > 40:
+            confidence *= 40 / len(text_norm)
+
+    for k in LIST_FIELDS:
+        raw[k] = list(dict.fromkeys(raw[k]))
+
+    result = _postprocess_text_to_json(json.dumps(raw, ensure_ascii=False), fallback_prompt=user_prompt)
+    return result, round(confidence, 4)
+
+
+def extract_keywords(user_prompt: str, threshold: float = None, llm_extract=None) -> dict:
+    """
+    new_extractor_model.extract_keywords 와 같은 시그니처.
+    fast-path confidence 가 threshold 미만일 때만 LLM 호출.
+    """
+    threshold = CONFIDENCE_THRESHOLD if threshold is None else threshold
+    result, confidence = extract_keywords_fast(user_prompt)
+    if confidence >= threshold:
+        return result
+
+    if llm_extract is None:
+        from new_extractor_model import extract_keywords as llm_extract
+    return llm_extract(user_prompt)
+
+
+# =========================================================
+# 3. 벤치마크: LLM 결과와의 일치도 / 지연
+# =========================================================
+
+def load_labelled_prompts(csv_path: str = "keyword_extract_log.csv"):
+    """park_extractor_model.run_and_log 가 남긴 CSV → [(prompt, 정답 dict), ...]"""
+    out = []
+    with open(csv_path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            out.append((row["user_prompt"], row_to_result(row)))
+    return out
+
+
+def _jaccard(a, b) -> float:
+    sa, sb = {_norm(x) for x in a}, {_norm(x) for x in b}
+    if not sa and not sb:
+        return 1.0
+    return len(sa & sb) / len(sa | sb)
+
+
+def compare_results(pred: dict, gold: dict) -> dict:
+    """필드별 일치도 (리스트: Jaccard, 나머지: 일치 여부)"""
+    scores = {k: _jaccard(pred.get(k, []), gold.get(k, [])) for k in LIST_FIELDS}
+    scores["spiciness"] = float(pred.get("spiciness") == gold.get("spiciness"))
+    scores["servings"] = float(pred.get("servings") == gold.get("servings"))
+    scores["max_cook_time_min"] = float(pred.get("max_cook_time_min") == gold.get("max_cook_time_min"))
+    scores["dietary_constraints"] = float(pred.get("dietary_constraints") == gold.get("dietary_constraints"))
+    return scores
+
+
+def benchmark_against_llm(labelled, threshold: float = None, llm_extract=None) -> dict:
+    """
+    labelled: [(prompt, LLM 정답 dict), ...]
+    - fast-path 단독 일치도 / 지연
+    - threshold 이상인(=LLM 을 건너뛰는) 프롬프트 비율과 그 부분집합의 일치도
+    - llm_extract 를 주면 LLM 지연도 같이 측정
+    """
+    threshold = CONFIDENCE_THRESHOLD if threshold is None else threshold
+    field_sums, field_sums_confident = {}, {}
+    fast_lat, llm_lat = [], []
+    n_confident = 0
+
+    for prompt, gold in labelled:
+        t0 = time.perf_counter()
+        pred, conf = extract_keywords_fast(prompt)
+        fast_lat.append(time.perf_counter() - t0)
+
+        scores = compare_results(pred, gold)
+        for k, v in scores.items():
+            field_sums[k] = field_sums.get(k, 0.0) + v
+        if conf >= threshold:
+            n_confident += 1
+            for k, v in scores.items():
+                field_sums_confident[k] = field_sums_confident.get(k, 0.0) + v
+
+        if llm_extract is not None:
+            t0 = time.perf_counter()
+            llm_extract(prompt)
+            llm_lat.append(time.perf_counter() - t0)
+
+    n = max(len(labelled), 1)
+    report = {
+        "n": len(labelled),
+        "fast_path_ratio": n_confident / n,
+        "agreement_all": {k: v / n for k, v in field_sums.items()},
+        "agreement_confident": (
+            {k: v / n_confident for k, v in field_sums_confident.items()} if n_confident else {}
+        ),
+        "fast_avg_latency_ms": 1000 * sum(fast_lat) / n,
+    }
+    if llm_lat:
+        report["llm_avg_latency_ms"] = 1000 * sum(llm_lat) / len(llm_lat)
+    return report
+
+
+if __name__ == "__main__":
+    # python lexicon_extractor.py keyword_extract_log.csv
+    import sys
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "keyword_extract_log.csv"
+    rep = benchmark_against_llm(load_labelled_prompts(csv_path))
+    print(json.dumps(rep, ensure_ascii=False, indent=2))
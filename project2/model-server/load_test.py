@@ -0,0 +1,281 @@
+# load_test.py
+# HTTP 부하 테스트
+#
+#   # 떠 있는 서버 대상
+#   python load_test.py --url http://127.0.0.1:8001/crawl-recipe/128671 -c 64 -n 1000
+#
+#   # stub 백엔드로 Flask(app.py 와 같은 branch 처리) vs asgi_app 비교 — Neo4j / 만개의레시피 / 모델 없이 실행
+#   python load_test.py --compare
+#
+# compare 모드
+# - 상세 페이지 upstream: recipe_crawler.start_fixture_server (응답 upstream_delay_s 지연)
+# - 그래프 유사도: stub (similarity_delay_s 만큼 sleep — Neo4j 왕복 흉내)
+# - cold: 상세 캐시 ttl 0 → 요청마다 upstream 크롤링 + 파싱 (파싱은 CPU 라 양쪽 다 GIL 에 묶임)
+# - warm: 상세는 캐시 hit, 유사도(I/O 대기)만 남은 상황 → 동시성 차이가 그대로 드러남
+# - Flask 쪽은 app.crawl_recipe_endpoint 와 같은 crawl_branches.crawl_recipe (두 branch 병렬, 같은 executor 크기)
+#   flask_threads 를 안 주면 app.run 처럼 요청마다 스레드, 주면 그 개수로 동시 처리 제한 (결과에 같이 기록)
+# - upstream / 측정 대상 서버는 각각 별도 프로세스 (부하 클라이언트와 같은 프로세스면 GIL 경합으로 결과가 왜곡됨)
+import argparse
+import asyncio
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+
+def _percentile(values, q: float):
+    if not values:
+        return None
+    s = sorted(values)
+    idx = min(len(s) - 1, max(0, int(round(q / 100.0 * (len(s) - 1)))))
+    return s[idx]
+
+
+async def _run_load(urls, concurrency: int, timeout_s: float) -> dict:
+    latencies, errors = [], 0
+    it = iter(urls)
+    connected, start = [0], asyncio.Event()
+    all_connected = asyncio.Event()
+
+    async def worker():
+        nonlocal errors
+        # 워커마다 커넥션 1개짜리 client (client 하나를 공유하면 커넥션 풀 대기에서 클라이언트가 먼저 병목)
+        limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+        async with httpx.AsyncClient(limits=limits, timeout=timeout_s) as client:
+            try:
+                await client.get(urls[0])      # 커넥션 먼저 맺어 두기 (측정 제외)
+            except httpx.HTTPError:
+                pass
+            connected[0] += 1
+            if connected[0] == concurrency:
+                all_connected.set()
+            await start.wait()
+            for url in it:
+                t0 = time.perf_counter()
+                try:
+                    res = await client.get(url)
+                    if res.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    await all_connected.wait()
+    t0 = time.perf_counter()
+    start.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - t0
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else None,
+        "p50_s": _percentile(latencies, 50),
+        "p95_s": _percentile(latencies, 95),
+        "p99_s": _percentile(latencies, 99),
+    }
+
+
+def run_load(urls, concurrency: int = 64, timeout_s: float = 30.0) -> dict:
+    return asyncio.run(_run_load(list(urls), concurrency, timeout_s))
+
+
+# =========================================================
+# stub 백엔드로 Flask vs ASGI 비교
+# =========================================================
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _StubSimilarity:
+    def __init__(self, delay_s):
+        self.delay_s = delay_s
+
+    def get_similar_recipes(self, recipe_id, top_n=3, min_shared_ings=2, timeout_s=None):
+        time.sleep(self.delay_s)
+        return {"overall": [], "ingredients": []}
+
+
+class _AsyncStubSimilarity(_StubSimilarity):
+    async def get_similar_recipes(self, recipe_id, top_n=3, min_shared_ings=2, timeout_s=None):
+        await asyncio.sleep(self.delay_s)
+        return {"overall": [], "ingredients": []}
+
+
+def _start_flask_baseline(similarity, detail_cache, threads: int = None):
+    """
+    app.crawl_recipe_endpoint 와 같은 처리 (crawl_branches.crawl_recipe, 같은 executor 크기)를 stub 으로.
+    threads=None 이면 app.run 처럼 요청마다 스레드, 숫자면 그 크기의 스레드풀로 동시 요청 수를 제한
+    """
+    from flask import Flask, jsonify
+    from werkzeug.serving import BaseWSGIServer, ThreadedWSGIServer, WSGIRequestHandler
+
+    import crawl_branches
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    flask_app = Flask("load_test_baseline")
+    branch_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="crawl-branch")
+    similar_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="crawl-similar")
+
+    @flask_app.route("/crawl-recipe/<int:recipe_id>")
+    def crawl(recipe_id):
+        body, status = crawl_branches.crawl_recipe(recipe_id, detail_cache.get, similarity,
+                                                   branch_executor, similar_executor)
+        return jsonify(body), status
+
+    class PooledServer(BaseWSGIServer):
+        pool = ThreadPoolExecutor(max_workers=threads) if threads else None
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    port = _free_port()
+    server_cls = ThreadedWSGIServer if threads is None else PooledServer
+    server = server_cls("127.0.0.1", port, flask_app, handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{port}"
+
+
+def _start_asgi(app):
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def _serve_upstream(delay_s, conn):
+    import recipe_crawler
+
+    server, base_url, _hits = recipe_crawler.start_fixture_server(delay_s=delay_s)
+    conn.send(base_url)
+    conn.recv()                     # 부모가 닫을 때까지
+    server.shutdown()
+
+
+def _serve_target(kind, scenario, base_url, flask_threads, similarity_delay_s, warm_ids, conn):
+    """측정 대상 서버 (부하 클라이언트와 GIL 을 나눠 쓰지 않도록 별도 프로세스에서)"""
+    import functools
+
+    import recipe_crawler
+    from recipe_detail_cache import RecipeDetailCache
+
+    recipe_crawler.RECIPE_BASE_URL = base_url      # asgi_app 크롤링도 fixture 서버로
+    fetch = functools.partial(recipe_crawler.get_recipe, base_url=base_url)
+    if scenario == "cold":
+        cache = RecipeDetailCache(fetch, path=None, ttl_s=0, stale_s=0)
+    else:
+        cache = RecipeDetailCache(fetch, path=None)
+        for i in range(warm_ids):
+            cache.get(i + 1)
+
+    if kind == "flask":
+        server, url = _start_flask_baseline(_StubSimilarity(similarity_delay_s), cache, flask_threads)
+        conn.send(url)
+        conn.recv()
+        server.shutdown()
+    else:
+        import asgi_app
+
+        app = asgi_app.create_app(similarity=_AsyncStubSimilarity(similarity_delay_s),
+                                  detail_cache=cache, use_store=False,
+                                  load_search_index=False, warm_up=False)
+        server, thread, url = _start_asgi(app)
+        conn.send(url)
+        conn.recv()
+        server.should_exit = True       # graceful shutdown (lifespan 종료까지)
+        thread.join(timeout=30)
+
+
+def _in_process(target, *args):
+    """target(*args, conn) 을 자식 프로세스로 띄우고 conn 으로 받은 URL 리턴. 리턴: (process, conn, url)"""
+    import multiprocessing
+
+    parent, child = multiprocessing.Pipe()
+    proc = multiprocessing.Process(target=target, args=(*args, child), daemon=True)
+    proc.start()
+    return proc, parent, parent.recv()
+
+
+def _stop(proc, conn):
+    conn.send("stop")
+    proc.join(timeout=30)
+
+
+def compare(n_requests: int = 400, concurrency: int = 64, flask_threads: int = None,
+            upstream_delay_s: float = 0.1, similarity_delay_s: float = 0.05,
+            scenarios=("cold", "warm"), warm_ids: int = 20) -> dict:
+    upstream, upstream_conn, base_url = _in_process(_serve_upstream, upstream_delay_s)
+
+    out = {}
+    try:
+        for scenario in scenarios:
+            if scenario == "cold":
+                paths = [f"/crawl-recipe/{i + 1}" for i in range(n_requests)]
+            else:
+                paths = [f"/crawl-recipe/{i % warm_ids + 1}" for i in range(n_requests)]
+
+            res = {}
+            for kind in ("flask", "asgi"):
+                proc, conn, url = _in_process(_serve_target, kind, scenario, base_url,
+                                              flask_threads, similarity_delay_s, warm_ids)
+                try:
+                    res[kind] = run_load([url + p for p in paths], concurrency)
+                finally:
+                    _stop(proc, conn)
+
+            out[scenario] = {
+                "flask_threads": flask_threads or "per_request",
+                "flask": res["flask"],
+                "asgi": res["asgi"],
+                "rps_gain": res["asgi"]["rps"] / res["flask"]["rps"],
+            }
+    finally:
+        _stop(upstream, upstream_conn)
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HTTP load test")
+    ap.add_argument("--url", action="append", help="요청할 URL (여러 번 주면 돌아가며)")
+    ap.add_argument("-n", "--requests", type=int, default=400)
+    ap.add_argument("-c", "--concurrency", type=int, default=64)
+    ap.add_argument("--compare", action="store_true", help="stub 백엔드로 Flask vs ASGI")
+    ap.add_argument("--flask-threads", type=int, default=None,
+                    help="Flask baseline 동시 처리 스레드 수 (생략하면 app.run 처럼 요청마다 스레드)")
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        res = compare(args.requests, args.concurrency, args.flask_threads)
+    elif args.url:
+        urls = [args.url[i % len(args.url)] for i in range(args.requests)]
+        res = run_load(urls, args.concurrency)
+    else:
+        ap.error("--url 또는 --compare 필요")
+    for k, v in res.items():
+        print(k, v)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+# metrics.py
+# 단계별 지연 히스토그램 + 카운터 (프로세스 메모리, /metrics 에서 Prometheus text format 으로 노출)
+#
+#   with metrics.stage("neo4j"):
+#       rows = list(session.run(cypher, **params))
+#   metrics.inc("search_results_total", len(recipes))
+#
+# - 단계(STAGES): extract / build_query / neo4j / select / explain / crawl / similarity / embed
+#   → stage_duration_seconds{stage=...} 히스토그램, 예외가 나면 stage_errors_total{stage=...} +1
+# - 히스토그램은 고정 bucket 누적 카운트 + sum + count 만 저장 (샘플 안 쌓음) → 기록 1번 = lock 1번 + bisect
+# - register_collector(): 다른 모듈의 stats() (openai_pool, 상세 캐시, 스케줄러 ...) 를 scrape 때 gauge 로 같이 노출
+# - METRICS_ENABLED=0 이면 stage()/observe()/inc() 가 아무것도 안 함
+# - stage() / observe_stage() 는 요청 trace 가 있으면 같은 이름의 span 도 남김 (tracing.py)
+import bisect
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import tracing
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+METRICS_PREFIX = os.environ.get("METRICS_PREFIX", "recipe")
+
+STAGES = ("extract", "build_query", "neo4j", "select", "explain", "crawl", "similarity", "embed")
+
+# 초 단위 bucket (모델 추출 / LLM 설명은 수 초, neo4j / 캐시 hit 은 ms 단위)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)     # 마지막 칸 = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float):
+        """bucket 경계로 근사한 분위수 (stats 용, 정확한 값은 Prometheus 쪽 histogram_quantile)"""
+        if not self.count:
+            return None
+        target = q / 100.0 * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    def __init__(self, prefix: str = METRICS_PREFIX):
+        self.prefix = prefix
+        self._hists = {}          # (name, labels) → Histogram
+        self._counters = {}       # (name, labels) → 값
+        self._collectors = {}     # name → fn() → dict | None
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            h = self._hists.get(key)
+            if h is None:
+                h = self._hists[key] = Histogram()
+            h.observe(value)
+
+    def inc(self, name: str, n: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def register_collector(self, name: str, fn):
+        with self._lock:
+            self._collectors[name] = fn
+
+    def _collect(self) -> dict:
+        """collector 이름 → 평탄화한 숫자 dict (실패 / None 은 건너뜀)"""
+        with self._lock:
+            collectors = list(self._collectors.items())
+        out = {}
+        for name, fn in collectors:
+            try:
+                stats = fn()
+            except Exception as e:
+                print(f"[WARN] metrics collector {name} failed:", e)
+                continue
+            if stats:
+                out[name] = _flatten(stats)
+        return out
+
+    # ---------- 노출 ----------
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        with self._lock:
+            hists = [(k, list(h.counts), h.sum, h.count, h.buckets) for k, h in self._hists.items()]
+            counters = list(self._counters.items())
+
+        lines = []
+        typed = set()
+
+        def _type(metric, kind):
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} {kind}")
+
+        for (name, labels), value in sorted(counters):
+            metric = f"{self.prefix}_{name}"
+            _type(metric, "counter")
+            lines.append(f"{metric}{_labels(labels)} {_num(value)}")
+
+        for (name, labels), counts, total, count, buckets in sorted(hists, key=lambda x: x[0]):
+            metric = f"{self.prefix}_{name}"
+            _type(metric, "histogram")
+            cum = 0
+            for bound, n in zip(buckets + (float("inf"),), counts):
+                cum += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{metric}_bucket{_labels(labels + (('le', le),))} {cum}")
+            lines.append(f"{metric}_sum{_labels(labels)} {_num(total)}")
+            lines.append(f"{metric}_count{_labels(labels)} {count}")
+
+        for cname, stats in sorted(self._collect().items()):
+            for key, value in sorted(stats.items()):
+                metric = _metric_name(f"{self.prefix}_{cname}_{key}")
+                _type(metric, "gauge")
+                lines.append(f"{metric} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """JSON 용: 히스토그램은 count / sum / p50 / p95 / p99 (bucket 근사)"""
+        with self._lock:
+            hists = {
+                _key_str(k): {
+                    "count": h.count,
+                    "sum_s": h.sum,
+                    "p50_s": h.quantile(50),
+                    "p95_s": h.quantile(95),
+                    "p99_s": h.quantile(99),
+                }
+                for k, h in self._hists.items()
+            }
+            counters = {_key_str(k): v for k, v in self._counters.items()}
+        return {"histograms": hists, "counters": counters, "collectors": self._collect()}
+
+
+def _flatten(d: dict, prefix: str = "") -> dict:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(_flatten(v, key + "_"))
+        elif isinstance(v, bool):
+            out[key] = int(v)
+        elif isinstance(v, (int, float)):
+            out[key] = v
+    return out
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+_NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _metric_name(name: str) -> str:
+    return _NAME_RE.sub("_", name)
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _num(v) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def _key_str(key) -> str:
+    name, labels = key
+    return name + _labels(labels)
+
+
+_registry = Registry()
+
+
+def get_registry() -> Registry:
+    return _registry
+
+
+# =========================================================
+# 모듈 함수 (계측 코드에서 바로 사용)
+# =========================================================
+
+def observe(name: str, value: float, **labels):
+    if METRICS_ENABLED:
+        _registry.observe(name, value, **labels)
+
+
+def inc(name: str, n: float = 1, **labels):
+    if METRICS_ENABLED:
+        _registry.inc(name, n, **labels)
+
+
+def observe_stage(name: str, seconds: float, **labels):
+    """with 로 감싸기 어려운 구간 (이미 재 둔 시간)"""
+    observe("stage_duration_seconds", seconds, stage=name, **labels)
+    tracing.record_span(name, seconds, **labels)
+
+
+@contextmanager
+def stage(name: str, **labels):
+    if not METRICS_ENABLED:
+        with tracing.span(name, **labels):
+            yield
+        return
+    t0 = time.perf_counter()
+    try:
+        with tracing.span(name, **labels):
+            yield
+    except Exception as e:
+        _registry.inc("stage_errors_total", stage=name, error=type(e).__name__, **labels)
+        raise
+    finally:
+        _registry.observe("stage_duration_seconds", time.perf_counter() - t0, stage=name, **labels)
+
+
+def register_collector(name: str, fn):
+    """fn() → stats dict (숫자만, 중첩 dict 는 _ 로 이어 붙임). None 이면 그 scrape 에서 생략"""
+    _registry.register_collector(name, fn)
+
+
+def _existing(module: str, attr: str):
+    """이미 import 된 모듈의 이미 만들어진 싱글턴만 (없으면 None — scrape 가 만들지 않음)"""
+    mod = sys.modules.get(module)
+    return None if mod is None else getattr(mod, attr, None)
+
+
+def register_default_collectors():
+    """
+    app / asgi_app 공용 collector.
+    scrape 가 보고 대상(풀 / 캐시 파일 / 스레드)을 새로 만들지 않도록 get_xxx() 대신
+    이미 있는 싱글턴만 읽음 → 아직 안 쓴 서브시스템은 그 scrape 에서 생략
+    """
+    def _stats(module, attr, method="stats"):
+        def _collect():
+            obj = _existing(module, attr)
+            return None if obj is None else getattr(obj, method)()
+        return _collect
+
+    def _recipe_store():
+        store = _existing("bulk_crawl", "_store")
+        return None if store is None else {"items": len(store)}
+
+    def _scheduler():
+        # 모델 모듈이 이미 로드돼 있고 스케줄러를 쓸 때만 (scrape 가 모델 import 를 일으키지 않도록)
+        mod = sys.modules.get("new_extractor_model")
+        if mod is None or not mod.USE_SCHEDULER or mod._scheduler is None:
+            return None
+        return mod._scheduler.stats()
+
+    def _inference_workers():
+        registry = sys.modules.get("extractor_registry")
+        client = _existing("inference_worker", "_client")
+        if registry is None or registry.ACTIVE_BACKEND != "remote" or client is None:
+            return None
+        return client.stats(timeout=1.0)
+
+    for name, fn in (
+        ("openai_pool", _stats("openai_pool", "_pool", "metrics")),
+        ("recipe_detail_cache", _stats("recipe_detail_cache", "_cache")),
+        ("recipe_store", _recipe_store),
+        ("explanation_jobs", _stats("explanation_jobs", "_jobs")),
+        ("explanation_cache", _stats("explanation_cache", "_cache")),
+        ("inference_scheduler", _scheduler),
+        ("inference_worker", _inference_workers),
+        ("extraction_log", _stats("extraction_log", "_writer")),
+    ):
+        register_collector(name, fn)
+
+
+def render() -> str:
+    return _registry.render()
+
+
+def snapshot() -> dict:
+    return _registry.snapshot()
+
+
+def benchmark(n: int = 200_000) -> dict:
+    """기록 한 번 비용 (µs). stage() 는 모듈 registry 에 stage="bench" 로 남음"""
+    reg = Registry()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        s = time.perf_counter()
+        reg.observe("stage_duration_seconds", time.perf_counter() - s, stage="bench")
+    observe_us = (time.perf_counter() - t0) / n * 1e6
+
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with stage("bench"):
+            pass
+    stage_us = (time.perf_counter() - t0) / n * 1e6
+    return {"observe_us": observe_us, "stage_us": stage_us, "enabled": METRICS_ENABLED}
+
+
+if __name__ == "__main__":
+    for k, v in benchmark().items():
+        print(k, v)
@@ -1,6 +1,7 @@
 from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
 import torch
-import json
+import os
+import threading
 
 # =========================================================
 # 0. 모델 경로 & 4bit 설정 (원래 코드 유지)
@@ -24,372 +25,333 @@ max_memory = {
     "cpu": "32GiB",
 }
 
-print("Loading tokenizer...")
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-
-print("Loading model (this can take a while)...")
-model = AutoModelForCausalLM.from_pretrained(
-    MODEL_NAME,
-    quantization_config=bnb_config,
-    # device_map="auto",      # accelerate가 알아서 3개 GPU에 분산
-    device_map={"": 2},       # 1번 GPU에 올려서 돌리는 설정
-    max_memory=max_memory,
+# 토크나이저/모델은 import 시점이 아니라 첫 사용(또는 warm-up) 시점에 로드
+# (extractor_registry 가 백그라운드 스레드에서 load_model() 호출)
+_tokenizer = None
+_model = None
+_load_lock = threading.Lock()
+
+
+def load_model():
+    """토크나이저 + 4bit 모델을 한 번만 로드하고 (tokenizer, model) 리턴"""
+    global _tokenizer, _model
+    with _load_lock:
+        if _model is None:
+            print("Loading tokenizer...")
+            tok = AutoTokenizer.from_pretrained(MODEL_NAME)
+
+            print("Loading model (this can take a while)...")
+            mdl = AutoModelForCausalLM.from_pretrained(
+                MODEL_NAME,
+                quantization_config=bnb_config,
+                # device_map="auto",      # accelerate가 알아서 3개 GPU에 분산
+                device_map={"": 2},       # 1번 GPU에 올려서 돌리는 설정
+                max_memory=max_memory,
+            )
+
+            # Qwen은 eos_token_id / pad_token_id 설정이 필요할 수 있음
+            if mdl.config.eos_token_id is None and tok.eos_token_id is not None:
+                mdl.config.eos_token_id = tok.eos_token_id
+            if mdl.config.pad_token_id is None:
+                mdl.config.pad_token_id = tok.eos_token_id
+
+            _tokenizer, _model = tok, mdl
+    return _tokenizer, _model
+
+
+def warm_up():
+    """모델 로드 + (설정 시) SYSTEM_PROMPT prefix 미리 prefill"""
+    load_model()
+    if USE_PREFIX_CACHE:
+        get_prefix_cache()
+
+
+def __getattr__(name):
+    # `from new_extractor_model import tokenizer, model` 호환 (접근 시 로드)
+    if name == "tokenizer":
+        return load_model()[0]
+    if name == "model":
+        return load_model()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 동시 요청을 모아 batched generate 할지 여부 (extractor_batcher.BatchingExtractor)
+USE_BATCHING = os.environ.get("EXTRACTOR_BATCHING", "0") == "1"
+BATCH_MAX_SIZE = int(os.environ.get("EXTRACTOR_BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("EXTRACTOR_BATCH_MAX_WAIT_MS", "5"))
+
+# JSON-aware 디코딩 (json_decoding.py)
+# - JSON_STOP: 최상위 JSON 객체가 닫히면 바로 generate 종료
+# - CONSTRAINED: 스키마 키/값 타입에 맞는 토큰만 허용 (코드 펜스/설명 문장 차단)
+JSON_STOP = os.environ.get("EXTRACTOR_JSON_STOP", "0") == "1"
+CONSTRAINED = os.environ.get("EXTRACTOR_CONSTRAINED", "0") == "1"
+
+# 추출 / 설명 생성이 모델 하나를 우선순위 큐로 나눠 쓰기 (inference_scheduler.py)
+# - 켜면 모든 generate 는 스케줄러 워커 스레드에서만 실행 (추출 우선, 설명은 남는 시간에 배치)
+# - USE_BATCHING 보다 우선 (스케줄러가 추출 요청도 배치로 묶음)
+USE_SCHEDULER = os.environ.get("EXTRACTOR_SCHEDULER", "0") == "1"
+
+# SYSTEM_PROMPT prefix 의 KV-cache 재사용 (prefix_cache.py)
+USE_PREFIX_CACHE = os.environ.get("EXTRACTOR_PREFIX_CACHE", "0") == "1"
+
+# assisted / speculative decoding (speculative.py)
+# - EXTRACTOR_DRAFT=prompt_lookup : 프롬프트 n-gram 복사 drafter
+# - EXTRACTOR_DRAFT=model         : 작은 draft 모델 (EXTRACTOR_DRAFT_MODEL)
+# - 배치 경로(USE_BATCHING)에서는 사용하지 않음 (assisted generation 은 batch size 1 전용)
+from speculative import (
+    DRAFT_MODE, SpeculationMeter, SpeculationStats, draft_generate_kwargs, draft_tokens_per_step,
 )
 
-# Qwen은 eos_token_id / pad_token_id 설정이 필요할 수 있음
-if model.config.eos_token_id is None and tokenizer.eos_token_id is not None:
-    model.config.eos_token_id = tokenizer.eos_token_id
-if model.config.pad_token_id is None:
-    model.config.pad_token_id = tokenizer.eos_token_id
 
 
 # =========================================================
-# 1. SYSTEM PROMPT (확장된 JSON 스키마)
+# 1~2. SYSTEM PROMPT & Post-process helpers → extractor_schema.py
 # =========================================================
 
-SYSTEM_PROMPT = """
-당신은 한국어 레시피 추천 시스템의 핵심 구성요소인
-"요리 의도·조건 추출기(Keyword & Constraint Extractor)" 입니다.
-
-당신의 임무는:
-사용자의 자연어 요리 요청에서 **모든 의미 있는 요소를 빠짐없이 구조화된 JSON으로 추출하는 것**입니다.
-
-출력 규칙은 반드시 다음을 따라야 합니다:
-
-────────────────────────────────────────
-📌 **① 출력 형식**
-
-오직 아래 JSON 스키마 형태의 JSON만 출력하십시오.
-문장 설명, 해설, 추가 문구는 절대 출력하지 마십시오.
-무조건 답변은 한국어로 하십시오.
-
-모든 필드는 반드시 존재해야 합니다.
-값이 비었으면 **빈 배열 또는 null** 로 채우십시오.
-
-JSON 스키마:
-
-{
-  "dish_type": [],                    // 요리 형태/종류
-  "method": [],                       // 조리 방식
-  "situation": [],                    // 먹는 상황/맥락
-  "must_ingredients": [],             // 반드시 포함되어야 하는 재료
-  "optional_ingredients": [],         // 들어가면 좋지만 필수는 아닌 재료
-  "exclude_ingredients": [],          // 절대 들어가면 안 되는 재료
-  "spiciness": "none" | "low" | "medium" | "high" | null,
-
-  "dietary_constraints": {
-    "vegetarian": bool,
-    "vegan": bool,
-    "no_beef": bool,
-    "no_pork": bool,
-    "no_chicken": bool,
-    "no_seafood": bool
-  },
-
-  "servings": {
-    "min": int or null,
-    "max": int or null
-  },
+from extractor_schema import SYSTEM_PROMPT, _postprocess_text_to_json
+from json_decoding import build_json_generation_kwargs
+import tracing
 
-  "max_cook_time_min": int or null,
-  "difficulty": [],
+_spec_stats = SpeculationStats()
 
-  "health_tags": [],                  // 건강, 목적, 영양 관련
-  "weather_tags": [],                 // 날씨/계절
-  "menu_style": [],                   // 국가/분류/스타일
-  "extra_keywords": [],               // 위 어디에도 속하지 않는 의미 있는 단어
 
-  "positive_tags": [],                // 사용자가 원함/좋아함
-  "negative_tags": [],                // 사용자가 싫어함/피하고 싶음
-
-  "free_text": string                 // 전체 요청의 자연어 요약
-}
+# =========================================================
+# 3. 실제 호출 함수: extract_keywords (원래 chat_template 방식 유지)
+# =========================================================
 
-────────────────────────────────────────
-📌 **② 각 필드의 세부 지침 (매우 중요)**
+def _generate_ids(user_prompt: str, json_stop: bool, constrained: bool, draft: str,
+                  **extra_generate_kwargs):
+    """단건 generate → (tokenizer, output_ids, prompt_len). extra_generate_kwargs 예: streamer"""
+    tokenizer, model = load_model()
+
+    gen_kwargs = dict(
+        max_new_tokens=256,
+        do_sample=False,         # deterministic하게
+        temperature=0.0,
+        pad_token_id=tokenizer.eos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        **draft_generate_kwargs(draft, model),
+        **extra_generate_kwargs,
+    )
 
-1) dish_type (요리 종류)
-- "찌개", "국", "볶음", "튀김", "조림", "덮밥", "비빔밥", "면 요리" 등
-- 가능하면 구체적 표현으로 추출
+    meter = None
+    if draft != "none":
+        # 요청별 streamer 로 측정 (공유 모델에 hook 을 걸면 동시 요청의 forward 가 섞임)
+        # prompt_len 은 finish 전에 채움 (prefix cache 경로는 generate 안에서 토큰화)
+        meter = SpeculationMeter(None, gen_kwargs["max_new_tokens"],
+                                 draft_tokens=draft_tokens_per_step(draft),
+                                 inner=gen_kwargs.pop("streamer", None))
+        gen_kwargs["streamer"] = meter
+
+    if USE_PREFIX_CACHE:
+        # SYSTEM_PROMPT prefix 는 cache 사본 재사용, user turn 만 prefill
+        with tracing.span("generate", prefix_cache=True, draft=draft) as s:
+            output_ids, prompt_len, _ = get_prefix_cache().generate(
+                user_prompt, json_stop=json_stop, constrained=constrained, **gen_kwargs
+            )
+            if s is not None:
+                s.attrs.update(prompt_tokens=int(prompt_len), new_tokens=int(output_ids.shape[-1] - prompt_len))
+        _record_speculation(meter, prompt_len, output_ids)
+        return tokenizer, output_ids, prompt_len
 
-2) method (조리 방식)
-- "끓이기", "볶기", "찜", "무침", "튀기기", "굽기" 등
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
 
-3) situation (먹는 상황)
-- "야식", "혼밥", "술안주", "손님 초대", "간단하게", "도시락", "캠핑" 등
-- 문맥에서 숨겨진 상황도 추론하여 포함 가능
+    # Qwen chat 템플릿 사용
+    text = tokenizer.apply_chat_template(
+        messages,
+        tokenize=False,
+        add_generation_prompt=True,
+    )
 
-4) must_ingredients 규칙(아주 중요):
+    inputs = tokenizer(text, return_tensors="pt").to(model.device)
+    prompt_len = inputs["input_ids"].shape[-1]
 
-  사용자가 특정 재료를 언급하며 “~ 요리 추천해줘”, “~ 넣어 먹고 싶다”, 
-  “~로 만들고 싶다”, “~ 요리가 땡긴다”, “~ 요리 먹고 싶어” 라고 말한 경우
-  → 해당 재료는 MUST INGREDIENT로 간주한다.
+    with tracing.span("generate", draft=draft) as s, torch.no_grad():
+        output_ids = model.generate(
+            **inputs,
+            **gen_kwargs,
+            **build_json_generation_kwargs(tokenizer, prompt_len, json_stop, constrained),
+        )
+        if s is not None:
+            s.attrs.update(prompt_tokens=int(prompt_len), new_tokens=int(output_ids.shape[-1] - prompt_len))
+    _record_speculation(meter, prompt_len, output_ids)
+    return tokenizer, output_ids, prompt_len
 
-  예:
-  - “돼지고기 요리 추천해줘” → must_ingredients: ["돼지고기"]
-  - “김치랑 버섯이랑 같이 먹고 싶다” → must_ingredients: ["김치","버섯"]
-  - “닭고기로 뭘 만들까?” → must_ingredients: ["닭고기"]
 
-5) optional_ingredients
-- “있으면 좋고”, “가능하면”, “추가로” 표현된 재료
+def _record_speculation(meter, prompt_len, output_ids):
+    if meter is not None:
+        meter.prompt_len = int(prompt_len)
+        _spec_stats.record(meter.finish(output_ids))
 
-6) exclude_ingredients
-- “싫어”, “알레르기”, “못먹어”, “빼고”, “제외해줘” 등
 
-7) spiciness
-- "안 매운", "매콤하게", "얼큰하게" 등 해석하여 4단계로 정규화:
-  - none, low, medium, high
+def _check_batched_args(json_stop, constrained, draft):
+    """배치 워커는 모듈 설정(JSON_STOP / CONSTRAINED, draft 없음)으로 만든 공용 워커 → 다른 값은 적용 불가"""
+    if (json_stop is not None and json_stop != JSON_STOP) or \
+            (constrained is not None and constrained != CONSTRAINED):
+        raise ValueError(
+            "json_stop / constrained can't be set per call with EXTRACTOR_BATCHING / EXTRACTOR_SCHEDULER "
+            "(use EXTRACTOR_JSON_STOP / EXTRACTOR_CONSTRAINED)"
+        )
+    if draft is not None and draft != "none":
+        raise ValueError("draft decoding is batch size 1 only; not available with "
+                         "EXTRACTOR_BATCHING / EXTRACTOR_SCHEDULER")
 
-8) dietary_constraints
-- "채식주의자" → vegetarian=true + no_beef/no_pork/no_chicken/no_seafood=true, 어떠한 형태의 고기요리나 생선요리도 포함되면 안돼
-- "비건" → vegan=true + 위 조건 모두 true
-- “고기 안 먹어” → no_beef/no_pork/no_chicken 모두 true
-- 특정 육류만 싫어하면 해당 항목만 true
 
-9) servings
-- "1인분", "혼자 먹을 거야" → min=1, max=1
-- "4명", "가족" → 추론 가능하면 넣고, 불확실하면 null
+def extract_keywords(user_prompt: str, json_stop: bool = None, constrained: bool = None,
+                     draft: str = None) -> dict:
+    """
+    한국어 자유 프롬프트를 입력받아 레시피 검색용 키워드를 JSON으로 추출.
+    - 4bit Qwen2.5-14B (multi-GPU) 사용
+    - SYSTEM_PROMPT에 정의된 확장 스키마로
+      health_tags / weather_tags / menu_style / extra_keywords까지 포함
+    - USE_BATCHING=True 이면 동시 요청과 묶어서 한 번에 generate
+    - json_stop / constrained: None 이면 모듈 설정(JSON_STOP / CONSTRAINED) 사용
+    - draft: "none" / "prompt_lookup" / "model" (None 이면 DRAFT_MODE)
+      (USE_SCHEDULER / USE_BATCHING 이면 호출별 값은 못 바꿈 → 모듈 설정과 다르면 ValueError)
+    """
+    if USE_SCHEDULER or USE_BATCHING:
+        _check_batched_args(json_stop, constrained, draft)
+        worker = get_scheduler() if USE_SCHEDULER else get_batcher()
+        return worker.extract_keywords(user_prompt)
 
-10) max_cook_time_min
-- "10분 안에", "빨리", "간단히" → 명확히 숫자가 있을 때만 기입
-- 숫자가 없으면 null
+    json_stop = JSON_STOP if json_stop is None else json_stop
+    constrained = CONSTRAINED if constrained is None else constrained
+    draft = DRAFT_MODE if draft is None else draft
 
-11) difficulty
-- "간단한", "쉽게", "어려운 요리" 등 난이도 표현 그대로 단어로 넣기
+    tokenizer, output_ids, prompt_len = _generate_ids(user_prompt, json_stop, constrained, draft)
 
-12) health_tags
-- "다이어트", "고단백", "저염식", "저칼로리", "영양식" 등
+    # 프롬프트 부분을 잘라내고 생성된 토큰만 디코딩
+    gen_ids = output_ids[0][prompt_len:]
+    output_text = tokenizer.decode(gen_ids, skip_special_tokens=True)
 
-13) weather_tags
-- "추운 날", "더운 날", "비오는 날", "겨울", "여름" 등
+    return _postprocess_text_to_json(output_text, fallback_prompt=user_prompt)
 
-14) menu_style
-- "한식", "중식", "양식", "분식", "디저트", "안주", "브런치", "한 그릇" 등
 
-15) extra_keywords
-- 위 항목들 어디에도 속하지 않지만 의미 있는 단어
-  예: "백종원 레시피", "에어프라이어", "명절", "칼칼한", "간편식"
+def stream_extract_keywords(user_prompt: str, json_stop: bool = None, constrained: bool = None,
+                            draft: str = None):
+    """
+    스트리밍 추출. 디코딩 중에 최상위 필드가 완성될 때마다 이벤트를 yield:
+      ("field", key, value)   # value 는 후처리 전 모델 출력 그대로
+      ("done", None, result)  # extract_keywords 와 같은 후처리 결과
+    (USE_SCHEDULER / USE_BATCHING 이면 모델을 직접 부르지 않고, 전체 추출 후 필드를 한꺼번에 yield)
+    """
+    from transformers import TextIteratorStreamer
+    from incremental_json import IncrementalJsonParser
+
+    if USE_SCHEDULER or USE_BATCHING:
+        result = extract_keywords(user_prompt, json_stop=json_stop, constrained=constrained, draft=draft)
+        for key, value in result.items():
+            yield ("field", key, value)
+        yield ("done", None, result)
+        return
+
+    json_stop = JSON_STOP if json_stop is None else json_stop
+    constrained = CONSTRAINED if constrained is None else constrained
+    draft = DRAFT_MODE if draft is None else draft
+
+    tokenizer, _ = load_model()
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    error = []
+
+    def _run():
+        try:
+            _generate_ids(user_prompt, json_stop, constrained, draft, streamer=streamer)
+        except Exception as e:
+            error.append(e)
+            streamer.end()
+
+    worker = threading.Thread(target=_run, name="extractor-stream", daemon=True)
+    worker.start()
+
+    parser = IncrementalJsonParser()
+    chunks = []
+    for chunk in streamer:
+        chunks.append(chunk)
+        for key, value in parser.feed(chunk):
+            yield ("field", key, value)
+    worker.join()
+    if error:
+        raise error[0]
+
+    yield ("done", None, _postprocess_text_to_json("".join(chunks), fallback_prompt=user_prompt))
 
-16) positive_tags
-- “좋아해”, “먹고 싶어”, “원해”, “ craving ” 등 감정/선호 기반
 
-17) negative_tags
-- “싫어”, “별로”, “꺼려져”, "먹기 싫어"
+# =========================================================
+# 4. 동적 배치 스케줄러 (싱글톤)
+# =========================================================
 
-18) free_text
-- 전체 사용자 요청을 자연스럽고 간결하게 요약한 1~2문장
-- 단순 요약이 아니라, 다음 내용을 반드시 포함해야 함:
-  1) 사용자가 어떤 상황에서 어떤 종류의 음식을 원하고 있는지
-  2) 재료/식단 제한/취향 조건이 서로 모순되거나 비현실적인지 여부
-  3) 모순·위험·비현실적인 조건이 있다면,
-     "요청을 그대로 만족시키기 어렵다"는 점과
-     어떤 방향(예: 비건 유지, 알레르기 회피 등)을 우선해야 하는지 제안
+_batcher = None
+_batcher_lock = threading.Lock()
 
-────────────────────────────────────────
-📌 **③ 절대적으로 지켜야 할 3가지**
 
-1. 출력은 반드시 **JSON 단독**이어야 함 (앞뒤 추가 텍스트 금지)  
-2. JSON 스키마의 **모든 필드**를 반드시 출력  
-3. 빈 값도 반드시 포함 (절대 필드 누락 금지)
+def get_batcher():
+    """tokenizer / model 을 공유하는 BatchingExtractor 를 한 번만 만들어 재사용"""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            from extractor_batcher import BatchingExtractor
+            tokenizer, model = load_model()
+            _batcher = BatchingExtractor(
+                tokenizer, model,
+                max_batch_size=BATCH_MAX_SIZE,
+                max_wait_ms=BATCH_MAX_WAIT_MS,
+                max_new_tokens=256,
+                json_stop=JSON_STOP,
+                constrained=CONSTRAINED,
+            ).start()
+    return _batcher
 
-────────────────────────────────────────
 
-지금부터 사용자 입력이 들어오면
-위 스키마에 맞춰 **정확하고 완전한 JSON**만 출력하십시오.
-"""
+# =========================================================
+# 5. SYSTEM_PROMPT KV-cache prefix (싱글톤)
+# =========================================================
 
+_prefix_cache = None
+_prefix_cache_lock = threading.Lock()
 
 
-# =========================================================
-# 2. Post-process helpers
-# =========================================================
+def get_prefix_cache():
+    """prefix 토큰 / past_key_values 를 한 번만 계산해서 재사용"""
+    global _prefix_cache
+    with _prefix_cache_lock:
+        if _prefix_cache is None:
+            from prefix_cache import SystemPromptPrefixCache
+            tokenizer, model = load_model()
+            _prefix_cache = SystemPromptPrefixCache(tokenizer, model, SYSTEM_PROMPT).build()
+    return _prefix_cache
 
-def _ensure_list(x):
-    if x is None:
-        return []
-    if isinstance(x, str):
-        if not x.strip():
-            return []
-        return [x]
-    return list(x)
-
-def _unique_preserve_order(lst):
-    seen = set()
-    out = []
-    for x in lst:
-        if x not in seen:
-            seen.add(x)
-            out.append(x)
-    return out
-
-def _dedup_by_norm_space_lower(tags):
-    """
-    ['추운 날', '추운날'] 같이 공백/대소문자만 다른 중복을 하나로 정리.
-    """
-    norm_seen = set()
-    out = []
-    for t in _ensure_list(tags):
-        norm = str(t).replace(" ", "").lower()
-        if norm in norm_seen:
-            continue
-        norm_seen.add(norm)
-        out.append(t)
-    return out
-
-
-def _postprocess_text_to_json(output_text: str, fallback_prompt: str) -> dict:
-    """
-    - LLM이 출력한 JSON 텍스트를 파싱
-    - 누락/타입 이상 필드 보정
-    - positive_tags → health_tags / extra_keywords 확장
-    - weather_tags는 LLM 출력만 사용하되, 표기 중복만 정리
-    """
-    output_text = output_text.strip()
-
-    # ```json ... ``` 형태 제거
-    if output_text.startswith("```"):
-        output_text = output_text.strip("`").strip()
-        if output_text.startswith("json"):
-            output_text = output_text[4:].strip()
-
-    try:
-        data = json.loads(output_text)
-    except json.JSONDecodeError:
-        data = {}
-
-    # 1) 기본 골격 (확장된 스키마 기준)
-    base = {
-        "dish_type": [],
-        "method": [],
-        "situation": [],
-        "must_ingredients": [],
-        "optional_ingredients": [],
-        "exclude_ingredients": [],
-        "spiciness": None,
-        "dietary_constraints": {
-            "vegetarian": False,
-            "vegan": False,
-            "no_beef": False,
-            "no_pork": False,
-            "no_chicken": False,
-            "no_seafood": False,
-        },
-        "servings": {"min": None, "max": None},
-        "max_cook_time_min": None,
-        "difficulty": [],
-
-        "health_tags": [],
-        "weather_tags": [],
-        "menu_style": [],
-        "extra_keywords": [],
-
-        "positive_tags": [],
-        "negative_tags": [],
-        "free_text": fallback_prompt,
-    }
-
-    if not isinstance(data, dict):
-        data = {}
-
-    merged = base.copy()
-    merged.update({k: v for k, v in data.items() if v is not None})
-
-    # 리스트 필드 정규화
-    list_fields = [
-        "dish_type", "method", "situation",
-        "must_ingredients", "optional_ingredients", "exclude_ingredients",
-        "difficulty",
-        "health_tags", "weather_tags", "menu_style", "extra_keywords",
-        "positive_tags", "negative_tags",
-    ]
-    for k in list_fields:
-        merged[k] = _ensure_list(merged.get(k))
-
-    # dietary_constraints 보정
-    dc = merged.get("dietary_constraints") or {}
-    merged["dietary_constraints"] = {
-        "vegetarian": bool(dc.get("vegetarian", False)),
-        "vegan": bool(dc.get("vegan", False)),
-        "no_beef": bool(dc.get("no_beef", False)),
-        "no_pork": bool(dc.get("no_pork", False)),
-        "no_chicken": bool(dc.get("no_chicken", False)),
-        "no_seafood": bool(dc.get("no_seafood", False)),
-    }
-
-    # servings 보정
-    serv = merged.get("servings") or {}
-    merged["servings"] = {
-        "min": serv.get("min"),
-        "max": serv.get("max"),
-    }
-
-    # spiciness 정규화
-    valid_sp = {"none", "low", "medium", "high", None}
-    sp = merged.get("spiciness")
-    if isinstance(sp, str):
-        sp = sp.lower().strip()
-        if sp not in valid_sp:
-            sp = None
-    elif sp not in valid_sp:
-        sp = None
-    merged["spiciness"] = sp
-
-    # free_text 보정
-    if not isinstance(merged.get("free_text"), str) or not merged["free_text"].strip():
-        merged["free_text"] = fallback_prompt
-
-    # positive_tags → health_tags / extra_keywords 확장
-    pos = merged.get("positive_tags", [])
-    merged["health_tags"] = _unique_preserve_order(merged["health_tags"] + pos)
-    merged["extra_keywords"] = _unique_preserve_order(merged["extra_keywords"] + pos)
-
-    # weather_tags는 LLM 출력만 신뢰, 대신 공백/대소문자 기준 중복 제거
-    merged["weather_tags"] = _dedup_by_norm_space_lower(merged["weather_tags"])
-
-    return merged
 
 
 # =========================================================
-# 3. 실제 호출 함수: extract_keywords (원래 chat_template 방식 유지)
+# 6. 추출 / 설명 공용 우선순위 스케줄러 (싱글톤)
 # =========================================================
 
-def extract_keywords(user_prompt: str) -> dict:
-    """
-    한국어 자유 프롬프트를 입력받아 레시피 검색용 키워드를 JSON으로 추출.
-    - 4bit Qwen2.5-14B (multi-GPU) 사용
-    - SYSTEM_PROMPT에 정의된 확장 스키마로
-      health_tags / weather_tags / menu_style / extra_keywords까지 포함
-    """
+_scheduler = None
+_scheduler_lock = threading.Lock()
 
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": user_prompt},
-    ]
 
-    # Qwen chat 템플릿 사용
-    text = tokenizer.apply_chat_template(
-        messages,
-        tokenize=False,
-        add_generation_prompt=True,
-    )
+def get_scheduler():
+    """모델 호출을 전담하는 InferenceScheduler 를 한 번만 만들어 재사용"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            from inference_scheduler import InferenceScheduler
+            _scheduler = InferenceScheduler(
+                extraction_batch=BATCH_MAX_SIZE,
+                json_stop=JSON_STOP,
+                constrained=CONSTRAINED,
+            ).start()
+    return _scheduler
 
-    inputs = tokenizer(text, return_tensors="pt").to(model.device)
 
-    with torch.no_grad():
-        output_ids = model.generate(
-            **inputs,
-            max_new_tokens=256,
-            do_sample=False,         # deterministic하게
-            temperature=0.0,
-            pad_token_id=tokenizer.eos_token_id,
-            eos_token_id=tokenizer.eos_token_id,
-        )
+def get_speculation_stats() -> dict:
+    """draft 사용 요청들의 누적 acceptance rate / tokens per second"""
+    return _spec_stats.summary()
 
-    # 프롬프트 부분을 잘라내고 생성된 토큰만 디코딩
-    gen_ids = output_ids[0][inputs["input_ids"].shape[-1]:]
-    output_text = tokenizer.decode(gen_ids, skip_special_tokens=True)
-
-    return _postprocess_text_to_json(output_text, fallback_prompt=user_prompt)
 
 # 파일 맨 아래 근처
-__all__ = ["extract_keywords", "tokenizer", "model"]
+__all__ = ["extract_keywords", "stream_extract_keywords", "load_model", "warm_up",
+           "get_batcher", "get_prefix_cache", "get_scheduler", "get_speculation_stats",
+           "tokenizer", "model"]
@@ -0,0 +1,404 @@
+# openai_pool.py
+# 공유 async OpenAI 클라이언트 (park_extractor_model / app.embed_query 공용)
+#
+# - AsyncOpenAI + httpx.AsyncClient 하나를 프로세스 전체에서 재사용 (keep-alive 커넥션 풀)
+# - 백그라운드 이벤트 루프 스레드 하나에서 실행 → Flask 워커 스레드는 run_sync() 로 결과만 기다림
+#   (asgi_app 처럼 자기 이벤트 루프가 있으면 run_async() 로 await)
+# - 동시 요청 수 상한 (semaphore) + token bucket 으로 초당 요청 수 제한
+# - 호출별 deadline, 재시도는 지수 backoff + full jitter 로 deadline 안에서만
+# - metrics(): 호출 수 / 재시도 / 실패 / 대기 시간 / p50·p95 지연
+#
+# 로컬 stub 서버로 벤치마크:  python openai_pool.py
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+from openai import AsyncOpenAI
+import openai
+
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL")            # None 이면 api.openai.com
+MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", "16"))
+RATE_PER_S = float(os.environ.get("OPENAI_RATE_PER_S", "20"))  # token bucket 충전 속도
+BURST = int(os.environ.get("OPENAI_BURST", "40"))              # token bucket 용량
+DEADLINE_S = float(os.environ.get("OPENAI_DEADLINE_S", "30"))
+MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", "3"))
+
+# 재시도해도 되는 에러 (4xx 중 429 만, 나머지는 바로 실패)
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,    # APITimeoutError 포함
+    openai.InternalServerError,
+    asyncio.TimeoutError,
+)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def _percentile(values, q: float):
+    if not values:
+        return None
+    s = sorted(values)
+    idx = min(len(s) - 1, max(0, int(round(q / 100.0 * (len(s) - 1)))))
+    return s[idx]
+
+
+# =========================================================
+# 1. token bucket
+# =========================================================
+
+class TokenBucket:
+    """rate 개/초 로 충전, capacity 까지 쌓임. 이벤트 루프 안에서만 사용."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, deadline: float):
+        """토큰 하나를 얻을 때까지 대기 (deadline 넘으면 DeadlineExceeded)"""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+                if time.monotonic() + wait > deadline:
+                    raise DeadlineExceeded("rate limit wait exceeds deadline")
+                await asyncio.sleep(wait)
+
+
+# =========================================================
+# 2. 풀
+# =========================================================
+
+class OpenAIPool:
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = OPENAI_BASE_URL,
+        max_concurrency: int = MAX_CONCURRENCY,
+        rate_per_s: float = RATE_PER_S,
+        burst: int = BURST,
+        deadline_s: float = DEADLINE_S,
+        max_retries: int = MAX_RETRIES,
+        latency_window: int = 1000,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.rate_per_s = rate_per_s
+        self.burst = burst
+        self.deadline_s = deadline_s
+        self.max_retries = max_retries
+
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._sem = None
+        self._bucket = None
+        self._start_lock = threading.Lock()
+
+        self._m_lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self._m = {"calls": 0, "ok": 0, "failed": 0, "retries": 0,
+                   "deadline_exceeded": 0, "in_flight": 0, "queue_wait_s_total": 0.0}
+
+    # ---------- lifecycle ----------
+    def start(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return self
+            if not self.api_key and self.base_url is None:
+                # 빈 키로 api.openai.com 에 보내면 매 요청 401 → 시작할 때 바로 실패
+                raise RuntimeError("OPENAI_API_KEY is not set")
+            ready = threading.Event()
+
+            def _run():
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                self._loop = loop
+                ready.set()
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=_run, name="openai-pool", daemon=True)
+            self._thread.start()
+            ready.wait()
+            asyncio.run_coroutine_threadsafe(self._init_async(), self._loop).result()
+        return self
+
+    async def _init_async(self):
+        # 커넥션 풀 크기 = 동시 요청 상한
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+            timeout=httpx.Timeout(self.deadline_s, connect=5.0),
+        )
+        self._client = AsyncOpenAI(
+            api_key=self.api_key or "EMPTY",      # 키 없이 쓰는 로컬 호환 서버(base_url)용
+            base_url=self.base_url,
+            http_client=http_client,
+            max_retries=0,          # 재시도는 여기서 deadline 기준으로 직접
+        )
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        self._bucket = TokenBucket(self.rate_per_s, self.burst)
+
+    def close(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+
+    # ---------- 호출 ----------
+    def _count(self, key, n=1):
+        with self._m_lock:
+            self._m[key] += n
+
+    async def call(self, fn, deadline_s: float = None):
+        """
+        fn: AsyncOpenAI client → awaitable  (예: lambda c: c.embeddings.create(...))
+        deadline_s 안에 (대기 + 재시도 포함) 끝나지 않으면 DeadlineExceeded
+        """
+        deadline = time.monotonic() + (deadline_s or self.deadline_s)
+        t0 = time.perf_counter()
+        self._count("calls")
+        attempt = 0
+        try:
+            while True:
+                try:
+                    t_wait = time.perf_counter()
+                    await self._bucket.acquire(deadline)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DeadlineExceeded("deadline exceeded before acquiring slot")
+                    await asyncio.wait_for(self._sem.acquire(), remaining)
+                    self._count("queue_wait_s_total", time.perf_counter() - t_wait)
+                    try:
+                        self._count("in_flight")
+                        remaining = deadline - time.monotonic()
+                        result = await asyncio.wait_for(fn(self._client), max(remaining, 0.001))
+                    finally:
+                        self._count("in_flight", -1)
+                        self._sem.release()
+                    self._count("ok")
+                    return result
+                except RETRYABLE_ERRORS as e:
+                    attempt += 1
+                    # full jitter: [0, base * 2^attempt)
+                    backoff = random.uniform(0, min(8.0, 0.25 * (2 ** attempt)))
+                    if attempt > self.max_retries or time.monotonic() + backoff >= deadline:
+                        if isinstance(e, asyncio.TimeoutError):
+                            raise DeadlineExceeded("deadline exceeded") from e
+                        raise
+                    self._count("retries")
+                    await asyncio.sleep(backoff)
+        except DeadlineExceeded:
+            self._count("deadline_exceeded")
+            self._count("failed")
+            raise
+        except Exception:
+            self._count("failed")
+            raise
+        finally:
+            with self._m_lock:
+                self._latencies.append(time.perf_counter() - t0)
+
+    def run_sync(self, fn, deadline_s: float = None):
+        """동기 코드(Flask 핸들러 등)에서 호출: 이벤트 루프 스레드에 맡기고 결과 대기"""
+        self.start()
+        fut = asyncio.run_coroutine_threadsafe(self.call(fn, deadline_s), self._loop)
+        return fut.result()
+
+    async def run_async(self, fn, deadline_s: float = None):
+        """다른 이벤트 루프(asgi_app 등)에서 await: 풀의 루프에서 실행하고 결과만 받음"""
+        self.start()
+        fut = asyncio.run_coroutine_threadsafe(self.call(fn, deadline_s), self._loop)
+        return await asyncio.wrap_future(fut)
+
+    # ---------- 편의 함수 ----------
+    def responses_create(self, deadline_s: float = None, **kwargs):
+        return self.run_sync(lambda c: c.responses.create(**kwargs), deadline_s)
+
+    def embeddings_create(self, deadline_s: float = None, **kwargs):
+        return self.run_sync(lambda c: c.embeddings.create(**kwargs), deadline_s)
+
+    async def embeddings_create_async(self, deadline_s: float = None, **kwargs):
+        return await self.run_async(lambda c: c.embeddings.create(**kwargs), deadline_s)
+
+    def metrics(self) -> dict:
+        with self._m_lock:
+            m = dict(self._m)
+            lat = list(self._latencies)
+        return {
+            **m,
+            "p50_latency_s": _percentile(lat, 50),
+            "p95_latency_s": _percentile(lat, 95),
+            "p99_latency_s": _percentile(lat, 99),
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> OpenAIPool:
+    """프로세스 공용 풀 (첫 사용 시 이벤트 루프 시작)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 키는 import 시점이 아니라 첫 사용 시 읽음 (app.py 의 load_dotenv() 이후)
+            _pool = OpenAIPool(api_key=os.environ.get("OPENAI_API_KEY")).start()
+    return _pool
+
+
+# =========================================================
+# 3. 로컬 stub 서버 + 벤치마크
+# =========================================================
+
+def start_stub_server(port: int = 0, delay_s: float = 0.05, fail_rate: float = 0.0, stats: dict = None):
+    """
+    /v1/responses, /v1/embeddings 만 흉내 내는 로컬 서버 (delay_s 만큼 지연, fail_rate 확률로 500)
+    stats 를 주면 요청 수 / 최대 동시 처리 수 / 클라이언트 포트 / Authorization 헤더를 기록
+    리턴: (server, base_url)
+    """
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    stats_lock = threading.Lock()
+    if stats is not None:
+        stats.update(requests=0, in_flight=0, max_in_flight=0, client_ports=set(), authorization=set())
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(n)
+            if stats is not None:
+                with stats_lock:
+                    stats["requests"] += 1
+                    stats["in_flight"] += 1
+                    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+                    stats["client_ports"].add(self.client_address[1])
+                    stats["authorization"].add(self.headers.get("Authorization"))
+            try:
+                self._respond()
+            finally:
+                if stats is not None:
+                    with stats_lock:
+                        stats["in_flight"] -= 1
+
+        def _respond(self):
+            time.sleep(delay_s)
+            if random.random() < fail_rate:
+                body = b'{"error": {"message": "stub failure", "type": "server_error"}}'
+                self.send_response(500)
+            else:
+                if self.path.endswith("/embeddings"):
+                    payload = {
+                        "object": "list", "model": "stub",
+                        "data": [{"object": "embedding", "index": 0, "embedding": [0.1, 0.2, 0.3]}],
+                        "usage": {"prompt_tokens": 1, "total_tokens": 1},
+                    }
+                else:
+                    payload = {
+                        "id": "resp_stub", "object": "response", "created_at": 0, "model": "stub",
+                        "status": "completed",
+                        "output": [{
+                            "type": "message", "id": "msg_stub", "role": "assistant", "status": "completed",
+                            "content": [{"type": "output_text", "text": '{"dish_type": ["국"]}',
+                                         "annotations": []}],
+                        }],
+                    }
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def benchmark(n_requests: int = 200, burst_threads: int = 64, delay_s: float = 0.05,
+              fail_rate: float = 0.0) -> dict:
+    """
+    bursty 부하: burst_threads 개 스레드가 동시에 n_requests 개 embeddings 호출.
+      1) 기존 방식 — 요청마다 동기 OpenAI() 클라이언트 생성 (풀/재시도/제한 없음)
+      2) 공유 OpenAIPool
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from openai import OpenAI
+
+    server, base_url = start_stub_server(delay_s=delay_s, fail_rate=fail_rate)
+
+    def _run(fn):
+        lat, errors = [], 0
+
+        def one(_):
+            t0 = time.perf_counter()
+            try:
+                fn()
+                return time.perf_counter() - t0, False
+            except Exception:
+                return time.perf_counter() - t0, True
+
+        t_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=burst_threads) as ex:
+            for dt, err in ex.map(one, range(n_requests)):
+                lat.append(dt)
+                errors += err
+        total = time.perf_counter() - t_start
+        return {
+            "throughput_rps": n_requests / total,
+            "p50_latency_s": _percentile(lat, 50),
+            "p95_latency_s": _percentile(lat, 95),
+            "p99_latency_s": _percentile(lat, 99),
+            "errors": errors,
+        }
+
+    def sync_call():
+        c = OpenAI(api_key="EMPTY", base_url=base_url, max_retries=0)
+        c.embeddings.create(model="stub", input=["계란"])
+
+    pool = OpenAIPool(api_key="EMPTY", base_url=base_url, max_concurrency=16,
+                      rate_per_s=1000, burst=100).start()
+
+    def pooled_call():
+        pool.embeddings_create(model="stub", input=["계란"])
+
+    try:
+        res = {"sync_per_request": _run(sync_call), "pooled": _run(pooled_call)}
+        res["pooled"]["metrics"] = pool.metrics()
+    finally:
+        pool.close()
+        server.shutdown()
+    return res
+
+
+if __name__ == "__main__":
+    for name, r in benchmark().items():
+        print(name, r)
@@ -2,7 +2,7 @@ from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
 import torch
 import json
 import os
-from openai import OpenAI
+from openai_pool import get_pool
 
 # =========================================================
 # 0. 모델 경로 & 4bit 설정 (원래 코드 유지)
@@ -33,14 +33,11 @@ max_memory = {
 
 print("Loading OpenAI client...")
 
-# 🔹 OpenAI API 키 설정 (여기에 본인 키 넣으세요)
-os.environ["OPENAI_API_KEY"] =""
-#OPENAI_API_KEY=""
+# 🔹 OpenAI API 키는 환경변수 / .env 의 OPENAI_API_KEY 사용 (코드에서 덮어쓰지 않음)
+#    → openai_pool.get_pool() 이 첫 호출 때 읽어서 클라이언트에 명시적으로 넘김
 
-# 🔹 OpenAI Python SDK 클라이언트
-client = OpenAI(
-    api_key=os.environ.get("OPENAI_API_KEY")
-)
+# 🔹 OpenAI 클라이언트는 openai_pool 의 공유 async 풀 사용
+#    (keep-alive 커넥션 풀 / 동시성·rate 제한 / deadline / 재시도 — 첫 호출 시 시작)
 
 # 🔹 로컬 Qwen 모델은 더 이상 사용하지 않으므로 placeholder 로 둡니다.
 tokenizer = None
@@ -374,7 +371,7 @@ def extract_keywords(user_prompt: str) -> dict:
     # system / user 역할을 줄 수 있음.
     # - instructions: SYSTEM_PROMPT (역할/스키마 설명)
     # - input: 실제 user_prompt
-    response = client.responses.create(
+    response = get_pool().responses_create(
         model=MODEL_NAME,
         instructions=SYSTEM_PROMPT,
         input=user_prompt,
@@ -394,6 +391,9 @@ __all__ = ["extract_keywords", "tokenizer", "model"]
 
 import csv
 import os
+import time
+
+from extraction_log import get_writer
 
 # 결과를 저장할 CSV 경로 (원하는 이름으로 바꿔도 됩니다)
 CSV_PATH = "keyword_extract_log.csv"
@@ -470,13 +470,20 @@ def save_result_to_csv(user_prompt: str, result: dict, csv_path: str = CSV_PATH)
         writer.writerow(row)
 
 
-def run_and_log(user_prompt: str, csv_path: str = CSV_PATH):
+def run_and_log(user_prompt: str, csv_path: str = None):
     """
     편하게 쓰라고 만든 헬퍼 함수:
     - extract_keywords(user_prompt) 실행
-    - 결과를 CSV에 저장
+    - 결과를 로그에 저장
+      · csv_path 를 주면 예전처럼 그 CSV 에 바로 append
+      · 안 주면 extraction_log 버퍼 writer 로 (요청 경로에서 파일 I/O 없음, 과부하 시 버림)
     - 결과 dict를 그대로 리턴
     """
+    t0 = time.perf_counter()
     result = extract_keywords(user_prompt)
-    save_result_to_csv(user_prompt, result, csv_path=csv_path)
+    if csv_path is not None:
+        save_result_to_csv(user_prompt, result, csv_path=csv_path)
+    else:
+        get_writer().log(user_prompt, result, backend="openai",
+                         latency_ms=(time.perf_counter() - t0) * 1000.0)
     return result
@@ -0,0 +1,182 @@
+# prefix_cache.py
+# SYSTEM_PROMPT 부분의 KV-cache 를 시작 시 한 번만 만들어 두고 재사용
+#
+# - chat_template 결과에서 "사용자 입력 직전까지" 가 prefix (모든 요청에서 동일)
+# - prefix 토큰 / past_key_values 를 미리 계산해 두고,
+#   요청마다 cache 사본 위에 user turn 만 prefill
+# - 토큰 경계가 어긋나거나 cache 를 쓸 수 없으면 일반 generate 로 fallback
+import copy
+import threading
+import time
+
+import torch
+
+from extractor_schema import SYSTEM_PROMPT
+from json_decoding import build_json_generation_kwargs
+
+_USER_SENTINEL = "<<<__USER_PROMPT__>>>"
+
+
+class SystemPromptPrefixCache:
+    def __init__(self, tokenizer, model, system_prompt: str = SYSTEM_PROMPT):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.system_prompt = system_prompt
+
+        self.prefix_ids = None          # (1, P)
+        self.past_key_values = None     # prefix 의 KV-cache
+        self.prefix_prefill_s = None    # prefix prefill 1회 비용 (= 요청당 절약되는 시간의 상한)
+
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "fallbacks": 0, "saved_s_total": 0.0, "copy_s_total": 0.0}
+        self.last_error = None
+
+    # ---------- build ----------
+    def _chat_text(self, user_prompt: str) -> str:
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        return self.tokenizer.apply_chat_template(
+            messages,
+            tokenize=False,
+            add_generation_prompt=True,
+        )
+
+    def build(self):
+        """prefix 토큰화 + prefill 해서 past_key_values 저장 (시작 시 1회)"""
+        full = self._chat_text(_USER_SENTINEL)
+        prefix_text = full[: full.index(_USER_SENTINEL)]
+
+        ids = self.tokenizer(prefix_text, return_tensors="pt")["input_ids"].to(self.model.device)
+
+        t0 = time.perf_counter()
+        with torch.no_grad():
+            out = self.model(input_ids=ids, use_cache=True)
+        if ids.is_cuda:
+            torch.cuda.synchronize(ids.device)
+        self.prefix_prefill_s = time.perf_counter() - t0
+
+        self.prefix_ids = ids
+        self.past_key_values = out.past_key_values
+        print(f"[prefix-cache] prefix {ids.shape[-1]} tokens, prefill {self.prefix_prefill_s:.4f}초")
+        return self
+
+    @property
+    def ready(self) -> bool:
+        return self.past_key_values is not None
+
+    # ---------- generate ----------
+    def _matches_prefix(self, input_ids) -> bool:
+        p = self.prefix_ids.shape[-1]
+        if input_ids.shape[0] != 1 or input_ids.shape[-1] <= p:
+            return False
+        return bool(torch.equal(input_ids[:, :p], self.prefix_ids))
+
+    def generate(self, user_prompt: str, json_stop: bool = False, constrained: bool = False,
+                 **generate_kwargs):
+        """
+        extract_keywords 와 같은 입력으로 generate.
+        리턴: (output_ids, prompt_len, used_cache)
+        """
+        text = self._chat_text(user_prompt)
+        inputs = self.tokenizer(text, return_tensors="pt").to(self.model.device)
+        prompt_len = inputs["input_ids"].shape[-1]
+
+        def _json_kwargs():
+            # stopping criteria / logits processor 는 상태가 있으므로 generate 호출마다 새로 생성
+            return build_json_generation_kwargs(self.tokenizer, prompt_len, json_stop, constrained)
+
+        if self.ready and self._matches_prefix(inputs["input_ids"]):
+            try:
+                t0 = time.perf_counter()
+                cache = copy.deepcopy(self.past_key_values)
+                copy_s = time.perf_counter() - t0
+
+                with torch.no_grad():
+                    output_ids = self.model.generate(
+                        **inputs,
+                        past_key_values=cache,
+                        **generate_kwargs,
+                        **_json_kwargs(),
+                    )
+                with self._lock:
+                    self._stats["hits"] += 1
+                    self._stats["copy_s_total"] += copy_s
+                    self._stats["saved_s_total"] += max(0.0, self.prefix_prefill_s - copy_s)
+                return output_ids, prompt_len, True
+            except Exception as e:
+                # 모델/캐시 구현이 prefix 재사용을 지원하지 않는 경우 등
+                print("[WARN] prefix cache generate failed, fallback:", e)
+                self.last_error = str(e)
+
+        with self._lock:
+            self._stats["fallbacks"] += 1
+        with torch.no_grad():
+            output_ids = self.model.generate(**inputs, **generate_kwargs, **_json_kwargs())
+        return output_ids, prompt_len, False
+
+    # ---------- 측정 ----------
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+        hits = s["hits"]
+        return {
+            "prefix_tokens": int(self.prefix_ids.shape[-1]) if self.prefix_ids is not None else 0,
+            "prefix_prefill_s": self.prefix_prefill_s,
+            "hits": hits,
+            "fallbacks": s["fallbacks"],
+            "avg_copy_s": (s["copy_s_total"] / hits) if hits else None,
+            "avg_saved_prefill_s": (s["saved_s_total"] / hits) if hits else None,
+            "last_error": self.last_error,
+        }
+
+    def measure_prefill_saving(self, user_prompt: str) -> dict:
+        """
+        한 요청에 대해 실제 prefill 시간을 비교:
+          - full: prefix + user turn 전체 prefill
+          - cached: cache 사본 복사 + user turn 만 prefill
+        """
+        text = self._chat_text(user_prompt)
+        ids = self.tokenizer(text, return_tensors="pt")["input_ids"].to(self.model.device)
+        if not (self.ready and self._matches_prefix(ids)):
+            return {"full_s": None, "cached_s": None, "saved_s": None}
+
+        def _sync():
+            if ids.is_cuda:
+                torch.cuda.synchronize(ids.device)
+
+        with torch.no_grad():
+            t0 = time.perf_counter()
+            self.model(input_ids=ids, use_cache=True)
+            _sync()
+            full_s = time.perf_counter() - t0
+
+            p = self.prefix_ids.shape[-1]
+            t0 = time.perf_counter()
+            cache = copy.deepcopy(self.past_key_values)
+            self.model(
+                input_ids=ids[:, p:],
+                past_key_values=cache,
+                cache_position=torch.arange(p, ids.shape[-1], device=ids.device),
+                use_cache=True,
+            )
+            _sync()
+            cached_s = time.perf_counter() - t0
+
+        return {"full_s": full_s, "cached_s": cached_s, "saved_s": full_s - cached_s}
+
+
+if __name__ == "__main__":
+    # 예) BENCH_MODEL=Qwen/Qwen2.5-0.5B-Instruct python prefix_cache.py
+    import os
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    bench_model = os.environ.get("BENCH_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
+    tok = AutoTokenizer.from_pretrained(bench_model)
+    mdl = AutoModelForCausalLM.from_pretrained(bench_model, torch_dtype=torch.float32)
+    mdl.eval()
+
+    pc = SystemPromptPrefixCache(tok, mdl).build()
+    for p in ["계란 들어간 30분 이내 요리", "비 오는 날 얼큰한 국물 요리 추천해줘"]:
+        print(p, pc.measure_prefill_saving(p))
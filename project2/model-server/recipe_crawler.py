@@ -0,0 +1,353 @@
+# recipe_crawler.py
+# 만개의레시피 상세 페이지 가져오기 + 파싱 (app.get_recipe 에서 분리)
+#
+# - fetch_recipe_html(): HTTP 요청만 (404 / 삭제된 레시피는 RecipeNotFound)
+# - parse_recipe(): HTML → {"title", "infos", "image_url", "steps", "grid_info"}
+#   · 기본(RECIPE_PARSER=fast): SoupStrainer 로 필요한 div 블록만 트리로 만들고, lxml 이 있으면 lxml 사용
+#   · RECIPE_PARSER=full: 예전처럼 html.parser 로 전체 문서 파싱 (parse_recipe_full)
+#   · benchmark_parse(): fixture 페이지로 두 방식의 시간 / 메모리 비교
+# - get_recipe(): fetch + parse (캐시 없이 매번 요청, 캐시는 recipe_detail_cache)
+# - RECIPE_BASE_URL 을 바꾸면 start_fixture_server() 같은 로컬 서버로 테스트 가능
+# - HTTP 는 공유 requests.Session (keep-alive 커넥션 풀) + timeout + 동시 요청 수 제한
+# - crawl_deadline(): 블록 안의 크롤링이 요청 deadline 을 넘지 않도록 (슬롯 대기 / 연결 / 읽기 모두)
+#   → 스레드에서 돌고 있는 크롤링은 Future.cancel() 로 멈출 수 없으므로 크롤러가 직접 deadline 을 지킴
+import contextlib
+import contextvars
+import os
+import re
+import threading
+import time
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+
+import metrics
+import tracing
+
+try:
+    import lxml  # noqa: F401
+    FAST_PARSER_FEATURES = "lxml"
+except ImportError:
+    FAST_PARSER_FEATURES = "html.parser"
+
+RECIPE_BASE_URL = os.environ.get("RECIPE_BASE_URL", "https://www.10000recipe.com/recipe").rstrip("/")
+RECIPE_HTTP_CONNECT_TIMEOUT_S = float(os.environ.get("RECIPE_HTTP_CONNECT_TIMEOUT_S", "3"))
+RECIPE_HTTP_READ_TIMEOUT_S = float(os.environ.get("RECIPE_HTTP_READ_TIMEOUT_S", "10"))
+# 상세 페이지 동시 요청 수 (prefetch 가 몰려도 upstream 에 과하게 붙지 않도록)
+RECIPE_HTTP_MAX_CONCURRENCY = int(os.environ.get("RECIPE_HTTP_MAX_CONCURRENCY", "8"))
+RECIPE_PARSER = os.environ.get("RECIPE_PARSER", "fast")
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class RecipeNotFound(Exception):
+    """없는 / 삭제된 레시피 (negative 캐시 대상)"""
+
+
+class CrawlDeadlineExceeded(TimeoutError):
+    """crawl_deadline() 안의 크롤링이 deadline 을 넘김"""
+
+
+# time.perf_counter() 기준 절대 시각 (None 이면 제한 없음)
+_deadline = contextvars.ContextVar("recipe_crawl_deadline", default=None)
+
+
+@contextlib.contextmanager
+def crawl_deadline(deadline: float):
+    """이 블록 안의 fetch_recipe_html 은 deadline(time.perf_counter 기준)까지만 — 넘으면 CrawlDeadlineExceeded"""
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left():
+    """현재 crawl_deadline 까지 남은 초 (deadline 없으면 None)"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.perf_counter()
+
+
+def _check_deadline(what: str):
+    left = time_left()
+    if left is not None and left <= 0:
+        raise CrawlDeadlineExceeded(f"crawl deadline exceeded ({what})")
+    return left
+
+
+def recipe_url(recipe_id, base_url: str = None) -> str:
+    return f"{(base_url or RECIPE_BASE_URL).rstrip('/')}/{recipe_id}"
+
+
+_session = None
+_session_lock = threading.Lock()
+_http_slots = threading.BoundedSemaphore(RECIPE_HTTP_MAX_CONCURRENCY)
+
+
+def get_session() -> requests.Session:
+    """프로세스 공용 Session (호스트당 커넥션 풀 = 동시 요청 수)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=RECIPE_HTTP_MAX_CONCURRENCY)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            s.headers.update({"User-Agent": "Mozilla/5.0 (recipe-recommender)"})
+            _session = s
+    return _session
+
+
+def fetch_recipe_html(recipe_id, base_url: str = None) -> bytes:
+    left = _check_deadline("before request")
+    if not _http_slots.acquire(timeout=left):
+        raise CrawlDeadlineExceeded("crawl deadline exceeded (waiting for http slot)")
+    try:
+        left = _check_deadline("waiting for http slot")
+        connect_s, read_s = RECIPE_HTTP_CONNECT_TIMEOUT_S, RECIPE_HTTP_READ_TIMEOUT_S
+        if left is not None:
+            connect_s, read_s = min(connect_s, left), min(read_s, left)
+        try:
+            res = get_session().get(recipe_url(recipe_id, base_url), timeout=(connect_s, read_s),
+                                    stream=True)
+            with res:
+                if res.status_code == 404:
+                    raise RecipeNotFound(f"recipe {recipe_id} not found")
+                res.raise_for_status()
+                # read timeout 은 소켓 read 한 번 기준 → 조금씩 오는 응답도 deadline 안에서 끊도록 chunk 마다 확인
+                chunks = []
+                for chunk in res.iter_content(64 * 1024):
+                    chunks.append(chunk)
+                    _check_deadline("reading body")
+                return b"".join(chunks)
+        except requests.RequestException:
+            _check_deadline("request")     # deadline 으로 줄인 timeout 에 걸린 거면 CrawlDeadlineExceeded
+            raise
+    finally:
+        _http_slots.release()
+
+
+# parse_recipe 가 실제로 읽는 블록 (이 div 들의 서브트리만 파싱)
+# (class 가 여러 개인 div 는 그중 하나만 맞아도 포함 — bs4 버전에 따라 class 를 나누기 전 문자열로 비교하기도 해서 정규식 사용)
+_WANTED_DIV_CLASSES = ["view2_summary", "cont_ingre2", "view_step_cont", "centeredcrop", "view3_pic"]
+
+_STRAINER = SoupStrainer("div", class_=re.compile(r"(?:^|\s)(?:%s)(?:\s|$)" % "|".join(_WANTED_DIV_CLASSES)))
+
+
+def parse_recipe_full(html) -> dict:
+    """전체 문서를 html.parser 로 파싱 (예전 방식, 비교용)"""
+    return _extract(BeautifulSoup(html, features="html.parser"))
+
+
+def parse_recipe_fast(html) -> dict:
+    """필요한 div 서브트리만 파싱 — 결과는 parse_recipe_full 과 같음"""
+    return _extract(BeautifulSoup(html, features=FAST_PARSER_FEATURES, parse_only=_STRAINER))
+
+
+def parse_recipe(html) -> dict:
+    if RECIPE_PARSER == "full":
+        return parse_recipe_full(html)
+    return parse_recipe_fast(html)
+
+
+def _extract(soup) -> dict:
+    title_tag = soup.select_one("div.view2_summary h3")
+    if title_tag is None:
+        # 삭제된 레시피는 200 + 안내 페이지로 오는 경우가 있음
+        raise RecipeNotFound("recipe summary not found in page")
+    main_title = title_tag.text
+
+    infos = soup.select_one("div.view2_summary_info")
+    info1 = infos.select_one("span.view2_summary_info1")
+    info1 = info1.text if info1 else ""
+    info2 = infos.select_one("span.view2_summary_info2")
+    info2 = info2.text if info2 else ""
+    info3 = infos.select_one("span.view2_summary_info3")
+    info3 = info3.text if info3 else ""
+    infos = [info1,info2,info3]
+
+
+    # Fallback: desktop layout style that sometimes appears
+    image_url = ""
+    img_tag = soup.select_one("div.centeredcrop img")
+    if not img_tag:
+        img_tag = soup.select_one("div.view3_pic img")
+
+    if img_tag and img_tag.get("src"):
+        image_url = img_tag["src"].strip()
+
+    grid = soup.select_one("div.cont_ingre2")
+    result = {
+        "재료": [],
+        "조리도구": []
+    }
+
+    # 모든 big titles 찾기 (ex: 재료 / 조리도구)
+    big_sections = grid.select("div.best_tit")
+
+    for section in big_sections:
+        title = section.get_text(strip=True)
+
+        # 제목 다음에 오는 ready_ingre3 블록 찾기
+        next_div = section.find_next_sibling("div", class_="ready_ingre3")
+        if not next_div:
+            continue
+
+        # 재료 처리
+        if "재료" in title:
+            for li in next_div.select("li"):
+                # 재료명
+                name_tag = li.select_one("div.ingre_list_name a")
+                if not name_tag:
+                    continue
+                name = name_tag.get_text(strip=True)
+
+                # 용량
+                qty_tag = li.select_one("span.ingre_list_ea")
+                qty = qty_tag.get_text(strip=True) if qty_tag else ""
+
+                result["재료"].append((name, qty))
+
+        # 조리도구 처리
+        elif "조리도구" in title:
+            for li in next_div.select("li"):
+                name_tag = li.select_one("div.ingre_list_name")
+                if name_tag:
+                    tool_name = name_tag.get_text(strip=True)
+                    result["조리도구"].append(tool_name)
+
+
+
+    steps = []
+    for cont in soup.select("div.view_step_cont"):
+        step = {"text": "","tools": "", "img_url": ""}
+        body = cont.select_one("div.media-body")
+        if body:
+            main_text_node = body.find(string=True, recursive=False)
+            if main_text_node:
+                # steps.append(main_text_node.strip())
+                step["text"] = main_text_node.strip()
+
+                tools = body.select("p")
+                if tools:
+                    step["tools"] = tools[0].text.strip()
+
+        img = cont.find("div", id=re.compile(r"stepimg\d+")).select_one("img")
+        if img:
+            step["img_url"] = img["src"]
+        steps.append(step)
+
+
+    return {"title": main_title,"infos":infos, "image_url": image_url, "steps": steps, "grid_info": result }
+
+
+def get_recipe(recipe_id, base_url: str = None) -> dict:
+    with metrics.stage("crawl"):
+        with tracing.span("fetch", recipe_id=str(recipe_id)) as s:
+            html = fetch_recipe_html(recipe_id, base_url)
+            if s is not None:
+                s.attrs["bytes"] = len(html)
+        with tracing.span("parse", parser=RECIPE_PARSER):
+            return parse_recipe(html)
+
+
+def benchmark_parse(paths=None, repeat: int = 20) -> dict:
+    """
+    저장된 페이지(기본: fixtures/*.html)로 parse_recipe_full / parse_recipe_fast 비교.
+    페이지당 평균 시간(ms)과 tracemalloc peak(KB), 두 결과가 같은지 확인.
+    """
+    import glob
+    import tracemalloc
+
+    paths = paths or sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))
+    pages = []
+    for p in paths:
+        with open(p, "rb") as f:
+            pages.append(f.read())
+
+    out = {}
+    for name, fn in (("full", parse_recipe_full), ("fast", parse_recipe_fast)):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            for html in pages:
+                fn(html)
+        elapsed = time.perf_counter() - t0
+
+        peaks = []
+        for html in pages:
+            tracemalloc.start()
+            fn(html)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        out[name] = {
+            "ms_per_page": elapsed / (repeat * len(pages)) * 1000,
+            "peak_kb": max(peaks) / 1024,
+        }
+    out["fast"]["parser"] = FAST_PARSER_FEATURES
+    out["same_result"] = all(parse_recipe_full(h) == parse_recipe_fast(h) for h in pages)
+    out["speedup"] = out["full"]["ms_per_page"] / out["fast"]["ms_per_page"]
+    out["pages"] = len(pages)
+    return out
+
+
+# =========================================================
+# 로컬 fixture 서버 (테스트 / 벤치마크용)
+# =========================================================
+
+def load_fixture(name: str = "recipe_detail.html") -> bytes:
+    with open(os.path.join(FIXTURE_DIR, name), "rb") as f:
+        return f.read()
+
+
+def start_fixture_server(pages=None, port: int = 0, delay_s: float = 0.0, fail_rate: float = 0.0):
+    """
+    GET /recipe/<id> 에 pages[id] (bytes) 를 돌려주는 로컬 서버, 없는 id 는 404, fail_rate 확률로 503.
+    pages 가 None 이면 모든 id 에 fixtures/recipe_detail.html.
+    리턴: (server, base_url, hits)  — hits 는 id 별 요청 수 (캐시 테스트용)
+    """
+    import random
+    from collections import Counter
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    default_page = load_fixture() if pages is None else None
+    pages = {str(k): v for k, v in (pages or {}).items()}
+    hits = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            recipe_id = self.path.rstrip("/").rsplit("/", 1)[-1]
+            hits[recipe_id] += 1
+            if delay_s:
+                time.sleep(delay_s)
+            body = default_page if default_page is not None else pages.get(recipe_id)
+            if random.random() < fail_rate:
+                body = b"temporarily unavailable"
+                self.send_response(503)
+            elif body is None:
+                body = b"not found"
+                self.send_response(404)
+            else:
+                self.send_response(200)
+            try:
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass    # 클라이언트가 deadline 으로 먼저 끊음
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/recipe", hits
+
+
+if __name__ == "__main__":
+    for k, v in benchmark_parse().items():
+        print(k, v)
@@ -0,0 +1,280 @@
+# recipe_detail_cache.py
+# /crawl-recipe 상세 페이지 파싱 결과 캐시 (매 요청마다 크롤링 + 파싱하지 않도록)
+#
+# - 1단계: 메모리 LRU / 2단계: sqlite 파일 (프로세스 재시작 후에도 유지)
+# - ttl_s 안: 캐시 그대로
+# - ttl_s ~ ttl_s + stale_s: 캐시(stale)를 바로 주고 백그라운드에서 다시 크롤링 (stale-while-revalidate)
+# - 그 이후 / 캐시 없음: 동기 크롤링 (같은 id 동시 요청은 한 번만 크롤링)
+# - 404 / 삭제된 레시피는 negative_ttl_s 동안 RecipeNotFound 로 캐시 (없는 id 반복 크롤링 방지)
+# - 크롤링이 실패하면(네트워크 등) 만료된 캐시라도 있으면 그걸 줌
+# - prefetch(): 검색 결과 상위 레시피를 백그라운드에서 미리 크롤링 → 사용자가 클릭하면 캐시 hit
+# - recipe_crawler.crawl_deadline() 안에서 부르면 크롤링 / 진행 중 크롤링 대기 모두 그 deadline 까지만
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from recipe_crawler import CrawlDeadlineExceeded, RecipeNotFound, get_recipe, time_left
+
+RECIPE_CACHE_PATH = os.environ.get("RECIPE_CACHE_PATH", "recipe_detail_cache.sqlite")
+RECIPE_CACHE_TTL_S = float(os.environ.get("RECIPE_CACHE_TTL_S", str(24 * 3600)))
+RECIPE_CACHE_STALE_S = float(os.environ.get("RECIPE_CACHE_STALE_S", str(7 * 24 * 3600)))
+RECIPE_CACHE_NEGATIVE_TTL_S = float(os.environ.get("RECIPE_CACHE_NEGATIVE_TTL_S", "600"))
+RECIPE_PREFETCH_WORKERS = int(os.environ.get("RECIPE_PREFETCH_WORKERS", "4"))
+
+
+# lookup() 상태
+FRESH = "fresh"
+STALE = "stale"          # ttl 지남, stale_s 안 → 주면서 갱신
+NEGATIVE = "negative"    # 없는 레시피로 캐시됨
+EXPIRED = "expired"      # 너무 오래됨 → 다시 크롤링 (실패하면 이 값이라도)
+MISS = "miss"
+
+
+class RecipeDetailCache:
+    """
+    Parameters
+    ----------
+    fetch_fn : recipe_id → 파싱된 dict (없는 레시피는 RecipeNotFound)
+    path : sqlite 파일 경로 (None 이면 메모리만)
+    """
+
+    def __init__(
+        self,
+        fetch_fn=get_recipe,
+        path: str = RECIPE_CACHE_PATH,
+        max_items: int = 1024,
+        ttl_s: float = RECIPE_CACHE_TTL_S,
+        stale_s: float = RECIPE_CACHE_STALE_S,
+        negative_ttl_s: float = RECIPE_CACHE_NEGATIVE_TTL_S,
+        refresh_workers: int = 2,
+        prefetch_workers: int = RECIPE_PREFETCH_WORKERS,
+    ):
+        self.fetch_fn = fetch_fn
+        self.path = path
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self.stale_s = stale_s
+        self.negative_ttl_s = negative_ttl_s
+
+        self._lru = OrderedDict()        # recipe_id → (value | None, fetched_at)
+        self._lock = threading.Lock()
+        self._inflight = {}              # recipe_id → Future (동기 크롤링 / 백그라운드 갱신 공용)
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers,
+                                             thread_name_prefix="recipe-refresh")
+        self._prefetcher = ThreadPoolExecutor(max_workers=prefetch_workers,
+                                              thread_name_prefix="recipe-prefetch")
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stale_served": 0,
+                       "negative_hits": 0, "fetches": 0, "refreshes": 0, "fetch_errors": 0,
+                       "stale_on_error": 0, "prefetched": 0}
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS recipe_details ("
+                " recipe_id TEXT PRIMARY KEY, value TEXT, fetched_at REAL)"
+            )
+            self._db.commit()
+
+    # ---------- 저장소 ----------
+    def _remember(self, key, entry):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def _lookup_locked(self, key):
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return self._lru[key]
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT value, fetched_at FROM recipe_details WHERE recipe_id = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                entry = (None if row[0] is None else json.loads(row[0]), row[1])
+                self._remember(key, entry)
+                self._stats["disk_hits"] += 1
+                return entry
+        self._stats["misses"] += 1
+        return None
+
+    def _store(self, key, value):
+        entry = (value, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO recipe_details (recipe_id, value, fetched_at) VALUES (?, ?, ?)",
+                    (key, None if value is None else json.dumps(value, ensure_ascii=False), entry[1]),
+                )
+                self._db.commit()
+
+    # ---------- 크롤링 ----------
+    def _fetch(self, key, fut: Future):
+        try:
+            self._count("fetches")
+            value = self.fetch_fn(key)
+            self._store(key, value)
+            fut.set_result(value)
+        except RecipeNotFound as e:
+            self._store(key, None)
+            fut.set_exception(e)
+        except Exception as e:
+            self._count("fetch_errors")
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _start_fetch(self, key, background: bool, executor=None):
+        """같은 id 로 진행 중인 크롤링이 있으면 그 Future 를 공유. 리턴: (future, 새로 시작했는지)"""
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut, False
+            fut = Future()
+            self._inflight[key] = fut
+        if background:
+            (executor or self._refresher).submit(self._fetch, key, fut)
+        return fut, True
+
+    def _is_fresh(self, key) -> bool:
+        """통계 카운트 없이 ttl 안의 캐시(negative 포함)가 있는지"""
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, fetched_at FROM recipe_details WHERE recipe_id = ?", (key,)
+                ).fetchone()
+                entry = row and (row[0], row[1])
+        if entry is None:
+            return False
+        ttl = self.negative_ttl_s if entry[0] is None else self.ttl_s
+        return time.time() - entry[1] < ttl
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    # ---------- public API ----------
+    def lookup(self, recipe_id):
+        """
+        크롤링 없이 캐시만 확인 → (state, value). state: FRESH / STALE / NEGATIVE / EXPIRED / MISS
+        (asgi_app 처럼 크롤링을 직접(async) 하는 쪽에서 사용, 결과는 put() 으로 저장)
+        """
+        key = str(recipe_id)
+        with self._lock:
+            entry = self._lookup_locked(key)
+        if entry is None:
+            return MISS, None
+        value, fetched_at = entry
+        age = time.time() - fetched_at
+        if value is None:
+            if age < self.negative_ttl_s:
+                self._count("negative_hits")
+                return NEGATIVE, None
+            return MISS, None
+        if age < self.ttl_s:
+            return FRESH, value
+        if age < self.ttl_s + self.stale_s:
+            self._count("stale_served")
+            return STALE, value
+        return EXPIRED, value
+
+    def put(self, recipe_id, value):
+        """크롤링 결과 저장 (value=None 이면 없는 레시피로 negative 캐시)"""
+        self._store(str(recipe_id), value)
+
+    def get(self, recipe_id) -> dict:
+        """파싱된 상세 dict. 없는 레시피면 RecipeNotFound"""
+        key = str(recipe_id)
+        state, value = self.lookup(key)
+        if state == FRESH:
+            return value
+        if state == NEGATIVE:
+            raise RecipeNotFound(f"recipe {key} not found (cached)")
+        if state == STALE:
+            if self._start_fetch(key, background=True)[1]:
+                self._count("refreshes")
+            return value
+
+        fut, started = self._start_fetch(key, background=False)
+        if started:
+            self._fetch(key, fut)
+        try:
+            # 다른 요청 / prefetch 가 크롤링 중이면 그걸 기다리되 crawl_deadline 까지만
+            try:
+                return fut.result(timeout=time_left())
+            except FutureTimeout:
+                if fut.done():
+                    raise           # 크롤링 자체의 timeout (CrawlDeadlineExceeded 등)
+                raise CrawlDeadlineExceeded(f"crawl deadline exceeded (waiting for in-flight fetch of {key})")
+        except RecipeNotFound:
+            raise
+        except Exception:
+            # 크롤링 실패: 만료된 캐시라도 있으면 그걸로 응답
+            if value is not None:
+                self._count("stale_on_error")
+                return value
+            raise
+
+    def prefetch(self, recipe_ids) -> int:
+        """
+        캐시에 없거나 만료된 레시피를 prefetch 스레드풀에서 크롤링 (기다리지 않음).
+        리턴: 새로 예약한 개수
+        """
+        n = 0
+        for rid in recipe_ids:
+            key = str(rid)
+            if self._is_fresh(key):
+                continue
+            if self._start_fetch(key, background=True, executor=self._prefetcher)[1]:
+                n += 1
+        if n:
+            self._count("prefetched", n)
+        return n
+
+    def invalidate(self, recipe_id):
+        key = str(recipe_id)
+        with self._lock:
+            self._lru.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM recipe_details WHERE recipe_id = ?", (key,))
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["memory_items"] = len(self._lru)
+            s["inflight"] = len(self._inflight)
+            if self._db is not None:
+                s["disk_items"] = self._db.execute("SELECT COUNT(*) FROM recipe_details").fetchone()[0]
+        lookups = s["memory_hits"] + s["disk_hits"] + s["misses"]
+        s["hit_rate"] = ((s["memory_hits"] + s["disk_hits"]) / lookups) if lookups else None
+        return s
+
+    def close(self):
+        self._refresher.shutdown(wait=False)
+        self._prefetcher.shutdown(wait=False)
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_detail_cache() -> RecipeDetailCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RecipeDetailCache()
+    return _cache
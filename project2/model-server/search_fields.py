@@ -0,0 +1,81 @@
+# search_fields.py
+# /jiewan-search-v2 응답의 설명 레벨 + 필드 projection
+# (jiewan_model_v2 를 import 하지 않고도 쓸 수 있게 분리 → asgi_app 이 요청 검증에 사용)
+#
+#   {"query": "...", "explain_level": "none", "fields": ["recipe_id", "title", "image_url", "score"]}
+#
+# - explain_level
+#     none    : 카드 정보만 (레시피별 태그 상세 쿼리 생략)
+#     summary : + 총점 요약 한 줄 / 요청 키워드 목록 (태그 상세 쿼리 생략)
+#     full    : + 태그 매칭 dict / 설명 줄 (기존 응답, 디버그 화면용) ← 기본값
+# - fields: 응답 레시피 dict 에 남길 키 (recipe_id / explain 으로 요청한 template_reason 은 항상). 없으면 전부
+# - 설명 필드는 레벨과 fields 둘 다에 포함될 때만 계산 (explanation_fields)
+# - explain (추천 이유 모드) 도 여기서 검증 (parse_explain) → 모르는 값은 400
+#   단, 추천 이유(template_reason / LLM 설명)를 만들 때는 REASON_FIELDS 를 응답에 안 나가도 계산
+
+EXPLANATION_FIELDS = ("summary", "matched_keywords_flat", "matched_tag_dict", "explanation_lines")
+
+EXPLAIN_LEVELS = {
+    "none": (),
+    "summary": ("summary", "matched_keywords_flat"),
+    "full": EXPLANATION_FIELDS,
+}
+DEFAULT_EXPLAIN_LEVEL = "full"
+
+# template_reason() / ExplanationModel 이 읽는 필드
+REASON_FIELDS = ("matched_tag_dict", "matched_keywords_flat")
+
+# projection 과 상관없이 남기는 키
+ALWAYS_FIELDS = {"recipe_id", "template_reason"}
+
+# 태그 상세 쿼리(레시피마다 Neo4j 1번)가 있어야 만들 수 있는 필드
+DETAIL_FIELDS = ("matched_tag_dict", "explanation_lines")
+
+
+# 추천 이유 모드 (explain) — 일반 응답 / NDJSON 스트리밍 응답
+EXPLAIN_MODES = ("none", "template", "llm_async")
+STREAM_EXPLAIN_MODES = ("none", "template", "cached", "llm")
+
+
+def parse_explain(data: dict, modes=EXPLAIN_MODES, default: str = "none") -> str:
+    """요청 body 의 explain. modes 에 없는 값이면 ValueError (메시지 그대로 400 응답)"""
+    explain = data.get("explain") or default
+    if explain not in modes:
+        raise ValueError(f"explain must be one of {list(modes)}")
+    return explain
+
+
+def parse_request(data: dict):
+    """요청 body → (explain_level, fields). 잘못된 값이면 ValueError (메시지 그대로 400 응답)"""
+    level = data.get("explain_level") or DEFAULT_EXPLAIN_LEVEL
+    if level not in EXPLAIN_LEVELS:
+        raise ValueError(f"explain_level must be one of {list(EXPLAIN_LEVELS)}")
+    fields = data.get("fields")
+    if fields is not None and not (isinstance(fields, list) and all(isinstance(f, str) for f in fields)):
+        raise ValueError("fields must be a list of strings")
+    return level, fields
+
+
+def explanation_fields(explain_level: str = DEFAULT_EXPLAIN_LEVEL, fields=None, with_reason: bool = False) -> set:
+    """검색에서 실제로 계산할 설명 필드"""
+    out = set(EXPLAIN_LEVELS[explain_level])
+    if fields is not None:
+        out &= set(fields)
+    if with_reason:
+        out |= set(REASON_FIELDS)
+    return out
+
+
+def project_recipes(recipes, explain_level: str = DEFAULT_EXPLAIN_LEVEL, fields=None):
+    """
+    응답용 레시피 리스트. 원본 dict 는 건드리지 않음 (설명 job 은 원본의 매칭 정보를 씀).
+    기본값(full, fields 없음)이면 원본 리스트 그대로
+    """
+    if explain_level == "full" and fields is None:
+        return recipes
+    drop = set(EXPLANATION_FIELDS) - set(EXPLAIN_LEVELS[explain_level])
+    keep = None if fields is None else set(fields) | ALWAYS_FIELDS
+    return [
+        {k: v for k, v in r.items() if k not in drop and (keep is None or k in keep)}
+        for r in recipes
+    ]
@@ -0,0 +1,243 @@
+# speculative.py
+# 키워드 추출용 assisted / speculative decoding
+#
+# - 추출 결과는 거의 고정된 JSON 골격(반복되는 key, 빈 배열)이라 초안 토큰이 잘 맞음
+# - drafter 두 가지 (HF generate 의 assisted generation 사용)
+#     * "prompt_lookup": 프롬프트(SYSTEM_PROMPT 의 스키마 예시 포함)에서 n-gram 을 찾아 복사
+#     * "model": 같은 토크나이저를 쓰는 작은 draft 모델 (예: Qwen2.5-0.5B-Instruct)
+# - 요청별 streamer(SpeculationMeter)로 검증 step 을 세어서 acceptance rate / tokens per second 측정
+import os
+import threading
+import time
+
+import torch
+
+# "none" / "prompt_lookup" / "model"
+DRAFT_MODE = os.environ.get("EXTRACTOR_DRAFT", "none")
+DRAFT_MODEL_NAME = os.environ.get("EXTRACTOR_DRAFT_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
+NUM_ASSISTANT_TOKENS = int(os.environ.get("EXTRACTOR_DRAFT_TOKENS", "8"))
+PROMPT_LOOKUP_TOKENS = int(os.environ.get("EXTRACTOR_PROMPT_LOOKUP_TOKENS", "10"))
+
+DRAFT_MODES = ("none", "prompt_lookup", "model")
+
+_draft_model = None
+_draft_lock = threading.Lock()
+
+
+def load_draft_model(model_name: str = None, device=None):
+    """draft 모델을 한 번만 로드 (본 모델과 같은 vocab 이어야 함)"""
+    global _draft_model
+    with _draft_lock:
+        if _draft_model is None:
+            from transformers import AutoModelForCausalLM
+            print(f"Loading draft model {model_name or DRAFT_MODEL_NAME} ...")
+            mdl = AutoModelForCausalLM.from_pretrained(
+                model_name or DRAFT_MODEL_NAME,
+                torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+            )
+            if device is not None:
+                mdl = mdl.to(device)
+            mdl.eval()
+            _draft_model = mdl
+    return _draft_model
+
+
+def draft_generate_kwargs(mode: str = None, model=None, draft_model=None,
+                          num_assistant_tokens: int = None,
+                          prompt_lookup_tokens: int = None) -> dict:
+    """
+    model.generate(...) 에 넘길 assisted generation 인자.
+    - mode 가 "none" 이면 빈 dict (기존 generate 그대로)
+    - assisted generation 은 batch size 1 에서만 동작 → 배치 경로에서는 쓰지 않음
+    """
+    mode = mode or DRAFT_MODE
+    if mode not in DRAFT_MODES:
+        raise ValueError(f"unknown draft mode: {mode} (available: {DRAFT_MODES})")
+
+    if mode == "prompt_lookup":
+        return {"prompt_lookup_num_tokens": prompt_lookup_tokens or PROMPT_LOOKUP_TOKENS}
+    if mode == "model":
+        if draft_model is None:
+            draft_model = load_draft_model(device=getattr(model, "device", None))
+        draft_model.generation_config.num_assistant_tokens = num_assistant_tokens or NUM_ASSISTANT_TOKENS
+        # 기본 "heuristic" 스케줄은 거부가 나면 초안 길이를 줄임 → 고정 길이로 측정
+        draft_model.generation_config.num_assistant_tokens_schedule = "constant"
+        return {"assistant_model": draft_model}
+    return {}
+
+
+# =========================================================
+# 1. acceptance rate / tokens per second 측정
+# =========================================================
+
+class SpeculationMeter:
+    """
+    요청별 측정용 streamer — model.generate(..., streamer=meter) 로 넘겨서 그 호출의 출력만 봄
+    (공유 모델에 hook 을 걸지 않으므로 동시에 도는 다른 요청의 forward 가 섞이지 않음).
+
+    assisted generation 은 검증 step 마다 streamer.put(이번 step 에 확정된 토큰들) 을 한 번 부름
+    (첫 put 은 프롬프트).
+      target_forwards = step 수
+      accepted = 생성 토큰 수 - step 수   (각 step 은 본 모델 토큰 1개를 직접 만듦)
+      proposed = draft 모델(draft_tokens 고정 길이)일 때 step 별 초안 길이 (남은 토큰 수로 잘림) 합
+                 — prompt_lookup 은 step 마다 초안 길이가 달라 출력으로 알 수 없음 → None
+    inner 에 다른 streamer (TextIteratorStreamer 등) 를 주면 put / end 를 그대로 전달.
+
+        meter = SpeculationMeter(prompt_len, max_new_tokens, draft_tokens=8)
+        out = model.generate(..., streamer=meter)
+        stats = meter.finish(out)
+    """
+
+    def __init__(self, prompt_len: int, max_new_tokens: int = None, draft_tokens: int = None, inner=None):
+        self.prompt_len = prompt_len
+        self.max_new_tokens = max_new_tokens
+        self.draft_tokens = draft_tokens
+        self.inner = inner
+        self.step_tokens = []        # step 별 확정 토큰 수
+        self.elapsed_s = None
+        self._prompt_seen = False
+        self._t0 = time.perf_counter()
+
+    def put(self, value):
+        if self.inner is not None:
+            self.inner.put(value)
+        if not self._prompt_seen:
+            self._prompt_seen = True
+            return
+        self.step_tokens.append(int(value.shape[-1]))
+
+    def end(self):
+        self.elapsed_s = time.perf_counter() - self._t0
+        if self.inner is not None:
+            self.inner.end()
+
+    def _proposed(self):
+        if not self.draft_tokens:
+            return None
+        proposed, generated = 0, 0
+        for n in self.step_tokens:
+            budget = self.draft_tokens if self.max_new_tokens is None else self.max_new_tokens - generated - 1
+            proposed += max(0, min(self.draft_tokens, budget))
+            generated += n
+        return proposed
+
+    def finish(self, output_ids) -> dict:
+        if self.elapsed_s is None:
+            self.end()
+        new_tokens = int(output_ids.shape[-1]) - self.prompt_len
+        steps = len(self.step_tokens)
+        accepted = max(0, new_tokens - steps)
+        proposed = self._proposed()
+        if proposed is not None:
+            accepted = min(accepted, proposed)
+
+        return {
+            "new_tokens": new_tokens,
+            "target_forwards": steps,
+            "proposed_tokens": proposed,
+            "accepted_tokens": accepted,
+            "acceptance_rate": (accepted / proposed) if proposed else None,
+            "tokens_per_forward": (new_tokens / steps) if steps else None,
+            "elapsed_s": self.elapsed_s,
+            "tokens_per_s": (new_tokens / self.elapsed_s) if self.elapsed_s else None,
+        }
+
+
+def draft_tokens_per_step(mode: str = None, num_assistant_tokens: int = None):
+    """SpeculationMeter 의 draft_tokens — 초안 길이가 고정인 draft 모델만 (prompt_lookup 은 None)"""
+    mode = mode or DRAFT_MODE
+    return (num_assistant_tokens or NUM_ASSISTANT_TOKENS) if mode == "model" else None
+
+
+class SpeculationStats:
+    """요청별 SpeculationMeter 결과 누적 (스레드 안전)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tot = {"requests": 0, "new_tokens": 0, "target_forwards": 0,
+                     "proposed_tokens": 0, "accepted_tokens": 0, "elapsed_s": 0.0}
+
+    def record(self, stats: dict):
+        with self._lock:
+            self._tot["requests"] += 1
+            for k in ("new_tokens", "target_forwards", "elapsed_s"):
+                self._tot[k] += stats.get(k) or 0
+            # acceptance rate 는 초안 길이를 아는 요청만으로
+            if stats.get("proposed_tokens") is not None:
+                self._tot["proposed_tokens"] += stats["proposed_tokens"]
+                self._tot["accepted_tokens"] += stats["accepted_tokens"]
+
+    def summary(self) -> dict:
+        with self._lock:
+            t = dict(self._tot)
+        return {
+            **t,
+            "acceptance_rate": (t["accepted_tokens"] / t["proposed_tokens"]) if t["proposed_tokens"] else None,
+            "tokens_per_forward": (t["new_tokens"] / t["target_forwards"]) if t["target_forwards"] else None,
+            "tokens_per_s": (t["new_tokens"] / t["elapsed_s"]) if t["elapsed_s"] else None,
+        }
+
+
+# =========================================================
+# 2. 벤치마크 (소형 CPU 모델)
+# =========================================================
+
+def benchmark(tokenizer, model, prompts, draft_model=None, max_new_tokens: int = 128,
+              modes=("none", "prompt_lookup", "model")) -> dict:
+    """
+    같은 프롬프트를 drafter 별로 greedy generate 해서
+    tokens/s, acceptance rate, 출력이 baseline 과 같은지(greedy 이므로 같아야 함) 비교.
+    """
+    from extractor_batcher import build_chat_text
+
+    outputs = {}
+    report = {}
+    for mode in modes:
+        if mode == "model" and draft_model is None:
+            continue
+        agg = SpeculationStats()
+        texts = []
+        for p in prompts:
+            inputs = tokenizer(build_chat_text(tokenizer, p), return_tensors="pt").to(model.device)
+            prompt_len = inputs["input_ids"].shape[-1]
+            meter = SpeculationMeter(prompt_len, max_new_tokens, draft_tokens=draft_tokens_per_step(mode))
+            with torch.no_grad():
+                out = model.generate(
+                    **inputs,
+                    max_new_tokens=max_new_tokens,
+                    do_sample=False,
+                    pad_token_id=tokenizer.eos_token_id,
+                    eos_token_id=tokenizer.eos_token_id,
+                    streamer=meter,
+                    **draft_generate_kwargs(mode, model, draft_model),
+                )
+            agg.record(meter.finish(out))
+            texts.append(tokenizer.decode(out[0][prompt_len:], skip_special_tokens=True))
+        outputs[mode] = texts
+        report[mode] = agg.summary()
+
+    base = outputs.get("none")
+    if base is not None:
+        for mode, texts in outputs.items():
+            report[mode]["same_as_baseline"] = sum(a == b for a, b in zip(base, texts)) / len(base)
+    return report
+
+
+if __name__ == "__main__":
+    # 예) BENCH_MODEL=Qwen/Qwen2.5-1.5B-Instruct BENCH_DRAFT_MODEL=Qwen/Qwen2.5-0.5B-Instruct python speculative.py
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    bench_model = os.environ.get("BENCH_MODEL", "Qwen/Qwen2.5-1.5B-Instruct")
+    bench_draft = os.environ.get("BENCH_DRAFT_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
+
+    tok = AutoTokenizer.from_pretrained(bench_model)
+    mdl = AutoModelForCausalLM.from_pretrained(bench_model, torch_dtype=torch.float32).eval()
+    draft = AutoModelForCausalLM.from_pretrained(bench_draft, torch_dtype=torch.float32).eval()
+
+    sample_prompts = [
+        "계란 들어간 30분 이내 요리",
+        "비 오는 날 얼큰한 국물 요리 추천해줘",
+        "돼지고기 빼고 혼밥용 덮밥",
+    ]
+    for mode, r in benchmark(tok, mdl, sample_prompts, draft_model=draft).items():
+        print(mode, r)
@@ -0,0 +1,71 @@
+# model-server 모듈은 패키지가 아니라 평평한 스크립트 → tests/ 에서 바로 import 하도록 경로 추가
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def tiny_lm():
+    """
+    네트워크 없이 만드는 작은 랜덤 causal LM + byte-level 토크나이저 (chat_template 포함).
+    배치 / draft 경로가 단건 generate 와 같은 출력을 내는지 확인하는 용도 (출력 내용 자체는 의미 없음)
+    """
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers
+
+    vocab = {ch: i for i, ch in enumerate(sorted(pre_tokenizers.ByteLevel.alphabet()))}
+    tok = Tokenizer(models.BPE(vocab=vocab, merges=[]))
+    tok.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tok.decoder = decoders.ByteLevel()
+    tok.add_special_tokens(["<|eos|>", "<|pad|>"])
+    tokenizer = transformers.PreTrainedTokenizerFast(
+        tokenizer_object=tok, eos_token="<|eos|>", pad_token="<|pad|>",
+    )
+    tokenizer.chat_template = (
+        "{% for m in messages %}<{{ m['role'] }}>{{ m['content'][:40] }}\n{% endfor %}"
+        "{% if add_generation_prompt %}<assistant>{% endif %}"
+    )
+
+    torch.manual_seed(0)
+    config = transformers.LlamaConfig(
+        vocab_size=len(tokenizer), hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=4, max_position_embeddings=512,
+        eos_token_id=tokenizer.eos_token_id, pad_token_id=tokenizer.pad_token_id,
+    )
+    model = transformers.LlamaForCausalLM(config).eval()
+    return tokenizer, model
+
+
+@pytest.fixture
+def fixture_server():
+    """recipe_crawler.start_fixture_server 로 띄운 로컬 만개의레시피 흉내 서버 (테스트 끝나면 모두 종료)
+    사용: base_url, hits = fixture_server(pages={1: load_fixture()}, delay_s=0.05)"""
+    from recipe_crawler import start_fixture_server
+
+    servers = []
+
+    def _start(**kwargs):
+        server, base_url, hits = start_fixture_server(**kwargs)
+        servers.append(server)
+        return base_url, hits
+
+    yield _start
+    for s in servers:
+        s.shutdown()
+
+
+@pytest.fixture
+def keyword_result():
+    """빈 추출 결과(_postprocess_text_to_json 기본값)에 일부 필드만 채운 dict 를 만드는 함수
+    사용: keyword_result("국물", dish_type=["국"])"""
+    from extractor_schema import _postprocess_text_to_json
+
+    def _make(prompt, **fields):
+        out = _postprocess_text_to_json("", fallback_prompt=prompt)
+        out.update(fields)
+        return out
+    return _make
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from starlette.testclient import TestClient
+
+import asgi_app
+import recipe_crawler
+from recipe_crawler import load_fixture, parse_recipe
+from recipe_detail_cache import RecipeDetailCache
+
+SIMILAR = {"overall": [{"recipe_id": 2}], "ingredients": []}
+
+
+class StubSimilarity:
+    def __init__(self, delay_s: float = 0.0):
+        self.delay_s = delay_s
+
+    async def get_similar_recipes(self, recipe_id, top_n=3, min_shared_ings=2, timeout_s=None):
+        await asyncio.sleep(self.delay_s)
+        return SIMILAR
+
+
+def stub_search(query, filterKeywords=None, top_k=5, explain_fields=None):
+    return {
+        "keywords": {"must_ingredients": ["계란"]},
+        "recipes": [{"recipe_id": 1, "title": "계란찜", "score": 1.0,
+                     "matched_tag_dict": {}, "matched_keywords_flat": ["계란"]}],
+    }
+
+
+@pytest.fixture
+def make_client(monkeypatch, fixture_server):
+    base_url, hits = fixture_server(pages={1: load_fixture()})
+    monkeypatch.setattr(recipe_crawler, "RECIPE_BASE_URL", base_url)
+    monkeypatch.setattr(asgi_app, "RECIPE_PREFETCH", False)
+    caches = []
+
+    def _make(similarity=None):
+        cache = RecipeDetailCache(path=None)
+        caches.append(cache)
+        app = asgi_app.create_app(similarity=similarity or StubSimilarity(), search_fn=stub_search,
+                                  detail_cache=cache, use_store=False, load_search_index=False,
+                                  warm_up=False)
+        return TestClient(app)
+
+    yield _make, hits
+    for c in caches:
+        c.close()
+
+
+def test_health(make_client):
+    make, _ = make_client
+    with make() as client:
+        assert client.get("/health").json() == {"status": "ok"}
+
+
+def test_crawl_recipe_ok_and_not_found(make_client):
+    make, hits = make_client
+    with make() as client:
+        res = client.get("/crawl-recipe/1")
+        assert res.status_code == 200
+        body = res.json()
+        assert body["data"]["title"] == parse_recipe(load_fixture())["title"]
+        assert body["overall"] == SIMILAR["overall"]
+        assert body["sections"]["data"]["status"] == "ok"
+
+        # 두 번째 요청은 캐시에서
+        assert client.get("/crawl-recipe/1").status_code == 200
+        assert hits["1"] == 1
+
+        res = client.get("/crawl-recipe/404")
+        assert res.status_code == 404
+        assert res.json()["error"] == "recipe_not_found"
+
+
+def test_crawl_recipe_similar_timeout_keeps_detail(make_client, monkeypatch):
+    monkeypatch.setattr(asgi_app, "CRAWL_SIMILAR_DEADLINE_S", 0.05)
+    make, _ = make_client
+    with make(similarity=StubSimilarity(delay_s=1.0)) as client:
+        res = client.get("/crawl-recipe/1")
+    assert res.status_code == 200
+    body = res.json()
+    assert body["overall"] == [] and body["data"] is not None
+    similar = body["sections"]["similar"]
+    assert similar["status"] == "timeout" and similar["elapsed_ms"] >= 40
+
+
+def test_graph_search_template_and_bad_explain(make_client):
+    make, _ = make_client
+    with make() as client:
+        res = client.post("/jiewan-search-v2", json={"query": "계란 요리", "explain": "template"})
+        assert res.status_code == 200
+        body = res.json()
+        assert body["keywords"] == {"must_ingredients": ["계란"]}
+        assert "계란" in body["results"][0]["template_reason"]
+
+        res = client.post("/jiewan-search-v2", json={"query": "계란 요리", "explain": "bogus"})
+        assert res.status_code == 400
+        assert client.post("/jiewan-search-v2", json={}).status_code == 400
+
+
+def test_explanations_bad_wait_and_unknown_id(make_client):
+    make, _ = make_client
+    with make() as client:
+        assert client.get("/explanations/abc?wait=soon").status_code == 400
+        assert client.get("/explanations/abc?wait=-1").status_code == 400
+        assert client.get("/explanations/does-not-exist").status_code == 404
+
+
+def _ndjson(res):
+    return [json.loads(line) for line in res.text.splitlines() if line]
+
+
+def test_graph_search_stream_lines(make_client):
+    make, _ = make_client
+    with make() as client:
+        res = client.post("/jiewan-search-v2/stream", json={"query": "계란 요리", "explain": "template"})
+    assert res.status_code == 200 and res.headers["content-type"].startswith("application/x-ndjson")
+    lines = _ndjson(res)
+    assert [line["type"] for line in lines] == ["keywords", "results", "done"]
+    assert lines[0]["keywords"] == {"must_ingredients": ["계란"]}
+    assert "계란" in lines[1]["results"][0]["template_reason"]
+
+
+def test_graph_search_stream_generates_explanations(make_client, monkeypatch):
+    import explanation_jobs
+    from explanation_cache import ExplanationCache
+
+    cache = ExplanationCache(path=None)
+    monkeypatch.setattr(explanation_jobs, "get_cache", lambda: cache)
+    jobs = explanation_jobs.ExplanationJobs(
+        generate_batch_fn=lambda q, kw, infos: [{"short_reason": f"why {r['recipe_id']}"} for r in infos],
+        prompt_version="test")
+    monkeypatch.setattr(explanation_jobs, "_jobs", jobs)
+
+    make, _ = make_client
+    with make() as client:
+        res = client.post("/jiewan-search-v2/stream", json={"query": "계란 요리", "explain": "llm"})
+    lines = _ndjson(res)
+    assert [line["type"] for line in lines] == ["keywords", "results", "explanation", "done"]
+    assert lines[2]["recipe_id"] == "1" and lines[2]["explanation"]["short_reason"] == "why 1"
+
+
+def test_graph_search_stream_rejects_bad_params(make_client):
+    make, _ = make_client
+    with make() as client:
+        assert client.post("/jiewan-search-v2/stream", json={"query": "계란", "explain": "llm_async"}).status_code == 400
+        assert client.post("/jiewan-search-v2/stream", json={}).status_code == 400
+
+
+def _state():
+    state = asgi_app._State()
+    state.executor = ThreadPoolExecutor(max_workers=2)
+    return state
+
+
+def test_iterate_blocking_closes_generator_on_aclose():
+    closed = threading.Event()
+
+    def gen():
+        try:
+            yield 1
+            yield 2
+        finally:
+            closed.set()
+
+    async def run():
+        state = _state()
+        it = asgi_app._iterate_blocking(state, gen())
+        assert await it.__anext__() == 1
+        await it.aclose()
+        state.executor.shutdown(wait=True)
+
+    asyncio.run(run())
+    assert closed.is_set()
+
+
+def test_iterate_blocking_closes_after_running_step_when_cancelled():
+    release, closed = threading.Event(), threading.Event()
+
+    def gen():
+        try:
+            yield 1
+            release.wait(5)        # 끊긴 시점에 executor 에서 돌고 있는 단계
+            yield 2
+        finally:
+            closed.set()
+
+    async def run():
+        state = _state()
+
+        async def consume():
+            async for _ in asgi_app._iterate_blocking(state, gen()):
+                pass
+
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not closed.is_set()
+        release.set()
+        state.executor.shutdown(wait=True)
+
+    asyncio.run(run())
+    assert closed.is_set()
@@ -0,0 +1,58 @@
+import pytest
+
+from bulk_crawl import RecipeStore, bulk_crawl
+from recipe_crawler import RecipeNotFound, load_fixture, parse_recipe
+
+PAGES = {1: load_fixture(), 2: load_fixture()}
+
+
+def _crawl(store, base_url, ids, **kwargs):
+    kwargs = {"concurrency": 2, "delay_s": 0, "retry_backoff_s": 0, "log_every": 0, **kwargs}
+    return bulk_crawl(ids, store, base_url=base_url, **kwargs)
+
+
+def test_bulk_crawl_stores_pages_and_resumes(tmp_path, fixture_server):
+    base_url, hits = fixture_server(pages=PAGES)
+    store = RecipeStore(str(tmp_path), writable=True)
+    stats = _crawl(store, base_url, [1, 2, 3])
+    assert (stats["ok"], stats["not_found"], stats["failed"]) == (2, 1, 0)
+
+    # 다시 실행하면 index.tsv 에 있는 id 는 건너뜀
+    stats = _crawl(store, base_url, [1, 2, 3])
+    assert stats["skipped"] == 3 and dict(hits) == {"1": 1, "2": 1, "3": 1}
+    store.close()
+
+    reader = RecipeStore(str(tmp_path))
+    assert len(reader) == 3
+    assert reader.get(1) == reader.get(2)
+    assert reader.get(1)["title"] == parse_recipe(load_fixture())["title"]
+    with pytest.raises(RecipeNotFound):
+        reader.get(3)
+    assert reader.get(4) is None
+    reader.close()
+
+
+def test_failed_ids_are_retried_and_recorded(tmp_path, fixture_server):
+    down_url, down_hits = fixture_server(pages=PAGES, fail_rate=1.0)
+    store = RecipeStore(str(tmp_path), writable=True)
+    stats = _crawl(store, down_url, [1, 2], max_retries=2)
+    assert stats["failed"] == 2 and stats["retries"] == 4
+    assert down_hits == {"1": 3, "2": 3}
+    assert (tmp_path / "failed.tsv").read_text(encoding="utf-8").count("\n") == 2
+
+    # upstream 복구 후 다시 실행하면 실패했던 id 만 받아옴
+    up_url, _ = fixture_server(pages=PAGES)
+    stats = _crawl(store, up_url, [1, 2])
+    assert (stats["ok"], stats["failed"]) == (2, 0)
+    assert (tmp_path / "failed.tsv").read_text(encoding="utf-8") == ""
+    store.close()
+
+
+def test_reader_sees_rows_appended_by_a_running_crawl(tmp_path, fixture_server):
+    base_url, _ = fixture_server(pages=PAGES)
+    writer = RecipeStore(str(tmp_path), writable=True)
+    reader = RecipeStore(str(tmp_path))
+    _crawl(writer, base_url, [1])
+    assert reader.get(1)["title"] == parse_recipe(load_fixture())["title"]   # get 이 index 를 다시 읽음
+    writer.close()
+    reader.close()
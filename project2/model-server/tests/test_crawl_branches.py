@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from crawl_branches import crawl_recipe
+from recipe_crawler import RecipeNotFound
+
+SIMILAR = {"overall": [{"recipe_id": 2}], "ingredients": []}
+
+
+class StubSimilarity:
+    def __init__(self, delay_s=0.0, error=None):
+        self.delay_s = delay_s
+        self.error = error
+        self.calls = []
+
+    def get_similar_recipes(self, recipe_id, top_n=3, min_shared_ings=2, timeout_s=None):
+        self.calls.append(timeout_s)
+        time.sleep(self.delay_s)
+        if self.error:
+            raise self.error
+        return SIMILAR
+
+
+def _detail(recipe_id):
+    if recipe_id == 404:
+        raise RecipeNotFound("recipe 404 not found")
+    return {"title": f"recipe {recipe_id}"}
+
+
+@pytest.fixture
+def executors():
+    branch, similar = ThreadPoolExecutor(4), ThreadPoolExecutor(2)
+    yield branch, similar
+    branch.shutdown(wait=False)
+    similar.shutdown(wait=False)
+
+
+def test_both_branches_ok_in_parallel(executors):
+    sim = StubSimilarity(delay_s=0.1)
+
+    def slow_detail(rid):
+        time.sleep(0.1)
+        return _detail(rid)
+
+    t0 = time.perf_counter()
+    body, status = crawl_recipe(1, slow_detail, sim, *executors, similar_deadline_s=2.0)
+    assert time.perf_counter() - t0 < 0.18          # 두 branch 가 동시에
+    assert status == 200
+    assert body["data"] == {"title": "recipe 1"} and body["overall"] == SIMILAR["overall"]
+    assert sim.calls == [2.0]                         # similar deadline 이 Neo4j timeout 으로
+
+
+def test_similar_timeout_keeps_detail(executors):
+    body, status = crawl_recipe(1, _detail, StubSimilarity(delay_s=0.5), *executors, similar_deadline_s=0.05)
+    assert status == 200
+    assert body["overall"] == [] and body["data"] is not None
+    assert body["sections"]["similar"]["status"] == "timeout"
+    assert body["sections"]["similar"]["elapsed_ms"] >= 40
+
+
+def test_detail_error_returns_partial_result(executors):
+    def broken(rid):
+        raise ConnectionError("upstream down")
+
+    body, status = crawl_recipe(1, broken, StubSimilarity(), *executors)
+    assert status == 200 and body["data"] is None
+    assert body["sections"]["data"]["status"] == "error"
+    assert body["overall"] == SIMILAR["overall"]
+
+
+def test_not_found_and_both_failed(executors):
+    body, status = crawl_recipe(404, _detail, StubSimilarity(), *executors)
+    assert status == 404 and body["error"] == "recipe_not_found"
+
+    def broken(rid):
+        raise ConnectionError("upstream down")
+
+    body, status = crawl_recipe(1, broken, StubSimilarity(error=RuntimeError("neo4j down")), *executors)
+    assert status == 500 and body["error"] == "crawl_failed"
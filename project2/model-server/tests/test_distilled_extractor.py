@@ -0,0 +1,57 @@
+import pickle
+
+import numpy as np
+
+from distilled_extractor import DistilledExtractor, MultiLabelClassifier, split_rows
+
+
+def _rows(keyword_result):
+    rows = []
+    for i in range(6):
+        p = f"비 오는 날 얼큰한 국물 요리 {i}"
+        rows.append((p, keyword_result(p, dish_type=["국"], weather_tags=["비"])))
+        p = f"다이어트용 샐러드 추천 {i}"
+        rows.append((p, keyword_result(p, dish_type=["샐러드"], health_tags=["다이어트"])))
+    return rows
+
+
+def test_classifier_weights_cover_only_seen_features(keyword_result):
+    rows = _rows(keyword_result)
+    clf = MultiLabelClassifier().train([p for p, _ in rows], [["a"] if "국물" in p else ["b"] for p, _ in rows],
+                                       min_count=1)
+    assert clf.W.shape == (len(clf.vocab), 2)
+    assert len(clf.vocab) < 2000                # dim(2^18) × 라벨 dense 행렬이 아님
+    probs = clf.predict_proba("얼큰한 국물")
+    assert probs["a"] > probs["b"]
+
+
+def test_save_load_roundtrip_and_held_out(tmp_path, keyword_result):
+    rows = _rows(keyword_result)
+    train, test = split_rows(rows, test_frac=0.25)
+    assert len(test) == 3 and len(train) == 9
+    m = DistilledExtractor.train(train, min_count=1)
+    path = str(tmp_path / "m.pkl")
+    m.save(path)
+    loaded = DistilledExtractor.load(path)
+
+    prompt = "비 오는 날 얼큰한 국물"
+    assert loaded.extract_keywords(prompt) == m.extract_keywords(prompt)
+    assert sorted(p for p, _ in loaded.held_out(rows)) == sorted(p for p, _ in test)
+
+
+def test_load_legacy_dense_weights(tmp_path, keyword_result):
+    rows = _rows(keyword_result)
+    m = DistilledExtractor.train(rows, min_count=1)
+    clf = m.classifier
+    dense = np.zeros((clf.dim, len(clf.labels)), dtype=np.float32)
+    for h, r in clf.vocab.items():
+        dense[h] = clf.W[r]
+    path = tmp_path / "legacy.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({"tagger_weights": m.tagger.weights, "dim": clf.dim, "labels": clf.labels,
+                     "W": dense, "b": clf.b, "threshold": m.threshold}, f)
+
+    loaded = DistilledExtractor.load(str(path))
+    assert loaded.classifier.W.shape[0] <= len(clf.vocab)
+    text = "다이어트 샐러드"
+    assert loaded.classifier.predict_proba(text) == clf.predict_proba(text)
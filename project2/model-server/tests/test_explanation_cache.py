@@ -0,0 +1,32 @@
+import csv
+import json
+
+from explanation_cache import frequent_keyword_combos
+from extraction_log import LOG_FIELDS, log_row
+
+
+def test_frequent_keyword_combos_reads_csv_and_log_directories(tmp_path, keyword_result):
+    soup = keyword_result("국물", dish_type=["국"], weather_tags=["비"])
+    salad = keyword_result("샐러드", dish_type=["샐러드"])
+
+    # park_extractor_model 형식 csv (" | " join)
+    csv_path = tmp_path / "keyword_extract_log.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=LOG_FIELDS)
+        w.writeheader()
+        row = log_row("국물", keyword_result("국물", dish_type=["국"], weather_tags=[" 비 "]))
+        w.writerow({k: (" | ".join(v) if isinstance(v, list) else v) for k, v in row.items()})
+
+    # extraction_log 회전 디렉터리 (jsonl)
+    log_dir = tmp_path / "extraction_logs"
+    log_dir.mkdir()
+    with open(log_dir / "extractions-1.jsonl", "w", encoding="utf-8") as f:
+        for p, r in (("국물", soup), ("국물2", soup), ("샐러드", salad)):
+            f.write(json.dumps(log_row(p, r), ensure_ascii=False) + "\n")
+        f.write('{"user_prompt": "잘린 줄')        # 쓰는 도중 잘린 마지막 줄
+
+    combos = frequent_keyword_combos([str(csv_path), str(log_dir)], n=5)
+    assert [(kw["dish_type"], kw["weather_tags"], cnt) for kw, cnt in combos] == [
+        (["국"], ["비"], 3),
+        (["샐러드"], [], 1),
+    ]
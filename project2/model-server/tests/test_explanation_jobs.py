@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+import explanation_jobs
+from explanation_cache import ExplanationCache, explanation_key
+from explanation_jobs import ExplanationJobs
+
+VERSION = "test"
+
+
+def _result(ids):
+    return {
+        "keywords": {"must_ingredients": ["감자"]},
+        "recipes": [{"recipe_id": i, "name": f"r{i}", "matched_keywords_flat": ["감자"]} for i in ids],
+    }
+
+
+class _Generator:
+    """호출별 레시피 수 / 동시 실행 수를 기록하는 가짜 generate_batch_fn"""
+
+    def __init__(self, delay_s=0.05):
+        self.delay_s = delay_s
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, user_prompt, kw, recipe_infos):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.calls.append(len(recipe_infos))
+        time.sleep(self.delay_s)
+        with self._lock:
+            self.active -= 1
+        return [{"short_reason": f"reason {r['recipe_id']}"} for r in recipe_infos]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    c = ExplanationCache(path=None)
+    monkeypatch.setattr(explanation_jobs, "get_cache", lambda: c)
+    return c
+
+
+def test_stream_batches_misses_and_serializes_generation(cache):
+    gen = _Generator()
+    jobs = ExplanationJobs(generate_batch_fn=gen, prompt_version=VERSION).start()
+    out = {}
+
+    def consume(name, ids):
+        out[name] = list(jobs.stream("q", _result(ids)))
+
+    threads = [threading.Thread(target=consume, args=(n, ids))
+               for n, ids in (("a", [1, 2, 3]), ("b", [4, 5, 6]))]
+    for t in threads:
+        t.start()
+    request_id = jobs.submit("q", _result([7, 8]))
+    for t in threads:
+        t.join(5)
+
+    assert jobs.get(request_id, wait_s=5)["status"] == explanation_jobs.DONE
+    assert gen.max_active == 1                  # 공유 모델에서 generate 가 겹치지 않음
+    assert sorted(gen.calls) == [2, 3, 3]       # 스트림마다 miss 전체를 한 번에
+    assert [rid for rid, _, _ in out["a"]] == ["1", "2", "3"]
+    assert all(expl["short_reason"] and err is None for _, expl, err in out["b"])
+
+
+def test_stream_without_generate_only_returns_cached(cache):
+    gen = _Generator()
+    jobs = ExplanationJobs(generate_batch_fn=gen, prompt_version=VERSION)
+    result = _result([1, 2])
+    cache.put(explanation_key(result["recipes"][0], VERSION), {"short_reason": "cached"}, recipe_id=1)
+
+    got = list(jobs.stream("q", result, generate=False))
+    assert got == [("1", {"short_reason": "cached"}, None)]
+    assert gen.calls == []
+
+
+def test_stream_uses_per_recipe_futures_with_scheduler_path(cache):
+    from concurrent.futures import Future
+
+    submitted = []
+
+    def submit_fn(user_prompt, kw, recipe_infos):
+        submitted.append(len(recipe_infos))
+        fut = Future()
+        fut.set_result([{"short_reason": "s"} for _ in recipe_infos])
+        return fut
+
+    jobs = ExplanationJobs(generate_batch_fn=_Generator(), prompt_version=VERSION)
+    jobs._submit_fn = submit_fn
+    assert len(list(jobs.stream("q", _result([1, 2, 3])))) == 3
+    assert submitted == [1, 1, 1]
+
+
+def test_remote_backend_does_not_import_local_model(monkeypatch):
+    import sys
+
+    import extractor_registry
+    import inference_worker
+
+    monkeypatch.setattr(extractor_registry, "ACTIVE_BACKEND", "remote")
+    monkeypatch.delitem(sys.modules, "new_extractor_model", raising=False)
+    monkeypatch.delitem(sys.modules, "explanation_model", raising=False)
+
+    jobs = ExplanationJobs()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(jobs._resolve_generator()))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert results == [(inference_worker.generate_explanations_batch, explanation_jobs.EXPLANATION_PROMPT_VERSION)] * 8
+    assert jobs._submit_fn is inference_worker.submit_explanations
+    assert "new_extractor_model" not in sys.modules
+    assert "explanation_model" not in sys.modules
+
+
+@pytest.mark.parametrize("value, expected", [(None, 0.0), ("", 0.0), ("2.5", 2.5), ("120", 30.0)])
+def test_parse_wait(value, expected):
+    assert explanation_jobs.parse_wait(value) == expected
+
+
+@pytest.mark.parametrize("value", ["abc", "nan", "-1"])
+def test_parse_wait_rejects_invalid(value):
+    with pytest.raises(ValueError, match="wait must be"):
+        explanation_jobs.parse_wait(value)
@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip("torch")
+
+import explanation_model
+
+# tiny_lm 의 chat_template 은 content 앞 40자만 쓰므로 user_prompt 로 행을 구분 (길이가 달라 left-padding 됨)
+ITEMS = [
+    ("계란", {"must_ingredients": ["계란"]}, {"recipe_id": 1, "matched_keywords_flat": ["계란"]}),
+    ("비 오는 날 얼큰한 국물 요리", {}, {"recipe_id": 2, "matched_keywords_flat": ["국물"]}),
+    ("돼지고기 빼고 혼밥용 덮밥 추천", {}, {"recipe_id": 3}),
+]
+
+
+def test_batched_explanations_match_single_calls(tiny_lm, monkeypatch):
+    monkeypatch.setattr(explanation_model, "load_model", lambda: tiny_lm)
+
+    batched = explanation_model.generate_explanations_for_items(ITEMS)
+    single = [explanation_model.generate_explanation_for_recipe(*item) for item in ITEMS]
+    assert batched == single
+    assert len({b["short_reason"] for b in batched}) == len(ITEMS)      # 행이 실제로 달랐는지
+
@@ -0,0 +1,47 @@
+import pytest
+
+from extraction_log import BufferedLogWriter, read_log_rows
+from extractor_schema import _postprocess_text_to_json
+
+
+def _log(writer, prompts):
+    for p in prompts:
+        assert writer.log(p, _postprocess_text_to_json("", fallback_prompt=p), backend="stub")
+
+
+def _wait_written(writer, n):
+    import time
+    deadline = time.monotonic() + 5
+    while writer.stats()["written"] < n and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.stats()["written"] == n
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv", "parquet"])
+def test_read_log_dir_while_writer_is_open(tmp_path, fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    writer = BufferedLogWriter(log_dir=str(tmp_path), fmt=fmt, flush_interval_s=0.01).start()
+    try:
+        _log(writer, ["계란 요리", "김치찌개"])
+        _wait_written(writer, 2)
+        # 쓰는 중인 파일: jsonl / csv 는 쓴 만큼 읽히고, parquet 은 건너뜀 (footer 없음)
+        active = [r["user_prompt"] for r in read_log_rows(str(tmp_path))]
+        assert active == ([] if fmt == "parquet" else ["계란 요리", "김치찌개"])
+    finally:
+        writer.close()
+
+    assert [r["user_prompt"] for r in read_log_rows(str(tmp_path))] == ["계란 요리", "김치찌개"]
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_writer_reopens_a_new_file_after_close(tmp_path):
+    writer = BufferedLogWriter(log_dir=str(tmp_path), flush_interval_s=0.01).start()
+    _log(writer, ["a"])
+    _wait_written(writer, 1)
+    writer.close()
+    _log(writer, ["b"])
+    _wait_written(writer, 2)
+    writer.close()
+    assert writer.stats()["write_errors"] == 0
+    assert sorted(r["user_prompt"] for r in read_log_rows(str(tmp_path))) == ["a", "b"]
@@ -0,0 +1,98 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("torch")
+
+import extractor_batcher
+from extractor_batcher import BatchingExtractor, build_chat_text, generate_batch
+from extractor_schema import _postprocess_text_to_json
+
+PROMPTS = [
+    "계란 들어간 30분 이내 요리",
+    "비 오는 날 얼큰한 국물 요리 추천해줘",
+    "돼지고기 빼고 혼밥용 덮밥",
+    "다이어트 중인데 고단백 샐러드 먹고 싶어",
+]
+
+
+def test_batched_generate_matches_single(tiny_lm):
+    tokenizer, model = tiny_lm
+    texts = [build_chat_text(tokenizer, p) for p in PROMPTS]
+    batched = generate_batch(tokenizer, model, texts, max_new_tokens=16)
+    single = [generate_batch(tokenizer, model, [t], max_new_tokens=16)[0] for t in texts]
+    assert batched == single
+
+
+def test_batching_extractor_matches_single(tiny_lm):
+    tokenizer, model = tiny_lm
+    expected = [
+        _postprocess_text_to_json(
+            generate_batch(tokenizer, model, [build_chat_text(tokenizer, p)], max_new_tokens=16)[0],
+            fallback_prompt=p,
+        )
+        for p in PROMPTS
+    ]
+    batcher = BatchingExtractor(tokenizer, model, max_batch_size=4, max_wait_ms=50, max_new_tokens=16)
+    with ThreadPoolExecutor(max_workers=len(PROMPTS)) as ex:
+        got = list(ex.map(lambda p: batcher.extract_keywords(p, timeout=30), PROMPTS))
+    batcher.close()
+    assert got == expected
+    assert batcher.stats()["batches"] < len(PROMPTS)
+
+
+@pytest.fixture
+def fake_generate(monkeypatch):
+    monkeypatch.setattr(extractor_batcher, "build_chat_text", lambda tok, p: p)
+    monkeypatch.setattr(extractor_batcher, "generate_batch",
+                        lambda tok, model, texts, **kw: ['{"dish_type": ["%s"]}' % t for t in texts])
+
+
+def test_postprocess_failure_fails_only_that_request(monkeypatch, fake_generate):
+    def postprocess(text, fallback_prompt=""):
+        if fallback_prompt == "bad":
+            raise TypeError("dietary_constraints must be a dict")
+        return _postprocess_text_to_json(text, fallback_prompt=fallback_prompt)
+
+    monkeypatch.setattr(extractor_batcher, "_postprocess_text_to_json", postprocess)
+    batcher = BatchingExtractor(None, None, max_batch_size=8, max_wait_ms=50)
+    futs = [batcher.submit(p) for p in ("good", "bad", "also good")]
+
+    assert futs[0].result(5)["dish_type"] == ["good"]
+    with pytest.raises(TypeError):
+        futs[1].result(5)
+    assert futs[2].result(5)["dish_type"] == ["also good"]
+    # 워커가 살아 있어 이후 요청도 처리
+    assert batcher.extract_keywords("later", timeout=5)["dish_type"] == ["later"]
+    batcher.close()
+
+
+def test_close_fails_queued_futures(fake_generate):
+    batcher = BatchingExtractor(None, None)
+    batcher._stop.set()                 # 워커 없이 큐에만 쌓인 상태
+    fut = Future()
+    batcher._queue.put(("queued", fut, 0.0))
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        fut.result(1)
+
+
+def test_extract_keywords_rejects_per_call_options_when_batching(monkeypatch):
+    pytest.importorskip("transformers")
+    import new_extractor_model
+
+    class FakeBatcher:
+        def extract_keywords(self, prompt):
+            return {"prompt": prompt}
+
+    monkeypatch.setattr(new_extractor_model, "USE_BATCHING", True)
+    monkeypatch.setattr(new_extractor_model, "USE_SCHEDULER", False)
+    monkeypatch.setattr(new_extractor_model, "get_batcher", lambda: FakeBatcher())
+
+    assert new_extractor_model.extract_keywords("감자") == {"prompt": "감자"}
+    assert new_extractor_model.extract_keywords("감자", json_stop=new_extractor_model.JSON_STOP,
+                                                draft="none") == {"prompt": "감자"}
+    with pytest.raises(ValueError):
+        new_extractor_model.extract_keywords("감자", constrained=not new_extractor_model.CONSTRAINED)
+    with pytest.raises(ValueError):
+        new_extractor_model.extract_keywords("감자", draft="prompt_lookup")
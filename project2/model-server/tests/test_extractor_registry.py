@@ -0,0 +1,40 @@
+import pytest
+
+import extraction_log
+import extractor_registry
+
+
+class _Writer:
+    def __init__(self):
+        self.rows = []
+
+    def log(self, user_prompt, result, backend=None, latency_ms=None):
+        self.rows.append((user_prompt, backend, result))
+        return True
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    w = _Writer()
+    monkeypatch.setattr(extractor_registry, "ACTIVE_BACKEND", "stub")
+    monkeypatch.setattr(extraction_log, "LOG_ENABLED", True)
+    monkeypatch.setattr(extraction_log, "get_writer", lambda: w)
+    return w
+
+
+def test_extract_keywords_is_logged(writer):
+    result = extractor_registry.extract_keywords("계란 요리")
+    assert writer.rows == [("계란 요리", "stub", result)]
+
+
+def test_stream_logs_the_done_result_once(writer):
+    events = list(extractor_registry.stream_extract_keywords("계란 요리"))
+    assert events[-1][0] == "done"
+    assert writer.rows == [("계란 요리", "stub", events[-1][2])]
+
+
+def test_abandoned_stream_is_not_logged(writer):
+    stream = extractor_registry.stream_extract_keywords("계란 요리")
+    assert next(stream)[0] == "field"
+    stream.close()
+    assert writer.rows == []
@@ -0,0 +1,45 @@
+from graph_similarity_v2 import RecipeGraphSimilarity
+
+
+class _FakeSession:
+    def __init__(self, timeouts):
+        self.timeouts = timeouts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_read(self, fn, *args):
+        self.timeouts.append(getattr(fn, "timeout", None))
+        return []
+
+
+class _FakeDriver:
+    def __init__(self):
+        self.timeouts = []
+
+    def session(self):
+        return _FakeSession(self.timeouts)
+
+
+def _similarity():
+    sim = RecipeGraphSimilarity.__new__(RecipeGraphSimilarity)
+    sim.driver = _FakeDriver()
+    return sim
+
+
+def test_timeout_is_sent_as_transaction_timeout():
+    sim = _similarity()
+    assert sim.get_similar_recipes(1, timeout_s=2.0) == {"overall": [], "ingredients": []}
+    first, second = sim.driver.timeouts
+    assert 0 < second <= first <= 2.0
+    # 공유 staticmethod 에는 timeout 이 남지 않음
+    assert getattr(RecipeGraphSimilarity._query_overall_similar, "timeout", None) is None
+
+
+def test_no_timeout_keeps_server_default():
+    sim = _similarity()
+    sim.get_similar_recipes(1)
+    assert sim.driver.timeouts == [None, None]
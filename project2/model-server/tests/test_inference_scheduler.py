@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+from inference_scheduler import EXPLANATION, EXTRACTION, InferenceScheduler, Overloaded
+
+
+def _gated_scheduler(explanation_handler=None, **kwargs):
+    """extraction 요청 하나가 gate 를 기다리는 동안 워커가 묶여 있도록"""
+    gate = threading.Event()
+
+    def extraction(prompts):
+        if "block" in prompts:
+            gate.wait(5)
+        return [{"prompt": p} for p in prompts]
+
+    sched = InferenceScheduler(
+        extraction_handler=extraction,
+        explanation_handler=explanation_handler or (lambda items: [f"expl:{i}" for i in items]),
+        **kwargs,
+    ).start()
+    blocker = sched.submit(EXTRACTION, ["block"])
+    time.sleep(0.05)        # 워커가 blocker 를 집어 갈 때까지
+    return sched, gate, blocker
+
+
+def test_extraction_before_explanation():
+    sched, gate, blocker = _gated_scheduler()
+    order = []
+    expl = sched.submit(EXPLANATION, ["e"])
+    ext = sched.submit(EXTRACTION, ["x"])
+    expl.add_done_callback(lambda f: order.append("explanation"))
+    ext.add_done_callback(lambda f: order.append("extraction"))
+    gate.set()
+    assert ext.result(2) == [{"prompt": "x"}]
+    assert expl.result(2) == ["expl:e"]
+    assert order == ["extraction", "explanation"]
+    sched.close()
+
+
+def test_cancelled_stale_explanation_does_not_kill_worker():
+    sched, gate, blocker = _gated_scheduler(explanation_max_wait_s=0.05)
+    cancelled = sched.submit(EXPLANATION, ["gone"])
+    stale = sched.submit(EXPLANATION, ["stale"])
+    assert cancelled.cancel()
+    time.sleep(0.1)                     # 둘 다 max_wait_s 초과
+    gate.set()
+    blocker.result(2)
+
+    with pytest.raises(Overloaded):
+        stale.result(2)
+    # 워커가 살아 있으면 이후 요청도 처리됨
+    assert sched.submit(EXPLANATION, ["next"]).result(2) == ["expl:next"]
+    assert sched._worker.is_alive()
+    stats = sched.stats()[EXPLANATION]
+    assert stats["shed"] == 1
+    sched.close()
+
+
+def test_short_handler_result_fails_leftover_requests():
+    sched, gate, blocker = _gated_scheduler(explanation_handler=lambda items: [f"expl:{i}" for i in items[:-1]])
+    first = sched.submit(EXPLANATION, ["a", "b"])
+    second = sched.submit(EXPLANATION, ["c"])
+    gate.set()
+    assert first.result(2) == ["expl:a", "expl:b"]
+    with pytest.raises(RuntimeError):
+        second.result(2)
+    assert sched.stats()[EXPLANATION]["failed"] == 1
+    sched.close()
+
+
+def test_queue_depth_sheds_on_submit():
+    sched, gate, blocker = _gated_scheduler(explanation_max_depth=2)
+    sched.submit(EXPLANATION, ["a", "b"])
+    with pytest.raises(Overloaded):
+        sched.submit(EXPLANATION, ["c"])
+    gate.set()
+    sched.close()
@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Listener
+
+import pytest
+
+from inference_scheduler import EXPLANATION, EXTRACTION
+from inference_worker import InferenceClient, InferenceWorkerServer, RemoteError
+
+AUTHKEY = b"test"
+
+
+class FakeScheduler:
+    """추출은 바로 끝내고, 설명은 테스트가 풀어 줄 때까지 큐에 남겨 두는 가짜 InferenceScheduler"""
+
+    def __init__(self):
+        self.explain_futures = []
+
+    def submit(self, kind, items):
+        fut = Future()
+        if kind == EXTRACTION:
+            fut.set_result([{"free_text": p} for p in items])
+        elif kind == EXPLANATION:
+            self.explain_futures.append((fut, items))
+        return fut
+
+    def stats(self):
+        return {"queued": len(self.explain_futures)}
+
+
+def _wait_for(cond, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < end, "condition not met"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def worker(tmp_path_factory):
+    address = str(tmp_path_factory.mktemp("iw") / "w.sock")
+    scheduler = FakeScheduler()
+    server = InferenceWorkerServer(address, scheduler, authkey=AUTHKEY)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _wait_for(lambda: server._listener is not None)
+    return address, scheduler
+
+
+def test_ping_stats_extract_and_explain(worker):
+    address, scheduler = worker
+    client = InferenceClient(address, authkey=AUTHKEY, timeout_s=5)
+    assert client.ping()
+    assert client.stats() == {address: {"queued": 0}}
+    assert client.extract_keywords("계란 요리") == {"free_text": "계란 요리"}
+
+    fut = client.submit_explanations("q", {"k": 1}, [{"recipe_id": 1}, {"recipe_id": 2}])
+    _wait_for(lambda: scheduler.explain_futures)
+    worker_fut, items = scheduler.explain_futures[0]
+    assert items == [("q", {"k": 1}, {"recipe_id": 1}), ("q", {"k": 1}, {"recipe_id": 2})]
+    worker_fut.set_result([{"short_reason": "a"}, {"short_reason": "b"}])
+    assert fut.result(timeout=5) == [{"short_reason": "a"}, {"short_reason": "b"}]
+
+
+def test_remote_errors_are_raised(worker):
+    address, scheduler = worker
+    client = InferenceClient(address, authkey=AUTHKEY, timeout_s=5)
+    with pytest.raises(RemoteError, match="unknown op"):
+        client.call("bogus")
+
+    fut = client.submit_explanations("q", {}, [{"recipe_id": 1}])
+    _wait_for(lambda: scheduler.explain_futures)
+    scheduler.explain_futures[0][0].set_exception(RuntimeError("Overloaded"))
+    with pytest.raises(RemoteError, match="RuntimeError: Overloaded"):
+        fut.result(timeout=5)
+
+
+def test_timeout_cancels_the_queued_request_on_the_worker(worker):
+    address, scheduler = worker
+    client = InferenceClient(address, authkey=AUTHKEY)
+    with pytest.raises(TimeoutError):
+        client.generate_explanations("q", {}, [{"recipe_id": 1}], timeout=0.2)
+    _wait_for(lambda: scheduler.explain_futures and scheduler.explain_futures[0][0].cancelled())
+    assert client.ping()          # 같은 연결은 계속 사용 가능
+
+
+def test_disconnect_fails_pending_requests(tmp_path_factory):
+    address = str(tmp_path_factory.mktemp("iw") / "d.sock")
+    listener = Listener(address, family="AF_UNIX", authkey=AUTHKEY)
+
+    def accept_then_drop():
+        conn = listener.accept()
+        conn.recv()               # 요청을 받고 응답 없이 끊음 (워커 프로세스가 죽은 경우)
+        conn.close()
+
+    t = threading.Thread(target=accept_then_drop, daemon=True)
+    t.start()
+    client = InferenceClient(address, authkey=AUTHKEY, timeout_s=5)
+    with pytest.raises(ConnectionError, match="disconnected"):
+        client.extract_keywords("계란")
+    t.join(5)
+    listener.close()
@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+import jiewan_model_v2
+from extractor_schema import _postprocess_text_to_json
+
+PROMPT = "계란 들어간 30분 이내 요리"
+
+
+def _result():
+    out = _postprocess_text_to_json("", fallback_prompt=PROMPT)
+    out.update(must_ingredients=["계란"], max_cook_time_min=30)
+    return out
+
+
+@pytest.fixture
+def prefilter(monkeypatch):
+    calls = []
+
+    def fake_prefilter(kw):
+        calls.append(kw)
+        return ["1", "2"]
+
+    monkeypatch.setattr(jiewan_model_v2, "prefilter_candidate_ids", fake_prefilter)
+    return calls
+
+
+def test_stream_with_done_uses_prefilter(monkeypatch, prefilter):
+    result = _result()
+
+    def stream(prompt):
+        for k in jiewan_model_v2.HARD_FILTER_FIELDS:
+            yield "field", k, result[k]
+        yield "done", None, result
+
+    monkeypatch.setattr(jiewan_model_v2, "stream_extract_keywords", stream)
+    raw_kw, candidate_ids = jiewan_model_v2._extract_with_prefilter(PROMPT, time.time(), {})
+    assert raw_kw == result and candidate_ids == ["1", "2"]
+
+
+def test_stream_without_done_falls_back_to_full_extraction(monkeypatch, prefilter):
+    result = _result()
+
+    def stream(prompt):
+        for k in jiewan_model_v2.HARD_FILTER_FIELDS:
+            yield "field", k, result[k]
+
+    monkeypatch.setattr(jiewan_model_v2, "stream_extract_keywords", stream)
+    monkeypatch.setattr(jiewan_model_v2, "extract_keywords", lambda prompt: result)
+    timings = {}
+    raw_kw, candidate_ids = jiewan_model_v2._extract_with_prefilter(PROMPT, time.time(), timings)
+    assert raw_kw == result
+    assert candidate_ids is None             # 사전 조회 결과는 버리고 전체 쿼리
+    assert timings["candidates"] is None
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from json_decoding import JsonDepthScanner, SchemaPrefixValidator
+
+VALID = json.dumps({
+    "dish_type": ["찌개"],
+    "must_ingredients": ["김치", "돼지고기"],
+    "spiciness": "medium",
+    "dietary_constraints": {"vegan": False, "no_beef": True},
+    "servings": {"min": 2, "max": None},
+    "max_cook_time_min": 30,
+    "free_text": "김치찌개 \"얼큰하게\"",
+}, ensure_ascii=False, indent=2)
+
+
+def _feed(text):
+    v = SchemaPrefixValidator()
+    return v.feed(text), v
+
+
+def test_validator_accepts_valid_object_and_every_prefix():
+    ok, v = _feed(VALID)
+    assert ok and v.done
+    for i in range(len(VALID)):
+        assert _feed(VALID[:i])[0], VALID[:i]
+
+
+@pytest.mark.parametrize("text", [
+    '{"unknown_key": []}',                              # 모르는 키
+    '{"max_cook_time_min": 1.5}',                        # int 자리에 float
+    '{"spiciness": "very"}',                             # enum 밖의 값
+    '{"dish_type": ["찌개"], "dish_type": []}',          # 중복 키
+    '{"dietary_constraints": {"vegan": "no"}}',         # bool 자리에 문자열
+    '```json\n{}',                                       # 객체 밖 텍스트
+    '{} trailing',
+])
+def test_validator_rejects_invalid_output(text):
+    assert not _feed(text)[0]
+
+
+def test_depth_scanner_ignores_braces_in_strings():
+    s = JsonDepthScanner()
+    assert not s.feed('```json\n{"free_text": "}{ \\" }"')
+    assert s.feed(', "servings": {"min": 1}}')
+
+
+def test_constrained_generation_yields_a_complete_valid_object(tiny_lm):
+    from extractor_batcher import build_chat_text, generate_batch
+
+    tokenizer, model = tiny_lm
+    text = build_chat_text(tokenizer, "계란 들어간 30분 이내 요리")
+    free = generate_batch(tokenizer, model, [text], max_new_tokens=64)[0]
+    constrained = generate_batch(tokenizer, model, [text], max_new_tokens=256, constrained=True)[0]
+
+    assert not _feed(free)[1].done          # 제약 없이는 랜덤 모델이 JSON 을 못 만듦
+    ok, v = _feed(constrained)
+    assert ok and v.done
+    assert isinstance(json.loads(constrained), dict)
@@ -0,0 +1,70 @@
+import pytest
+
+from lexicon_extractor import extract_keywords_fast, extract_numeric_constraints
+
+LEXICON = {
+    "ingredients": ["김치", "감자", "돼지고기"],
+    "dish_type": ["찌개", "김치찌개"],
+}
+
+
+@pytest.mark.parametrize("prompt, expected", [
+    ("김치찌개 2인분 매운거 싫어", "none"),
+    ("매운 건 별로", "none"),
+    ("안 매운 찌개", "none"),
+    ("매운거 말고 순한 찌개", "none"),
+    ("김치찌개 매운걸로", "medium"),
+    ("엄청 매운 찌개", "high"),
+    ("매운건 별로고 살짝 매콤한 찌개", "low"),
+    ("김치 빼고 매운 찌개", "medium"),
+])
+def test_spiciness_respects_negation(prompt, expected):
+    result, _ = extract_keywords_fast(prompt, LEXICON)
+    assert result["spiciness"] == expected
+
+
+def test_negation_on_ingredient_does_not_touch_spiciness():
+    result, _ = extract_keywords_fast("김치 빼고 매운 찌개", LEXICON)
+    assert result["exclude_ingredients"] == ["김치"]
+    assert "김치" not in result["must_ingredients"]
+
+
+def test_unattached_negation_cue_is_not_covered():
+    # "싫어" 가 아무 매칭에도 붙지 않으면 confidence 를 올리지 않음
+    _, attached = extract_keywords_fast("김치찌개 싫어", LEXICON)
+    _, dangling = extract_keywords_fast("싫어 김치찌개", LEXICON)
+    assert attached == 1.0
+    assert dangling < 0.8
+
+
+@pytest.mark.parametrize("prompt, expected", [
+    ("김치찌개 2인분 30분 이내", 30),
+    ("김치찌개 2인분", None),
+    ("감자 3분의1 넣고 20분", 20),
+    ("1시간 30분 안에", 90),
+    ("1시간반 정도", 90),
+    ("2시간", 120),
+])
+def test_max_time_parses_only_time_expressions(prompt, expected):
+    max_time, _, _ = extract_numeric_constraints(prompt)
+    assert max_time == expected
+
+
+def test_servings_not_confused_with_time():
+    max_time, servings, _ = extract_numeric_constraints("10인분 15분")
+    assert servings == {"min": 10, "max": 10}
+    assert max_time == 15
+
+
+@pytest.mark.parametrize("prompt", ["물고기 빼고", "불고기 말고", "돼지고기 빼고 찌개", "오리고기 없이"])
+def test_compound_meat_words_do_not_exclude_all_meat(prompt):
+    result, _ = extract_keywords_fast(prompt, LEXICON)
+    diet = result["dietary_constraints"]
+    assert not diet["no_beef"] and not diet["no_chicken"]
+
+
+@pytest.mark.parametrize("prompt", ["고기 빼고 찌개", "고기 없이 김치찌개", "오늘은 고기 말고"])
+def test_plain_meat_negation_excludes_all_meat(prompt):
+    result, _ = extract_keywords_fast(prompt, LEXICON)
+    diet = result["dietary_constraints"]
+    assert diet["no_beef"] and diet["no_pork"] and diet["no_chicken"]
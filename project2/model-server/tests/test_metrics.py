@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    reg = metrics.Registry(prefix="t")
+    monkeypatch.setattr(metrics, "_registry", reg)
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    return reg
+
+
+def test_render_counters_histograms_and_collectors(registry):
+    metrics.inc("search_results_total", 3, route="search")
+    metrics.observe("stage_duration_seconds", 0.02, stage="neo4j")
+    metrics.observe("stage_duration_seconds", 2.0, stage="neo4j")
+    metrics.register_collector("pool", lambda: {"in_flight": 2, "nested": {"ok": True}, "name": "x"})
+    metrics.register_collector("idle", lambda: None)
+
+    lines = metrics.render().splitlines()
+    assert "# TYPE t_search_results_total counter" in lines
+    assert 't_search_results_total{route="search"} 3' in lines
+    assert "# TYPE t_stage_duration_seconds histogram" in lines
+    assert 't_stage_duration_seconds_bucket{stage="neo4j",le="0.025"} 1' in lines
+    assert 't_stage_duration_seconds_bucket{stage="neo4j",le="2.5"} 2' in lines
+    assert 't_stage_duration_seconds_bucket{stage="neo4j",le="+Inf"} 2' in lines
+    assert 't_stage_duration_seconds_count{stage="neo4j"} 2' in lines
+    assert 't_stage_duration_seconds_sum{stage="neo4j"} 2.02' in lines
+    # collector: 숫자만 gauge 로, 중첩 dict 는 _ 로 이어 붙임, None 은 생략
+    assert "t_pool_in_flight 2" in lines and "t_pool_nested_ok 1" in lines
+    assert not any(line.startswith(("t_pool_name", "t_idle")) for line in lines)
+
+
+def test_stage_counts_errors_and_still_observes(registry):
+    with metrics.stage("crawl"):
+        pass
+    with pytest.raises(TimeoutError):
+        with metrics.stage("crawl"):
+            raise TimeoutError("slow")
+
+    snap = metrics.snapshot()
+    assert snap["histograms"]['stage_duration_seconds{stage="crawl"}']["count"] == 2
+    assert snap["counters"] == {'stage_errors_total{error="TimeoutError",stage="crawl"}': 1}
+
+
+def test_failing_collector_is_skipped(registry, capsys):
+    metrics.register_collector("broken", lambda: 1 / 0)
+    assert "broken" not in metrics.render()
+    assert "metrics collector broken failed" in capsys.readouterr().out
+
+
+def test_default_collectors_do_not_create_subsystems(registry, monkeypatch, tmp_path, capsys):
+    import explanation_cache
+    import openai_pool
+    import recipe_detail_cache
+
+    for mod, attr in ((openai_pool, "_pool"), (recipe_detail_cache, "_cache"), (explanation_cache, "_cache")):
+        monkeypatch.setattr(mod, attr, None)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.chdir(tmp_path)
+
+    metrics.register_default_collectors()
+    metrics.render()
+    metrics.snapshot()
+
+    assert os.listdir(tmp_path) == []
+    assert openai_pool._pool is None and recipe_detail_cache._cache is None and explanation_cache._cache is None
+    assert "[WARN]" not in capsys.readouterr().out
+
+
+def test_default_collectors_report_existing_singletons(registry, monkeypatch):
+    import recipe_detail_cache
+
+    monkeypatch.setattr(recipe_detail_cache, "_cache", recipe_detail_cache.RecipeDetailCache(path=None))
+    metrics.register_default_collectors()
+    assert "t_recipe_detail_cache_" in metrics.render()
+    recipe_detail_cache._cache.close()
@@ -0,0 +1,65 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import openai_pool
+from openai_pool import OpenAIPool, start_stub_server
+
+
+@pytest.fixture
+def stub():
+    stats = {}
+    server, base_url = start_stub_server(delay_s=0.02, stats=stats)
+    yield base_url, stats
+    server.shutdown()
+
+
+def test_concurrent_calls_share_a_bounded_connection_pool(stub):
+    base_url, stats = stub
+    pool = OpenAIPool(api_key="sk-test", base_url=base_url, max_concurrency=4,
+                      rate_per_s=1000, burst=100).start()
+    try:
+        with ThreadPoolExecutor(max_workers=32) as ex:
+            results = list(ex.map(
+                lambda _: pool.embeddings_create(model="stub", input=["계란"]), range(64)))
+    finally:
+        pool.close()
+
+    assert all(r.data[0].embedding == [0.1, 0.2, 0.3] for r in results)
+    assert stats["requests"] == 64
+    assert stats["max_in_flight"] <= 4            # semaphore 로 동시 요청 상한
+    assert len(stats["client_ports"]) <= 4        # keep-alive 커넥션 재사용
+    assert stats["authorization"] == {"Bearer sk-test"}
+    m = pool.metrics()
+    assert m["ok"] == 64 and m["failed"] == 0 and m["in_flight"] == 0
+
+
+def test_get_pool_passes_key_from_environment(monkeypatch, stub):
+    base_url, stats = stub
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-env")
+    monkeypatch.setattr(openai_pool, "OpenAIPool", lambda **kw: OpenAIPool(base_url=base_url, **kw))
+    monkeypatch.setattr(openai_pool, "_pool", None)
+    pool = openai_pool.get_pool()
+    try:
+        pool.responses_create(model="stub", input="계란")
+    finally:
+        pool.close()
+    assert stats["authorization"] == {"Bearer sk-env"}
+
+
+def test_missing_key_fails_fast(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with pytest.raises(RuntimeError, match="OPENAI_API_KEY"):
+        OpenAIPool(api_key=None, base_url=None).start()
+
+
+def test_park_extractor_does_not_overwrite_api_key(monkeypatch):
+    pytest.importorskip("transformers")
+    import importlib
+    import sys
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-env")
+    monkeypatch.delitem(sys.modules, "park_extractor_model", raising=False)
+    importlib.import_module("park_extractor_model")
+    assert os.environ["OPENAI_API_KEY"] == "sk-env"
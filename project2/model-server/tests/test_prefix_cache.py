@@ -0,0 +1,57 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from prefix_cache import SystemPromptPrefixCache
+
+PROMPTS = ["계란 들어간 30분 이내 요리", "비 오는 날 얼큰한 국물 요리 추천해줘"]
+
+
+@pytest.fixture
+def cache(tiny_lm):
+    tokenizer, model = tiny_lm
+    return SystemPromptPrefixCache(tokenizer, model).build()
+
+
+def _gen_kwargs(tokenizer):
+    return dict(max_new_tokens=48, do_sample=False,
+                pad_token_id=tokenizer.eos_token_id, eos_token_id=tokenizer.eos_token_id)
+
+
+def _plain(cache, prompt):
+    inputs = cache.tokenizer(cache._chat_text(prompt), return_tensors="pt")
+    with torch.no_grad():
+        return cache.model.generate(**inputs, **_gen_kwargs(cache.tokenizer))
+
+
+def test_cached_generate_matches_plain_generate(cache):
+    for p in PROMPTS:
+        output_ids, prompt_len, used_cache = cache.generate(p, **_gen_kwargs(cache.tokenizer))
+        assert used_cache
+        assert torch.equal(output_ids, _plain(cache, p))
+    assert cache.stats()["hits"] == len(PROMPTS) and cache.stats()["fallbacks"] == 0
+
+
+def test_prefix_mismatch_falls_back(cache):
+    cache.prefix_ids = cache.prefix_ids.clone()
+    cache.prefix_ids[0, 0] += 1                  # 토큰 경계가 어긋난 경우
+    output_ids, _, used_cache = cache.generate(PROMPTS[0], **_gen_kwargs(cache.tokenizer))
+    assert not used_cache
+    assert torch.equal(output_ids, _plain(cache, PROMPTS[0]))
+    assert cache.stats()["fallbacks"] == 1 and cache.stats()["hits"] == 0
+
+
+def test_cache_error_falls_back(cache, monkeypatch):
+    real_generate = cache.model.generate
+
+    def generate(*args, **kwargs):
+        if "past_key_values" in kwargs:
+            raise RuntimeError("cache not supported")
+        return real_generate(*args, **kwargs)
+
+    monkeypatch.setattr(cache.model, "generate", generate)
+    output_ids, _, used_cache = cache.generate(PROMPTS[0], **_gen_kwargs(cache.tokenizer))
+    assert not used_cache and cache.last_error == "cache not supported"
+    assert torch.equal(output_ids, _plain(cache, PROMPTS[0]))
+    assert cache.stats()["fallbacks"] == 1
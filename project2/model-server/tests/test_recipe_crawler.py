@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+
+import recipe_crawler
+from recipe_crawler import (
+    CrawlDeadlineExceeded, crawl_deadline, load_fixture, parse_recipe_fast, parse_recipe_full,
+)
+from recipe_detail_cache import RecipeDetailCache
+
+
+@pytest.mark.parametrize("name", ["recipe_detail.html", "recipe_detail_view3.html"])
+@pytest.mark.parametrize("features", sorted({recipe_crawler.FAST_PARSER_FEATURES, "html.parser"}))
+def test_fast_parser_matches_full_parser(monkeypatch, name, features):
+    monkeypatch.setattr(recipe_crawler, "FAST_PARSER_FEATURES", features)
+    html = load_fixture(name)
+    assert parse_recipe_fast(html) == parse_recipe_full(html)
+
+
+def test_view3_pic_fallback_and_step_without_image():
+    # centeredcrop 이 없는 레이아웃 → 본문의 view3_pic (script 문자열 / 댓글 영역 것이 아님)
+    r = parse_recipe_fast(load_fixture("recipe_detail_view3.html"))
+    assert r["image_url"] == "https://recipe1.ezmember.co.kr/cache/recipe/view3_main.jpg"
+    assert r["infos"] == ["3인분", "", "아무나"]
+    assert r["grid_info"] == {"재료": [("두부", "1모"), ("된장", "")], "조리도구": []}
+    assert r["steps"] == [
+        {"text": "물 800ml 에 된장을 풀어 끓여 주세요.", "tools": "냄비",
+         "img_url": "https://recipe1.ezmember.co.kr/cache/recipe/view3_step1.jpg"},
+        {"text": "두부를 깍둑썰기 해서 넣어 주세요.", "tools": "", "img_url": ""},
+        {"text": "", "tools": "", "img_url": ""},
+    ]
+
+
+def test_fetch_stops_at_crawl_deadline(fixture_server):
+    base_url, _ = fixture_server(delay_s=1.0)
+    t0 = time.perf_counter()
+    with crawl_deadline(t0 + 0.2):
+        with pytest.raises(CrawlDeadlineExceeded):
+            recipe_crawler.fetch_recipe_html(1, base_url=base_url)
+    assert time.perf_counter() - t0 < 0.8
+    # deadline 밖에서는 제한 없음
+    assert recipe_crawler.time_left() is None
+
+
+def test_cache_waiter_respects_deadline_for_in_flight_fetch():
+    release = threading.Event()
+
+    def slow_fetch(key):
+        release.wait(5)
+        return {"title": key}
+
+    cache = RecipeDetailCache(fetch_fn=slow_fetch, path=None)
+    try:
+        cache.prefetch([7])                     # 백그라운드 크롤링이 진행 중
+        t0 = time.perf_counter()
+        with crawl_deadline(t0 + 0.1):
+            with pytest.raises(CrawlDeadlineExceeded):
+                cache.get(7)
+        assert time.perf_counter() - t0 < 1.0
+        release.set()
+        assert cache.get(7) == {"title": "7"}
+    finally:
+        release.set()
+        cache.close()
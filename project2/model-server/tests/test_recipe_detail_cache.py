@@ -0,0 +1,80 @@
+import json
+import threading
+import time
+
+import pytest
+
+from recipe_crawler import RecipeNotFound, get_recipe, load_fixture, parse_recipe
+from recipe_detail_cache import FRESH, MISS, NEGATIVE, STALE, RecipeDetailCache
+
+
+@pytest.fixture
+def upstream(fixture_server):
+    return fixture_server(pages={1: load_fixture()}, delay_s=0.05)
+
+
+def _cache(base_url, **kwargs):
+    kwargs.setdefault("path", None)
+    return RecipeDetailCache(fetch_fn=lambda rid: get_recipe(rid, base_url=base_url), **kwargs)
+
+
+def test_concurrent_misses_crawl_once(upstream):
+    base_url, hits = upstream
+    cache = _cache(base_url)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(1))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert results == [parse_recipe(load_fixture())] * 8
+    assert hits["1"] == 1
+    assert cache.lookup(1)[0] == FRESH
+    cache.close()
+
+
+def test_not_found_is_negative_cached(upstream):
+    base_url, hits = upstream
+    cache = _cache(base_url)
+    for _ in range(3):
+        with pytest.raises(RecipeNotFound):
+            cache.get(404)
+    assert hits["404"] == 1
+    assert cache.lookup(404)[0] == NEGATIVE
+    cache.close()
+
+
+def test_stale_entry_is_served_and_refreshed_in_background(upstream):
+    base_url, hits = upstream
+    cache = _cache(base_url, ttl_s=0.05, stale_s=60)
+    first = cache.get(1)
+    time.sleep(0.1)
+    assert cache.lookup(1)[0] == STALE
+    assert cache.get(1) == first            # 바로 stale 값, 갱신은 백그라운드
+    deadline = time.monotonic() + 5
+    while hits["1"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert hits["1"] == 2
+    cache.close()
+
+
+def test_sqlite_tier_survives_restart_and_serves_expired_value_on_error(tmp_path, upstream):
+    base_url, hits = upstream
+    path = str(tmp_path / "details.sqlite")
+    cache = _cache(base_url, path=path)
+    value = json.loads(json.dumps(cache.get(1)))      # sqlite 에는 JSON 으로 (tuple → list)
+    cache.close()
+
+    def broken_fetch(rid):
+        raise ConnectionError("upstream down")
+
+    restarted = RecipeDetailCache(fetch_fn=broken_fetch, path=path)
+    assert restarted.get(1) == value and restarted.stats()["disk_hits"] == 1
+    restarted.close()
+
+    expired = RecipeDetailCache(fetch_fn=broken_fetch, path=path, ttl_s=0, stale_s=0)
+    assert expired.get(1) == value           # 크롤링 실패 → 만료된 값이라도
+    assert expired.stats()["stale_on_error"] == 1
+    assert expired.lookup(2) == (MISS, None)
+    expired.close()
+    assert hits["1"] == 1
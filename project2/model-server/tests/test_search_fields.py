@@ -0,0 +1,25 @@
+import pytest
+
+import search_fields
+
+
+def test_parse_explain_defaults_and_rejects_unknown_modes():
+    assert search_fields.parse_explain({}) == "none"
+    assert search_fields.parse_explain({"explain": "llm_async"}) == "llm_async"
+    assert search_fields.parse_explain({}, search_fields.STREAM_EXPLAIN_MODES, default="cached") == "cached"
+    with pytest.raises(ValueError, match="explain must be one of"):
+        search_fields.parse_explain({"explain": "llm"})            # 스트리밍 전용 모드
+    with pytest.raises(ValueError):
+        search_fields.parse_explain({"explain": "llm_async"}, search_fields.STREAM_EXPLAIN_MODES)
+
+
+def test_parse_request_and_projection():
+    level, fields = search_fields.parse_request({"explain_level": "none", "fields": ["title"]})
+    assert search_fields.explanation_fields(level, fields) == set()
+    recipes = [{"recipe_id": 1, "title": "a", "summary": "s", "template_reason": "t", "score": 0.5}]
+    assert search_fields.project_recipes(recipes, level, fields) == [
+        {"recipe_id": 1, "title": "a", "template_reason": "t"}]
+    with pytest.raises(ValueError):
+        search_fields.parse_request({"explain_level": "verbose"})
+    with pytest.raises(ValueError):
+        search_fields.parse_request({"fields": "title"})
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+import speculative
+from speculative import SpeculationMeter
+
+
+@pytest.fixture
+def local_model(monkeypatch, tiny_lm):
+    import new_extractor_model
+
+    tokenizer, model = tiny_lm
+    # draft 모델: 같은 vocab, 다른 가중치 (초안 일부가 거부되도록)
+    torch.manual_seed(1)
+    draft = transformers.LlamaForCausalLM(model.config).eval()
+    monkeypatch.setattr(speculative, "_draft_model", draft)
+    monkeypatch.setattr(new_extractor_model, "load_model", lambda: (tokenizer, model))
+    for flag in ("USE_BATCHING", "USE_SCHEDULER", "USE_PREFIX_CACHE"):
+        monkeypatch.setattr(new_extractor_model, flag, False)
+    monkeypatch.setattr(new_extractor_model, "_spec_stats", speculative.SpeculationStats())
+    return new_extractor_model
+
+
+PROMPTS = ["계란 들어간 30분 이내 요리", "돼지고기 빼고 혼밥용 덮밥"]
+
+
+def _generate(nem, prompt, draft):
+    tokenizer, output_ids, prompt_len = nem._generate_ids(prompt, False, False, draft)
+    return tokenizer.decode(output_ids[0][prompt_len:], skip_special_tokens=True)
+
+
+@pytest.mark.parametrize("draft", ["prompt_lookup", "model"])
+def test_draft_output_matches_plain_greedy(local_model, draft):
+    for p in PROMPTS:
+        assert _generate(local_model, p, draft) == _generate(local_model, p, "none")
+    stats = local_model.get_speculation_stats()
+    assert stats["requests"] == len(PROMPTS)
+    assert stats["target_forwards"] <= stats["new_tokens"]
+    if draft == "model":
+        assert stats["proposed_tokens"] >= stats["accepted_tokens"]
+    else:
+        assert stats["proposed_tokens"] == 0          # prompt_lookup 초안 길이는 알 수 없음
+
+
+def test_prefix_cache_path_records_speculation(local_model, monkeypatch):
+    monkeypatch.setattr(local_model, "USE_PREFIX_CACHE", True)
+    monkeypatch.setattr(local_model, "_prefix_cache", None)
+
+    # (출력 비교는 안 함: 랜덤 소형 모델은 logit 이 거의 같은 자리가 있어 cache 경로의 float 오차로 갈릴 수 있음)
+    for p in PROMPTS:
+        _generate(local_model, p, "prompt_lookup")
+    stats = local_model.get_speculation_stats()
+    assert stats["requests"] == len(PROMPTS)
+    assert 0 < stats["target_forwards"] <= stats["new_tokens"]
+    assert local_model.get_prefix_cache().stats()["hits"] == len(PROMPTS)
+
+
+def test_meter_is_per_call_under_concurrency(local_model, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(local_model._spec_stats, "record", recorded.append)
+
+    for p in PROMPTS:
+        _generate(local_model, p, "model")
+    sequential = sorted((r["new_tokens"], r["target_forwards"]) for r in recorded)
+    recorded.clear()
+
+    threads = [threading.Thread(target=_generate, args=(local_model, p, "model")) for p in PROMPTS * 2]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(60)
+    # 동시에 돌아도 요청별 측정값은 단독 실행과 같음 (다른 요청의 forward 가 섞이지 않음)
+    assert sorted((r["new_tokens"], r["target_forwards"]) for r in recorded) == sorted(sequential * 2)
+
+
+def test_meter_forwards_to_inner_streamer():
+    seen = []
+
+    class Inner:
+        def put(self, value):
+            seen.append(int(value.shape[-1]))
+
+        def end(self):
+            seen.append("end")
+
+    meter = SpeculationMeter(prompt_len=3, max_new_tokens=6, draft_tokens=4, inner=Inner())
+    for n in (3, 1, 3, 2):         # 프롬프트 → step 3번 (1 / 3 / 2 토큰 확정)
+        meter.put(torch.zeros(1, n))
+    meter.end()
+    stats = meter.finish(torch.zeros(1, 3 + 6))
+    assert seen == [3, 1, 3, 2, "end"]
+    # 초안 길이: min(4, 6-0-1)=4, min(4, 6-1-1)=4, min(4, 6-4-1)=1
+    assert (stats["target_forwards"], stats["proposed_tokens"], stats["accepted_tokens"]) == (3, 9, 3)
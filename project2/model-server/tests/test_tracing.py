@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+
+def _names(node):
+    return [c["name"] for c in node.get("children", [])]
+
+
+def test_span_tree_follows_wrap_into_thread_pool(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", True)
+    monkeypatch.setattr(tracing, "SLOW_REQUEST_THRESHOLD_S", 1e9)
+
+    def detail(recipe_id):
+        with tracing.span("detail", recipe_id=recipe_id):
+            tracing.annotate(rows=1)
+
+    with tracing.trace("/jiewan-search-v2", body={"query": "계란"}) as t:
+        tracing.annotate_trace(keywords={"must_ingredients": ["계란"]})
+        with tracing.span("search"):
+            with ThreadPoolExecutor(max_workers=2) as ex:
+                list(ex.map(tracing.wrap(detail), [1, 2]))
+        # wrap 없이 넘긴 함수는 trace 밖 → span 이 생기지 않음
+        with ThreadPoolExecutor(max_workers=1) as ex:
+            ex.submit(detail, 3).result()
+
+    record = t.to_dict()
+    assert record["keywords"] == {"must_ingredients": ["계란"]}
+    root = record["spans"]
+    assert root["attrs"]["body"] == {"query": "계란"}
+    assert _names(root) == ["search"]
+    search = root["children"][0]
+    assert sorted(c["attrs"]["recipe_id"] for c in search["children"]) == [1, 2]
+    assert all(c["attrs"]["rows"] == 1 for c in search["children"])
+    assert tracing.current_trace_id() is None
+
+
+def test_disabled_tracing_records_nothing(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", False)
+    with tracing.trace("/x") as t:
+        with tracing.span("inner") as s:
+            tracing.annotate(a=1)
+    assert t is None and s is None
+    assert tracing.start_trace("/x") == (None, None)
+
+
+def test_slow_log_write_read_and_format_tree(monkeypatch, tmp_path):
+    log = tmp_path / "slow.jsonl"
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", True)
+    monkeypatch.setattr(tracing, "SLOW_REQUEST_THRESHOLD_S", 0.0)
+    monkeypatch.setattr(tracing, "SLOW_REQUEST_LOG", str(log))
+
+    t, token = tracing.start_trace("/crawl-recipe/<int:recipe_id>", method="GET")
+    with tracing.span("neo4j", query="similar", params={"ids": list(range(200))}):
+        pass
+    tracing.record_span("openai", 0.5)
+    try:
+        with tracing.span("detail"):
+            raise RuntimeError("timeout")
+    except RuntimeError:
+        pass
+    tracing.end_trace(t, token, status=200)
+
+    records = list(tracing.read_slow(str(log)))
+    assert len(records) == 1
+    rec = records[0]
+    assert rec["trace_id"] == t.trace_id
+    assert rec["spans"]["attrs"] == {"method": "GET", "status": 200}
+    neo4j, openai, detail = rec["spans"]["children"]
+    # 긴 리스트는 앞부분 + 길이만
+    assert neo4j["attrs"]["params"]["ids"]["len"] == 200
+    assert len(neo4j["attrs"]["params"]["ids"]["head"]) == tracing.MAX_LIST_ITEMS
+    assert openai["duration_ms"] >= 500
+    assert detail["error"] == "RuntimeError: timeout"
+
+    text = tracing.format_tree(rec)
+    lines = text.splitlines()
+    assert lines[0].startswith("/crawl-recipe/<int:recipe_id>") and t.trace_id in lines[0]
+    assert lines[1].lstrip().startswith("- neo4j") and '"query": "similar"' in lines[1]
+    assert "params" not in lines[1]
+    assert lines[2].lstrip().startswith("- openai")
+    assert "ERROR RuntimeError: timeout" in lines[3]
+
+
+def test_max_spans_counts_dropped(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", True)
+    monkeypatch.setattr(tracing, "SLOW_REQUEST_THRESHOLD_S", 1e9)
+    monkeypatch.setattr(tracing, "MAX_SPANS", 3)
+    with tracing.trace("/x") as t:
+        for i in range(5):
+            with tracing.span(f"s{i}"):
+                pass
+    record = t.to_dict()
+    assert _names(record["spans"]) == ["s0", "s1"]
+    assert record["dropped_spans"] == 3
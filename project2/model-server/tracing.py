@@ -0,0 +1,347 @@
+# tracing.py
+# 요청 단위 span 트리 + 느린 요청 로그 (slow_requests.jsonl) + replay
+#
+#   with tracing.trace("/jiewan-search-v2", body=data):      # 요청 하나 = trace 하나 (app 의 before/teardown_request)
+#       with tracing.span("neo4j", query="candidates"):      # 안쪽 구간 (metrics.stage 도 같은 span 을 만듦)
+#           tracing.annotate(params=params)
+#
+# - 현재 span 은 contextvars 로 전달 → asyncio task 는 자동, 스레드풀은 tracing.wrap(fn) 으로 넘김
+# - trace 가 없으면 span()/annotate() 는 아무것도 안 함 (배치 스크립트 / 벤치마크에서 비용 없음)
+# - 끝난 trace 가 SLOW_REQUEST_THRESHOLD_S 이상이면 span 트리 + 요청 body + 추출 키워드 + Cypher 파라미터를
+#   SLOW_REQUEST_LOG 에 JSON 한 줄로 남김
+# - python tracing.py show slow_requests.jsonl           : 트리로 출력
+#   python tracing.py replay slow_requests.jsonl --url http://127.0.0.1:8001   : 같은 요청 다시 보내서 비교
+#   python tracing.py replay slow_requests.jsonl --local : 기록된 키워드로 그래프 검색만 다시 (추출 제외)
+import argparse
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "1") == "1"
+SLOW_REQUEST_THRESHOLD_S = float(os.environ.get("SLOW_REQUEST_THRESHOLD_S", "3"))
+SLOW_REQUEST_LOG = os.environ.get("SLOW_REQUEST_LOG", "slow_requests.jsonl")
+# trace 하나에 남길 최대 span 수 (상세 쿼리가 레시피마다 생기므로 넉넉히, 넘으면 dropped_spans 로 집계)
+MAX_SPANS = int(os.environ.get("TRACING_MAX_SPANS", "500"))
+# 로그에 남길 리스트 최대 길이 (candidate_ids 같은 큰 파라미터는 앞부분 + 길이만)
+MAX_LIST_ITEMS = 50
+# slow 로그에 남길 요청 body 최대 크기 (이보다 크면 body 생략)
+TRACE_BODY_MAX_BYTES = int(os.environ.get("TRACE_BODY_MAX_BYTES", str(64 * 1024)))
+
+_current = contextvars.ContextVar("tracing_current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "end", "children", "error", "trace")
+
+    def __init__(self, name, attrs, trace):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+        self.error = None
+        self.trace = trace
+
+    @property
+    def duration_s(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    def to_dict(self, t0: float) -> dict:
+        d = {
+            "name": self.name,
+            "start_ms": round((self.start - t0) * 1000, 2),
+            "duration_ms": round(self.duration_s * 1000, 2),
+        }
+        if self.attrs:
+            d["attrs"] = _compact(self.attrs)
+        if self.error:
+            d["error"] = self.error
+        if self.children:
+            d["children"] = [c.to_dict(t0) for c in self.children]
+        return d
+
+
+class Trace:
+    def __init__(self, name, attrs):
+        self.trace_id = uuid.uuid4().hex
+        self.ts = time.time()
+        self.root = Span(name, attrs, self)
+        self.extra = {}           # annotate_trace(): keywords 등 요청 전체에 대한 값
+        self.n_spans = 1
+        self.dropped_spans = 0
+        self._lock = threading.Lock()
+
+    def _add(self, parent: Span, span: Span) -> bool:
+        with self._lock:
+            if self.n_spans >= MAX_SPANS:
+                self.dropped_spans += 1
+                return False
+            self.n_spans += 1
+            parent.children.append(span)
+        return True
+
+    def to_dict(self) -> dict:
+        t0 = self.root.start
+        return {
+            "trace_id": self.trace_id,
+            "ts": self.ts,
+            "name": self.root.name,
+            "duration_ms": round(self.root.duration_s * 1000, 2),
+            **_compact(self.extra),
+            "dropped_spans": self.dropped_spans,
+            "spans": self.root.to_dict(t0),
+        }
+
+
+# =========================================================
+# 계측 API
+# =========================================================
+
+@contextmanager
+def trace(name: str, **attrs):
+    """요청 하나의 root span. 끝날 때 느리면 slow 로그 (yield 값: Trace, tracing 꺼져 있으면 None)"""
+    if not TRACING_ENABLED:
+        yield None
+        return
+    t = Trace(name, attrs)
+    token = _current.set(t.root)
+    try:
+        yield t
+    except Exception as e:
+        t.root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        finish(t)
+
+
+def start_trace(name: str, **attrs):
+    """with 로 감쌀 수 없는 곳 (Flask before_request) 용. 리턴: (trace, token) → end_trace 로 종료"""
+    if not TRACING_ENABLED:
+        return None, None
+    t = Trace(name, attrs)
+    return t, _current.set(t.root)
+
+
+def end_trace(t, token, error: str = None, **attrs):
+    if t is None:
+        return
+    t.root.attrs.update(attrs)
+    if error:
+        t.root.error = error
+    try:
+        _current.reset(token)
+    except ValueError:
+        # 다른 context 에서 시작된 token (스트리밍 응답 등) → 현재 값만 비움
+        _current.set(None)
+    finish(t)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    s = Span(name, attrs, parent.trace)
+    if not parent.trace._add(parent, s):
+        yield None
+        return
+    token = _current.set(s)
+    try:
+        yield s
+    except Exception as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.end = time.perf_counter()
+        _current.reset(token)
+
+
+def record_span(name: str, duration_s: float, **attrs):
+    """이미 끝난 구간을 현재 span 의 자식으로 추가 (with 로 감싸기 어려운 긴 구간)"""
+    parent = _current.get()
+    if parent is None:
+        return
+    s = Span(name, attrs, parent.trace)
+    s.end = time.perf_counter()
+    s.start = s.end - duration_s
+    parent.trace._add(parent, s)
+
+
+def annotate(**attrs):
+    """현재 span 에 속성 추가 (Cypher 파라미터, 결과 수 등)"""
+    s = _current.get()
+    if s is not None:
+        s.attrs.update(attrs)
+
+
+def annotate_trace(**values):
+    """trace 전체에 붙는 값 (추출 키워드 등 — slow 로그 최상위에 들어감)"""
+    s = _current.get()
+    if s is not None:
+        s.trace.extra.update(values)
+
+
+def current_trace_id():
+    s = _current.get()
+    return None if s is None else s.trace.trace_id
+
+
+def wrap(fn):
+    """스레드풀에 넘길 함수가 지금 span 아래에서 돌도록 (executor.submit(tracing.wrap(fn), ...))"""
+    ctx = contextvars.copy_context()
+
+    def _run(*args, **kwargs):
+        return ctx.run(fn, *args, **kwargs)
+    return _run
+
+
+# =========================================================
+# slow 로그
+# =========================================================
+
+_log_lock = threading.Lock()
+
+
+def finish(t: Trace):
+    t.root.end = time.perf_counter()
+    if t.root.duration_s >= SLOW_REQUEST_THRESHOLD_S:
+        write_slow(t)
+
+
+def write_slow(t: Trace, path: str = None):
+    try:
+        line = json.dumps(t.to_dict(), ensure_ascii=False, default=str)
+        with _log_lock, open(path or SLOW_REQUEST_LOG, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except Exception as e:
+        print("[WARN] slow request log failed:", e)
+
+
+def _compact(value, depth: int = 0):
+    """로그용: 긴 리스트는 앞부분 + 길이, 너무 깊은 구조는 문자열"""
+    if depth > 6:
+        return str(value)
+    if isinstance(value, dict):
+        return {str(k): _compact(v, depth + 1) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        items = list(value)
+        if len(items) > MAX_LIST_ITEMS:
+            return {"len": len(items), "head": [_compact(v, depth + 1) for v in items[:MAX_LIST_ITEMS]]}
+        return [_compact(v, depth + 1) for v in items]
+    return value
+
+
+def read_slow(path: str = None):
+    with open(path or SLOW_REQUEST_LOG, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def format_tree(record: dict) -> str:
+    """slow 로그 한 줄 → 들여쓴 span 트리 (가장 오래 걸린 자식이 눈에 띄도록 비율 표시)"""
+    total = record["duration_ms"] or 1.0
+    lines = [f"{record['name']}  {record['duration_ms']:.1f}ms  trace={record['trace_id']}"]
+
+    def _walk(node, depth):
+        for c in node.get("children", []):
+            pct = c["duration_ms"] / total * 100
+            attrs = c.get("attrs") or {}
+            short = {k: v for k, v in attrs.items() if k != "params"}
+            err = f"  ERROR {c['error']}" if c.get("error") else ""
+            lines.append(f"{'  ' * depth}- {c['name']}  +{c['start_ms']:.1f}ms  {c['duration_ms']:.1f}ms "
+                         f"({pct:.0f}%)  {json.dumps(short, ensure_ascii=False) if short else ''}{err}")
+            _walk(c, depth + 1)
+
+    _walk(record["spans"], 1)
+    return "\n".join(lines)
+
+
+# =========================================================
+# replay
+# =========================================================
+
+def replay_http(record: dict, base_url: str, timeout_s: float = 120.0) -> dict:
+    """기록된 요청(method / path / body)을 다시 보내고 소요 시간 비교 (응답의 X-Trace-Id 로 새 trace 확인)"""
+    import requests
+
+    attrs = record["spans"].get("attrs") or {}
+    method = attrs.get("method", "POST")
+    url = base_url.rstrip("/") + attrs.get("path", record["name"])
+    t0 = time.perf_counter()
+    res = requests.request(method, url, json=attrs.get("body"), timeout=timeout_s)
+    return {
+        "trace_id": record["trace_id"],
+        "url": url,
+        "status": res.status_code,
+        "recorded_ms": record["duration_ms"],
+        "replay_ms": round((time.perf_counter() - t0) * 1000, 2),
+        "replay_trace_id": res.headers.get("X-Trace-Id"),
+    }
+
+
+def replay_local(record: dict) -> dict:
+    """
+    기록된 키워드로 그래프 검색만 다시 실행 (추출 모델 제외 → Neo4j / 선택 / 설명 구간만 비교).
+    리턴: {"trace_id", "recorded_ms", "replay": 새 trace dict}
+    """
+    from jiewan_model_v2 import graph_rag_search_with_scoring_explanation
+
+    body = (record["spans"].get("attrs") or {}).get("body") or {}
+    keywords = record.get("keywords")
+    if keywords is None:
+        raise ValueError(f"trace {record['trace_id']} has no recorded keywords")
+    # slow 로그에는 다시 쓰지 않도록 trace() 대신 직접 시작 / 종료
+    t = Trace("replay:" + record["name"], {"body": body, "replay_of": record["trace_id"]})
+    token = _current.set(t.root)
+    try:
+        graph_rag_search_with_scoring_explanation(
+            body.get("query", ""),
+            top_k=int(body.get("top_k", 5)),
+            filterKeywords=body.get("filterKeywords") or {},
+            raw_kw=dict(keywords),
+        )
+    finally:
+        _current.reset(token)
+        t.root.end = time.perf_counter()
+    return {"trace_id": record["trace_id"], "recorded_ms": record["duration_ms"], "replay": t.to_dict()}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="slow request log viewer / replayer")
+    ap.add_argument("command", choices=["show", "replay"])
+    ap.add_argument("path", nargs="?", default=SLOW_REQUEST_LOG)
+    ap.add_argument("--url", help="replay: 요청을 다시 보낼 서버 (예: http://127.0.0.1:8001)")
+    ap.add_argument("--local", action="store_true", help="replay: 기록된 키워드로 그래프 검색만 다시 실행")
+    ap.add_argument("--trace-id", help="이 trace 만")
+    ap.add_argument("--last", type=int, default=None, help="마지막 N개만")
+    args = ap.parse_args(argv)
+
+    records = [r for r in read_slow(args.path) if not args.trace_id or r["trace_id"] == args.trace_id]
+    if args.last:
+        records = records[-args.last:]
+
+    for r in records:
+        if args.command == "show":
+            print(format_tree(r))
+            print()
+        elif args.local:
+            out = replay_local(r)
+            print(f"recorded {out['recorded_ms']:.1f}ms → replay (no extract) {out['replay']['duration_ms']:.1f}ms")
+            print(format_tree(out["replay"]))
+            print()
+        elif args.url:
+            print(json.dumps(replay_http(r, args.url), ensure_ascii=False))
+        else:
+            ap.error("replay 에는 --url 또는 --local 필요")
+
+
+if __name__ == "__main__":
+    main()